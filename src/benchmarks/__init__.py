@@ -0,0 +1,15 @@
+"""
+src/benchmarks/__init__.py — Benchmarks for the crawler (offline, no real network).
+
+Author: Danil
+Created: 2026-10-17
+
+Description:
+    Benchmarks are run as modules from the `src/` directory, for example:
+        python -m benchmarks.bench_extractors
+
+Project Structure:
+    - bench_extractors.py : Parse hot-path benchmark over saved HTML pages.
+    - bench_e2e.py        : End-to-end crawl benchmark against the local mock site.
+    - mock_server.py      : aiohttp mock of the mashina.kg search and detail pages.
+"""
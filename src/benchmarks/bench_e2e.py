@@ -0,0 +1,194 @@
+"""
+src/benchmarks/bench_e2e.py — End-to-end crawl throughput benchmark against the local mock site.
+
+Author: Danil
+Created: 2026-10-17
+Description:
+    Starts `benchmarks.mock_server` in a separate process and runs the real
+    `main_crawl` pipeline against it once per concurrency setting, reporting:
+    - wall time of the whole crawl and records written
+    - requests/second over the network (cache hits excluded)
+    - p50 / p99 request latency as seen by the client
+    - response status counts (including injected 429 / 500 responses)
+
+    Per-host rate limits are lifted for the mock host so the numbers show what
+    the fetch/parse/write pipeline itself can sustain. Latency, error and
+    throttle rates of the mock site are configurable to see how the pipeline
+    behaves under a slow or flaky server.
+
+Usage:
+    cd src
+    python -m benchmarks.bench_e2e --concurrency 8 32 128 --pages 20 --latency 0.05
+    python -m benchmarks.bench_e2e --throttle-rate 0.02 --error-rate 0.01 --json e2e.json
+
+Dependencies:
+    - aiohttp (mock server)
+    - benchmarks.mock_server, services.crawl_service.main_crawl
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import tempfile
+import time
+import urllib.request
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks.mock_server import MockSiteConfig, run as run_mock_server
+from services.crawl_service import main_crawl
+from services.options import CrawlOptions
+from utils.fetch import add_response_hook, remove_response_hook
+from utils.http_client import FetchResponse
+
+MOCK_HOST: str = "127.0.0.1"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind((MOCK_HOST, 0))
+        return s.getsockname()[1]
+
+
+def start_mock_server(config: MockSiteConfig, timeout: float = 10.0) -> Tuple[multiprocessing.Process, str]:
+    """
+    Start the mock site in a child process and wait until it answers.
+
+    Args:
+        config (MockSiteConfig): Site shape and failure injection settings.
+        timeout (float): Seconds to wait for the server to come up.
+
+    Returns:
+        Tuple[multiprocessing.Process, str]: The server process and its base URL.
+    """
+    port: int = _free_port()
+    process = multiprocessing.Process(target=run_mock_server, args=(config, MOCK_HOST, port), daemon=True)
+    process.start()
+    base_url: str = f"http://{MOCK_HOST}:{port}"
+    deadline: float = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(base_url + "/__stats", timeout=1).read()
+            return process, base_url
+        except OSError:
+            time.sleep(0.05)
+    process.terminate()
+    raise RuntimeError("Mock server did not start")
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered: List[float] = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def bench_concurrency(base_url: str, concurrency: int, workdir: str, parse_workers: int = 0) -> Dict[str, Any]:
+    """
+    Run one full crawl against the mock site.
+
+    Args:
+        base_url (str): Mock site base URL.
+        concurrency (int): Detail-stage workers (listing stage uses a quarter, at least 1).
+        workdir (str): Directory for the output and checkpoint files.
+        parse_workers (int): Parse pool processes (0 = parse on the event loop).
+
+    Returns:
+        Dict[str, Any]: Wall time, throughput, latency percentiles and status counts.
+    """
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+
+    def on_response(response: FetchResponse) -> None:
+        latencies.append(response.elapsed)
+        statuses[response.status] += 1
+
+    output_path: str = os.path.join(workdir, f"bench_c{concurrency}.ndjson")
+    options = CrawlOptions(
+        search_url=f"{base_url}/search/all/?page=1",
+        listing_concurrency=max(1, concurrency // 4),
+        detail_concurrency=concurrency,
+        parse_workers=parse_workers,
+        host_rates={},
+        default_rate=1_000_000.0,
+        output_path=output_path,
+        compression=None,
+        legacy_json_path=None,
+        state_path=os.path.join(workdir, f"bench_c{concurrency}.sqlite3"),
+    )
+
+    add_response_hook(on_response)
+    start: float = time.perf_counter()
+    try:
+        asyncio.run(main_crawl(options))
+    finally:
+        wall: float = time.perf_counter() - start
+        remove_response_hook(on_response)
+
+    with open(output_path, encoding="utf-8") as f:
+        records: int = sum(1 for _ in f)
+    return {
+        "concurrency": concurrency,
+        "parse_workers": parse_workers,
+        "wall_seconds": wall,
+        "records": records,
+        "requests": len(latencies),
+        "requests_per_sec": len(latencies) / wall if wall else None,
+        "latency_p50_ms": (_percentile(latencies, 0.50) or 0.0) * 1000,
+        "latency_p99_ms": (_percentile(latencies, 0.99) or 0.0) * 1000,
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+    }
+
+
+def print_results(results: List[Dict[str, Any]]) -> None:
+    print(f"\n{'conc':>5} {'wall s':>8} {'records':>8} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8}  statuses")
+    for r in results:
+        print(f"{r['concurrency']:>5} {r['wall_seconds']:>8.2f} {r['records']:>8} {r['requests_per_sec']:>9.1f} "
+              f"{r['latency_p50_ms']:>8.1f} {r['latency_p99_ms']:>8.1f}  {r['statuses']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="End-to-end crawl benchmark against a local mock site")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[8, 32, 128],
+                        help="detail-stage worker counts to measure")
+    parser.add_argument("--parse-workers", type=int, default=0, help="parse pool processes")
+    parser.add_argument("--pages", type=int, default=20, help="search result pages on the mock site")
+    parser.add_argument("--cards-per-page", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.02, help="mean server delay, seconds")
+    parser.add_argument("--jitter", type=float, default=0.01, help="± spread of the delay, seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of 500 responses")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="share of 429 responses")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", default=None, help="save results to this file")
+    args = parser.parse_args()
+
+    config = MockSiteConfig(
+        pages=args.pages,
+        cards_per_page=args.cards_per_page,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        seed=args.seed,
+    )
+    process, base_url = start_mock_server(config)
+    results: List[Dict[str, Any]] = []
+    try:
+        with tempfile.TemporaryDirectory(prefix="bench_e2e_") as workdir:
+            for concurrency in args.concurrency:
+                results.append(bench_concurrency(base_url, concurrency, workdir, args.parse_workers))
+    finally:
+        process.terminate()
+        process.join()
+
+    print_results(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"mock_site": vars(config), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
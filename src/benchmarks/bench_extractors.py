@@ -0,0 +1,241 @@
+"""
+src/benchmarks/bench_extractors.py — Offline benchmark of the HTML extractors.
+
+Author: Danil
+Created: 2026-10-17
+Description:
+    Measures the parse hot path on saved pages only (no network):
+    - `extract_car_details` end to end, in pages/second
+    - soup construction and every individual extractor from
+      `utils.parse_details.EXTRACTORS` (head_info, specs, history, ...),
+      collected through the extractor registry's timing hook
+    - `extract_links_from_html` on search result pages
+    - peak memory of a single detail-page parse (tracemalloc)
+    - with `--scoped`, the same for scoped parsing (only the blocks the
+      extractors read), plus the number of pages whose scoped output differs
+      from the full parse
+
+    The corpus is a directory of `.html` files (default:
+    `data/reference_data/html/`) or an HTML cache directory (`--cache-dir`).
+    Pages containing search result cards are treated as listing pages, all
+    others as detail pages. Several parser backends can be measured side by
+    side, and results saved with `--json` can be compared across commits.
+
+Usage:
+    cd src
+    python -m benchmarks.bench_extractors --parsers html.parser lxml --repeat 50
+    python -m benchmarks.bench_extractors --parsers lxml --scoped --cache-dir ../.html_cache
+    python -m benchmarks.bench_extractors --json before.json   # on commit A
+    python -m benchmarks.bench_extractors --json after.json    # on commit B
+    python -m benchmarks.bench_extractors --compare before.json after.json
+
+Dependencies:
+    - utils.parse_details, utils.parse_listings
+    - utils.html_cache (optional corpus source)
+"""
+
+import argparse
+import glob
+import json
+import os
+import subprocess
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.html_cache import HtmlCache
+from utils.parse_details import EXTRACTORS, extract_car_details
+from utils.parse_details.parser import DETAIL_BLOCKS, compare_scoped, make_soup, resolve_parser
+from utils.parse_details.registry import add_timing_hook, remove_timing_hook, run_extractors
+from utils.parse_listings import extract_links_from_html
+
+FIXTURES_DIR: str = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                 "data", "reference_data", "html")
+
+
+def load_corpus(directory: Optional[str] = None, cache_dir: Optional[str] = None) -> Tuple[List[str], List[str]]:
+    """
+    Load saved pages and split them into detail pages and search result pages.
+
+    Args:
+        directory (Optional[str]): Directory of `.html` files; fixtures by default.
+        cache_dir (Optional[str]): HTML cache directory to read instead.
+
+    Returns:
+        Tuple[List[str], List[str]]: (detail pages, search result pages).
+    """
+    if cache_dir:
+        pages: List[str] = [entry.body for entry in HtmlCache(cache_dir).iter_entries()]
+    else:
+        pages = []
+        for path in sorted(glob.glob(os.path.join(directory or FIXTURES_DIR, "*.html"))):
+            with open(path, encoding="utf-8") as f:
+                pages.append(f.read())
+
+    details: List[str] = [html for html in pages if "list-item list-label" not in html]
+    listings: List[str] = [html for html in pages if "list-item list-label" in html]
+    return details, listings
+
+
+def _timed(fn, *args) -> float:
+    start: float = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def bench_parser(details: List[str], listings: List[str], parser: str, repeat: int,
+                 scoped: bool = False) -> Dict[str, Any]:
+    """
+    Benchmark one parser backend over the corpus.
+
+    Args:
+        details (List[str]): Detail page HTML.
+        listings (List[str]): Search result page HTML.
+        parser (str): Parser backend name.
+        repeat (int): Passes over the corpus.
+        scoped (bool): Parse detail pages scoped to the extracted blocks.
+
+    Returns:
+        Dict[str, Any]: Throughput, per-stage seconds per page and peak memory (and, when
+        scoped, the number of detail pages whose output differs from a full parse).
+    """
+    parser = resolve_parser(parser)
+    result: Dict[str, Any] = {"parser": f"{parser} scoped" if scoped else parser,
+                              "detail_pages": len(details) * repeat, "listing_pages": len(listings) * repeat}
+    strainer = DETAIL_BLOCKS if scoped else None
+
+    # End-to-end detail parsing
+    total: float = 0.0
+    for _ in range(repeat):
+        for html in details:
+            total += _timed(extract_car_details, html, parser, scoped)
+    result["details_pages_per_sec"] = result["detail_pages"] / total if total else None
+
+    # Soup construction and each extractor on a prebuilt soup
+    stages: Dict[str, float] = {"soup": 0.0, **{spec.name: 0.0 for spec in EXTRACTORS}}
+
+    def collect(name: str, seconds: float) -> None:
+        stages[name] += seconds
+
+    add_timing_hook(collect)
+    try:
+        for _ in range(repeat):
+            for html in details:
+                start: float = time.perf_counter()
+                soup = make_soup(html, parser, parse_only=strainer)
+                stages["soup"] += time.perf_counter() - start
+                run_extractors(soup, EXTRACTORS)
+    finally:
+        remove_timing_hook(collect)
+    pages: int = max(1, result["detail_pages"])
+    result["ms_per_page"] = {name: seconds * 1000 / pages for name, seconds in stages.items()}
+
+    # Search result pages
+    total = 0.0
+    for _ in range(repeat):
+        for html in listings:
+            total += _timed(extract_links_from_html, html, parser)
+    result["listing_pages_per_sec"] = result["listing_pages"] / total if total else None
+
+    # Peak memory of one detail parse (largest page)
+    if details:
+        largest: str = max(details, key=len)
+        tracemalloc.start()
+        extract_car_details(largest, parser, scoped)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result["peak_memory_kb"] = peak / 1024
+
+    if scoped:
+        result["scoped_mismatches"] = sum(1 for html in details if compare_scoped(html, parser))
+    return result
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+def print_results(results: List[Dict[str, Any]]) -> None:
+    for r in results:
+        print(f"\n== {r['parser']} ({r['detail_pages']} detail pages, {r['listing_pages']} listing pages)")
+        if r.get("details_pages_per_sec"):
+            print(f"  extract_car_details     {r['details_pages_per_sec']:10.1f} pages/s")
+        if r.get("listing_pages_per_sec"):
+            print(f"  extract_links_from_html {r['listing_pages_per_sec']:10.1f} pages/s")
+        if "peak_memory_kb" in r:
+            print(f"  peak memory / page      {r['peak_memory_kb']:10.1f} KB")
+        if "scoped_mismatches" in r:
+            print(f"  differs from full parse {r['scoped_mismatches']:10d} pages")
+        for name, ms in sorted(r["ms_per_page"].items(), key=lambda kv: -kv[1]):
+            print(f"    {name:<22} {ms:8.3f} ms/page")
+
+
+def compare(before_path: str, after_path: str) -> None:
+    """
+    Print per-metric ratios between two saved benchmark runs.
+
+    Args:
+        before_path (str): JSON written by an earlier run.
+        after_path (str): JSON written by a later run.
+
+    Returns:
+        None
+    """
+    with open(before_path, encoding="utf-8") as f:
+        before: Dict[str, Any] = json.load(f)
+    with open(after_path, encoding="utf-8") as f:
+        after: Dict[str, Any] = json.load(f)
+    print(f"before: {before.get('commit')}  after: {after.get('commit')}")
+
+    after_by_parser: Dict[str, Dict[str, Any]] = {r["parser"]: r for r in after["results"]}
+    for b in before["results"]:
+        a: Optional[Dict[str, Any]] = after_by_parser.get(b["parser"])
+        if not a:
+            continue
+        print(f"\n== {b['parser']}")
+        for key in ("details_pages_per_sec", "listing_pages_per_sec"):
+            if b.get(key) and a.get(key):
+                print(f"  {key:<24} {b[key]:10.1f} -> {a[key]:10.1f}  (x{a[key] / b[key]:.2f})")
+        for name, ms in b["ms_per_page"].items():
+            if name in a["ms_per_page"] and ms:
+                print(f"    {name:<22} {ms:8.3f} -> {a['ms_per_page'][name]:8.3f} ms  (x{ms / a['ms_per_page'][name]:.2f})")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline extractor benchmark")
+    parser.add_argument("--corpus", default=None, help="directory of saved .html pages (default: fixtures)")
+    parser.add_argument("--cache-dir", default=None, help="use an HTML cache directory as the corpus")
+    parser.add_argument("--parsers", nargs="+", default=["html.parser", "lxml"], help="backends to compare")
+    parser.add_argument("--repeat", type=int, default=20, help="passes over the corpus")
+    parser.add_argument("--scoped", action="store_true",
+                        help="also measure scoped parsing and validate it against the full parse")
+    parser.add_argument("--json", default=None, help="save results to this file")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two saved runs")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    details, listings = load_corpus(args.corpus, args.cache_dir)
+    if not details and not listings:
+        raise SystemExit("Corpus is empty")
+
+    results: List[Dict[str, Any]] = []
+    for p in args.parsers:
+        results.append(bench_parser(details, listings, p, args.repeat))
+        if args.scoped:
+            results.append(bench_parser(details, listings, p, args.repeat, scoped=True))
+    print_results(results)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"commit": _git_commit(), "repeat": args.repeat, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""
+src/benchmarks/mock_server.py — Local mock of the mashina.kg pages the crawler touches.
+
+Author: Danil
+Created: 2026-10-17
+Description:
+    Serves synthetic search result and detail pages built from the saved
+    fixtures in `data/reference_data/html/`, so the whole crawl pipeline can be
+    exercised and benchmarked without touching the real site:
+    - `/search/all/?page=N`: `cards_per_page` `div.list-item.list-label` cards
+      with unique detail slugs, a JSON-LD `AggregateOffer` listing the same
+      cars, and a `ul.pagination` whose "Последняя" link points at page
+      `pages`; pages past the end have no cards
+    - `/search/<brand>/<model|all>/?region=R&page=N`: segment pages with a
+      deterministic page count per segment (brand-wide segments can be large,
+      region / model segments are smaller) and listings of their own
+    - `/details/<slug>`: the full detail fixture (every block present), with an
+      ETag so conditional requests get `304 Not Modified`
+    - `/__stats`: JSON counters of what the server has answered
+
+    Every response can be delayed (`latency` ± `jitter` seconds), and a share of
+    requests can fail with `500` (`error_rate`) or be throttled with `429` and a
+    `Retry-After` header (`throttle_rate`).
+
+Usage:
+    cd src
+    python -m benchmarks.mock_server --port 8765 --pages 50 --latency 0.02 --throttle-rate 0.01
+
+    from benchmarks.mock_server import MockSiteConfig, create_app
+    app = create_app(MockSiteConfig(pages=5))
+
+Dependencies:
+    - aiohttp (web server)
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import zlib
+from collections import Counter
+from dataclasses import dataclass
+from typing import List, Optional
+
+from aiohttp import web
+
+FIXTURES_DIR: str = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                 "data", "reference_data", "html")
+
+_CARD_RE = re.compile(r'\s*<div class="list-item list-label">.*?\n    </div>\n', re.S)
+_SLUG_RE = re.compile(r'href="/details/([a-z0-9-]+)-([0-9a-f]+)"')
+_OFFER_SLUG_RE = re.compile(r'/details/([a-z0-9-]+)-([0-9a-f]+)$')
+_LD_JSON_RE = re.compile(r'(<script type="application/ld\+json">)(.*?)(</script>)', re.S)
+
+
+@dataclass
+class MockSiteConfig:
+    """
+    Shape and behaviour of the mock site.
+
+    Attributes:
+        pages (int): Number of search result pages.
+        cards_per_page (int): Listing cards on each search page.
+        latency (float): Mean response delay in seconds.
+        jitter (float): Uniform ± spread of the delay in seconds.
+        error_rate (float): Share of requests answered with 500.
+        throttle_rate (float): Share of requests answered with 429.
+        retry_after (int): `Retry-After` seconds sent with 429 responses.
+        seed (Optional[int]): Random seed for reproducible failures.
+    """
+    pages: int = 20
+    cards_per_page: int = 20
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+    retry_after: int = 1
+    seed: Optional[int] = None
+
+
+class MockSite:
+    """
+    Page templates plus the request handlers of the mock site.
+    """
+
+    def __init__(self, config: MockSiteConfig, fixtures_dir: str = FIXTURES_DIR) -> None:
+        self.config: MockSiteConfig = config
+        self.stats: Counter = Counter()
+        self._random: random.Random = random.Random(config.seed)
+
+        with open(os.path.join(fixtures_dir, "search_page.html"), encoding="utf-8") as f:
+            search: str = f.read()
+        with open(os.path.join(fixtures_dir, "detail_full.html"), encoding="utf-8") as f:
+            self._detail: str = f.read()
+        self._detail_etag: str = '"' + hashlib.md5(self._detail.encode("utf-8")).hexdigest() + '"'
+
+        self._cards: List[str] = _CARD_RE.findall(search)
+        first, last = _CARD_RE.search(search), list(_CARD_RE.finditer(search))[-1]
+        self._head: str = search[: first.start()]
+        ld_json = _LD_JSON_RE.search(self._head)
+        self._product: dict = json.loads(ld_json.group(2))
+        self._offers: List[dict] = self._product["offers"]["offers"]
+        self._head_before: str = self._head[: ld_json.end(1)]
+        self._head_after: str = self._head[ld_json.start(3):]
+        self._raw_tail: str = search[last.end():]
+        self._tail: str = self._pagination(config.pages)
+
+    def _pagination(self, pages: int) -> str:
+        tail: str = re.sub(r'data-page="\d+">Последняя', f'data-page="{pages}">Последняя', self._raw_tail)
+        return tail.replace('?page=1746"', f'?page={pages}"')
+
+    def segment_pages(self, segment: str) -> int:
+        """
+        Deterministic page count of a brand / model / region segment: brand-wide
+        segments may exceed `pages`, narrower ones are smaller.
+
+        Args:
+            segment (str): "<brand>/<model>?region=<id>" key of the segment.
+
+        Returns:
+            int: Number of pages (0 = no listings).
+        """
+        brand_wide: bool = segment.split("?")[0].endswith("/all")
+        span: int = 2 * self.config.pages if brand_wide and "region" not in segment else self.config.pages // 2
+        return zlib.crc32(segment.encode("utf-8")) % (span + 1)
+
+    def search_page(self, page: int, pages: Optional[int] = None, segment: Optional[str] = None) -> str:
+        """
+        Render one search result page with unique detail slugs.
+
+        Args:
+            page (int): Page number.
+            pages (Optional[int]): Page count of the result set; `config.pages` if None.
+            segment (Optional[str]): Segment key; its hash is mixed into the slugs so that
+                every segment has its own listings.
+
+        Returns:
+            str: HTML of the page.
+        """
+        pages = self.config.pages if pages is None else pages
+        prefix: str = f"{page:08x}" if segment is None else f"{zlib.crc32(segment.encode('utf-8')) & 0xffff:04x}{page:04x}"
+        cards: List[str] = []
+        offers: List[dict] = []
+        for i in range(self.config.cards_per_page if page <= pages else 0):
+            card: str = self._cards[i % len(self._cards)]
+            # Keep the "<model>-<hex id>" slug shape, but make the id unique per (page, position)
+            cards.append(_SLUG_RE.sub(
+                lambda m: f'href="/details/{m.group(1)}-{prefix}{i:04x}{m.group(2)[12:]}"', card
+            ))
+            offer: dict = dict(self._offers[i % len(self._offers)])
+            offer["url"] = _OFFER_SLUG_RE.sub(
+                lambda m: f"/details/{m.group(1)}-{prefix}{i:04x}{m.group(2)[12:]}", offer["url"])
+            offers.append(offer)
+        product: dict = dict(self._product, offers=dict(self._product["offers"], offers=offers))
+        head: str = self._head_before + json.dumps(product, ensure_ascii=False) + self._head_after
+        tail: str = self._tail if pages == self.config.pages else self._pagination(pages)
+        return head + "".join(cards) + tail
+
+    async def _misbehave(self, kind: str) -> Optional[web.Response]:
+        delay: float = self.config.latency + self._random.uniform(-self.config.jitter, self.config.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        roll: float = self._random.random()
+        if roll < self.config.throttle_rate:
+            self.stats[f"{kind}_429"] += 1
+            return web.Response(status=429, headers={"Retry-After": str(self.config.retry_after)})
+        if roll < self.config.throttle_rate + self.config.error_rate:
+            self.stats[f"{kind}_500"] += 1
+            return web.Response(status=500, text="Internal Server Error")
+        return None
+
+    async def handle_search(self, request: web.Request) -> web.Response:
+        failure: Optional[web.Response] = await self._misbehave("search")
+        if failure is not None:
+            return failure
+        page: str = request.query.get("page", "1")
+        if not page.isdigit() or int(page) < 1:
+            self.stats["search_404"] += 1
+            raise web.HTTPNotFound()
+        self.stats["search_200"] += 1
+        return web.Response(text=self.search_page(int(page)), content_type="text/html")
+
+    async def handle_segment(self, request: web.Request) -> web.Response:
+        failure: Optional[web.Response] = await self._misbehave("search")
+        if failure is not None:
+            return failure
+        page: str = request.query.get("page", "1")
+        if not page.isdigit() or int(page) < 1:
+            self.stats["search_404"] += 1
+            raise web.HTTPNotFound()
+        segment: str = f"{request.match_info['brand']}/{request.match_info['model']}"
+        if "region" in request.query:
+            segment += f"?region={request.query['region']}"
+        self.stats["segment_200"] += 1
+        return web.Response(text=self.search_page(int(page), self.segment_pages(segment), segment),
+                            content_type="text/html")
+
+    async def handle_details(self, request: web.Request) -> web.Response:
+        failure: Optional[web.Response] = await self._misbehave("details")
+        if failure is not None:
+            return failure
+        if request.headers.get("If-None-Match") == self._detail_etag:
+            self.stats["details_304"] += 1
+            return web.Response(status=304, headers={"ETag": self._detail_etag})
+        self.stats["details_200"] += 1
+        return web.Response(text=self._detail, content_type="text/html", headers={"ETag": self._detail_etag})
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(dict(self.stats))
+
+
+def create_app(config: MockSiteConfig) -> web.Application:
+    """
+    Build the aiohttp application of the mock site.
+
+    Args:
+        config (MockSiteConfig): Site shape and failure injection settings.
+
+    Returns:
+        web.Application: Ready-to-run application.
+    """
+    site = MockSite(config)
+    app = web.Application()
+    app["site"] = site
+    app.router.add_get("/search/all/", site.handle_search)
+    app.router.add_get("/search/{brand}/{model}/", site.handle_segment)
+    app.router.add_get("/details/{slug}", site.handle_details)
+    app.router.add_get("/__stats", site.handle_stats)
+    return app
+
+
+def run(config: MockSiteConfig, host: str = "127.0.0.1", port: int = 8765) -> None:
+    """
+    Serve the mock site until interrupted.
+
+    Args:
+        config (MockSiteConfig): Site shape and failure injection settings.
+        host (str): Interface to bind.
+        port (int): TCP port to bind.
+
+    Returns:
+        None
+    """
+    web.run_app(create_app(config), host=host, port=port, print=None, access_log=None)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local mock of mashina.kg for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--pages", type=int, default=20, help="number of search result pages")
+    parser.add_argument("--cards-per-page", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.0, help="mean response delay, seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="± spread of the delay, seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of 500 responses")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="share of 429 responses")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds on 429")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    config = MockSiteConfig(
+        pages=args.pages,
+        cards_per_page=args.cards_per_page,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+    print(f"Mock mashina.kg on http://{args.host}:{args.port}/search/all/?page=1")
+    run(config, args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
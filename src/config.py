@@ -6,8 +6,22 @@ Created: 2025-06-22
 Description:
     This module contains project-wide configuration constants and logging setup,
     including:
-    - Base URL for mashina.kg
+    - Base URL for mashina.kg and the first search result page
+    - Listing-only mode (search page data only, sampled / filtered details)
+    - Segmented discovery (per brand / region / model) and the reference catalogues
+    - Catalogue ID resolution of brand / model / location and its lookup cache
     - Standard HTTP headers for requests
+    - HTTP engine and connection pool settings for the async fetcher
+    - HTML parser backend and scoped (block-only) detail parsing
+    - Crawl concurrency and per-host rate limits
+    - Retry policy, circuit breaker and dead-letter file
+    - Analytics export (CSV / Parquet / Arrow) and the SQLite listing database
+    - Change tracking across crawls (new / price_changed / upped / removed events)
+    - Listing deduplication (exact set or Bloom filter)
+    - Output file locations, checkpoint and incremental-index databases
+    - On-disk HTML cache settings
+    - Metrics endpoint / snapshot settings
+    - Sharded crawl workers and their shared work queue
     - Logging configuration (writes to app.log)
 
 Usage:
@@ -18,10 +32,36 @@ Project Notes:
     - Logging is configured globally and will write to `app.log` in append mode
 """
 
-from typing import Dict
+import os
+from typing import Dict, Optional
 
 
 BASE_URL: str = "https://m.mashina.kg"
+SEARCH_URL: str = f"{BASE_URL}/search/all/?page=1"
+
+# Listing-only mode: records from the search pages' JSON-LD offers; detail pages only
+# for this share of listings (0..1) and / or those matching DETAIL_FILTER (see services/listing_mode.py)
+LISTING_ONLY: bool = False
+DETAIL_SAMPLE_RATE: float = 0.0
+DETAIL_FILTER: Optional[str] = None
+
+# Pagination: False = page count from page 1's "Последняя" link,
+# True = keep requesting pages until one comes back without listings
+LAZY_PAGINATION: bool = False
+
+# Segmented discovery: crawl per brand (big brands per brand×region / model) instead of one
+# /search/all/ chain; segments with more pages than SEGMENT_MAX_PAGES are split further
+SEGMENTED_DISCOVERY: bool = False
+SEGMENT_MAX_PAGES: int = 50
+REFERENCE_DATA_DIR: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "reference_data")
+BRANDS_CATALOGUE_PATH: str = os.path.join(REFERENCE_DATA_DIR, "brands_and_models.json")
+REGIONS_CATALOGUE_PATH: str = os.path.join(REFERENCE_DATA_DIR, "regions_and_towns.json")
+
+# Add catalogue IDs of brand / model / location to every record (opt-in: adds four keys,
+# see models/reference.py); the lookup tables are cached as JSON next to the catalogues and
+# rebuilt when their content changes (None = rebuild on every start)
+REFERENCE_IDS: bool = False
+REFERENCE_INDEX_CACHE: Optional[str] = os.path.join(REFERENCE_DATA_DIR, "reference_index.cache.json")
 
 HEADERS: Dict[str, str] = {
     "User-Agent": (
@@ -31,6 +71,87 @@ HEADERS: Dict[str, str] = {
     )
 }
 
+# Async fetch engine: "aiohttp" (default), "httpx" (enables HTTP/2) or "requests" (threaded fallback)
+FETCH_ENGINE: str = "aiohttp"
+REQUEST_TIMEOUT: float = 10.0
+HTTP_POOL_SIZE: int = 200
+HTTP_POOL_SIZE_PER_HOST: int = 100
+HTTP2_ENABLED: bool = False
+
+# HTML tree builder for BeautifulSoup: "lxml" (fast, falls back if missing) or "html.parser"
+HTML_PARSER: str = "lxml"
+# True = build the detail-page tree only for the blocks the extractors read (see parse_details/parser.py)
+SCOPED_PARSING: bool = False
+
+# Crawl scheduler: number of concurrent workers per phase
+LISTING_CONCURRENCY: int = 16
+DETAIL_CONCURRENCY: int = 64
+
+# Parse stage: worker processes for HTML parsing (0 = parse on the event loop)
+PARSE_WORKERS: int = 0
+PARSE_BATCH_SIZE: int = 8
+
+# Politeness: requests/second per host (token bucket) and back-off on 429/5xx
+HOST_RATE_LIMITS: Dict[str, float] = {
+    "m.mashina.kg": 20.0,
+    "im.mashina.kg": 40.0,
+}
+DEFAULT_HOST_RATE: float = 10.0
+BACKOFF_BASE: float = 1.0
+BACKOFF_MAX: float = 60.0
+
+# Retries: attempts per request (timeouts / 5xx / 429), back-off with jitter, circuit breaker
+RETRY_MAX_ATTEMPTS: int = 4
+RETRY_BACKOFF_BASE: float = 0.5
+RETRY_BACKOFF_MAX: float = 30.0
+BREAKER_FAILURE_THRESHOLD: int = 10
+BREAKER_RESET_SECONDS: float = 30.0
+DEAD_LETTER_PATH: str = "dead_letters.ndjson"
+
+# Output: records are streamed to NDJSON; the legacy JSON array is built at the end
+OUTPUT_PATH: str = "full_results.ndjson"
+LEGACY_JSON_PATH: str = "full_results.json"
+# Analytics export after the crawl: None, "csv", "parquet" or "arrow"; optional "brand" / "crawl_date" partitions
+EXPORT_FORMAT: Optional[str] = None
+EXPORT_PARTITION_BY: Optional[str] = None
+# SQLite database the records are upserted into after each run (listings + price history); None to skip
+SQLITE_DB_PATH: Optional[str] = None
+# Change tracking after each run: snapshot database (None to skip) and the NDJSON event stream it appends to
+CHANGE_DB_PATH: Optional[str] = None
+CHANGE_EVENTS_PATH: str = "changes.ndjson"
+# Record layout: "legacy" (string values, as extracted) or "typed" (numbers normalised, see models/)
+RECORD_FORMAT: str = "legacy"
+FSYNC_EVERY: int = 500
+
+# Listing dedup: 0 keeps an exact set of listing IDs; N > 0 uses a Bloom filter sized for N listings
+DEDUP_BLOOM_CAPACITY: int = 0
+DEDUP_BLOOM_ERROR_RATE: float = 1e-6
+
+# Checkpoint database used to resume interrupted crawls
+STATE_DB_PATH: str = "crawl_state.sqlite3"
+
+# On-disk HTML cache (enabled with --cache): revalidated with ETag / Last-Modified
+HTML_CACHE_DIR: str = ".html_cache"
+HTML_CACHE_FRESH_SECONDS: float = 0.0
+HTML_CACHE_MAX_AGE_DAYS: float = 7.0
+HTML_CACHE_MAX_MB: int = 2048
+
+# Incremental mode: index of known listings and refetch TTL for unchanged ones
+# (their previous records are carried forward); listings gone from a complete run are appended here
+LISTING_INDEX_PATH: str = "listing_index.sqlite3"
+INCREMENTAL_TTL_HOURS: float = 24.0
+REMOVED_LISTINGS_PATH: str = "removed_listings.ndjson"
+
+# Metrics: Prometheus endpoint port (0 = off) and JSON snapshot interval (seconds)
+METRICS_PORT: int = 0
+METRICS_SNAPSHOT_INTERVAL: float = 15.0
+
+# Sharded crawl: worker processes, how work is split ("pages" ranges or listing URL "hash"),
+# and the shared queue ("sqlite:///file" or "redis://host:port/db")
+SHARD_WORKERS: int = 1
+SHARD_BY: str = "pages"
+WORK_QUEUE_URL: str = "sqlite:///crawl_queue.sqlite3"
+
 import logging
 logging.basicConfig(
     filename='app.log',
@@ -7,11 +7,25 @@ Description:
     This script launches the asynchronous crawling process that:
     - Collects car listing links from all pages of mashina.kg
     - Parses each individual car's detail page
-    - Aggregates and saves the full data to a JSON file
+    - Streams the full data to an NDJSON file (and the legacy JSON array)
 
 Usage:
     Run directly with Python:
         python main.py
+        python main.py --detail-concurrency 128 --rate m.mashina.kg=30
+        python main.py --resume
+        python main.py --segments --segment-max-pages 50
+        python main.py --listing-only --detail-sample 0.05 --detail-filter "price_usd<10000"
+        python main.py --incremental --ttl-hours 12
+        python main.py --cache
+        python main.py --reparse-cache --output reparsed.ndjson
+        python main.py --workers 4 --shard-by hash
+        python main.py --export parquet --partition-by brand
+        python main.py --export-only --export csv --output full_results.ndjson
+        python main.py --sqlite-db listings.sqlite3
+        python main.py --sqlite-db listings.sqlite3 --changes-since 24
+        python main.py --track-changes snapshots.sqlite3 --change-events changes.ndjson
+        python main.py --workers 4 --queue redis://queue-host/0 --worker-index 2
 
 Dependencies:
     - Python 3.8+
@@ -19,6 +33,7 @@ Dependencies:
 
 Project Structure:
     - services/crawl_service.py   : core crawling and parsing logic
+    - services/sharded_crawl.py   : several crawl workers sharing a work queue
     - utils/parse_details/        : individual detail extractors
     - config.py                   : configuration and logging setup
     - data/reference_data/        : sample HTML pages and expected JSON output
@@ -26,8 +41,418 @@ Project Structure:
 
 """
 
+import argparse
 import asyncio
-from services.crawl_service import main_crawl
+import json
+import re
+import time
+from typing import List, Optional, Tuple
+
+from config import BRANDS_CATALOGUE_PATH, HTML_CACHE_DIR
+from models.legacy import iter_listings
+from models.reference import get_reference_index
+from services.crawl_service import build_html_cache, main_crawl
+from services.listing_mode import parse_detail_filter
+from services.options import RECORD_FORMATS, CrawlOptions
+from services.reparse import reparse_cache
+from services.segments import load_catalogue
+from services.sharded_crawl import (
+    merge_sharded_output,
+    prepare_sharded_crawl,
+    run_sharded,
+    run_worker,
+    sharded_crawl_complete,
+)
+from services.sharding import SHARD_MODES
+from storage.columnar import EXPORT_FORMATS, PARTITION_KEYS, default_export_path, export_records, pyarrow_available
+from storage.change_tracker import EVENT_TYPES, ChangeTracker
+from storage.ndjson import ndjson_to_json_array
+from storage.sqlite_store import ListingDatabase
+from utils.http_client import ENGINES
+
+
+def parse_args(argv: Optional[List[str]] = None) -> Tuple[CrawlOptions, str]:
+    """
+    Build crawl options from command-line arguments.
+
+    Args:
+        argv (Optional[List[str]]): Arguments to parse; defaults to sys.argv.
+
+    Returns:
+        Tuple[CrawlOptions, str]: Options for `main_crawl`, and what to run: "crawl",
+        "reparse" (HTML cache offline), "prepare" / "merge" (sharded crawl coordinator steps),
+        "export" (existing records only), "changes" (query the SQLite listing database).
+    """
+    defaults = CrawlOptions()
+    parser = argparse.ArgumentParser(description="Mashina.kg car listing crawler")
+    parser.add_argument("--search-url", default=defaults.search_url,
+                        help="first search result page to crawl")
+    parser.add_argument("--lazy-pages", action="store_true", default=defaults.lazy_pages,
+                        help="keep requesting search pages until one has no listings")
+    parser.add_argument("--segments", action="store_true", default=defaults.segmented,
+                        help="discover pages per brand (split by region / model when big) instead of one chain")
+    parser.add_argument("--segment-max-pages", type=int, default=defaults.segment_max_pages,
+                        help="split segments with more pages than this")
+    parser.add_argument("--segment-brands", default=None,
+                        help="comma-separated brand slugs to crawl with --segments (default: all)")
+    parser.add_argument("--listing-only", action="store_true", default=defaults.listing_only,
+                        help="build records from the search pages' JSON-LD offers, skipping detail pages")
+    parser.add_argument("--detail-sample", type=float, default=defaults.detail_sample_rate,
+                        help="with --listing-only: fetch details for this share (0..1) of listings")
+    parser.add_argument("--detail-filter", default=defaults.detail_filter,
+                        help='with --listing-only: fetch details of matching listings, e.g. "price_usd<15000;title~toyota"')
+    parser.add_argument("--reference-ids", action="store_true", default=defaults.reference_ids,
+                        help="add catalogue brand_id / model_id / region_id / town_id to the records")
+    parser.add_argument("--engine", default=defaults.fetch_engine, choices=ENGINES,
+                        help="async HTTP engine")
+    parser.add_argument("--http2", action="store_true", default=defaults.http2,
+                        help="enable HTTP/2 (httpx engine only)")
+    parser.add_argument("--parser", default=defaults.parser, choices=["lxml", "html.parser"],
+                        help="HTML parser backend used by all extractors")
+    parser.add_argument("--scoped-parse", action="store_true", default=defaults.scoped_parse,
+                        help="parse only the detail-page blocks the extractors read (faster, less memory)")
+    parser.add_argument("--listing-concurrency", type=int, default=defaults.listing_concurrency,
+                        help="concurrent search page fetches")
+    parser.add_argument("--detail-concurrency", type=int, default=defaults.detail_concurrency,
+                        help="concurrent detail page fetches")
+    parser.add_argument("--parse-workers", type=int, default=defaults.parse_workers,
+                        help="parser processes (0 = parse on the event loop)")
+    parser.add_argument("--parse-batch", type=int, default=defaults.parse_batch_size,
+                        help="pages per batch sent to a parser process")
+    parser.add_argument("--rate", action="append", default=[], metavar="HOST=RPS",
+                        help="per-host request rate, e.g. m.mashina.kg=20 (repeatable)")
+    parser.add_argument("--default-rate", type=float, default=defaults.default_rate,
+                        help="request rate for hosts without an explicit --rate")
+    parser.add_argument("--retries", type=int, default=defaults.retry_attempts,
+                        help="attempts per request on timeouts / 5xx / 429 (1 = no retries)")
+    parser.add_argument("--retry-backoff", type=float, default=defaults.retry_backoff_base,
+                        help="upper bound of the first retry delay in seconds (doubles per attempt)")
+    parser.add_argument("--retry-backoff-max", type=float, default=defaults.retry_backoff_max,
+                        help="upper bound of any retry delay in seconds")
+    parser.add_argument("--breaker-threshold", type=int, default=defaults.breaker_threshold,
+                        help="consecutive failures that pause a host")
+    parser.add_argument("--breaker-reset", type=float, default=defaults.breaker_reset_seconds,
+                        help="seconds an opened circuit pauses the host")
+    parser.add_argument("--dead-letters", default=defaults.dead_letter_path,
+                        help="NDJSON file receiving pages/listings that failed after all retries")
+    parser.add_argument("--requeue-dead-letters", action="store_true",
+                        help="only re-fetch the entries of the dead-letter file, appending to --output")
+    parser.add_argument("--dedup-bloom", type=int, default=defaults.dedup_bloom_capacity, metavar="N",
+                        help="track seen listings in a Bloom filter sized for N listings (0 = exact set)")
+    parser.add_argument("--dedup-error-rate", type=float, default=defaults.dedup_error_rate,
+                        help="Bloom filter false-positive rate")
+    parser.add_argument("--output", default=defaults.output_path,
+                        help="NDJSON output file (.gz / .zst suffix enables compression)")
+    parser.add_argument("--record-format", choices=RECORD_FORMATS, default=defaults.record_format,
+                        help="legacy string-valued records or typed records with numeric fields")
+    parser.add_argument("--compress", choices=["none", "gzip", "zstd"], default=defaults.compression,
+                        help="output compression (default: infer from --output suffix)")
+    parser.add_argument("--fsync-every", type=int, default=defaults.fsync_every,
+                        help="fsync the output every N records (0 = only at the end)")
+    parser.add_argument("--legacy-json", default=defaults.legacy_json_path,
+                        help="also write a single-array JSON file here at the end")
+    parser.add_argument("--no-legacy-json", action="store_true",
+                        help="skip the single-array JSON conversion")
+    parser.add_argument("--state-db", default=defaults.state_path,
+                        help="SQLite checkpoint database")
+    parser.add_argument("--resume", action="store_true",
+                        help="resume the previous crawl: skip completed pages/details, retry failures")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only fetch details of new, upped, changed or stale listings")
+    parser.add_argument("--index-db", default=defaults.index_path,
+                        help="SQLite index of known listings (incremental mode)")
+    parser.add_argument("--ttl-hours", type=float, default=defaults.ttl_hours,
+                        help="refetch unchanged listings older than this (incremental mode)")
+    parser.add_argument("--removed-output", default=defaults.removed_path,
+                        help="NDJSON file receiving a marker per listing gone since the last run (incremental mode)")
+    parser.add_argument("--cache", action="store_true",
+                        help=f"enable the on-disk HTML cache in {HTML_CACHE_DIR}")
+    parser.add_argument("--cache-dir", default=None,
+                        help="enable the on-disk HTML cache in this directory")
+    parser.add_argument("--cache-fresh", type=float, default=defaults.cache_fresh_seconds,
+                        help="serve cached pages younger than this many seconds without revalidation")
+    parser.add_argument("--cache-max-age-days", type=float, default=defaults.cache_max_age_days,
+                        help="evict cache entries not refreshed for this many days")
+    parser.add_argument("--cache-max-mb", type=int, default=defaults.cache_max_mb,
+                        help="maximum cache size in MB")
+    parser.add_argument("--metrics-port", type=int, default=defaults.metrics_port,
+                        help="serve Prometheus metrics on this port (0 = off)")
+    parser.add_argument("--metrics-file", default=defaults.metrics_path,
+                        help="periodically write a JSON metrics snapshot to this file")
+    parser.add_argument("--metrics-interval", type=float, default=defaults.metrics_interval,
+                        help="seconds between JSON metrics snapshots")
+    parser.add_argument("--export", choices=EXPORT_FORMATS, default=defaults.export_format,
+                        help="also export the records as a flat CSV / Parquet / Arrow table")
+    parser.add_argument("--export-path", default=defaults.export_path,
+                        help="export file (or directory when partitioned); default next to --output")
+    parser.add_argument("--partition-by", choices=PARTITION_KEYS, default=defaults.export_partition_by,
+                        help="partition Parquet / Arrow exports into brand=... / crawl_date=... directories")
+    parser.add_argument("--export-only", action="store_true",
+                        help="only run the export / --sqlite-db / --track-changes steps on the existing --output records")
+    parser.add_argument("--sqlite-db", default=defaults.sqlite_path,
+                        help="upsert the records into this SQLite listing database (price history, changes)")
+    parser.add_argument("--changes-since", type=float, metavar="HOURS",
+                        help="print listings of --sqlite-db that are new / changed / re-priced in the last HOURS")
+    parser.add_argument("--track-changes", metavar="SNAPSHOT_DB", default=defaults.change_db_path,
+                        help="compare the records with the previous run's snapshots and emit change events")
+    parser.add_argument("--change-events", default=defaults.change_events_path,
+                        help="NDJSON file the new / price_changed / upped / removed events are appended to")
+    parser.add_argument("--workers", type=int, default=defaults.workers,
+                        help="split the crawl between this many workers sharing --queue (1 = no sharding)")
+    parser.add_argument("--worker-index", type=int, default=defaults.worker_index,
+                        help="run only this worker of a sharded crawl (multi-node); default runs all locally")
+    parser.add_argument("--shard-by", choices=SHARD_MODES, default=defaults.shard_by,
+                        help="split by search page ranges or by listing URL hash")
+    parser.add_argument("--queue", default=defaults.queue_url,
+                        help="shared work queue: sqlite:///file or redis://host:port/db")
+    parser.add_argument("--prepare-queue", action="store_true",
+                        help="only queue the search pages of a sharded crawl (coordinator)")
+    parser.add_argument("--merge-shards", action="store_true",
+                        help="only merge the output shards of a sharded crawl into --output")
+    parser.add_argument("--reparse-cache", action="store_true",
+                        help="re-parse all cached detail pages into --output without network access")
+    args = parser.parse_args(argv)
+
+    host_rates = dict(defaults.host_rates)
+    for item in args.rate:
+        host, _, rate = item.partition("=")
+        try:
+            host_rates[host] = float(rate)
+        except ValueError:
+            parser.error(f"--rate expects HOST=RPS, got {item!r}")
+    segment_brands: Optional[Tuple[str, ...]] = None
+    if args.segment_brands:
+        segment_brands = tuple(slug.strip() for slug in args.segment_brands.split(",") if slug.strip())
+    if segment_brands and not args.segments:
+        parser.error("--segment-brands needs --segments")
+    if segment_brands:
+        try:
+            load_catalogue(BRANDS_CATALOGUE_PATH, only_brands=segment_brands)
+        except ValueError as e:
+            parser.error(f"--segment-brands: {e}")
+    if args.segments and args.lazy_pages:
+        parser.error("--segments and --lazy-pages cannot be combined")
+    if args.segment_max_pages < 1:
+        parser.error("--segment-max-pages must be at least 1")
+    if not 0.0 <= args.detail_sample <= 1.0:
+        parser.error("--detail-sample must be between 0 and 1")
+    if args.detail_filter:
+        try:
+            parse_detail_filter(args.detail_filter)
+        except (ValueError, re.error) as e:
+            parser.error(f"--detail-filter: {e}")
+    if args.worker_index is not None and not 0 <= args.worker_index < args.workers:
+        parser.error("--worker-index must be in [0, --workers)")
+
+    mode: str = "crawl"
+    if args.reparse_cache:
+        mode = "reparse"
+    elif args.prepare_queue:
+        mode = "prepare"
+    elif args.merge_shards:
+        mode = "merge"
+    elif args.changes_since is not None:
+        mode = "changes"
+    elif args.export_only:
+        mode = "export"
+    if args.export_only and not (args.export or args.sqlite_db or args.track_changes):
+        parser.error("--export-only needs --export FORMAT, --sqlite-db PATH or --track-changes PATH")
+    if args.changes_since is not None and not args.sqlite_db:
+        parser.error("--changes-since needs --sqlite-db PATH")
+    if args.partition_by and args.export == "csv":
+        parser.error("--partition-by applies to Parquet / Arrow exports only")
+    if args.export in ("parquet", "arrow") and not pyarrow_available():
+        parser.error(f"--export {args.export} requires the 'pyarrow' package (pip install pyarrow)")
+
+    return CrawlOptions(
+        search_url=args.search_url,
+        lazy_pages=args.lazy_pages,
+        segmented=args.segments,
+        segment_max_pages=args.segment_max_pages,
+        segment_brands=segment_brands,
+        listing_only=args.listing_only,
+        detail_sample_rate=args.detail_sample,
+        detail_filter=args.detail_filter,
+        reference_ids=args.reference_ids,
+        fetch_engine=args.engine,
+        http2=args.http2,
+        parser=args.parser,
+        scoped_parse=args.scoped_parse,
+        listing_concurrency=args.listing_concurrency,
+        detail_concurrency=args.detail_concurrency,
+        parse_workers=args.parse_workers,
+        parse_batch_size=args.parse_batch,
+        host_rates=host_rates,
+        default_rate=args.default_rate,
+        retry_attempts=args.retries,
+        retry_backoff_base=args.retry_backoff,
+        retry_backoff_max=args.retry_backoff_max,
+        breaker_threshold=args.breaker_threshold,
+        breaker_reset_seconds=args.breaker_reset,
+        dead_letter_path=args.dead_letters or None,
+        requeue_dead_letters=args.requeue_dead_letters,
+        dedup_bloom_capacity=args.dedup_bloom,
+        dedup_error_rate=args.dedup_error_rate,
+        output_path=args.output,
+        compression=args.compress,
+        record_format=args.record_format,
+        fsync_every=args.fsync_every,
+        export_format=args.export,
+        export_path=args.export_path,
+        export_partition_by=args.partition_by,
+        sqlite_path=args.sqlite_db,
+        changes_since_hours=args.changes_since,
+        change_db_path=args.track_changes,
+        change_events_path=args.change_events,
+        legacy_json_path=None if args.no_legacy_json else args.legacy_json,
+        state_path=args.state_db,
+        resume=args.resume,
+        incremental=args.incremental,
+        index_path=args.index_db,
+        ttl_hours=args.ttl_hours,
+        removed_path=args.removed_output,
+        cache_dir=args.cache_dir or (HTML_CACHE_DIR if args.cache or args.reparse_cache else None),
+        cache_fresh_seconds=args.cache_fresh,
+        cache_max_age_days=args.cache_max_age_days,
+        cache_max_mb=args.cache_max_mb,
+        metrics_port=args.metrics_port,
+        metrics_path=args.metrics_file,
+        metrics_interval=args.metrics_interval,
+        workers=args.workers,
+        worker_index=args.worker_index,
+        shard_by=args.shard_by,
+        queue_url=args.queue,
+    ), mode
+
+
+def run_reparse(options: CrawlOptions) -> None:
+    """
+    Re-parse the HTML cache offline and write the usual output files.
+
+    Args:
+        options (CrawlOptions): Output, parser and cache settings.
+
+    Returns:
+        None
+    """
+    count: int = reparse_cache(
+        build_html_cache(options),
+        options.output_path,
+        compression=options.compression,
+        parser=options.parser,
+        scoped=options.scoped_parse,
+        workers=options.parse_workers,
+        record_format=options.record_format,
+        reference=get_reference_index() if options.reference_ids else None,
+    )
+    if options.legacy_json_path:
+        ndjson_to_json_array(options.output_path, options.legacy_json_path, options.compression)
+    print(f"Re-parsed {count} cached car details to {options.output_path}")
+
+
+def run_export(options: CrawlOptions) -> None:
+    """
+    Export the records in `options.output_path` as the requested flat table.
+
+    Args:
+        options (CrawlOptions): Output and export settings.
+
+    Returns:
+        None
+    """
+    path: str = options.export_path or default_export_path(
+        options.output_path, options.export_format, options.export_partition_by)
+    count: int = export_records(
+        options.output_path,
+        options.export_format,
+        path,
+        partition_by=options.export_partition_by,
+        compression=options.compression,
+    )
+    print(f"Exported {count} records to {path}")
+
+
+def run_sqlite_import(options: CrawlOptions) -> None:
+    """
+    Upsert the records in `options.output_path` into the SQLite listing database.
+
+    Args:
+        options (CrawlOptions): Output and database settings.
+
+    Returns:
+        None
+    """
+    with ListingDatabase(options.sqlite_path) as db:
+        count: int = db.import_records(options.output_path, options.compression)
+    print(f"Upserted {count} listings into {options.sqlite_path}")
+
+
+def run_change_tracking(options: CrawlOptions, complete: bool) -> None:
+    """
+    Diff the records in `options.output_path` against the previous snapshots and append change events.
+
+    Args:
+        options (CrawlOptions): Output and change tracking settings.
+        complete (bool): The records come from a complete crawl, so listings
+            missing from them are reported as removed (incremental runs carry
+            the unchanged listings forward, so their output can be complete).
+
+    Returns:
+        None
+    """
+    with ChangeTracker(options.change_db_path, options.change_events_path) as tracker:
+        for listing in iter_listings(options.output_path, options.compression):
+            tracker.observe(listing)
+        tracker.finish(detect_removed=complete)
+        counts = tracker.counts
+    summary: str = ", ".join(f"{counts[event]} {event}" for event in EVENT_TYPES)
+    print(f"Change events ({summary}) appended to {options.change_events_path}")
+
+
+def print_changes(options: CrawlOptions) -> None:
+    """
+    Print the listings that are new, changed or re-priced in the last
+    `options.changes_since_hours`, one JSON object per line.
+
+    Args:
+        options (CrawlOptions): Database settings and look-back window.
+
+    Returns:
+        None
+    """
+    with ListingDatabase(options.sqlite_path) as db:
+        for change in db.changes_since(time.time() - options.changes_since_hours * 3600):
+            print(json.dumps(change, ensure_ascii=False))
+
 
 if __name__ == "__main__":
-    asyncio.run(main_crawl())
+    crawl_options, mode = parse_args()
+    # Only a complete crawl tells which listings are gone; re-parsed caches,
+    # merged shards and existing output given to --export-only may be partial
+    crawl_complete: bool = False
+    if mode == "reparse":
+        run_reparse(crawl_options)
+    elif mode == "prepare":
+        prepare_sharded_crawl(crawl_options)
+    elif mode == "merge":
+        merge_sharded_output(crawl_options)
+    elif mode == "changes":
+        print_changes(crawl_options)
+    elif mode == "export":
+        pass
+    elif crawl_options.workers > 1 and crawl_options.worker_index is not None:
+        asyncio.run(run_worker(crawl_options, crawl_options.worker_index))
+    elif crawl_options.workers > 1:
+        run_sharded(crawl_options)
+        crawl_complete = sharded_crawl_complete(crawl_options)
+    else:
+        crawl_complete = asyncio.run(main_crawl(crawl_options))
+
+    # A single worker's output is only a shard; the export runs after the merge
+    if mode not in ("prepare", "changes") and crawl_options.worker_index is None:
+        if crawl_options.export_format:
+            run_export(crawl_options)
+        if crawl_options.sqlite_path:
+            run_sqlite_import(crawl_options)
+        if crawl_options.change_db_path:
+            run_change_tracking(crawl_options, crawl_complete)
@@ -0,0 +1,29 @@
+"""
+src/models/__init__.py — Typed record model package initializer.
+
+Author: Danil
+Created: 2026-10-17
+
+Description:
+    This module re-exports the record model:
+    - CarListing:           Search card data + parsed details of one listing.
+    - CarDetails:           Parsed detail page with normalised numeric fields.
+    - VinReport:            VIN history block (HistoryRecord entries).
+    - listing_from_legacy:  Legacy dict record → CarListing.
+    - listing_to_legacy:    CarListing → legacy dict record.
+    - iter_listings:        Streams CarListing objects from an NDJSON file.
+    - get_reference_index:  Brand / model / location text → catalogue IDs.
+
+Usage:
+    from models import CarListing, iter_listings
+
+Project Structure:
+    - car.py       : Slotted dataclasses and their typed dict / JSON form.
+    - normalize.py : Price / mileage / count text → integers (and back).
+    - legacy.py    : Compatibility with the original string-valued records.
+    - reference.py : Reference catalogue lookup index (cached as JSON once built).
+"""
+
+from .car import CarDetails, CarListing, HistoryRecord, VinReport
+from .legacy import iter_listings, listing_from_legacy, listing_to_legacy
+from .reference import ReferenceIndex, get_reference_index
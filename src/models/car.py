@@ -0,0 +1,246 @@
+"""
+src/models/car.py — Typed, slotted record model for crawled car listings.
+
+Author: Danil
+Created: 2026-10-17
+Description:
+    Compact replacement for the nested dict-of-dicts records:
+    - `HistoryRecord` / `VinReport`: VIN history block ("ДТП: 2 records", ...)
+    - `CarDetails`: everything parsed from a detail page, with numeric fields
+      as integers (prices, year, mileage in km, views, favorites)
+    - `CarListing`: one search result (link, listing ID, status, paid
+      features) plus its `CarDetails`
+
+    All classes are dataclasses with `__slots__` (no per-instance `__dict__`),
+    which makes millions of records much lighter in memory. `to_dict` builds
+    plain dicts field by field (no `dataclasses.asdict` deep copies) and
+    `to_json` serialises them compactly; `from_dict` reads them back.
+    The legacy string-valued dict layout is handled by `models.legacy`.
+
+Usage:
+    from models import CarListing
+    listing = CarListing.from_dict(json.loads(line))
+    listing.details.price_usd   # 16300
+    line = listing.to_json()
+
+Dependencies:
+    - dataclasses, json (standard library)
+"""
+
+import json
+import sys
+from dataclasses import dataclass, field, fields
+from operator import attrgetter
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def slotted(cls):
+    """
+    `@dataclass` with `__slots__` (what `dataclass(slots=True)` does on Python 3.10+).
+
+    Args:
+        cls (type): Class body with annotated fields.
+
+    Returns:
+        type: The dataclass, rebuilt with `__slots__`.
+    """
+    if sys.version_info >= (3, 10):
+        return dataclass(slots=True)(cls)
+    cls = dataclass(cls)
+    names: Tuple[str, ...] = tuple(f.name for f in fields(cls))
+    namespace: Dict[str, Any] = {key: value for key, value in cls.__dict__.items()
+                                 if key not in names and key not in ("__dict__", "__weakref__")}
+    namespace["__slots__"] = names
+    return type(cls)(cls.__name__, cls.__bases__, namespace)
+
+
+def _dumps(data: Dict[str, Any]) -> str:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+@slotted
+class HistoryRecord:
+    """
+    One line of the VIN history block.
+
+    Attributes:
+        source (str): History source (e.g. "ДТП", "Пробег").
+        record_count (int): Number of records from that source.
+    """
+    source: str
+    record_count: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"source": self.source, "record_count": self.record_count}
+
+
+@slotted
+class VinReport:
+    """
+    VIN history report shown on a detail page.
+
+    Attributes:
+        car_name_and_year_vin (Optional[str]): Car name and year as the report shows it.
+        history_records (List[HistoryRecord]): Sources and their record counts.
+    """
+    car_name_and_year_vin: Optional[str] = None
+    history_records: List[HistoryRecord] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "car_name_and_year_vin": self.car_name_and_year_vin,
+            "history_records": [record.to_dict() for record in self.history_records],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> Optional["VinReport"]:
+        if not data:
+            return None
+        return cls(
+            data.get("car_name_and_year_vin"),
+            [HistoryRecord(record.get("source"), int(record.get("record_count") or 0))
+             for record in data.get("history_records") or []],
+        )
+
+
+@slotted
+class CarDetails:
+    """
+    Parsed detail page with normalised numbers (None = not shown on the page).
+    Prices are whole currency units; mileage is in kilometres. `brand_id` ..
+    `town_id` are reference catalogue IDs (see `models.reference`).
+    """
+    brand: Optional[str] = None
+    model: Optional[str] = None
+    generation: Optional[str] = None
+    title: Optional[str] = None
+    model_info: Optional[str] = None
+    location: Optional[str] = None
+    updated: Optional[str] = None
+    posted: Optional[str] = None
+    views: Optional[int] = None
+    favorites: Optional[int] = None
+    price_usd: Optional[int] = None
+    price_kgs: Optional[int] = None
+    price_rub: Optional[int] = None
+    price_kzt: Optional[int] = None
+    credit_offer: Optional[str] = None
+    user_name: Optional[str] = None
+    user_profile_url: Optional[str] = None
+    phone_number: Optional[str] = None
+    image_links: List[str] = field(default_factory=list)
+    year: Optional[int] = None
+    mileage_km: Optional[int] = None
+    body_type: Optional[str] = None
+    color: Optional[str] = None
+    engine: Optional[str] = None
+    transmission: Optional[str] = None
+    drive_type: Optional[str] = None
+    steering_wheel: Optional[str] = None
+    condition: Optional[str] = None
+    customs_cleared: Optional[str] = None
+    exchange: Optional[str] = None
+    availability: Optional[str] = None
+    car_location: Optional[str] = None
+    registration_country: Optional[str] = None
+    other_info: Optional[str] = None
+    vin: Optional[str] = None
+    average_price_desc: Optional[str] = None
+    average_price_usd: Optional[int] = None
+    seller_comment: Optional[str] = None
+    configuration: Optional[Dict[str, List[str]]] = None
+    vin_report: Optional[VinReport] = None
+    vin_code: Optional[str] = None
+    brand_id: Optional[int] = None
+    model_id: Optional[int] = None
+    region_id: Optional[int] = None
+    town_id: Optional[int] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Plain dict of all fields (nested VIN report included).
+
+        Returns:
+            Dict[str, Any]: JSON-serialisable field values.
+        """
+        data: Dict[str, Any] = dict(zip(_DETAIL_FIELDS, _detail_values(self)))
+        if self.vin_report is not None:
+            data["vin_report"] = self.vin_report.to_dict()
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CarDetails":
+        """
+        Build from a dict produced by `to_dict` (unknown keys are ignored).
+
+        Args:
+            data (Dict[str, Any]): Typed details dict.
+
+        Returns:
+            CarDetails: The details.
+        """
+        values: Dict[str, Any] = {name: data[name] for name in _DETAIL_FIELDS if name in data}
+        values["vin_report"] = VinReport.from_dict(data.get("vin_report"))
+        values["image_links"] = list(data.get("image_links") or [])
+        return cls(**values)
+
+
+_DETAIL_FIELDS: Tuple[str, ...] = tuple(f.name for f in fields(CarDetails))
+_detail_values = attrgetter(*_DETAIL_FIELDS)
+
+
+@slotted
+class CarListing:
+    """
+    One listing: its search card data and, once fetched, its details.
+
+    Attributes:
+        link (str): Detail page URL.
+        listing_id (str): ID from the URL slug (see `utils.dedup.listing_id`).
+        status (Optional[str]): "Срочно" label if shown on the card.
+        features (Tuple[str, ...]): Paid features ("vip", "premium", "color", "autoup").
+        details (Optional[CarDetails]): Parsed detail page; None if not fetched or failed.
+    """
+    link: str
+    listing_id: str
+    status: Optional[str] = None
+    features: Tuple[str, ...] = ()
+    details: Optional[CarDetails] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Plain dict in the typed record layout (details under "car_details").
+
+        Returns:
+            Dict[str, Any]: JSON-serialisable record.
+        """
+        return {
+            "link": self.link,
+            "listing_id": self.listing_id,
+            "status": self.status,
+            "features": list(self.features),
+            "car_details": self.details.to_dict() if self.details is not None else {},
+        }
+
+    def to_json(self) -> str:
+        return _dumps(self.to_dict())
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CarListing":
+        """
+        Build from a typed record dict (see `models.legacy` for the legacy layout).
+
+        Args:
+            data (Dict[str, Any]): Record produced by `to_dict`.
+
+        Returns:
+            CarListing: The listing.
+        """
+        details: Optional[Dict[str, Any]] = data.get("car_details")
+        return cls(
+            data["link"],
+            data.get("listing_id") or "",
+            data.get("status"),
+            tuple(data.get("features") or ()),
+            CarDetails.from_dict(details) if details else None,
+        )
@@ -0,0 +1,167 @@
+"""
+src/models/legacy.py — Conversion between the typed model and the legacy dict records.
+
+Author: Danil
+Created: 2026-10-17
+Description:
+    The extractors in `utils/parse_details/` still produce the original
+    string-valued dict layout, and existing consumers of `full_results.json`
+    expect it. This compatibility layer converts in both directions:
+    - `listing_from_legacy` / `details_from_legacy`: legacy dicts → typed model
+      (numbers normalised with `models.normalize`)
+    - `listing_to_legacy` / `details_to_legacy`: typed model → legacy dicts,
+      re-rendering numbers the way the site prints them ("$ 16 300",
+      "1 425 435 сом", "45 000 км"), keys in the original order
+    - `load_listing` / `iter_listings`: read records of either layout from an
+      NDJSON file as `CarListing` objects
+
+Usage:
+    from models.legacy import listing_from_legacy, listing_to_legacy
+    listing = listing_from_legacy(record)        # record from main_crawl
+    legacy = listing_to_legacy(listing)          # same shape as before
+
+Dependencies:
+    - models.car, models.normalize
+    - storage.ndjson for reading record files
+    - utils.dedup for listing IDs
+"""
+
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from models.car import CarDetails, CarListing, VinReport
+from models.normalize import format_thousands, parse_int, parse_mileage_km
+from models.reference import REFERENCE_FIELDS
+from utils.dedup import listing_id
+
+# Legacy field → (typed field, text → value, value → text); other fields are copied as they are
+_NUMERIC: Dict[str, Tuple[str, Callable[[Any], Optional[int]], Callable[[int], str]]] = {
+    "views": ("views", parse_int, format_thousands),
+    "favorites": ("favorites", parse_int, format_thousands),
+    "price_usd": ("price_usd", parse_int, lambda v: f"$ {format_thousands(v)}"),
+    "price_kgs": ("price_kgs", parse_int, lambda v: f"{format_thousands(v)} сом"),
+    "price_rub": ("price_rub", parse_int, lambda v: f"{format_thousands(v)} руб"),
+    "price_kzt": ("price_kzt", parse_int, lambda v: f"{format_thousands(v)} тенге"),
+    "year": ("year", parse_int, str),
+    "mileage": ("mileage_km", parse_mileage_km, lambda v: f"{format_thousands(v)} км"),
+    "average_price_usd": ("average_price_usd", parse_int, lambda v: f"$ {format_thousands(v)}"),
+}
+_TYPED_TO_LEGACY: Dict[str, str] = {typed: legacy for legacy, (typed, _, _) in _NUMERIC.items()}
+
+
+def details_from_legacy(data: Dict[str, Any]) -> CarDetails:
+    """
+    Build typed details from an `extract_car_details` dict.
+
+    Args:
+        data (Dict[str, Any]): Legacy details dict.
+
+    Returns:
+        CarDetails: Details with numeric fields as integers.
+    """
+    details = CarDetails()
+    for key, value in data.items():
+        numeric = _NUMERIC.get(key)
+        if numeric is not None:
+            setattr(details, numeric[0], numeric[1](value))
+        elif key == "vin_report":
+            details.vin_report = VinReport.from_dict(value)
+        elif key == "image_links":
+            details.image_links = list(value or [])
+        elif hasattr(details, key):
+            setattr(details, key, value)
+    return details
+
+
+def details_to_legacy(details: CarDetails) -> Dict[str, Any]:
+    """
+    Render typed details in the legacy string-valued layout.
+
+    Args:
+        details (CarDetails): Typed details.
+
+    Returns:
+        Dict[str, Any]: Same keys, order and formats as `extract_car_details`; the
+        catalogue ID keys only when at least one ID is set (they are opt-in).
+    """
+    data: Dict[str, Any] = {}
+    for key, value in details.to_dict().items():
+        legacy_key: Optional[str] = _TYPED_TO_LEGACY.get(key)
+        if legacy_key is not None:
+            data[legacy_key] = None if value is None else _NUMERIC[legacy_key][2](value)
+        else:
+            data[key] = value
+    if all(data[key] is None for key in REFERENCE_FIELDS):
+        for key in REFERENCE_FIELDS:
+            del data[key]
+    return data
+
+
+def listing_from_legacy(record: Dict[str, Any]) -> CarListing:
+    """
+    Build a typed listing from a legacy crawl record.
+
+    Args:
+        record (Dict[str, Any]): {"link", "status", "features", "car_details"}.
+
+    Returns:
+        CarListing: The listing (details None if the record has none).
+    """
+    details: Optional[Dict[str, Any]] = record.get("car_details")
+    return CarListing(
+        record["link"],
+        listing_id(record["link"]),
+        record.get("status"),
+        tuple(record.get("features") or ()),
+        details_from_legacy(details) if details else None,
+    )
+
+
+def listing_to_legacy(listing: CarListing) -> Dict[str, Any]:
+    """
+    Render a typed listing as a legacy crawl record.
+
+    Args:
+        listing (CarListing): Typed listing.
+
+    Returns:
+        Dict[str, Any]: {"link", "status", "features", "car_details"}.
+    """
+    return {
+        "link": listing.link,
+        "status": listing.status,
+        "features": list(listing.features),
+        "car_details": details_to_legacy(listing.details) if listing.details is not None else {},
+    }
+
+
+def load_listing(record: Dict[str, Any]) -> CarListing:
+    """
+    Build a listing from a record of either layout (typed records carry "listing_id").
+
+    Args:
+        record (Dict[str, Any]): Typed or legacy record.
+
+    Returns:
+        CarListing: The listing.
+    """
+    if "listing_id" in record:
+        return CarListing.from_dict(record)
+    return listing_from_legacy(record)
+
+
+def iter_listings(path: str, compression: Optional[str] = None) -> Iterator[CarListing]:
+    """
+    Stream `CarListing` objects from an NDJSON record file of either layout.
+
+    Args:
+        path (str): NDJSON file (optionally compressed).
+        compression (Optional[str]): Compression; inferred from suffix if None.
+
+    Yields:
+        CarListing: One listing per record.
+    """
+    # Imported here: the storage package itself builds on this module
+    from storage.ndjson import iter_ndjson
+
+    for record in iter_ndjson(path, compression):
+        yield load_listing(record)
@@ -0,0 +1,150 @@
+"""
+src/models/normalize.py — Text → number normalisation for scraped car fields.
+
+Author: Danil
+Created: 2026-10-17
+Description:
+    mashina.kg renders numbers for humans: "$ 16 300", "1 425 435 сом",
+    "45 000 км", "1 234" (with regular, no-break or narrow no-break spaces as
+    thousands separators). These helpers turn them into integers and back:
+    - `parse_int`: first integer in a string, separators removed
+    - `parse_mileage_km`: mileage in kilometres (values in miles are converted)
+    - `format_thousands`: integer with spaces between thousands groups, the
+      inverse used by `models.legacy` to rebuild the original strings
+    - `parse_engine`: "2.0 / бензин" → (2.0, "бензин")
+    - `parse_age`: "Обновлено 2 часа назад" → (7200, 3600), seconds and precision
+
+Usage:
+    from models.normalize import parse_int, parse_mileage_km
+    parse_int("$ 16 300")            # 16300
+    parse_mileage_km("45 000 км")    # 45000
+
+Dependencies:
+    - re (standard library)
+"""
+
+import re
+from typing import Any, Optional, Tuple
+
+# Digits possibly grouped by (no-break) spaces: "1 425 435"
+_INT_RE = re.compile(r"\d+(?:[ \u00a0\u202f\u2009]\d{3})*")
+_SEPARATORS = str.maketrans("", "", " \u00a0\u202f\u2009")
+
+_VOLUME_RE = re.compile(r"\d+(?:[.,]\d+)?")
+
+KM_PER_MILE: float = 1.609344
+
+# Unit stem of relative times ("2 часа назад", "5 минут назад") → seconds
+_AGE_UNITS: Tuple[Tuple[str, int], ...] = (
+    ("сек", 1),
+    ("мин", 60),
+    ("час", 3600),
+    ("дн", 86400),
+    ("день", 86400),
+    ("нед", 7 * 86400),
+    ("мес", 30 * 86400),
+    ("год", 365 * 86400),
+    ("лет", 365 * 86400),
+)
+
+
+def parse_int(value: Any) -> Optional[int]:
+    """
+    First integer contained in a value.
+
+    Args:
+        value (Any): Scraped text (ints pass through; None stays None).
+
+    Returns:
+        Optional[int]: The number, or None if the value has no digits.
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    match = _INT_RE.search(str(value))
+    return int(match.group(0).translate(_SEPARATORS)) if match else None
+
+
+def parse_mileage_km(value: Any) -> Optional[int]:
+    """
+    Mileage in kilometres.
+
+    Args:
+        value (Any): e.g. "45 000 км" or "30 000 миль".
+
+    Returns:
+        Optional[int]: Kilometres, or None if the value has no number.
+    """
+    number: Optional[int] = parse_int(value)
+    if number is None or isinstance(value, int):
+        return number
+    text: str = str(value).lower()
+    if "миль" in text or "mile" in text:
+        return round(number * KM_PER_MILE)
+    return number
+
+
+def format_thousands(value: int) -> str:
+    """
+    Format an integer the way the site does ("1 425 435").
+
+    Args:
+        value (int): Number to format.
+
+    Returns:
+        str: Digits grouped by spaces.
+    """
+    return f"{value:,}".replace(",", " ")
+
+
+def parse_engine(value: Optional[str]) -> Tuple[Optional[float], Optional[str]]:
+    """
+    Split the engine field into displacement and fuel.
+
+    Args:
+        value (Optional[str]): e.g. "2.0 / бензин", "электро".
+
+    Returns:
+        Tuple[Optional[float], Optional[str]]: Volume in litres and fuel type (None if absent).
+    """
+    if not value:
+        return None, None
+    volume: Optional[float] = None
+    fuel: Optional[str] = None
+    for part in (part.strip() for part in value.split("/")):
+        match = _VOLUME_RE.fullmatch(part.replace(" л", "").strip())
+        if match and volume is None:
+            volume = float(match.group(0).replace(",", "."))
+        elif part and fuel is None:
+            fuel = part
+    return volume, fuel
+
+
+def parse_age(value: Optional[str]) -> Optional[Tuple[int, int]]:
+    """
+    Age described by a relative time such as the "updated" field.
+
+    Args:
+        value (Optional[str]): e.g. "Обновлено 2 часа назад", "только что", "вчера".
+
+    Returns:
+        Optional[Tuple[int, int]]: (age in seconds, precision in seconds), or None if the
+        text is not a relative time.
+    """
+    if not value:
+        return None
+    text: str = value.lower()
+    if "только что" in text or "сейчас" in text:
+        return 0, 60
+    if "сегодня" in text:
+        return 0, 86400
+    if "вчера" in text:
+        return 86400, 86400
+    if "назад" not in text:
+        return None
+    number: Optional[int] = parse_int(text)
+    for stem, seconds in _AGE_UNITS:
+        if stem in text:
+            return (1 if number is None else number) * seconds, seconds
+    return None
@@ -0,0 +1,367 @@
+"""
+src/models/reference.py — Reference-data lookups: free-text brand / model / location → catalogue IDs.
+
+Author: Danil
+Created: 2026-10-17
+Description:
+    `extract_car_breadcrumbs` yields brand / model as the page prints them
+    ("Mercedes-Benz", "E-Класс AMG") and `extract_main_specs` the location as
+    "Чуйская область, Бишкек". `ReferenceIndex` maps them to the IDs of the
+    reference catalogues (`brands_and_models.json`, `regions_and_towns.json`):
+    - names and slugs are folded (case, diacritics, "ё", punctuation and
+      spaces ignored: "Mercedes-Benz" == "mercedes benz" == "mercedes-benz";
+      a Cyrillic "Е" in "Е-Класс" matches the catalogue's Latin "E")
+    - exact hash-map hits first, then the longest catalogue name the text
+      starts with ("Camry Hybrid" → Camry), then a unique catalogue name
+      starting with the text ("Mercedes" → Mercedes-Benz)
+    - towns are matched within their region first (the same village name
+      exists in several regions); "с. " / "г. " prefixes and "(... р-н)"
+      qualifiers are optional
+    - brand and model fall back to the title ("Kia K5, 2020") when the page
+      has no breadcrumbs (e.g. listing-only records)
+
+    Building the tables from the 700 KB JSON files takes a noticeable moment,
+    so `load_reference_index` caches them as a JSON file, stamped with the
+    SHA-256 of both catalogues, and reuses it while their content is
+    unchanged. Lookups are memoised, so the per-record cost in the crawl is a
+    few dict hits.
+
+Usage:
+    from models.reference import get_reference_index
+    index = get_reference_index()
+    details.update(index.resolve(details))
+    # {"brand_id": 60, "model_id": 1017, "region_id": 1, "town_id": 2}
+
+Dependencies:
+    - json, hashlib, unicodedata (standard library)
+    - config for the catalogue and cache paths
+"""
+
+import hashlib
+import json
+import os
+import re
+import unicodedata
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import BRANDS_CATALOGUE_PATH, REFERENCE_INDEX_CACHE, REGIONS_CATALOGUE_PATH, logger
+
+REFERENCE_FIELDS: Tuple[str, ...] = ("brand_id", "model_id", "region_id", "town_id")
+
+# Bumped whenever the cached table layout changes
+_CACHE_VERSION: int = 1
+_NON_WORD = re.compile(r"[\W_]+")
+# Cyrillic letters that look like Latin ones ("Е-Класс" typed with a Cyrillic "Е")
+_HOMOGLYPHS = str.maketrans("авекмнорстух", "abekmhopctyx")
+_TOWN_PREFIX = re.compile(r"^\s*(?:с|г|пгт|пос|п)\.\s*", re.I)
+_QUALIFIER = re.compile(r"\s*\([^)]*\)\s*")
+# Catalogue names shorter than this are only matched exactly
+_MIN_PREFIX: int = 2
+# Marks an alias shared by several entries: such text is not resolved
+_AMBIGUOUS: int = -1
+
+_Table = Dict[str, int]
+
+
+def fold(text: str) -> str:
+    """
+    Normalise text for lookups: case-folded, diacritics and non-alphanumerics removed,
+    Cyrillic look-alikes of Latin letters replaced by them.
+
+    Args:
+        text (str): Name as printed ("Mercedes-Benz", "Иссык-Кульская область").
+
+    Returns:
+        str: Folded key ("mercedesbenz"; Cyrillic keys come out partly Latin).
+    """
+    decomposed: str = unicodedata.normalize("NFKD", text.casefold())
+    stripped: str = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return _NON_WORD.sub("", stripped).translate(_HOMOGLYPHS)
+
+
+def _add(table: _Table, key: str, value: int, names: Optional[set] = None) -> None:
+    """
+    Add a key; with `names` (the keys of real names) it is an alias, which never
+    overrides a real name and turns ambiguous when aliases of different entries collide.
+    """
+    if not key or (names is not None and key in names):
+        return
+    if names is not None and table.get(key, value) != value:
+        table[key] = _AMBIGUOUS
+    else:
+        table[key] = value
+
+
+def _town_aliases(name: str) -> List[str]:
+    bare: str = _QUALIFIER.sub(" ", _TOWN_PREFIX.sub("", name))
+    return [fold(alias) for alias in {bare, _TOWN_PREFIX.sub("", name)} if alias != name]
+
+
+def build_tables(brands: List[dict], regions: List[dict]) -> Dict[str, Any]:
+    """
+    Build the lookup tables from the parsed catalogue files.
+
+    Args:
+        brands (List[dict]): Content of `brands_and_models.json`.
+        regions (List[dict]): Content of `regions_and_towns.json`.
+
+    Returns:
+        Dict[str, Any]: Plain dicts: "brands", "models" (by brand ID),
+        "regions", "towns" (by region ID) and "all_towns" (town → (region ID, town ID)).
+    """
+    brand_table: _Table = {}
+    model_tables: Dict[int, _Table] = {}
+    for brand in brands:
+        for name in (brand.get("slug"), brand["name"]):
+            _add(brand_table, fold(name or ""), brand["id"])
+        models: _Table = model_tables.setdefault(brand["id"], {})
+        for model in brand.get("models") or []:
+            # Some models have no slug
+            for name in (model.get("slug"), model["name"]):
+                _add(models, fold(name or ""), model["id"])
+    # "Enovate (Enoreve)" may also be printed without its bracketed name
+    brand_names: set = set(brand_table)
+    for brand in brands:
+        _add(brand_table, fold(_QUALIFIER.sub(" ", brand["name"])), brand["id"], brand_names)
+
+    region_table: _Table = {}
+    town_tables: Dict[int, _Table] = {}
+    all_towns: Dict[str, Tuple[int, int]] = {}
+    for region in regions:
+        _add(region_table, fold(region["name"]), region["id"])
+        towns: _Table = town_tables.setdefault(region["id"], {})
+        for town in region.get("towns") or []:
+            _add(towns, fold(town["name"]), town["id"])
+        town_names: set = set(towns)
+        for town in region.get("towns") or []:
+            for alias in _town_aliases(town["name"]):
+                _add(towns, alias, town["id"], town_names)
+    for region_id, towns in town_tables.items():
+        for key, town_id in towns.items():
+            place: Tuple[int, int] = (region_id, town_id) if town_id != _AMBIGUOUS else (_AMBIGUOUS, _AMBIGUOUS)
+            if all_towns.get(key, place) != place:
+                place = (_AMBIGUOUS, _AMBIGUOUS)
+            all_towns[key] = place
+    return {"brands": brand_table, "models": model_tables, "regions": region_table,
+            "towns": town_tables, "all_towns": all_towns}
+
+
+def _match(table: Dict[str, Any], keys: List[str], key: str, default: Any = None) -> Any:
+    """
+    Look a folded key up: exact, then the longest table key it starts with, then
+    the only table key starting with it.
+    """
+    value: Any = table.get(key)
+    if value is not None:
+        return value
+    for end in range(len(key) - 1, _MIN_PREFIX - 1, -1):
+        value = table.get(key[:end])
+        if value is not None:
+            return value
+    if len(key) >= _MIN_PREFIX:
+        position: int = bisect_left(keys, key)
+        found: set = set()
+        while position < len(keys) and keys[position].startswith(key):
+            found.add(table[keys[position]])
+            position += 1
+        if len(found) == 1:
+            return found.pop()
+    return default
+
+
+class ReferenceIndex:
+    """
+    In-memory brand / model / region / town lookup tables.
+    """
+
+    def __init__(self, tables: Dict[str, Any]) -> None:
+        """
+        Args:
+            tables (Dict[str, Any]): Output of `build_tables`.
+        """
+        self._brands: _Table = tables["brands"]
+        self._models: Dict[int, _Table] = tables["models"]
+        self._regions: _Table = tables["regions"]
+        self._towns: Dict[int, _Table] = tables["towns"]
+        self._all_towns: Dict[str, Tuple[int, int]] = tables["all_towns"]
+        self._brand_keys: List[str] = sorted(self._brands)
+        self._model_keys: Dict[int, List[str]] = {brand: sorted(table) for brand, table in self._models.items()}
+        self._region_keys: List[str] = sorted(self._regions)
+        self._town_keys: Dict[int, List[str]] = {region: sorted(table) for region, table in self._towns.items()}
+        self._all_town_keys: List[str] = sorted(self._all_towns)
+        # Per-instance memoisation of the text → IDs lookups
+        self.car = lru_cache(maxsize=16384)(self._car)
+        self.place = lru_cache(maxsize=4096)(self._place)
+
+    @staticmethod
+    def _valid(value: Optional[int]) -> Optional[int]:
+        return None if value is None or value == _AMBIGUOUS else value
+
+    def brand_id(self, name: Optional[str]) -> Optional[int]:
+        """
+        Args:
+            name (Optional[str]): Brand as printed ("Mercedes-Benz") or its slug.
+
+        Returns:
+            Optional[int]: Catalogue brand ID, None if unknown.
+        """
+        return self._valid(_match(self._brands, self._brand_keys, fold(name))) if name else None
+
+    def model_id(self, brand_id: Optional[int], name: Optional[str]) -> Optional[int]:
+        """
+        Args:
+            brand_id (Optional[int]): Catalogue brand ID.
+            name (Optional[str]): Model as printed ("E-Класс AMG") or its slug.
+
+        Returns:
+            Optional[int]: Catalogue model ID, None if unknown.
+        """
+        if brand_id is None or not name or brand_id not in self._models:
+            return None
+        return self._valid(_match(self._models[brand_id], self._model_keys[brand_id], fold(name)))
+
+    def _car(self, brand: Optional[str], model: Optional[str], title: Optional[str]) -> Tuple[Optional[int], ...]:
+        brand_id: Optional[int] = self.brand_id(brand)
+        model_id: Optional[int] = self.model_id(brand_id, model)
+        if (brand_id is None or model_id is None) and title:
+            # "Kia K5, 2020": the brand is the longest brand name the title starts with,
+            # the model the longest model name of that brand the rest starts with
+            folded: str = fold(title.split(",")[0])
+            if brand_id is None:
+                for end in range(len(folded), _MIN_PREFIX - 1, -1):
+                    brand_id = self._valid(self._brands.get(folded[:end]))
+                    if brand_id is not None:
+                        model_id = self.model_id(brand_id, folded[end:] or None)
+                        break
+            elif brand and folded.startswith(fold(brand)):
+                model_id = self.model_id(brand_id, folded[len(fold(brand)):] or None)
+        return brand_id, model_id
+
+    def _place(self, location: Optional[str], town: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+        region_id: Optional[int] = None
+        town_key: Optional[str] = None
+        if location:
+            region_text, _, town_text = location.partition(",")
+            region_id = self._valid(_match(self._regions, self._region_keys, fold(region_text)))
+            if region_id is None and not town_text:
+                # A single name may be a town ("Бишкек")
+                town_text = region_text
+            town_key = fold(town_text) if town_text.strip() else None
+        if town_key is None and town:
+            town_key = fold(town)
+        if not town_key:
+            return region_id, None
+        if region_id is not None and region_id in self._towns:
+            town_id: Optional[int] = self._valid(_match(self._towns[region_id], self._town_keys[region_id], town_key))
+            if town_id is not None:
+                return region_id, town_id
+        found_region, found_town = _match(self._all_towns, self._all_town_keys, town_key, (None, None))
+        if found_town is None or found_town == _AMBIGUOUS or (region_id is not None and found_region != region_id):
+            return region_id, None
+        return found_region, found_town
+
+    def resolve(self, details: Dict[str, Any]) -> Dict[str, Optional[int]]:
+        """
+        Catalogue IDs of a details dict (legacy or typed layout).
+
+        Args:
+            details (Dict[str, Any]): Needs "brand", "model", "title", "car_location"
+                and / or "location"; missing keys resolve to None.
+
+        Returns:
+            Dict[str, Optional[int]]: "brand_id", "model_id", "region_id", "town_id".
+        """
+        brand_id, model_id = self.car(details.get("brand"), details.get("model"), details.get("title"))
+        region_id, town_id = self.place(details.get("car_location"), details.get("location"))
+        return {"brand_id": brand_id, "model_id": model_id, "region_id": region_id, "town_id": town_id}
+
+
+def _source_stamp(paths: Tuple[str, ...]) -> List[str]:
+    stamp: List[str] = []
+    for path in paths:
+        with open(path, "rb") as f:
+            stamp.append(hashlib.sha256(f.read()).hexdigest())
+    return stamp
+
+
+def _tables_to_json(tables: Dict[str, Any]) -> Dict[str, Any]:
+    # JSON object keys are strings: the int-keyed tables are stored as such and restored by _tables_from_json
+    return {
+        "brands": tables["brands"],
+        "models": {str(brand): table for brand, table in tables["models"].items()},
+        "regions": tables["regions"],
+        "towns": {str(region): table for region, table in tables["towns"].items()},
+        "all_towns": tables["all_towns"],
+    }
+
+
+def _tables_from_json(data: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "brands": data["brands"],
+        "models": {int(brand): table for brand, table in data["models"].items()},
+        "regions": data["regions"],
+        "towns": {int(region): table for region, table in data["towns"].items()},
+        "all_towns": {key: tuple(place) for key, place in data["all_towns"].items()},
+    }
+
+
+def load_reference_index(
+    brands_path: str = BRANDS_CATALOGUE_PATH,
+    regions_path: str = REGIONS_CATALOGUE_PATH,
+    cache_path: Optional[str] = REFERENCE_INDEX_CACHE,
+) -> ReferenceIndex:
+    """
+    Load the index from its JSON cache, or build it from the catalogues and cache it.
+
+    Args:
+        brands_path (str): `brands_and_models.json`.
+        regions_path (str): `regions_and_towns.json`.
+        cache_path (Optional[str]): JSON cache, used while it was built from catalogues with
+            the same content; None always builds from the catalogue files.
+
+    Returns:
+        ReferenceIndex: The index.
+    """
+    stamp = _source_stamp((brands_path, regions_path))
+    if cache_path and os.path.exists(cache_path):
+        try:
+            with open(cache_path, encoding="utf-8") as f:
+                cached: Dict[str, Any] = json.load(f)
+            if cached.get("version") == _CACHE_VERSION and cached.get("sources") == stamp:
+                return ReferenceIndex(_tables_from_json(cached["tables"]))
+        except (OSError, ValueError, AttributeError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable reference index cache {cache_path}: {e}")
+
+    with open(brands_path, encoding="utf-8") as f:
+        brands: List[dict] = json.load(f)
+    with open(regions_path, encoding="utf-8") as f:
+        regions: List[dict] = json.load(f)
+    tables: Dict[str, Any] = build_tables(brands, regions)
+    if cache_path:
+        try:
+            temporary: str = f"{cache_path}.tmp"
+            with open(temporary, "w", encoding="utf-8") as f:
+                json.dump({"version": _CACHE_VERSION, "sources": stamp, "tables": _tables_to_json(tables)}, f,
+                          ensure_ascii=False, separators=(",", ":"))
+            os.replace(temporary, cache_path)
+        except OSError as e:
+            logger.warning(f"Could not write reference index cache {cache_path}: {e}")
+    return ReferenceIndex(tables)
+
+
+_INDEX: Optional[ReferenceIndex] = None
+
+
+def get_reference_index() -> ReferenceIndex:
+    """
+    The process-wide index, loaded on first use.
+
+    Returns:
+        ReferenceIndex: The index built from the configured catalogue paths.
+    """
+    global _INDEX
+    if _INDEX is None:
+        _INDEX = load_reference_index()
+    return _INDEX
@@ -4,35 +4,88 @@ src/services/crawl_service.py — Core asynchronous crawling service for Mashina
 Author: Danil
 Created: 2025-06-22
 Description:
-    Contains the main crawling workflow that:
-    - Builds the list of search result pages
-    - Fetches and extracts car listing links from all pages asynchronously
-    - Fetches and parses detailed information for each car listing asynchronously
-    - Aggregates all results and saves them to a JSON file
+    Contains the main crawling workflow, run as a producer/consumer pipeline:
+    - Builds the list of search result pages from page 1 (fetched once, on the
+      async path) or streams them lazily until a page has no listings
+    - Fetches and extracts car listing links from all pages (bounded worker pool),
+      queueing each listing ID once and merging the cards of repeated listings
+    - Streams every extracted link straight into the detail stage, which fetches
+      and parses car detail pages (bounded worker pool) while listing pages are
+      still being fetched
+    - Streams every parsed record to an NDJSON file and, at the end, converts
+      it into the legacy single-array JSON file
+    - Checkpoints page and detail progress so `resume=True` skips completed
+      work and retries only failures; a listing is checkpointed as done only
+      after the output has been fsynced with its record
+    - In incremental mode, fetches details only for new, upped, changed or
+      stale listings, carries the previous records of the others forward and
+      writes a removal marker for listings missing from the search
+    - Retries transient fetch failures (see `utils.retry`) and records pages and
+      listings that still failed in a dead-letter file, which a later run can
+      re-queue on its own (`requeue_dead_letters=True`)
+    - Counts pages and records in `utils.metrics`, optionally served on a
+      Prometheus endpoint and/or written to a periodic JSON snapshot
+    - In listing-only mode, builds records from each search page's JSON-LD
+      offers and fetches detail pages only for a sampled / filtered subset
 
 Usage:
     Import and call `main_crawl()` from an async context or run via an entry script.
 
 Dependencies:
-    - asyncio
-    - tqdm (for async progress bars)
-    - utils.pagination: page link builder
-    - utils.fetch: async-compatible HTML fetcher
+    - services.scheduler: bounded-concurrency work queue (with progress bars)
+    - utils.rate_limit: per-host token buckets and back-off
+    - utils.retry: retry policy, circuit breaker, dead-letter file
+    - utils.pagination: page discovery (eager or lazy)
+    - services.segments: segmented discovery per brand / region / model
+    - utils.fetch: pooled async HTML fetcher
+    - utils.html_cache: optional on-disk HTML cache with revalidation
     - utils.parse_listings: extract car links from listing pages
+    - utils.dedup: one fetch per listing ID, merging repeated search cards
     - utils.parse_details: parse detailed car info
+    - utils.parse_pool: optional process pool for the parse stage
+    - utils.metrics: counters / histograms, Prometheus endpoint, JSON snapshots
+    - services.listing_mode: records from JSON-LD offers, detail sampling / filters
+    - models.legacy: typed record layout (`record_format="typed"`)
+    - storage.ndjson: streaming record sink and legacy JSON converter
+    - storage.state_store: SQLite checkpoints for resumable crawls
+    - storage.listing_index: known-listing index for incremental crawls
+    - services.sharding: shared-queue access when running as one worker of a sharded crawl
     - config: logger instance
 
 """
 
-import asyncio
-import json
-from typing import Any, Dict, List
-from tqdm.asyncio import tqdm
-from utils.pagination import build_page_links
-from utils.fetch import fetch_html
+from functools import partial
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
+from utils.pagination import LazyPageLinks, page_number_from_url
+from utils.fetch import (
+    close_client,
+    fetch_html_async,
+    open_client,
+    set_circuit_breaker,
+    set_html_cache,
+    set_rate_limiter,
+    set_retry_policy,
+)
+from utils.html_cache import HtmlCache
+from utils.rate_limit import HostRateLimiter
+from utils.retry import CircuitBreaker, DeadLetterQueue, RetryPolicy, release_dead_letters, take_dead_letters
 from utils.parse_listings import extract_links_from_html
+from utils.dedup import ListingDeduplicator, dedupe_listings
 from utils.parse_details import fetch_and_parse_car
-from config import logger
+from utils.parse_details.parser import set_default_parser, set_scoped_parsing
+from utils.parse_pool import ParsePool
+from utils.metrics import PAGES_FETCHED, RECORDS_WRITTEN, MetricsServer, SnapshotWriter
+from storage.ndjson import NDJsonWriter, ndjson_to_json_array
+from storage.state_store import DONE, FAILED, CrawlStateStore
+from storage.listing_index import ListingIndex
+from models.legacy import listing_from_legacy
+from models.reference import ReferenceIndex, get_reference_index
+from services.options import CrawlOptions
+from services.listing_mode import DetailSelector, offer_details
+from services.segments import discover_search_pages
+from services.sharding import ShardRouter, merge_streams
+from services.scheduler import CrawlScheduler
+from config import BACKOFF_BASE, BACKOFF_MAX, logger
 
 
 async def fetch_and_extract_links(url: str) -> List[Dict[str, Any]]:
@@ -46,70 +99,432 @@ async def fetch_and_extract_links(url: str) -> List[Dict[str, Any]]:
     Returns:
         List[Dict[str, Any]]: List of dictionaries with link info.
     """
-    html: str = await asyncio.to_thread(fetch_html, url)
-    return extract_links_from_html(html)
+    html: str = await fetch_html_async(url)
+    return extract_links_from_html(html, page_url=url)
 
 
-async def main_crawl() -> None:
+async def fetch_listing_page(
+    url: str,
+    parse_pool: Optional[ParsePool] = None,
+    prefetched: Optional[Dict[str, str]] = None,
+    with_offers: bool = False,
+) -> Tuple[str, bool, List[Dict[str, Any]]]:
     """
-    Main crawling function that orchestrates the full crawling workflow:
-    - Builds page links
-    - Fetches car listing URLs from all pages asynchronously
-    - Parses car details asynchronously
-    - Saves all collected data to 'full_results.json'
+    Fetch one search result page and extract its car links.
+
+    Args:
+        url (str): URL of the listings page.
+        parse_pool (Optional[ParsePool]): Process pool for parsing; parse in-process if None.
+        prefetched (Optional[Dict[str, str]]): HTML already fetched by URL (e.g. page 1
+            during page discovery); used once instead of a request.
+        with_offers (bool): Attach each car's JSON-LD offer (listing-only mode).
 
     Returns:
-        None
+        Tuple[str, bool, List[Dict[str, Any]]]: The URL, whether the fetch succeeded,
+        and the extracted link info dictionaries.
     """
-    base_url: str = "https://m.mashina.kg/search/all/?page=1"
-    links: List[str] = build_page_links(base_url)
+    html: Optional[str] = prefetched.pop(url, None) if prefetched else None
+    if html is None:
+        html = await fetch_html_async(url)
+    if not html:
+        return url, False, []
+    if parse_pool is not None:
+        return url, True, await parse_pool.parse_listing(html, url, with_offers)
+    return url, True, extract_links_from_html(html, page_url=url, with_offers=with_offers)
 
-    logger.info(f"Start fetching link lists from {len(links)} pages")
 
-    # Fetch all listing pages and extract car links with progress bar
-    tasks_links: List[asyncio.Future[List[Dict[str, Any]]]] = [fetch_and_extract_links(link) for link in links]
-    all_results: List[List[Dict[str, Any]]] = []
-    for coro in tqdm(asyncio.as_completed(tasks_links), total=len(tasks_links), desc="Fetching car links"):
-        result: List[Dict[str, Any]] = await coro
-        all_results.append(result)
+async def iter_listing_links(
+    page_links: Union[List[str], LazyPageLinks, AsyncIterator[str]],
+    options: CrawlOptions,
+    store: CrawlStateStore,
+    index: Optional[ListingIndex] = None,
+    parse_pool: Optional[ParsePool] = None,
+    dead_letters: Optional[DeadLetterQueue] = None,
+    prefetched: Optional[Dict[str, str]] = None,
+    router: Optional[ShardRouter] = None,
+    dedup: Optional[ListingDeduplicator] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Fetch search result pages with bounded concurrency and yield each new car
+    link as soon as its page has been parsed. Page outcomes and discovered links
+    are checkpointed in the state store; links already known to it are skipped.
+    Each listing ID is queued once: repeated cards (VIP / premium listings pinned
+    to many pages) are merged into the first occurrence.
+    In incremental mode, links whose stored details are still current are skipped too.
+    In a sharded crawl, page outcomes are reported to the shared queue and
+    listings owned by other workers are handed over to them.
 
-    # Flatten list of lists into a single list of car link dicts
-    flat_results: List[Dict[str, Any]] = [item for sublist in all_results for item in sublist]
-    logger.info(f"Total car links found: {len(flat_results)}")
+    Args:
+        page_links (Union[List[str], LazyPageLinks, AsyncIterator[str]]): URLs of the search
+            result pages, a lazy stream that is told how many cards each page had, or the
+            pages claimed from a sharded crawl's queue.
+        options (CrawlOptions): Run tunables.
+        store (CrawlStateStore): Checkpoint store of the current run.
+        index (Optional[ListingIndex]): Known-listing index (incremental mode only).
+        parse_pool (Optional[ParsePool]): Process pool for parsing; parse in-process if None.
+        dead_letters (Optional[DeadLetterQueue]): Receives pages that failed after all retries.
+        prefetched (Optional[Dict[str, str]]): HTML of pages fetched during discovery.
+        router (Optional[ShardRouter]): This worker's view of a sharded crawl's queue.
+        dedup (Optional[ListingDeduplicator]): Listing-ID deduplicator shared with the detail stage.
+
+    Yields:
+        Dict[str, Any]: Link info dictionaries from `extract_links_from_html`.
+    """
+    scheduler = CrawlScheduler(options.listing_concurrency, desc="Fetching car links", position=0, name="listing")
+    run_id: float = store.run_id()
+    found: int = 0
+    unchanged: int = 0
+    handler = partial(fetch_listing_page, parse_pool=parse_pool, prefetched=prefetched,
+                      with_offers=options.listing_only)
+    # A page whose fetch / parse raised counts as failed (checkpointed and dead-lettered)
+    async for url, ok, batch in scheduler.map(page_links, handler, on_error=lambda url, e: (url, False, [])):
+        PAGES_FETCHED.inc(outcome="ok" if ok else "failed")
+        if not ok and dead_letters is not None:
+            dead_letters.add("page", url, reason="fetch failed")
+        found += len(batch)
+        page: int = page_number_from_url(url)
+        if isinstance(page_links, LazyPageLinks):
+            page_links.record(page, len(batch) if ok else None)
+        batch = dedupe_listings(batch)
+        if router is not None:
+            router.page_done(url, ok)
+            batch = router.route(batch)
+        queued: List[Dict[str, Any]] = []
+        for position, item in enumerate(batch):
+            if dedup is not None and not dedup.admit(item):
+                continue
+            if index is not None and index.observe(item, page, position, run_id) is None:
+                unchanged += 1
+            elif store.add_detail(item):
+                queued.append(item)
+                continue
+            if dedup is not None:
+                dedup.release(item["link"])
+        # The page is checkpointed after its listings, so a crash in between fetches it again
+        store.mark_page(url, DONE if ok else FAILED)
+        for item in queued:
+            yield item
+    duplicates: int = dedup.duplicates if dedup is not None else 0
+    logger.info(f"Total car links found: {found} (unchanged, skipped: {unchanged}; "
+                f"duplicate listings, skipped: {duplicates})")
 
-    results: List[Dict[str, Any]] = [None] * len(flat_results)
 
-    async def worker(i: int, url: str) -> None:
-        """
-        Worker coroutine to fetch and parse car details for a single URL.
+async def fetch_listing_details(
+    item: Dict[str, Any],
+    parse_pool: Optional[ParsePool] = None,
+    selector: Optional[DetailSelector] = None,
+    reference: Optional[ReferenceIndex] = None,
+) -> Dict[str, Any]:
+    """
+    Fetch and parse the detail page of one listing and attach it as `car_details`.
 
-        Args:
-            i (int): Index to store results.
-            url (str): URL of the car details page.
+    Args:
+        item (Dict[str, Any]): Link info dictionary with a 'link' key.
+        parse_pool (Optional[ParsePool]): Process pool for parsing; parse in-process if None.
+        selector (Optional[DetailSelector]): Listing-only mode: listings with a JSON-LD
+            'offer' that it does not select get their details from the offer, without a fetch.
+        reference (Optional[ReferenceIndex]): Adds the catalogue IDs of brand / model /
+            location to the details.
 
-        Returns:
-            None
-        """
+    Returns:
+        Dict[str, Any]: The same dictionary with 'car_details' set ({} on failure).
+    """
+    url: str = item["link"]
+    offer: Optional[Dict[str, Any]] = item.get("offer")
+    if offer is not None and selector is not None and not selector(item):
+        del item["offer"]
+        item["car_details"] = offer_details(offer)
+    else:
+        item.pop("offer", None)
         try:
-            details: Dict[str, Any] = await fetch_and_parse_car(url)
-            results[i] = details
+            item["car_details"] = await fetch_and_parse_car(url, parse_pool)
         except Exception as e:
             logger.warning(f"Error parsing {url}: {e}")
-            results[i] = {}
+            item["car_details"] = {}
+    if reference is not None and item["car_details"]:
+        item["car_details"].update(reference.resolve(item["car_details"]))
+    return item
+
+
+def detail_failed(item: Dict[str, Any], error: Exception) -> Dict[str, Any]:
+    """
+    Record of a listing whose detail stage raised, so it is written, checkpointed
+    as failed and dead-lettered like a failed fetch.
+
+    Args:
+        item (Dict[str, Any]): Link info dictionary with a 'link' key.
+        error (Exception): What the handler raised.
+
+    Returns:
+        Dict[str, Any]: The same dictionary with 'car_details' set to {}.
+    """
+    item.pop("offer", None)
+    item["car_details"] = {}
+    return item
+
+
+async def start_metrics(options: CrawlOptions) -> Tuple[Optional[MetricsServer], Optional[SnapshotWriter]]:
+    """
+    Start the metrics endpoint and snapshot writer requested by the options.
+
+    Args:
+        options (CrawlOptions): Run tunables.
+
+    Returns:
+        Tuple[Optional[MetricsServer], Optional[SnapshotWriter]]: Running exporters (None if disabled).
+    """
+    server: Optional[MetricsServer] = None
+    writer: Optional[SnapshotWriter] = None
+    if options.metrics_port:
+        server = MetricsServer(options.metrics_port)
+        try:
+            await server.start()
+        except OSError as e:
+            logger.error(f"Could not start metrics endpoint on port {options.metrics_port}: {e}")
+            server = None
+    if options.metrics_path:
+        writer = SnapshotWriter(options.metrics_path, options.metrics_interval)
+        writer.start()
+    return server, writer
+
+
+def build_html_cache(options: CrawlOptions) -> Optional[HtmlCache]:
+    """
+    Create the on-disk HTML cache described by the options.
+
+    Args:
+        options (CrawlOptions): Run tunables.
+
+    Returns:
+        Optional[HtmlCache]: The cache, or None if caching is disabled.
+    """
+    if not options.cache_dir:
+        return None
+    return HtmlCache(
+        options.cache_dir,
+        fresh_seconds=options.cache_fresh_seconds,
+        max_age_seconds=options.cache_max_age_days * 86400,
+        max_bytes=options.cache_max_mb * 1024 ** 2,
+    )
+
+
+async def main_crawl(options: Optional[CrawlOptions] = None, router: Optional[ShardRouter] = None) -> bool:
+    """
+    Main crawling function that orchestrates the full crawling workflow as a
+    streaming pipeline:
+    - Builds page links from page 1, whose HTML is reused by the listing stage
+      (or, when resuming, reloads the unfinished ones); with `lazy_pages`,
+      further pages are generated until one has no listings; with `segmented`,
+      from page 1 of every brand / region / model segment
+    - Fetches search pages; every extracted car link flows straight into the
+      detail queue while the remaining search pages are still being fetched
+    - Parses car details with bounded concurrency as links arrive (in listing-only
+      mode, only for sampled / filtered listings; the rest come from the search page)
+    - Appends each record to the NDJSON output as soon as it is parsed
+    - Records pages/listings that failed after all retries as dead letters
+      (with `requeue_dead_letters`, only those entries are fetched again)
+    - Optionally converts the NDJSON output to the legacy 'full_results.json'
+
+    As one worker of a sharded crawl (`router` given), search pages are claimed
+    from the shared queue instead of being discovered, and listings are split
+    between the workers (see `services.sharding`).
+
+    Args:
+        options (Optional[CrawlOptions]): Run tunables; defaults from config.
+        router (Optional[ShardRouter]): Shared-queue access of a sharded crawl worker.
+
+    Returns:
+        bool: True if the run was a complete pass over the site's search pages
+        (not a shard, dead-letter re-run or brand subset, and no page left
+        unfinished), so listings missing from it can be treated as removed.
+    """
+    options = options or CrawlOptions()
+    set_default_parser(options.parser)
+    set_scoped_parsing(options.scoped_parse)
+    await open_client(engine=options.fetch_engine, http2=options.http2)
+    set_rate_limiter(HostRateLimiter(
+        options.host_rates,
+        default_rate=options.default_rate,
+        backoff_base=BACKOFF_BASE,
+        backoff_max=BACKOFF_MAX,
+    ))
+    set_retry_policy(RetryPolicy(options.retry_attempts, options.retry_backoff_base, options.retry_backoff_max))
+    set_circuit_breaker(CircuitBreaker(options.breaker_threshold, options.breaker_reset_seconds))
+    cache: Optional[HtmlCache] = build_html_cache(options)
+    set_html_cache(cache)
+
+    # Re-queued dead letters are taken before new failures start being appended
+    requeued: List[Dict[str, Any]] = []
+    if options.requeue_dead_letters and options.dead_letter_path:
+        requeued = take_dead_letters(options.dead_letter_path)
+    dead_letters: Optional[DeadLetterQueue] = None
+    append: bool = options.resume or options.requeue_dead_letters
+    if options.dead_letter_path:
+        dead_letters = DeadLetterQueue(options.dead_letter_path, append=append)
+
+    store = CrawlStateStore(options.state_path)
+    if not append:
+        store.reset()
+    index: Optional[ListingIndex] = None
+    if options.incremental:
+        index = ListingIndex(options.index_path, ttl_seconds=options.ttl_hours * 3600)
+    parse_pool: Optional[ParsePool] = None
+    if options.parse_workers > 0:
+        parse_pool = ParsePool(options.parse_workers, options.parse_batch_size, parser=options.parser,
+                               scoped=options.scoped_parse)
+    metrics_server, snapshot_writer = await start_metrics(options)
+    # Card data merged from a later page is written back, so a resume queues the merged listing
+    dedup = ListingDeduplicator(options.dedup_bloom_capacity, options.dedup_error_rate,
+                                on_merge=store.update_detail)
+    selector: Optional[DetailSelector] = None
+    if options.listing_only:
+        selector = DetailSelector(options.detail_sample_rate, options.detail_filter)
+    reference: Optional[ReferenceIndex] = get_reference_index() if options.reference_ids else None
+
+    prefetched: Dict[str, str] = {}
+    expected_pages: int = 0
+    try:
+        links: List[str] = []
+        retry_items: List[Dict[str, Any]] = []
+        if router is not None:
+            logger.info(f"Sharded crawl: {router.owner} of {router.worker_count} (shard_by={router.shard_by})")
+        elif options.requeue_dead_letters:
+            links = [entry["url"] for entry in requeued if entry["kind"] == "page"]
+            retry_items = [entry["item"] for entry in requeued if entry["kind"] == "detail" and entry.get("item")]
+            store.add_pages(links)
+            logger.info(f"Re-queued {len(links)} pages and {len(retry_items)} listings from dead letters")
+        else:
+            if not store.has_pages():
+                page_links, first_pages = await discover_search_pages(options)
+                prefetched.update(first_pages)
+                expected_pages = len(page_links)
+                store.add_pages(page_links[:1] if options.lazy_pages else page_links)
+            links = store.unfinished_pages()
+
+        pages: Union[List[str], LazyPageLinks, AsyncIterator[str]] = links
+        if router is not None:
+            pages = router.pages(store)
+        elif options.lazy_pages and not options.requeue_dead_letters:
+            start: int = max((page_number_from_url(url) for url in store.all_pages()), default=0) + 1
+            pages = LazyPageLinks(
+                options.search_url,
+                links,
+                start,
+                on_new_page=lambda url: store.add_pages([url]),
+                expected_last=expected_pages,
+                lookahead=max(1, options.listing_concurrency // 4),
+            )
+
+        logger.info(f"Start fetching link lists from {len(links)} pages (resume={options.resume}, "
+                    f"lazy={options.lazy_pages})")
+
+        async def work_items() -> AsyncIterator[Dict[str, Any]]:
+            # Details left unfinished by a previous run (or dead letters) go first, then newly discovered links
+            for item in (retry_items if options.requeue_dead_letters else store.unfinished_details()):
+                if dedup.admit(item):
+                    yield item
+            found = iter_listing_links(pages, options, store, index, parse_pool, dead_letters, prefetched, router,
+                                       dedup)
+            if router is not None:
+                # Listings other workers found for this shard arrive while own pages are still fetched
+                found = merge_streams(found, router.details(store, dedup))
+            async for item in found:
+                yield item
+
+        # Links from the listing stage feed the detail stage directly,
+        # and each parsed record is written out immediately
+        detail_scheduler = CrawlScheduler(options.detail_concurrency, desc="Parsing car details", position=1,
+                                          name="details")
+        # Detail statuses are checkpointed only once their records are on disk, so a
+        # hard kill cannot leave a listing marked done whose record was still buffered
+        settled: List[Tuple[str, str]] = []
+
+        def settle() -> None:
+            for url, status in settled:
+                store.mark_detail(url, status)
+            settled.clear()
+            store.commit()
 
-    tasks = [worker(i, item["link"]) for i, item in enumerate(flat_results)]
+        with NDJsonWriter(options.output_path, options.compression, options.fsync_every, append=append,
+                          on_sync=settle) as sink:
+            handler = partial(fetch_listing_details, parse_pool=parse_pool, selector=selector,
+                              reference=reference)
+            async for record in detail_scheduler.map(work_items(), handler, on_error=detail_failed):
+                written: Dict[str, Any] = (record if options.record_format == "legacy"
+                                           else listing_from_legacy(record).to_dict())
+                sink.write(written)
+                RECORDS_WRITTEN.inc(outcome="ok" if record["car_details"] else "empty")
+                if not record["car_details"] and dead_letters is not None:
+                    item = {key: value for key, value in record.items() if key != "car_details"}
+                    dead_letters.add("detail", record["link"], item, reason="no details")
+                settled.append((record["link"], DONE if record["car_details"] else FAILED))
+                dedup.release(record["link"])
+                if router is not None:
+                    router.detail_done(record["link"], bool(record["car_details"]))
+                if index is not None and record["car_details"]:
+                    index.record_details(record["link"], written)
+            if index is not None:
+                # Unchanged listings keep their previous record, so the output still lists every listing seen
+                fetched: int = sink.count
+                for carried in index.carried_records(store.run_id()):
+                    sink.write(carried)
+                logger.info(f"Carried forward {sink.count - fetched} unchanged listings")
+            saved: int = sink.count
+        store.commit()
 
-    # Parse car details asynchronously with progress bar
-    for f in tqdm(asyncio.as_completed(tasks), total=len(tasks), desc="Parsing car details"):
-        await f
+        if dead_letters is not None and dead_letters.count:
+            logger.warning(f"{dead_letters.count} failed pages/listings written to {options.dead_letter_path}")
+        if options.requeue_dead_letters and options.dead_letter_path:
+            # Every re-queued entry has been written out or dead-lettered again
+            release_dead_letters(options.dead_letter_path)
 
-    # Attach parsed details back to the car listing dictionaries
-    for i, item in enumerate(flat_results):
-        item["car_details"] = results[i]
+        # Only a complete pass over the search pages can tell that a listing is gone
+        # (a shard, dead-letter re-run or brand subset only sees part of the site)
+        complete: bool = False
+        if options.requeue_dead_letters or router is not None:
+            pass
+        elif store.unfinished_pages():
+            logger.warning("Some search pages failed; skipping removed-listing detection")
+        elif options.segment_brands:
+            logger.info("Crawl restricted to some brands; skipping removed-listing detection")
+        else:
+            complete = True
+        if index is not None and complete:
+            removed: List[Dict[str, Any]] = index.mark_removed(store.run_id())
+            if removed:
+                with NDJsonWriter(options.removed_path, append=True) as removed_sink:
+                    for marker in removed:
+                        removed_sink.write(marker)
+            logger.info(f"Marked {len(removed)} listings as removed (markers in {options.removed_path})")
 
-    # Save results to JSON file
-    with open("full_results.json", "w", encoding="utf-8") as f:
-        json.dump(flat_results, f, ensure_ascii=False, indent=2)
+        logger.info(f"Saved {saved} car details to {options.output_path}; progress: {store.stats()}")
+        print(f"Saved {saved} car details to {options.output_path}")
 
-    logger.info(f"Saved {len(flat_results)} car details to full_results.json")
-    print(f"Saved {len(flat_results)} car details to full_results.json")
+        if options.legacy_json_path:
+            ndjson_to_json_array(
+                options.output_path,
+                options.legacy_json_path,
+                options.compression,
+                unique_by="link" if append else None,
+            )
+            logger.info(f"Converted {options.output_path} to {options.legacy_json_path}")
+        return complete
+    finally:
+        if parse_pool is not None:
+            parse_pool.close()
+        store.close()
+        if index is not None:
+            index.close()
+        if dead_letters is not None:
+            dead_letters.close()
+        if cache is not None:
+            cache.evict()
+        set_html_cache(None)
+        set_rate_limiter(None)
+        set_retry_policy(None)
+        set_circuit_breaker(None)
+        await close_client()
+        if snapshot_writer is not None:
+            await snapshot_writer.stop()
+        if metrics_server is not None:
+            await metrics_server.stop()
@@ -0,0 +1,199 @@
+"""
+src/services/listing_mode.py — Listing-only crawls: records from search pages, details on demand.
+
+Author: Danil
+Created: 2026-10-17
+Description:
+    Every search page embeds a schema.org `AggregateOffer` with the price,
+    currency, name, image and seller of each car. For price monitoring that is
+    enough, and skipping the detail pages cuts requests by about 20x:
+    - `offer_details`: JSON-LD offer → `car_details` dict in the legacy layout
+      (title, price, image, seller; everything else None). Prices are rendered
+      exactly like the detail page's ("$ 16 300", "1 425 435 сом"), but three
+      shared fields carry the search page's values, not the detail page's:
+      `title` is the offer name ("Kia K5 III Седан", not "Kia K5, 2020"),
+      `image_links` holds the one 640x480 card thumbnail, and `user_name` is
+      the seller name of the card. Only the price in the offer's currency is
+      set; year, mileage and the other specs are None.
+    - `DetailSelector`: decides which listings still get their detail page
+      fetched, by a deterministic sample of listing IDs (the same listings on
+      every run) and / or a filter expression over the card data:
+
+          price_usd<15000;title~toyota|lexus;features=vip
+
+      Conditions are separated by ";" and must all hold. Operators:
+      <, <=, >, >=, =, != (numbers or text; "=" on features means "has") and
+      ~ (case-insensitive regex search). Fields: price, currency, price_usd,
+      price_kgs, title, seller, status, features.
+
+Usage:
+    from services.listing_mode import DetailSelector, offer_details
+    selector = DetailSelector(sample_rate=0.05, filter_expr="price_usd<10000")
+    if not selector(item):
+        item["car_details"] = offer_details(item["offer"])
+
+Dependencies:
+    - models: typed details rendered in the legacy layout
+    - utils.dedup for listing IDs
+"""
+
+import operator
+import re
+import zlib
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from models.car import CarDetails
+from models.legacy import details_to_legacy
+from utils.dedup import listing_id
+
+_CONDITION_RE = re.compile(r"^\s*(\w+)\s*(<=|>=|!=|<|>|=|~)\s*(.*?)\s*$")
+_NUMERIC_OPS: Dict[str, Callable[[Any, Any], bool]] = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "=": operator.eq,
+    "!=": operator.ne,
+}
+FILTER_FIELDS: Tuple[str, ...] = ("price", "currency", "price_usd", "price_kgs", "title", "seller", "status",
+                                  "features")
+_SAMPLE_BUCKETS: int = 1_000_000
+
+
+def offer_details(offer: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build a `car_details` dict from a JSON-LD offer.
+
+    Args:
+        offer (Dict[str, Any]): Offer from `utils.parse_listings.extract_offers`.
+
+    Returns:
+        Dict[str, Any]: Same keys and formats as `extract_car_details`; fields the
+        search page does not show are None (see the module docstring for the
+        fields whose values differ from the detail page's).
+    """
+    details = CarDetails(
+        title=offer.get("name"),
+        user_name=offer.get("seller"),
+        image_links=[offer["image"]] if offer.get("image") else [],
+    )
+    currency: str = (offer.get("currency") or "").upper()
+    if currency == "USD":
+        details.price_usd = offer.get("price")
+    elif currency in ("KGS", "SOM"):
+        details.price_kgs = offer.get("price")
+    return details_to_legacy(details)
+
+
+def _card_values(item: Dict[str, Any]) -> Dict[str, Any]:
+    offer: Dict[str, Any] = item.get("offer") or {}
+    currency: str = (offer.get("currency") or "").upper()
+    return {
+        "price": offer.get("price"),
+        "currency": currency or None,
+        "price_usd": offer.get("price") if currency == "USD" else None,
+        "price_kgs": offer.get("price") if currency in ("KGS", "SOM") else None,
+        "title": offer.get("name"),
+        "seller": offer.get("seller"),
+        "status": item.get("status"),
+        "features": item.get("features") or [],
+    }
+
+
+def _condition(field: str, op: str, value: str) -> Callable[[Dict[str, Any]], bool]:
+    if op == "~":
+        pattern = re.compile(value, re.I)
+
+        def matches(values: Dict[str, Any]) -> bool:
+            actual: Any = values[field]
+            if isinstance(actual, list):
+                return any(pattern.search(str(entry)) for entry in actual)
+            return actual is not None and pattern.search(str(actual)) is not None
+        return matches
+
+    compare: Callable[[Any, Any], bool] = _NUMERIC_OPS[op]
+    try:
+        expected: Any = float(value)
+    except ValueError:
+        expected = value
+
+    def holds(values: Dict[str, Any]) -> bool:
+        actual: Any = values[field]
+        if isinstance(actual, list):
+            found: bool = value in actual
+            return found if op == "=" else (not found if op == "!=" else False)
+        if actual is None:
+            return op == "!="
+        if isinstance(expected, float):
+            try:
+                return compare(float(actual), expected)
+            except (TypeError, ValueError):
+                return False
+        return compare(str(actual), expected)
+    return holds
+
+
+def parse_detail_filter(expr: str) -> Callable[[Dict[str, Any]], bool]:
+    """
+    Compile a filter expression over the card data of a search result.
+
+    Args:
+        expr (str): Conditions separated by ";" (see the module docstring).
+
+    Returns:
+        Callable[[Dict[str, Any]], bool]: Predicate on a link info dict (with 'offer').
+
+    Raises:
+        ValueError: On an unknown field or a malformed condition.
+    """
+    conditions: List[Callable[[Dict[str, Any]], bool]] = []
+    for part in filter(str.strip, expr.split(";")):
+        match = _CONDITION_RE.match(part)
+        if not match:
+            raise ValueError(f"Malformed detail filter condition: {part!r}")
+        field, op, value = match.groups()
+        if field not in FILTER_FIELDS:
+            raise ValueError(f"Unknown detail filter field {field!r}; choose from {FILTER_FIELDS}")
+        conditions.append(_condition(field, op, value))
+
+    def predicate(item: Dict[str, Any]) -> bool:
+        values: Dict[str, Any] = _card_values(item)
+        return all(condition(values) for condition in conditions)
+    return predicate
+
+
+class DetailSelector:
+    """
+    Chooses the listings whose detail page is fetched in a listing-only crawl.
+    """
+
+    def __init__(self, sample_rate: float = 0.0, filter_expr: Optional[str] = None) -> None:
+        """
+        Args:
+            sample_rate (float): Share of listings (0..1) fetched in full, picked by a hash of
+                the listing ID so that the same listings are sampled on every run.
+            filter_expr (Optional[str]): Also fetch listings matching this filter.
+        """
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError("Detail sample rate must be between 0 and 1")
+        self.sample_rate: float = sample_rate
+        self._threshold: int = round(sample_rate * _SAMPLE_BUCKETS)
+        self._filter: Optional[Callable[[Dict[str, Any]], bool]] = (
+            parse_detail_filter(filter_expr) if filter_expr else None)
+
+    def sampled(self, link: str) -> bool:
+        return zlib.crc32(listing_id(link).encode("utf-8")) % _SAMPLE_BUCKETS < self._threshold
+
+    def __call__(self, item: Dict[str, Any]) -> bool:
+        """
+        Whether to fetch the detail page of a listing.
+
+        Args:
+            item (Dict[str, Any]): Link info dict with its 'offer'.
+
+        Returns:
+            bool: True if sampled or matched by the filter.
+        """
+        if self._threshold and self.sampled(item["link"]):
+            return True
+        return self._filter is not None and self._filter(item)
@@ -0,0 +1,208 @@
+"""
+src/services/options.py — Runtime options for a crawl run.
+
+Author: Danil
+Created: 2026-10-17
+Description:
+    `CrawlOptions` collects the tunables of a single `main_crawl()` run. Defaults
+    come from `config.py`; `main.py` overrides them from command-line arguments.
+
+Usage:
+    from services.options import CrawlOptions
+    options = CrawlOptions(detail_concurrency=128)
+    await main_crawl(options)
+
+Dependencies:
+    - config: default values
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+from config import (
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_RESET_SECONDS,
+    CHANGE_DB_PATH,
+    CHANGE_EVENTS_PATH,
+    DEAD_LETTER_PATH,
+    DEDUP_BLOOM_CAPACITY,
+    DEDUP_BLOOM_ERROR_RATE,
+    DEFAULT_HOST_RATE,
+    DETAIL_CONCURRENCY,
+    DETAIL_FILTER,
+    DETAIL_SAMPLE_RATE,
+    EXPORT_FORMAT,
+    EXPORT_PARTITION_BY,
+    FETCH_ENGINE,
+    FSYNC_EVERY,
+    HOST_RATE_LIMITS,
+    HTML_CACHE_FRESH_SECONDS,
+    HTML_CACHE_MAX_AGE_DAYS,
+    HTML_CACHE_MAX_MB,
+    HTML_PARSER,
+    HTTP2_ENABLED,
+    LAZY_PAGINATION,
+    INCREMENTAL_TTL_HOURS,
+    LEGACY_JSON_PATH,
+    LISTING_INDEX_PATH,
+    METRICS_PORT,
+    METRICS_SNAPSHOT_INTERVAL,
+    LISTING_CONCURRENCY,
+    LISTING_ONLY,
+    REFERENCE_IDS,
+    REMOVED_LISTINGS_PATH,
+    OUTPUT_PATH,
+    PARSE_BATCH_SIZE,
+    PARSE_WORKERS,
+    RECORD_FORMAT,
+    RETRY_BACKOFF_BASE,
+    RETRY_BACKOFF_MAX,
+    RETRY_MAX_ATTEMPTS,
+    SCOPED_PARSING,
+    SEARCH_URL,
+    SEGMENTED_DISCOVERY,
+    SEGMENT_MAX_PAGES,
+    SHARD_BY,
+    SHARD_WORKERS,
+    SQLITE_DB_PATH,
+    STATE_DB_PATH,
+    WORK_QUEUE_URL,
+)
+
+RECORD_FORMATS: Tuple[str, ...] = ("legacy", "typed")
+
+
+@dataclass
+class CrawlOptions:
+    """
+    Tunables for a crawl run.
+
+    Attributes:
+        search_url (str): First search result page; its pagination defines the crawl.
+        lazy_pages (bool): Stream page URLs until a page has no listings instead of
+            trusting the page count read from page 1.
+        segmented (bool): Discover pages per brand / region / model segment instead of walking
+            the single `search_url` chain (see `services.segments`).
+        segment_max_pages (int): Split segments with more pages than this.
+        segment_brands (Optional[Tuple[str, ...]]): Only crawl these brand slugs (segmented mode).
+        listing_only (bool): Build records from the search pages' JSON-LD offers without
+            fetching detail pages (see `services.listing_mode`).
+        detail_sample_rate (float): Listing-only mode: still fetch details for this share (0..1)
+            of listings, picked deterministically by listing ID.
+        detail_filter (Optional[str]): Listing-only mode: also fetch details of listings matching
+            this filter, e.g. "price_usd<15000;title~toyota".
+        reference_ids (bool): Add the catalogue IDs of brand / model / region / town to every
+            record (see `models.reference`).
+        fetch_engine (str): Async HTTP engine ("aiohttp", "httpx", "requests").
+        http2 (bool): Enable HTTP/2 (httpx engine only).
+        parser (str): HTML parser backend for all extractors ("lxml" or "html.parser").
+        scoped_parse (bool): Build detail-page trees only for the blocks the extractors read.
+        listing_concurrency (int): Workers fetching search result pages.
+        detail_concurrency (int): Workers fetching and parsing car detail pages.
+        parse_workers (int): Parser processes; 0 parses on the event loop.
+        parse_batch_size (int): Pages per batch shipped to a parser process.
+        host_rates (Dict[str, float]): Requests/second per host.
+        default_rate (float): Requests/second for hosts not in `host_rates`.
+        retry_attempts (int): Attempts per request on timeouts / 5xx / 429 (1 = no retries).
+        retry_backoff_base (float): Upper bound of the first retry delay (full jitter), seconds.
+        retry_backoff_max (float): Upper bound of any retry delay, seconds.
+        breaker_threshold (int): Consecutive failures that pause a host (circuit breaker).
+        breaker_reset_seconds (float): How long an opened circuit pauses the host.
+        dead_letter_path (Optional[str]): NDJSON file of pages/listings that failed after
+            all retries; None to skip.
+        requeue_dead_letters (bool): Only re-fetch the entries of `dead_letter_path`.
+        dedup_bloom_capacity (int): Track seen listing IDs in a Bloom filter sized for this
+            many listings (bounded memory); 0 keeps an exact set.
+        dedup_error_rate (float): Bloom filter false-positive rate (a false positive skips a listing).
+        output_path (str): NDJSON file receiving each record as soon as it is parsed.
+        record_format (str): "legacy" (string values, as extracted) or "typed" (normalised
+            numbers, `models.CarListing.to_dict` layout).
+        compression (Optional[str]): "gzip", "zstd", "none" or None (infer from suffix).
+        export_format (Optional[str]): Also export the records as "csv", "parquet" or "arrow".
+        export_path (Optional[str]): Export file / directory; None derives it from `output_path`.
+        export_partition_by (Optional[str]): Partition Parquet / Arrow exports by "brand" or "crawl_date".
+        sqlite_path (Optional[str]): Upsert the records into this SQLite listing database
+            (see `storage.sqlite_store`); None to skip.
+        changes_since_hours (Optional[float]): Only report the database's changes of this many hours.
+        change_db_path (Optional[str]): Compare the records with the snapshots in this SQLite file
+            and emit change events (see `storage.change_tracker`); None to skip.
+        change_events_path (str): NDJSON file the change events are appended to.
+        fsync_every (int): Flush and fsync the output after this many records (0 = only on close).
+        legacy_json_path (Optional[str]): Also write the single-array JSON here at the end; None to skip.
+        state_path (str): SQLite checkpoint database recording page/detail progress.
+        resume (bool): Continue the previous run: skip completed work, retry failures.
+        incremental (bool): Only fetch details of new, upped, changed or stale listings.
+        index_path (str): SQLite index of known listings used by incremental mode.
+        ttl_hours (float): Refetch unchanged listings whose details are older than this.
+        removed_path (str): Incremental mode: NDJSON file a removal marker is appended to for
+            every listing missing from a complete run.
+        cache_dir (Optional[str]): On-disk HTML cache directory; None disables the cache.
+        cache_fresh_seconds (float): Serve cached pages younger than this without revalidation.
+        cache_max_age_days (float): Evict cache entries not refreshed for this long.
+        cache_max_mb (int): Evict least recently fetched entries above this cache size.
+        metrics_port (int): Serve Prometheus metrics on this port; 0 disables the endpoint.
+        metrics_path (Optional[str]): Periodically write a JSON metrics snapshot here; None to skip.
+        metrics_interval (float): Seconds between JSON snapshots.
+        workers (int): Worker processes/nodes of a sharded crawl (1 = not sharded).
+        worker_index (Optional[int]): Run only this worker of a sharded crawl (multi-node);
+            None runs all workers locally.
+        shard_by (str): Split the crawl by search "pages" ranges or by listing URL "hash".
+        queue_url (str): Work queue shared by the workers (sqlite:///file or redis://...).
+    """
+    search_url: str = SEARCH_URL
+    lazy_pages: bool = LAZY_PAGINATION
+    segmented: bool = SEGMENTED_DISCOVERY
+    segment_max_pages: int = SEGMENT_MAX_PAGES
+    segment_brands: Optional[Tuple[str, ...]] = None
+    listing_only: bool = LISTING_ONLY
+    detail_sample_rate: float = DETAIL_SAMPLE_RATE
+    detail_filter: Optional[str] = DETAIL_FILTER
+    reference_ids: bool = REFERENCE_IDS
+    fetch_engine: str = FETCH_ENGINE
+    http2: bool = HTTP2_ENABLED
+    parser: str = HTML_PARSER
+    scoped_parse: bool = SCOPED_PARSING
+    listing_concurrency: int = LISTING_CONCURRENCY
+    detail_concurrency: int = DETAIL_CONCURRENCY
+    parse_workers: int = PARSE_WORKERS
+    parse_batch_size: int = PARSE_BATCH_SIZE
+    host_rates: Dict[str, float] = field(default_factory=lambda: dict(HOST_RATE_LIMITS))
+    default_rate: float = DEFAULT_HOST_RATE
+    retry_attempts: int = RETRY_MAX_ATTEMPTS
+    retry_backoff_base: float = RETRY_BACKOFF_BASE
+    retry_backoff_max: float = RETRY_BACKOFF_MAX
+    breaker_threshold: int = BREAKER_FAILURE_THRESHOLD
+    breaker_reset_seconds: float = BREAKER_RESET_SECONDS
+    dead_letter_path: Optional[str] = DEAD_LETTER_PATH
+    requeue_dead_letters: bool = False
+    dedup_bloom_capacity: int = DEDUP_BLOOM_CAPACITY
+    dedup_error_rate: float = DEDUP_BLOOM_ERROR_RATE
+    output_path: str = OUTPUT_PATH
+    record_format: str = RECORD_FORMAT
+    compression: Optional[str] = None
+    fsync_every: int = FSYNC_EVERY
+    export_format: Optional[str] = EXPORT_FORMAT
+    export_path: Optional[str] = None
+    export_partition_by: Optional[str] = EXPORT_PARTITION_BY
+    sqlite_path: Optional[str] = SQLITE_DB_PATH
+    changes_since_hours: Optional[float] = None
+    change_db_path: Optional[str] = CHANGE_DB_PATH
+    change_events_path: str = CHANGE_EVENTS_PATH
+    legacy_json_path: Optional[str] = LEGACY_JSON_PATH
+    state_path: str = STATE_DB_PATH
+    resume: bool = False
+    incremental: bool = False
+    index_path: str = LISTING_INDEX_PATH
+    ttl_hours: float = INCREMENTAL_TTL_HOURS
+    removed_path: str = REMOVED_LISTINGS_PATH
+    cache_dir: Optional[str] = None
+    cache_fresh_seconds: float = HTML_CACHE_FRESH_SECONDS
+    cache_max_age_days: float = HTML_CACHE_MAX_AGE_DAYS
+    cache_max_mb: int = HTML_CACHE_MAX_MB
+    metrics_port: int = METRICS_PORT
+    metrics_path: Optional[str] = None
+    metrics_interval: float = METRICS_SNAPSHOT_INTERVAL
+    workers: int = SHARD_WORKERS
+    worker_index: Optional[int] = None
+    shard_by: str = SHARD_BY
+    queue_url: str = WORK_QUEUE_URL
@@ -0,0 +1,106 @@
+"""
+src/services/reparse.py — Offline re-parse of the on-disk HTML cache.
+
+Author: Danil
+Created: 2026-10-17
+Description:
+    Rebuilds crawl records from cached pages only, without any network access,
+    e.g. after an extractor in `utils/parse_details/` has changed:
+    - cached search pages are parsed first to recover each listing's `status`
+      and `features`
+    - every cached detail page is parsed with `extract_car_details`
+      (optionally in several processes), given the catalogue IDs of its
+      brand / model / location, and written to an NDJSON file
+
+Usage:
+    from services.reparse import reparse_cache
+    count = reparse_cache(HtmlCache(".html_cache"), "reparsed.ndjson", workers=4)
+
+Dependencies:
+    - utils.html_cache: cached page corpus
+    - utils.parse_listings / utils.parse_details: extractors
+    - storage.ndjson: output sink
+    - models.legacy: typed record layout
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional
+
+from config import logger
+from models.legacy import listing_from_legacy
+from models.reference import ReferenceIndex
+from storage.ndjson import NDJsonWriter
+from utils.html_cache import CacheEntry, HtmlCache
+from utils.parse_details import extract_car_details
+from utils.parse_details.parser import set_default_parser
+from utils.parse_listings import extract_links_from_html
+
+
+def _chunks(entries: Iterator[CacheEntry], size: int) -> Iterator[List[CacheEntry]]:
+    while True:
+        chunk: List[CacheEntry] = list(islice(entries, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def reparse_cache(
+    cache: HtmlCache,
+    output_path: str,
+    compression: Optional[str] = None,
+    parser: Optional[str] = None,
+    scoped: Optional[bool] = None,
+    workers: int = 0,
+    chunk_size: int = 256,
+    record_format: str = "legacy",
+    reference: Optional[ReferenceIndex] = None,
+) -> int:
+    """
+    Re-parse every cached detail page into an NDJSON file.
+
+    Args:
+        cache (HtmlCache): Cache holding previously fetched pages.
+        output_path (str): NDJSON output file.
+        compression (Optional[str]): Output compression; inferred from suffix if None.
+        parser (Optional[str]): HTML parser backend.
+        scoped (Optional[bool]): Parse only the blocks the extractors read; configured default if None.
+        workers (int): Parser processes; 0 parses in this process.
+        chunk_size (int): Pages loaded and parsed per step (bounds memory).
+        record_format (str): "legacy" string-valued records or "typed" (see `models`).
+        reference (Optional[ReferenceIndex]): Adds the catalogue IDs of brand / model / location.
+
+    Returns:
+        int: Number of records written.
+    """
+    set_default_parser(parser)
+
+    listings: Dict[str, Dict[str, Any]] = {}
+    for entry in cache.iter_entries("/search/"):
+        for item in extract_links_from_html(entry.body, page_url=entry.url):
+            listings.setdefault(item["link"], item)
+    logger.info(f"Reparse: {len(listings)} listings recovered from cached search pages")
+
+    parse = partial(extract_car_details, parser=parser, scoped=scoped)
+    executor: Optional[ProcessPoolExecutor] = ProcessPoolExecutor(workers) if workers > 0 else None
+    try:
+        with NDJsonWriter(output_path, compression) as sink:
+            for chunk in _chunks(cache.iter_entries("/details/"), chunk_size):
+                bodies: List[str] = [entry.body for entry in chunk]
+                parsed = executor.map(parse, bodies, chunksize=16) if executor else map(parse, bodies)
+                for entry, details in zip(chunk, parsed):
+                    record: Dict[str, Any] = dict(
+                        listings.get(entry.url) or {"link": entry.url, "status": None, "features": []}
+                    )
+                    if reference is not None and details:
+                        details.update(reference.resolve(details))
+                    record["car_details"] = details
+                    sink.write(record if record_format == "legacy" else listing_from_legacy(record).to_dict())
+            count: int = sink.count
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    logger.info(f"Reparse: wrote {count} records to {output_path}")
+    return count
@@ -0,0 +1,169 @@
+"""
+src/services/scheduler.py — Bounded-concurrency work queue for the crawl phases.
+
+Author: Danil
+Created: 2026-10-17
+Description:
+    `CrawlScheduler` runs an async handler over a stream of work items with a fixed
+    number of worker tasks pulling from a bounded `asyncio.Queue`. Results are
+    yielded as soon as they complete, so the number of in-flight requests is
+    always capped at `concurrency` regardless of how many items are queued.
+
+    `map()` accepts an async iterable as input, so the output of one scheduler
+    can be fed into another to build a streaming pipeline. Both the input and
+    the result queues are bounded, so a slow consumer stalls the workers (and
+    through them the input stream) instead of letting results pile up in
+    memory: at most `concurrency * 2` items wait on either side.
+
+    Failures are not swallowed: an exception raised by the input stream is
+    re-raised from `map()` once the items already queued have been handled, and
+    a handler failure is turned into a result by `on_error` when one is given
+    (e.g. a record marked as failed), otherwise logged and skipped.
+
+    Politeness (per-host rate limits and back-off) is applied underneath, in
+    `utils.fetch`, via `utils.rate_limit.HostRateLimiter`.
+
+    Queue depth and in-flight handlers are exported as the `stage`-labelled
+    `utils.metrics.QUEUE_DEPTH` / `IN_FLIGHT` gauges.
+
+Usage:
+    from services.scheduler import CrawlScheduler
+    scheduler = CrawlScheduler(concurrency=32, desc="Fetching car links")
+    async for result in scheduler.map(urls, fetch_and_extract_links):
+        ...
+
+Dependencies:
+    - asyncio
+    - tqdm (progress bar)
+    - config.logger for logging
+"""
+
+import asyncio
+from typing import AsyncIterable, AsyncIterator, Awaitable, Callable, Iterable, List, Optional, TypeVar, Union
+
+from tqdm import tqdm
+
+from config import logger
+from utils.metrics import IN_FLIGHT, QUEUE_DEPTH
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_DONE = object()
+_FAILED = object()
+_FINISHED = object()
+
+
+class CrawlScheduler:
+    """
+    Work queue + N workers applying a coroutine handler to each item.
+    """
+
+    def __init__(self, concurrency: int, desc: Optional[str] = None, position: Optional[int] = None,
+                 name: str = "default") -> None:
+        """
+        Args:
+            concurrency (int): Number of worker tasks (max in-flight handlers).
+            desc (Optional[str]): Progress bar label; no progress bar if None.
+            position (Optional[int]): Progress bar line, for stages running side by side.
+            name (str): Stage label of the queue metrics.
+        """
+        self.concurrency: int = max(1, concurrency)
+        self.desc: Optional[str] = desc
+        self.position: Optional[int] = position
+        self.name: str = name
+
+    async def map(
+        self,
+        items: Union[Iterable[T], AsyncIterable[T]],
+        handler: Callable[[T], Awaitable[R]],
+        total: Optional[int] = None,
+        on_error: Optional[Callable[[T, Exception], R]] = None,
+    ) -> AsyncIterator[R]:
+        """
+        Apply `handler` to every item with bounded concurrency, yielding results
+        in completion order.
+
+        Args:
+            items (Union[Iterable[T], AsyncIterable[T]]): Work items; may be produced lazily.
+            handler (Callable[[T], Awaitable[R]]): Coroutine function run for each item.
+            total (Optional[int]): Expected number of items for the progress bar.
+            on_error (Optional[Callable[[T, Exception], R]]): Result yielded for an item
+                whose handler raised; such items are logged and skipped if None.
+
+        Yields:
+            R: Handler results as they complete.
+
+        Raises:
+            Exception: Whatever the input stream raised, after the items it had
+                produced before have been handled.
+        """
+        if total is None and hasattr(items, "__len__"):
+            total = len(items)
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        results: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        input_error: List[BaseException] = []
+
+        async def feeder() -> None:
+            try:
+                if hasattr(items, "__aiter__"):
+                    async for item in items:
+                        await queue.put(item)
+                        QUEUE_DEPTH.set(queue.qsize(), stage=self.name)
+                else:
+                    for item in items:
+                        await queue.put(item)
+                        QUEUE_DEPTH.set(queue.qsize(), stage=self.name)
+            except Exception as e:
+                logger.error(f"Scheduler input stream failed: {e!r}")
+                input_error.append(e)
+            # Not in a `finally`: when cancelled (consumer gone), the workers are cancelled too and
+            # nobody would drain the full queue
+            for _ in range(self.concurrency):
+                await queue.put(_DONE)
+
+        async def worker() -> None:
+            while True:
+                item = await queue.get()
+                if item is _DONE:
+                    break
+                QUEUE_DEPTH.set(queue.qsize(), stage=self.name)
+                IN_FLIGHT.inc(stage=self.name)
+                try:
+                    result = await handler(item)
+                except Exception as e:
+                    logger.warning(f"Scheduler handler failed for {item!r}: {e!r}")
+                    result = _FAILED if on_error is None else on_error(item, e)
+                finally:
+                    IN_FLIGHT.dec(stage=self.name)
+                await results.put(result)
+
+        async def supervisor(tasks: List[asyncio.Task]) -> None:
+            await asyncio.gather(*tasks, return_exceptions=True)
+            QUEUE_DEPTH.set(0, stage=self.name)
+            await results.put(_FINISHED)
+
+        tasks: List[asyncio.Task] = [asyncio.create_task(feeder())]
+        tasks += [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+        supervisor_task: asyncio.Task = asyncio.create_task(supervisor(tasks))
+
+        progress: Optional[tqdm] = tqdm(total=total, desc=self.desc, position=self.position) if self.desc else None
+        try:
+            while True:
+                result = await results.get()
+                if result is _FINISHED:
+                    break
+                if progress is not None:
+                    progress.update(1)
+                if result is _FAILED:
+                    continue
+                yield result
+            if input_error:
+                raise input_error[0]
+        finally:
+            for task in tasks:
+                task.cancel()
+            supervisor_task.cancel()
+            if progress is not None:
+                progress.close()
@@ -0,0 +1,247 @@
+"""
+src/services/segments.py — Segmented discovery: many short pagination chains instead of one deep one.
+
+Author: Danil
+Created: 2026-10-17
+Description:
+    `/search/all/?page=N` is a single chain of thousands of pages that shifts
+    while it is being crawled. The reference catalogues
+    (`data/reference_data/brands_and_models.json`, `regions_and_towns.json`)
+    allow splitting the search into independent segments instead:
+    - `Segment`: a brand, optionally narrowed to one model and / or region,
+      rendered as `/search/<brand>/<model|all>/?region=<id>&page=1`
+    - `load_catalogue`: brand → model slugs, popular brands and region IDs
+    - `initial_segments`: one segment per brand; popular (big) brands start
+      split by region
+    - `plan_segments`: fetches page 1 of every segment concurrently and splits
+      any segment with more than `max_pages` pages (brand → brand×region →
+      brand×model×region) until every chain is short enough, then returns the
+      page URLs of all segments plus the page-1 HTML it already fetched
+    - `discover_search_pages`: the page list of a crawl, segmented or the
+      single `search_url` chain, depending on the options
+
+    All segment pages go through the normal listing stage, which fetches them
+    in parallel; listings appearing in several segments are merged by the
+    listing-ID deduplication. Listings of brands missing from the catalogue
+    are not reached by a segmented crawl.
+
+Usage:
+    from services.segments import load_catalogue, plan_segments
+    catalogue = load_catalogue(BRANDS_PATH, REGIONS_PATH)
+    page_links, first_pages = await plan_segments(SEARCH_URL, catalogue, max_pages=50)
+
+Dependencies:
+    - utils.fetch for the page-1 requests
+    - utils.pagination for page counts and page URLs
+"""
+
+import asyncio
+import json
+from dataclasses import dataclass, field, replace
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit, urlunsplit
+
+from utils.fetch import fetch_html_async
+from utils.pagination import discover_page_links, find_total_pages, with_page
+from config import BRANDS_CATALOGUE_PATH, REGIONS_CATALOGUE_PATH, logger
+
+
+@dataclass(frozen=True)
+class Segment:
+    """
+    One independently paginated slice of the search.
+
+    Attributes:
+        brand (str): Brand slug ("toyota").
+        model (Optional[str]): Model slug ("camry"); None for all models.
+        region (Optional[int]): Region ID; None for all regions.
+    """
+    brand: str
+    model: Optional[str] = None
+    region: Optional[int] = None
+
+    def url(self, search_url: str) -> str:
+        """
+        Page 1 of the segment on the host of `search_url`.
+
+        Args:
+            search_url (str): Any search URL of the site (scheme and host are reused).
+
+        Returns:
+            str: e.g. "https://m.mashina.kg/search/toyota/all/?region=1&page=1".
+        """
+        parts = urlsplit(search_url)
+        query: Dict[str, object] = {}
+        if self.region is not None:
+            query["region"] = self.region
+        query["page"] = 1
+        return urlunsplit((parts.scheme, parts.netloc, f"/search/{self.brand}/{self.model or 'all'}/",
+                           urlencode(query), ""))
+
+    def __str__(self) -> str:
+        label: str = self.brand if self.model is None else f"{self.brand}/{self.model}"
+        return label if self.region is None else f"{label}@{self.region}"
+
+
+@dataclass
+class Catalogue:
+    """
+    Reference data used to build segments.
+
+    Attributes:
+        models (Dict[str, List[str]]): Model slugs by brand slug.
+        popular (FrozenSet[str]): Brand slugs marked popular (split by region upfront).
+        regions (List[int]): Region IDs.
+    """
+    models: Dict[str, List[str]]
+    popular: FrozenSet[str] = frozenset()
+    regions: List[int] = field(default_factory=list)
+
+
+def load_catalogue(brands_path: str, regions_path: Optional[str] = None,
+                   only_brands: Optional[Iterable[str]] = None) -> Catalogue:
+    """
+    Load brands, models and regions from the reference JSON files.
+
+    Args:
+        brands_path (str): `brands_and_models.json`.
+        regions_path (Optional[str]): `regions_and_towns.json`; None disables region splits.
+        only_brands (Optional[Iterable[str]]): Restrict the catalogue to these brand slugs.
+
+    Returns:
+        Catalogue: The catalogue.
+
+    Raises:
+        ValueError: If `only_brands` names a brand missing from the catalogue.
+    """
+    with open(brands_path, encoding="utf-8") as f:
+        brands: List[dict] = json.load(f)
+    models: Dict[str, List[str]] = {brand["slug"]: [model["slug"] for model in brand.get("models") or []]
+                                    for brand in brands}
+    popular: FrozenSet[str] = frozenset(brand["slug"] for brand in brands if brand.get("is_popular"))
+    if only_brands is not None:
+        wanted: List[str] = list(only_brands)
+        unknown: List[str] = [slug for slug in wanted if slug not in models]
+        if unknown:
+            raise ValueError(f"Unknown brand slugs: {', '.join(unknown)}")
+        models = {slug: models[slug] for slug in wanted}
+    regions: List[int] = []
+    if regions_path:
+        with open(regions_path, encoding="utf-8") as f:
+            regions = [region["id"] for region in json.load(f)]
+    return Catalogue(models, popular, regions)
+
+
+def initial_segments(catalogue: Catalogue) -> List[Segment]:
+    """
+    Starting segments: one per brand, popular brands already split by region.
+
+    Args:
+        catalogue (Catalogue): Reference data.
+
+    Returns:
+        List[Segment]: Segments to probe.
+    """
+    segments: List[Segment] = []
+    for brand in catalogue.models:
+        if brand in catalogue.popular and catalogue.regions:
+            segments.extend(Segment(brand, region=region) for region in catalogue.regions)
+        else:
+            segments.append(Segment(brand))
+    return segments
+
+
+def split_segment(segment: Segment, catalogue: Catalogue) -> List[Segment]:
+    """
+    Narrower segments covering the same listings.
+
+    Args:
+        segment (Segment): Segment with too many pages.
+        catalogue (Catalogue): Reference data.
+
+    Returns:
+        List[Segment]: Brand → per region, (brand, region) → per model; empty if the
+        segment cannot be split further.
+    """
+    if segment.model is None and segment.region is None and catalogue.regions:
+        return [replace(segment, region=region) for region in catalogue.regions]
+    if segment.model is None:
+        return [replace(segment, model=model) for model in catalogue.models.get(segment.brand, [])]
+    return []
+
+
+async def _probe(segment: Segment, search_url: str, semaphore: asyncio.Semaphore) -> Tuple[Segment, Optional[str]]:
+    async with semaphore:
+        return segment, await fetch_html_async(segment.url(search_url))
+
+
+async def plan_segments(
+    search_url: str,
+    catalogue: Catalogue,
+    max_pages: int,
+    concurrency: int = 16,
+) -> Tuple[List[str], Dict[str, str]]:
+    """
+    Probe the segments and split the big ones until every chain has at most `max_pages` pages.
+
+    Args:
+        search_url (str): Any search URL of the site (scheme and host are reused).
+        catalogue (Catalogue): Reference data.
+        max_pages (int): Page threshold above which a segment is split.
+        concurrency (int): Page-1 requests in flight.
+
+    Returns:
+        Tuple[List[str], Dict[str, str]]: URLs of every page of every final segment
+        (page 1 of each segment first), and the page-1 HTML already fetched, by URL.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    pending: List[Segment] = initial_segments(catalogue)
+    page_links: List[str] = []
+    first_pages: Dict[str, str] = {}
+    probed: int = 0
+    segments: int = 0
+    while pending:
+        probed += len(pending)
+        results = await asyncio.gather(*(_probe(segment, search_url, semaphore) for segment in pending))
+        pending = []
+        for segment, html in results:
+            first_url: str = segment.url(search_url)
+            if not html:
+                # Left to the listing stage, which retries it and records a dead letter if it keeps failing
+                logger.warning(f"Could not probe segment {segment}; crawling its first page only")
+                page_links.append(first_url)
+                segments += 1
+                continue
+            total: int = find_total_pages(html) or 1
+            if total > max_pages:
+                children: List[Segment] = split_segment(segment, catalogue)
+                if children:
+                    logger.info(f"Segment {segment} has {total} pages; splitting into {len(children)}")
+                    pending.extend(children)
+                    continue
+                logger.warning(f"Segment {segment} has {total} pages and cannot be split further")
+            first_pages[first_url] = html
+            page_links.extend(with_page(first_url, page) for page in range(1, total + 1))
+            segments += 1
+    logger.info(f"Segmented discovery: {segments} segments, {len(page_links)} pages "
+                f"({probed} segment pages probed)")
+    return page_links, first_pages
+
+
+async def discover_search_pages(options) -> Tuple[List[str], Dict[str, str]]:
+    """
+    Build the search pages of a crawl (needs an open fetch client).
+
+    Args:
+        options (CrawlOptions): Search URL and segmentation settings.
+
+    Returns:
+        Tuple[List[str], Dict[str, str]]: Page URLs, and the HTML of the pages that were
+        already fetched to discover them (by URL).
+    """
+    if not options.segmented:
+        page_links, first_html = await discover_page_links(options.search_url)
+        return page_links, {page_links[0]: first_html}
+    catalogue: Catalogue = load_catalogue(BRANDS_CATALOGUE_PATH, REGIONS_CATALOGUE_PATH, options.segment_brands)
+    return await plan_segments(options.search_url, catalogue, options.segment_max_pages,
+                               options.listing_concurrency)
@@ -0,0 +1,191 @@
+"""
+src/services/sharded_crawl.py — Run a crawl as several `main_crawl` workers sharing a queue.
+
+Author: Danil
+Created: 2026-10-17
+Description:
+    Entry points of a sharded crawl (see `services.sharding` for how the work
+    is split):
+    - `worker_options`: per-worker copy of the run options — own output shard,
+      checkpoint, dead-letter and metrics files, and an equal share of the
+      per-host request rates (the configured rates stay the crawl's total)
+    - `run_worker`: one worker, e.g. on its own node against a shared queue
+    - `prepare_sharded_crawl` / `merge_sharded_output`: coordinator steps
+      before and after the workers
+    - `run_sharded`: all of the above on one machine, one process per worker
+    - `sharded_crawl_complete`: whether every page task ended done (removal
+      detection of the change tracker depends on it)
+
+Usage:
+    from services.sharded_crawl import run_sharded
+    run_sharded(CrawlOptions(workers=4, shard_by="hash"))
+
+    Multi-node (shared SQLite file or Redis queue):
+        python main.py --workers 4 --queue redis://queue-host/0 --prepare-queue
+        python main.py --workers 4 --queue redis://queue-host/0 --worker-index 2   # on every node
+        python main.py --workers 4 --merge-shards                                 # shards copied back
+
+Dependencies:
+    - multiprocessing (standard library)
+    - services.crawl_service.main_crawl, services.sharding, storage.work_queue
+"""
+
+import asyncio
+import multiprocessing
+from dataclasses import replace
+from typing import List, Optional
+
+from config import logger
+from services.crawl_service import main_crawl
+from services.options import CrawlOptions
+from services.sharding import ShardRouter, merge_shards, prepare_queue, shard_path
+from storage.ndjson import ndjson_to_json_array
+from storage.work_queue import DONE, open_work_queue
+
+
+def _check_options(options: CrawlOptions) -> None:
+    if options.workers < 2:
+        raise ValueError("A sharded crawl needs at least 2 workers")
+    if options.incremental or options.requeue_dead_letters:
+        raise ValueError("--incremental and --requeue-dead-letters are not supported for sharded crawls")
+    if options.lazy_pages:
+        logger.warning("Sharded crawls queue the page count read from page 1; --lazy-pages is ignored")
+
+
+def worker_options(options: CrawlOptions, index: int) -> CrawlOptions:
+    """
+    Derive the options of one worker.
+
+    Args:
+        options (CrawlOptions): Options of the whole crawl.
+        index (int): Worker index.
+
+    Returns:
+        CrawlOptions: Options with per-worker file names, metrics port and rates.
+    """
+    return replace(
+        options,
+        worker_index=index,
+        host_rates={host: rate / options.workers for host, rate in options.host_rates.items()},
+        default_rate=options.default_rate / options.workers,
+        output_path=shard_path(options.output_path, index),
+        legacy_json_path=None,
+        state_path=shard_path(options.state_path, index),
+        dead_letter_path=shard_path(options.dead_letter_path, index),
+        metrics_port=options.metrics_port + index if options.metrics_port else 0,
+        metrics_path=shard_path(options.metrics_path, index),
+    )
+
+
+async def run_worker(options: CrawlOptions, index: int) -> None:
+    """
+    Run one worker of a sharded crawl until its share of the queue is done.
+
+    Args:
+        options (CrawlOptions): Options of the whole crawl.
+        index (int): Worker index in [0, options.workers).
+
+    Returns:
+        None
+    """
+    _check_options(options)
+    queue = open_work_queue(options.queue_url)
+    try:
+        router = ShardRouter(queue, index, options.workers, options.shard_by)
+        await main_crawl(worker_options(options, index), router=router)
+        if router.handed_over:
+            logger.info(f"{router.owner} handed {router.handed_over} listings over to other workers")
+    finally:
+        queue.close()
+
+
+def _worker_main(options: CrawlOptions, index: int) -> None:
+    asyncio.run(run_worker(options, index))
+
+
+def prepare_sharded_crawl(options: CrawlOptions) -> int:
+    """
+    Fill the shared queue with the crawl's search pages (or, with `resume`,
+    release the leases of the interrupted run).
+
+    Args:
+        options (CrawlOptions): Options of the whole crawl.
+
+    Returns:
+        int: Number of pages queued.
+    """
+    _check_options(options)
+    queue = open_work_queue(options.queue_url)
+    try:
+        return asyncio.run(prepare_queue(options, queue, options.workers, options.shard_by, options.resume))
+    finally:
+        queue.close()
+
+
+def merge_sharded_output(options: CrawlOptions) -> int:
+    """
+    Merge the workers' output shards into `options.output_path` (and the legacy JSON).
+
+    Args:
+        options (CrawlOptions): Options of the whole crawl.
+
+    Returns:
+        int: Number of unique listings written.
+    """
+    shards: List[str] = [shard_path(options.output_path, index) for index in range(options.workers)]
+    count: int = merge_shards(shards, options.output_path, options.compression)
+    if options.legacy_json_path:
+        ndjson_to_json_array(options.output_path, options.legacy_json_path, options.compression)
+    print(f"Merged {count} car details from {options.workers} shards into {options.output_path}")
+    return count
+
+
+def sharded_crawl_complete(options: CrawlOptions) -> bool:
+    """
+    Check whether a sharded crawl fetched every one of its search pages, i.e.
+    whether listings missing from its merged output can be treated as removed.
+
+    Args:
+        options (CrawlOptions): Options of the whole crawl.
+
+    Returns:
+        bool: True if every page task is done and the crawl was not limited to some brands.
+    """
+    if options.segment_brands:
+        return False
+    queue = open_work_queue(options.queue_url)
+    try:
+        pages = queue.stats().get("page", {})
+    finally:
+        queue.close()
+    return bool(pages) and set(pages) == {DONE}
+
+
+def run_sharded(options: CrawlOptions) -> int:
+    """
+    Run a whole sharded crawl on this machine: prepare the queue, start one
+    process per worker, wait for all of them and merge their output.
+
+    Args:
+        options (CrawlOptions): Options of the whole crawl (`workers` >= 2).
+
+    Returns:
+        int: Number of unique listings in the merged output.
+    """
+    prepare_sharded_crawl(options)
+    context = multiprocessing.get_context("spawn")
+    processes: List[multiprocessing.Process] = [
+        context.Process(target=_worker_main, args=(options, index), name=f"crawl-worker-{index}")
+        for index in range(options.workers)
+    ]
+    for process in processes:
+        process.start()
+    failed: List[Optional[int]] = []
+    for process in processes:
+        process.join()
+        if process.exitcode != 0:
+            failed.append(process.exitcode)
+    if failed:
+        logger.error(f"{len(failed)} crawl workers failed (exit codes {failed}); "
+                     f"rerun with --resume to finish their share")
+    return merge_sharded_output(options)
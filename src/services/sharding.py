@@ -0,0 +1,366 @@
+"""
+src/services/sharding.py — Split one crawl across several workers and merge their output.
+
+Author: Danil
+Created: 2026-10-17
+Description:
+    A sharded crawl runs N copies of `main_crawl` (processes on one machine or
+    on several nodes) that share a work queue (`storage.work_queue`):
+    - `prepare_queue`: the coordinator discovers the search pages (page count
+      from page 1, or per segment with `segmented`) and enqueues every one,
+      either as contiguous page ranges per worker (`shard_by="pages"`) or
+      unassigned (`shard_by="hash"`)
+    - `ShardRouter`: plugged into `main_crawl`; claims the worker's search pages
+      from the queue and, in hash mode, hands every discovered listing whose
+      listing-ID hash belongs to another worker over to that worker through
+      the queue, while pulling the listings addressed to itself
+    - `shard_path`: per-worker file names (`full_results.shard-2.ndjson`), so
+      every worker writes its own output, checkpoint and dead-letter files
+    - `merge_shards`: combines the output shards into one NDJSON file,
+      deduplicating by listing ID (a record with details beats one without)
+
+    In "pages" mode a worker fetches the details of everything on its own
+    pages, so listings that move between page ranges during the crawl can be
+    fetched twice (the merge removes them). In "hash" mode every listing is
+    fetched by exactly one worker, at the cost of queue traffic for the
+    listings found on other workers' pages.
+
+    A worker only stops claiming pages when none of the pages it may take is
+    pending or leased. If a worker dies, its page leases expire after the
+    queue's `lease_seconds` and the surviving workers fetch those pages (hash
+    mode; in pages mode its range waits for `--resume`). Failed page and
+    handed-over detail tasks are retried by the queue up to its `max_attempts`.
+
+Usage:
+    from services.sharding import ShardRouter, merge_shards, prepare_queue
+    await prepare_queue(options, queue, workers=4, shard_by="hash")
+    await main_crawl(worker_options, router=ShardRouter(queue, index, 4, "hash"))
+    merge_shards([shard_path(options.output_path, i) for i in range(4)], options.output_path)
+
+Dependencies:
+    - storage.work_queue: shared task queue
+    - storage.ndjson: shard reader / merged writer
+    - utils.pagination: page discovery
+"""
+
+import asyncio
+import os
+import zlib
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Set, Tuple
+
+from config import logger
+from storage.ndjson import NDJsonWriter, iter_ndjson
+from storage.state_store import CrawlStateStore
+from storage.work_queue import Task
+from utils.dedup import ListingDeduplicator, listing_id
+from utils.fetch import close_client, open_client
+from services.segments import discover_search_pages
+
+SHARD_MODES: Tuple[str, ...] = ("pages", "hash")
+
+_END = object()
+
+
+def shard_of(key: str, count: int) -> int:
+    """
+    Stable shard number of a listing (the same in every process and run).
+
+    Args:
+        key (str): Listing ID (or URL).
+        count (int): Number of shards.
+
+    Returns:
+        int: Shard in [0, count).
+    """
+    return zlib.crc32(key.encode("utf-8")) % count
+
+
+def shard_path(path: Optional[str], index: int) -> Optional[str]:
+    """
+    Per-worker variant of a file name: the shard tag goes before the extensions.
+
+    Args:
+        path (Optional[str]): e.g. "out/full_results.ndjson.gz".
+        index (int): Worker index.
+
+    Returns:
+        Optional[str]: e.g. "out/full_results.shard-2.ndjson.gz" (None stays None).
+    """
+    if not path:
+        return path
+    folder, name = os.path.split(path)
+    stem, dot, extensions = name.partition(".")
+    return os.path.join(folder, f"{stem}.shard-{index}{dot}{extensions}")
+
+
+def page_shards(page_links: Sequence[str], count: int) -> List[int]:
+    """
+    Assign search pages to workers as contiguous, equally sized page ranges.
+
+    Args:
+        page_links (Sequence[str]): Page URLs in page order.
+        count (int): Number of workers.
+
+    Returns:
+        List[int]: Worker index of each page.
+    """
+    total: int = len(page_links)
+    return [position * count // total for position in range(total)]
+
+
+async def prepare_queue(options, queue, workers: int, shard_by: str = "pages", resume: bool = False) -> int:
+    """
+    Enqueue all search pages of the crawl for the workers.
+
+    Args:
+        options (CrawlOptions): Run tunables (search URL, fetch engine).
+        queue: Work queue (`storage.work_queue`).
+        workers (int): Number of workers.
+        shard_by (str): "pages" (page ranges per worker) or "hash" (pages claimed
+            by any worker, listings routed by listing-ID hash).
+        resume (bool): Keep the queue of the previous run, only releasing leases.
+
+    Returns:
+        int: Number of pages queued.
+    """
+    if shard_by not in SHARD_MODES:
+        raise ValueError(f"Unknown shard mode: {shard_by}")
+    if resume:
+        released: int = queue.release_leases()
+        retried: int = queue.retry_failed()
+        logger.info(f"Resuming sharded crawl: released {released} leased and {retried} failed tasks, "
+                    f"queue {queue.stats()}")
+        return 0
+
+    queue.reset()
+    await open_client(engine=options.fetch_engine, http2=options.http2)
+    try:
+        page_links, _ = await discover_search_pages(options)
+    finally:
+        await close_client()
+    shards: List[Optional[int]] = (page_shards(page_links, workers) if shard_by == "pages"
+                                   else [None] * len(page_links))
+    added: int = queue.put_many("page", ((url, {}, shard) for url, shard in zip(page_links, shards)))
+    logger.info(f"Queued {added} search pages for {workers} workers (shard_by={shard_by})")
+    return added
+
+
+async def merge_streams(*streams: AsyncIterator[Any]) -> AsyncIterator[Any]:
+    """
+    Interleave several async iterators, yielding items as they become available.
+
+    Args:
+        *streams (AsyncIterator[Any]): Input streams.
+
+    Yields:
+        Any: Items of all streams.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+
+    async def pump(stream: AsyncIterator[Any]) -> None:
+        try:
+            async for item in stream:
+                await queue.put(item)
+        finally:
+            await queue.put(_END)
+
+    tasks: List[asyncio.Task] = [asyncio.create_task(pump(stream)) for stream in streams]
+    remaining: int = len(tasks)
+    try:
+        while remaining:
+            item = await queue.get()
+            if item is _END:
+                remaining -= 1
+                continue
+            yield item
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+class ShardRouter:
+    """
+    One worker's view of the shared work queue, consumed by `main_crawl`.
+    """
+
+    def __init__(
+        self,
+        queue,
+        worker_index: int,
+        worker_count: int,
+        shard_by: str = "pages",
+        claim_batch: int = 4,
+        poll_interval: float = 0.5,
+    ) -> None:
+        """
+        Args:
+            queue: Work queue (`storage.work_queue`).
+            worker_index (int): This worker's shard number.
+            worker_count (int): Total number of workers.
+            shard_by (str): "pages" or "hash" (see module docstring).
+            claim_batch (int): Tasks leased per queue round trip.
+            poll_interval (float): Seconds between polls while waiting for other workers.
+        """
+        if shard_by not in SHARD_MODES:
+            raise ValueError(f"Unknown shard mode: {shard_by}")
+        self.queue = queue
+        self.worker_index: int = worker_index
+        self.worker_count: int = worker_count
+        self.shard_by: str = shard_by
+        self.claim_batch: int = claim_batch
+        self.poll_interval: float = poll_interval
+        self.owner: str = f"worker-{worker_index}"
+        self._page_tasks: Dict[str, Any] = {}
+        self._detail_tasks: Dict[str, Any] = {}
+        # Handed-over listings this worker failed: a reclaimed task is fetched again
+        self._failed_details: Set[str] = set()
+        self.handed_over: int = 0
+
+    async def pages(self, store: CrawlStateStore) -> AsyncIterator[str]:
+        """
+        Claim this worker's search pages until none are left. While pages it may
+        take are still leased by other workers, it keeps polling, so the pages of
+        a worker that died are taken over once their leases expire (and failed
+        pages are retried).
+
+        Args:
+            store (CrawlStateStore): The worker's checkpoint store (claimed pages are registered there).
+
+        Yields:
+            str: Search page URL.
+        """
+        shard: Optional[int] = self.worker_index if self.shard_by == "pages" else None
+        while True:
+            tasks: List[Task] = self.queue.claim("page", self.owner, shard=shard, limit=self.claim_batch)
+            if not tasks:
+                if self.queue.outstanding("page", shard) == 0:
+                    return
+                await asyncio.sleep(self.poll_interval)
+                continue
+            store.add_pages(task.key for task in tasks)
+            for task in tasks:
+                self._page_tasks[task.key] = task.id
+                yield task.key
+            await asyncio.sleep(0)
+
+    def page_done(self, url: str, ok: bool) -> None:
+        task_id: Any = self._page_tasks.pop(url, None)
+        if task_id is not None:
+            self.queue.ack([task_id], ok)
+
+    def route(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Keep the listings this worker is responsible for and queue the others
+        for their owners (hash mode only).
+
+        Args:
+            batch (List[Dict[str, Any]]): Link info dictionaries from one search page.
+
+        Returns:
+            List[Dict[str, Any]]: The listings to fetch here.
+        """
+        if self.shard_by != "hash":
+            return batch
+        own: List[Dict[str, Any]] = []
+        foreign: List[Tuple[str, Dict[str, Any], int]] = []
+        for item in batch:
+            shard: int = shard_of(listing_id(item["link"]), self.worker_count)
+            if shard == self.worker_index:
+                own.append(item)
+            else:
+                foreign.append((item["link"], item, shard))
+        if foreign:
+            self.handed_over += self.queue.put_many("detail", foreign)
+        return own
+
+    async def details(
+        self,
+        store: CrawlStateStore,
+        dedup: Optional[ListingDeduplicator] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Pull the listings other workers found for this shard (hash mode), until
+        every search page is finished and nothing is left for this shard.
+
+        Args:
+            store (CrawlStateStore): The worker's checkpoint store (deduplicates against own finds).
+            dedup (Optional[ListingDeduplicator]): The worker's listing-ID deduplicator.
+
+        Yields:
+            Dict[str, Any]: Link info dictionaries.
+        """
+        if self.shard_by != "hash":
+            return
+        pages_finished: bool = False
+        while True:
+            tasks: List[Task] = self.queue.claim("detail", self.owner, shard=self.worker_index,
+                                                 limit=self.claim_batch)
+            for task in tasks:
+                if task.key in self._failed_details:
+                    # A retry of a listing this worker failed: already known to dedup and the store
+                    self._failed_details.discard(task.key)
+                    self._detail_tasks[task.key] = task.id
+                    yield task.payload
+                elif dedup is not None and not dedup.admit(task.payload):
+                    self.queue.ack([task.id])
+                elif store.add_detail(task.payload):
+                    self._detail_tasks[task.key] = task.id
+                    yield task.payload
+                else:
+                    self.queue.ack([task.id])
+                    if dedup is not None:
+                        dedup.release(task.key)
+            if tasks:
+                continue
+            if pages_finished:
+                return
+            # Pages still being fetched anywhere can produce more listings for this shard;
+            # once none are left, one more claim picks up whatever was queued meanwhile
+            if self.queue.outstanding("page") == 0:
+                pages_finished = True
+                continue
+            await asyncio.sleep(self.poll_interval)
+
+    def detail_done(self, url: str, ok: bool) -> None:
+        task_id: Any = self._detail_tasks.pop(url, None)
+        if task_id is not None:
+            if not ok:
+                self._failed_details.add(url)
+            self.queue.ack([task_id], ok)
+
+
+def merge_shards(shard_paths: Sequence[str], dst: str, compression: Optional[str] = None) -> int:
+    """
+    Merge worker output shards into one NDJSON file, one record per listing ID.
+
+    The first pass picks, per listing, the last record with details (or the last
+    one if none has details); the second pass writes the picked records in
+    shard order. Memory use is one entry per distinct listing.
+
+    Args:
+        shard_paths (Sequence[str]): Shard NDJSON files (missing files are skipped).
+        dst (str): Merged NDJSON output.
+        compression (Optional[str]): Compression of shards and output; inferred from suffix if None.
+
+    Returns:
+        int: Number of records written.
+    """
+    paths: List[str] = [path for path in shard_paths if os.path.exists(path)]
+    best: Dict[str, Tuple[int, int, bool]] = {}
+    for shard, path in enumerate(paths):
+        for position, record in enumerate(iter_ndjson(path, compression)):
+            has_details: bool = bool(record.get("car_details"))
+            key: str = listing_id(record.get("link") or "")
+            current: Optional[Tuple[int, int, bool]] = best.get(key)
+            if current is None or has_details or not current[2]:
+                best[key] = (shard, position, has_details)
+    keep = {(shard, position) for shard, position, _ in best.values()}
+
+    with NDJsonWriter(dst, compression) as sink:
+        for shard, path in enumerate(paths):
+            for position, record in enumerate(iter_ndjson(path, compression)):
+                if (shard, position) in keep:
+                    sink.write(record)
+        count: int = sink.count
+    logger.info(f"Merged {len(paths)} shards into {dst}: {count} unique listings")
+    return count
@@ -0,0 +1,38 @@
+"""
+src/storage/__init__.py — Output and persistence package initializer.
+
+Author: Danil
+Created: 2026-10-17
+
+Description:
+    This module re-exports the crawl output helpers:
+    - NDJsonWriter:         Streaming NDJSON sink (optional gzip/zstd, periodic fsync).
+    - iter_ndjson:          Reads records back from an NDJSON file.
+    - ndjson_to_json_array: Converts NDJSON into the legacy `full_results.json` array.
+    - CrawlStateStore:      SQLite checkpoint store used by `--resume`.
+    - ListingIndex:         Known-listing index used by `--incremental`.
+    - open_work_queue:      Shared task queue of a sharded crawl (SQLite / Redis).
+    - export_records:       Flat CSV / Parquet / Arrow export of the records.
+    - ListingDatabase:      SQLite listing database with price history and change queries.
+    - ChangeTracker:        new / price_changed / upped / removed events across crawls.
+
+Usage:
+    from storage import NDJsonWriter, ndjson_to_json_array
+
+Project Structure:
+    - ndjson.py        : Streaming JSON Lines writer/reader and legacy converter.
+    - state_store.py   : Crawl progress checkpoints (pages / detail URLs).
+    - listing_index.py : Known listings, last positions and fetch times.
+    - work_queue.py    : Task queue shared by the workers of a sharded crawl.
+    - columnar.py      : Typed, flattened CSV / Parquet / Arrow exports.
+    - sqlite_store.py  : Listings, prices over time, images, options and VIN history in SQLite.
+    - change_tracker.py: Hashed per-listing snapshots and the change-event stream.
+"""
+
+from .ndjson import NDJsonWriter, iter_ndjson, ndjson_to_json_array
+from .state_store import CrawlStateStore
+from .listing_index import ListingIndex
+from .work_queue import SqliteWorkQueue, RedisWorkQueue, open_work_queue
+from .columnar import export_records
+from .sqlite_store import ListingDatabase
+from .change_tracker import ChangeTracker
@@ -0,0 +1,269 @@
+"""
+src/storage/change_tracker.py — Change-event stream of listings across crawls.
+
+Author: Danil
+Created: 2026-10-17
+Description:
+    Keeps a compact snapshot of every listing (prices, `updated`, views,
+    favorites from `extract_head_info`) and compares each crawl with it:
+    - new:           listing ID not seen before (or seen again after removal)
+    - price_changed: price_usd / price_kgs differ, with old and new values
+    - upped:         the seller upped the ad (its "updated" time moved forward)
+    - removed:       listing missing from a complete crawl
+
+    "updated" is relative text ("Обновлено 2 часа назад") that drifts on every
+    crawl, so it is turned into an estimated up-time; an ad counts as upped
+    only when that time moves forward by more than the text's precision.
+
+    The prices are reduced to a 64-bit hash, and the hash and up-time of all
+    live listings are held in memory. Unchanged listings (the vast majority)
+    cost one dict lookup and no database access; only listings whose hash
+    changed are read back from SQLite and diffed. Views / favorites are stored
+    whenever a snapshot is written and carried on the events as context.
+    Events are appended to an NDJSON file, one compact object each.
+
+Usage:
+    from storage.change_tracker import ChangeTracker
+    with ChangeTracker("snapshots.sqlite3", "changes.ndjson") as tracker:
+        for listing in iter_listings("full_results.ndjson"):
+            tracker.observe(listing)
+        tracker.finish()                       # emits "removed" events
+
+Dependencies:
+    - sqlite3, hashlib (standard library)
+    - models.normalize for the relative "updated" times
+    - storage.ndjson for the event stream
+"""
+
+import hashlib
+import sqlite3
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from models.car import CarDetails, CarListing
+from models.normalize import parse_age
+from storage.ndjson import NDJsonWriter
+
+EVENT_TYPES: Tuple[str, ...] = ("new", "price_changed", "upped", "removed")
+
+_SCHEMA: str = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    listing_id      TEXT PRIMARY KEY,
+    link            TEXT NOT NULL,
+    hash            INTEGER NOT NULL,
+    price_usd       INTEGER,
+    price_kgs       INTEGER,
+    updated         TEXT,
+    upped_at        REAL,
+    upped_precision REAL,
+    views           INTEGER,
+    favorites       INTEGER,
+    first_seen_at   REAL NOT NULL,
+    changed_at      REAL NOT NULL,
+    removed_at      REAL
+);
+CREATE INDEX IF NOT EXISTS idx_snapshots_removed ON snapshots(removed_at);
+"""
+
+# In-memory state of a live listing: (hash, estimated up-time, its precision in seconds)
+_State = Tuple[int, Optional[float], Optional[float]]
+
+
+def snapshot_hash(details: CarDetails, upped_known: bool) -> int:
+    """
+    64-bit hash of the event-relevant snapshot values (signed, so it fits an SQLite INTEGER).
+
+    Args:
+        details (CarDetails): Parsed details.
+        upped_known (bool): Whether "updated" parsed into a time; if not, its raw text
+            is hashed so that any change of it is diffed.
+
+    Returns:
+        int: Hash value.
+    """
+    values = (details.price_usd, details.price_kgs, None if upped_known else details.updated)
+    digest: bytes = hashlib.blake2b(repr(values).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+class ChangeTracker:
+    """
+    Snapshot store that turns consecutive crawls into change events.
+    """
+
+    def __init__(self, path: str, events_path: Optional[str] = None, batch_size: int = 1000) -> None:
+        """
+        Args:
+            path (str): SQLite snapshot database.
+            events_path (Optional[str]): NDJSON file the events are appended to; None keeps
+                only the counters.
+            batch_size (int): Snapshot writes buffered per transaction.
+        """
+        self.path: str = path
+        self.batch_size: int = batch_size
+        self.counts: Counter = Counter()
+        self._conn: sqlite3.Connection = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._known: Dict[str, _State] = {
+            key: (digest, upped_at, precision)
+            for key, digest, upped_at, precision in self._conn.execute(
+                "SELECT listing_id, hash, upped_at, upped_precision FROM snapshots WHERE removed_at IS NULL")
+        }
+        self._seen: Set[str] = set()
+        self._pending: List[Tuple[Any, ...]] = []
+        self._events: Optional[NDJsonWriter] = NDJsonWriter(events_path, append=True) if events_path else None
+
+    def _emit(self, event: str, listing_id: str, link: str, at: float, **changes: Any) -> Dict[str, Any]:
+        record: Dict[str, Any] = {"event": event, "listing_id": listing_id, "link": link, "at": round(at, 3)}
+        record.update(changes)
+        self.counts[event] += 1
+        if self._events is not None:
+            self._events.write(record)
+        return record
+
+    def observe(self, listing: CarListing, at: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Compare a freshly parsed listing with its snapshot and update the snapshot.
+
+        Args:
+            listing (CarListing): Listing with details. A listing without details
+                (its detail fetch failed) is only recorded as still listed.
+            at (Optional[float]): Observation time; now if None.
+
+        Returns:
+            List[Dict[str, Any]]: Events emitted for this listing (usually none).
+        """
+        key: str = listing.listing_id
+        self._seen.add(key)
+        details: Optional[CarDetails] = listing.details
+        if details is None:
+            return []
+        at = at or time.time()
+
+        age = parse_age(details.updated)
+        upped_at: Optional[float] = None if age is None else at - age[0]
+        precision: Optional[float] = None if age is None else float(age[1])
+        digest: int = snapshot_hash(details, age is not None)
+
+        old: Optional[_State] = self._known.get(key)
+        upped: bool = False
+        if old is not None:
+            old_digest, old_upped_at, old_precision = old
+            if upped_at is not None and old_upped_at is not None:
+                upped = upped_at - old_upped_at > max(precision, old_precision or 0.0)
+                if not upped:
+                    # Keep the first estimate so that the drifting text does not creep forward
+                    upped_at, precision = old_upped_at, old_precision
+            elif details.updated is None:
+                # Not shown (e.g. a listing-only record): keep what the last detail page said
+                upped_at, precision = old_upped_at, old_precision
+            if old_digest == digest and not upped:
+                return []
+        self._known[key] = (digest, upped_at, precision)
+
+        context: Dict[str, Any] = {"views": details.views, "favorites": details.favorites}
+        events: List[Dict[str, Any]] = []
+        row = None
+        if old is not None:
+            row = self._conn.execute(
+                "SELECT price_usd, price_kgs, updated FROM snapshots WHERE listing_id = ?", (key,)).fetchone()
+        if row is None:
+            events.append(self._emit("new", key, listing.link, at,
+                                     price_usd=details.price_usd, price_kgs=details.price_kgs, **context))
+        else:
+            old_usd, old_kgs, old_updated = row
+            # A price the record does not show (listing-only records carry one currency) is not a change
+            if any(new is not None and new != old_value for old_value, new in
+                   ((old_usd, details.price_usd), (old_kgs, details.price_kgs))):
+                events.append(self._emit("price_changed", key, listing.link, at,
+                                         price_usd=[old_usd, details.price_usd],
+                                         price_kgs=[old_kgs, details.price_kgs], **context))
+            if upped or (age is None and details.updated is not None and old_updated != details.updated):
+                events.append(self._emit("upped", key, listing.link, at,
+                                         updated=[old_updated, details.updated], **context))
+
+        self._pending.append((key, listing.link, digest, details.price_usd, details.price_kgs, details.updated,
+                              upped_at, precision, details.views, details.favorites, at,
+                              at if events else None))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+        return events
+
+    def flush(self) -> None:
+        """
+        Write buffered snapshots in one transaction.
+
+        Returns:
+            None
+        """
+        if not self._pending:
+            return
+        with self._conn:
+            self._conn.executemany(
+                """
+                INSERT INTO snapshots(listing_id, link, hash, price_usd, price_kgs, updated, upped_at,
+                                      upped_precision, views, favorites, first_seen_at, changed_at, removed_at)
+                VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?7, ?8, ?9, ?10, ?11, COALESCE(?12, ?11), NULL)
+                ON CONFLICT(listing_id) DO UPDATE SET
+                    link = excluded.link, hash = excluded.hash,
+                    price_usd = COALESCE(excluded.price_usd, snapshots.price_usd),
+                    price_kgs = COALESCE(excluded.price_kgs, snapshots.price_kgs), updated = COALESCE(excluded.updated, snapshots.updated),
+                    upped_at = excluded.upped_at,
+                    upped_precision = excluded.upped_precision, views = excluded.views,
+                    favorites = excluded.favorites, removed_at = NULL,
+                    first_seen_at = CASE WHEN snapshots.removed_at IS NULL
+                                         THEN snapshots.first_seen_at ELSE excluded.first_seen_at END,
+                    changed_at = COALESCE(?12, snapshots.changed_at)
+                """,
+                self._pending,
+            )
+        self._pending.clear()
+
+    def finish(self, detect_removed: bool = True, at: Optional[float] = None) -> int:
+        """
+        End a crawl: write pending snapshots and emit "removed" for listings it did not see.
+
+        Args:
+            detect_removed (bool): Only True after a complete crawl (not incremental / partial runs).
+            at (Optional[float]): Removal time; now if None.
+
+        Returns:
+            int: Number of listings marked as removed.
+        """
+        self.flush()
+        if not detect_removed:
+            self._seen.clear()
+            return 0
+        at = at or time.time()
+        missing: List[str] = [key for key in self._known if key not in self._seen]
+        with self._conn:
+            for start in range(0, len(missing), self.batch_size):
+                chunk: List[str] = missing[start:start + self.batch_size]
+                rows = self._conn.execute(
+                    f"SELECT listing_id, link FROM snapshots WHERE listing_id IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                for key, link in rows:
+                    self._emit("removed", key, link, at)
+                self._conn.executemany(
+                    "UPDATE snapshots SET removed_at = ?, changed_at = ? WHERE listing_id = ?",
+                    ((at, at, key) for key in chunk),
+                )
+        for key in missing:
+            del self._known[key]
+        self._seen.clear()
+        return len(missing)
+
+    def close(self) -> None:
+        self.flush()
+        if self._events is not None:
+            self._events.close()
+        self._conn.close()
+
+    def __enter__(self) -> "ChangeTracker":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
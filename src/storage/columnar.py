@@ -0,0 +1,363 @@
+"""
+src/storage/columnar.py — Flat, typed exports of crawl records for analytics (Parquet / Arrow / CSV).
+
+Author: Danil
+Created: 2026-10-17
+Description:
+    Loading `full_results.json` into pandas means parsing every nested dict
+    and every "$ 16 300" string. This module flattens each record into one
+    row with proper dtypes and writes it in a columnar or tabular format:
+    - `COLUMNS`: the row schema — card data, head info and prices (int64),
+      main specs (year / mileage_km as int64, engine split into volume and
+      fuel), average price, image / VIN-history counts and the configuration
+      options as a list of "section: option" strings
+    - `flatten_listing`: `models.CarListing` → row dict
+    - `CsvExporter`: streaming CSV writer (lists joined with "; ")
+    - `ArrowExporter`: Parquet or Arrow IPC files written in record batches,
+      optionally partitioned Hive-style by brand or crawl date
+      (`brand=Kia/part-0.parquet`), readable with `pandas.read_parquet(dir)`
+    - `export_records`: stream an NDJSON record file (either record layout)
+      into one of the above
+
+Usage:
+    from storage.columnar import export_records
+    export_records("full_results.ndjson", "parquet", "export/", partition_by="brand")
+    export_records("full_results.ndjson", "csv", "listings.csv")
+
+Dependencies:
+    - csv (standard library)
+    - pyarrow (optional, for Parquet / Arrow)
+    - models: typed records
+"""
+
+import csv
+import datetime
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from models.car import CarListing
+from models.legacy import iter_listings
+from models.normalize import parse_engine
+
+EXPORT_FORMATS: Tuple[str, ...] = ("csv", "parquet", "arrow")
+PARTITION_KEYS: Tuple[str, ...] = ("brand", "crawl_date")
+
+# (column, type); types: "string", "int64", "float64", "date", "list<string>"
+COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ("listing_id", "string"),
+    ("link", "string"),
+    ("crawl_date", "date"),
+    ("status", "string"),
+    ("features", "list<string>"),
+    ("brand", "string"),
+    ("model", "string"),
+    ("generation", "string"),
+    ("brand_id", "int64"),
+    ("model_id", "int64"),
+    ("title", "string"),
+    ("model_info", "string"),
+    ("location", "string"),
+    ("views", "int64"),
+    ("favorites", "int64"),
+    ("price_usd", "int64"),
+    ("price_kgs", "int64"),
+    ("price_rub", "int64"),
+    ("price_kzt", "int64"),
+    ("average_price_usd", "int64"),
+    ("year", "int64"),
+    ("mileage_km", "int64"),
+    ("body_type", "string"),
+    ("color", "string"),
+    ("engine_volume", "float64"),
+    ("fuel", "string"),
+    ("transmission", "string"),
+    ("drive_type", "string"),
+    ("steering_wheel", "string"),
+    ("condition", "string"),
+    ("customs_cleared", "string"),
+    ("exchange", "string"),
+    ("availability", "string"),
+    ("car_location", "string"),
+    ("region_id", "int64"),
+    ("town_id", "int64"),
+    ("registration_country", "string"),
+    ("vin", "string"),
+    ("user_name", "string"),
+    ("phone_number", "string"),
+    ("image_count", "int64"),
+    ("vin_history_records", "int64"),
+    ("configuration", "list<string>"),
+)
+COLUMN_NAMES: Tuple[str, ...] = tuple(name for name, _ in COLUMNS)
+
+# Fields copied unchanged from CarDetails
+_DETAIL_COLUMNS: Tuple[str, ...] = (
+    "brand", "model", "generation", "title", "model_info", "location", "views", "favorites",
+    "price_usd", "price_kgs", "price_rub", "price_kzt", "average_price_usd", "year", "mileage_km",
+    "body_type", "color", "transmission", "drive_type", "steering_wheel", "condition",
+    "customs_cleared", "exchange", "availability", "car_location", "registration_country", "vin",
+    "user_name", "phone_number", "brand_id", "model_id", "region_id", "town_id",
+)
+_UNSAFE_PATH_CHARS = re.compile(r"[\\/:*?\"<>|=]")
+
+
+def pyarrow_available() -> bool:
+    """
+    Check whether the Parquet / Arrow formats can be written.
+
+    Returns:
+        bool: True if pyarrow is installed.
+    """
+    try:
+        _pyarrow()
+    except RuntimeError:
+        return False
+    return True
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Parquet / Arrow export requires the 'pyarrow' package")
+    return pyarrow
+
+
+def flatten_listing(listing: CarListing, crawl_date: datetime.date) -> Dict[str, Any]:
+    """
+    Flatten a listing into one export row.
+
+    Args:
+        listing (CarListing): Typed listing (details may be None).
+        crawl_date (datetime.date): Date stamped on the row.
+
+    Returns:
+        Dict[str, Any]: Values for every column of `COLUMNS`.
+    """
+    row: Dict[str, Any] = dict.fromkeys(COLUMN_NAMES)
+    row["listing_id"] = listing.listing_id
+    row["link"] = listing.link
+    row["crawl_date"] = crawl_date
+    row["status"] = listing.status
+    row["features"] = list(listing.features)
+    row["configuration"] = []
+    details = listing.details
+    if details is None:
+        return row
+    for name in _DETAIL_COLUMNS:
+        row[name] = getattr(details, name)
+    row["engine_volume"], row["fuel"] = parse_engine(details.engine)
+    row["image_count"] = len(details.image_links)
+    if details.vin_report is not None:
+        row["vin_history_records"] = sum(record.record_count for record in details.vin_report.history_records)
+    row["configuration"] = [f"{section}: {option}"
+                            for section, options in (details.configuration or {}).items()
+                            for option in options]
+    return row
+
+
+class CsvExporter:
+    """
+    Streaming CSV writer for export rows.
+    """
+
+    def __init__(self, path: str, list_separator: str = "; ") -> None:
+        """
+        Args:
+            path (str): Output CSV file (UTF-8 with BOM, so Excel detects the encoding).
+            list_separator (str): Separator for list columns.
+        """
+        self.path: str = path
+        self.list_separator: str = list_separator
+        self.count: int = 0
+        self._file = open(path, "w", encoding="utf-8-sig", newline="")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(COLUMN_NAMES)
+
+    def write(self, row: Dict[str, Any]) -> None:
+        values: List[Any] = []
+        for name, kind in COLUMNS:
+            value: Any = row[name]
+            if value is None:
+                value = ""
+            elif kind == "list<string>":
+                value = self.list_separator.join(value)
+            elif kind == "date":
+                value = value.isoformat()
+            values.append(value)
+        self._writer.writerow(values)
+        self.count += 1
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "CsvExporter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class ArrowExporter:
+    """
+    Parquet / Arrow IPC writer with typed columns, batching and optional Hive partitioning.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        file_format: str = "parquet",
+        partition_by: Optional[str] = None,
+        batch_rows: int = 10_000,
+        compression: str = "zstd",
+    ) -> None:
+        """
+        Args:
+            path (str): Output file, or output directory when partitioned.
+            file_format (str): "parquet" or "arrow" (Arrow IPC / Feather v2).
+            partition_by (Optional[str]): "brand" or "crawl_date"; None writes a single file.
+            batch_rows (int): Rows buffered per partition before a batch is written.
+            compression (str): Parquet codec ("zstd", "snappy", "gzip", "none").
+        """
+        if file_format not in ("parquet", "arrow"):
+            raise ValueError(f"Unknown columnar format: {file_format}")
+        if partition_by is not None and partition_by not in PARTITION_KEYS:
+            raise ValueError(f"Cannot partition by {partition_by!r}; choose from {PARTITION_KEYS}")
+        self._pa = _pyarrow()
+        self.path: str = path
+        self.file_format: str = file_format
+        self.partition_by: Optional[str] = partition_by
+        self.batch_rows: int = batch_rows
+        self.compression: Optional[str] = None if compression == "none" else compression
+        self.count: int = 0
+
+        # Partition values live in the directory names, not in the files
+        columns = [(name, kind) for name, kind in COLUMNS if name != partition_by]
+        self._columns: List[str] = [name for name, _ in columns]
+        self.schema = self._pa.schema([self._pa.field(name, self._arrow_type(kind)) for name, kind in columns])
+        self._buffers: Dict[Optional[str], List[Dict[str, Any]]] = {}
+        self._writers: Dict[Optional[str], Any] = {}
+        if partition_by is not None:
+            os.makedirs(path, exist_ok=True)
+
+    def _arrow_type(self, kind: str):
+        pa = self._pa
+        return {
+            "string": pa.string(),
+            "int64": pa.int64(),
+            "float64": pa.float64(),
+            "date": pa.date32(),
+            "list<string>": pa.list_(pa.string()),
+        }[kind]
+
+    def _partition_dir(self, value: Optional[str]) -> str:
+        name: str = "__HIVE_DEFAULT_PARTITION__" if value in (None, "") else _UNSAFE_PATH_CHARS.sub("_", value)
+        return os.path.join(self.path, f"{self.partition_by}={name}")
+
+    def _writer(self, key: Optional[str]):
+        writer = self._writers.get(key)
+        if writer is None:
+            extension: str = "parquet" if self.file_format == "parquet" else "arrow"
+            if self.partition_by is None:
+                path: str = self.path
+            else:
+                folder: str = self._partition_dir(key)
+                os.makedirs(folder, exist_ok=True)
+                path = os.path.join(folder, f"part-0.{extension}")
+            if self.file_format == "parquet":
+                writer = self._pa.parquet.ParquetWriter(path, self.schema, compression=self.compression)
+            else:
+                writer = self._pa.ipc.new_file(path, self.schema)
+            self._writers[key] = writer
+        return writer
+
+    def _flush(self, key: Optional[str]) -> None:
+        rows: List[Dict[str, Any]] = self._buffers.pop(key, [])
+        if not rows:
+            return
+        arrays = [self._pa.array([row[name] for row in rows], type=field.type)
+                  for name, field in zip(self._columns, self.schema)]
+        self._writer(key).write_table(self._pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def write(self, row: Dict[str, Any]) -> None:
+        key: Optional[str] = None
+        if self.partition_by is not None:
+            value: Any = row[self.partition_by]
+            key = value.isoformat() if isinstance(value, datetime.date) else value
+        buffer: List[Dict[str, Any]] = self._buffers.setdefault(key, [])
+        buffer.append(row)
+        self.count += 1
+        if len(buffer) >= self.batch_rows:
+            self._flush(key)
+
+    def close(self) -> None:
+        for key in list(self._buffers):
+            self._flush(key)
+        for writer in self._writers.values():
+            writer.close()
+        self._writers.clear()
+
+    def __enter__(self) -> "ArrowExporter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def default_export_path(records_path: str, file_format: str, partition_by: Optional[str] = None) -> str:
+    """
+    Export location next to the record file.
+
+    Args:
+        records_path (str): NDJSON record file, e.g. "full_results.ndjson.gz".
+        file_format (str): "csv", "parquet" or "arrow".
+        partition_by (Optional[str]): Partition column; partitioned exports are directories.
+
+    Returns:
+        str: e.g. "full_results.csv", "full_results.parquet" or "full_results_parquet/".
+    """
+    folder, name = os.path.split(records_path)
+    stem: str = name.partition(".")[0]
+    if partition_by is not None:
+        return os.path.join(folder, f"{stem}_{file_format}")
+    return os.path.join(folder, f"{stem}.{file_format}")
+
+
+def export_records(
+    src: str,
+    file_format: str,
+    dst: str,
+    partition_by: Optional[str] = None,
+    crawl_date: Optional[datetime.date] = None,
+    compression: Optional[str] = None,
+) -> int:
+    """
+    Export an NDJSON record file (legacy or typed layout) as CSV, Parquet or Arrow.
+
+    Args:
+        src (str): NDJSON record file.
+        file_format (str): "csv", "parquet" or "arrow".
+        dst (str): Output file (or directory when partitioned).
+        partition_by (Optional[str]): "brand" or "crawl_date" (Parquet / Arrow only).
+        crawl_date (Optional[datetime.date]): Date stamped on every row; defaults to today.
+        compression (Optional[str]): Compression of `src`; inferred from suffix if None.
+
+    Returns:
+        int: Number of rows written.
+    """
+    if file_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {file_format}")
+    crawl_date = crawl_date or datetime.date.today()
+    if file_format == "csv":
+        if partition_by is not None:
+            raise ValueError("CSV export cannot be partitioned")
+        exporter = CsvExporter(dst)
+    else:
+        exporter = ArrowExporter(dst, file_format, partition_by)
+    with exporter:
+        for listing in iter_listings(src, compression):
+            exporter.write(flatten_listing(listing, crawl_date))
+    return exporter.count
@@ -0,0 +1,216 @@
+"""
+src/storage/listing_index.py — Index of known listings for incremental (delta) crawls.
+
+Author: Danil
+Created: 2026-10-17
+Description:
+    Keeps one row per listing URL seen on the search pages, with:
+    - its last search position (page, position) and card `status`/`features`
+    - the last record written for it, as it was written to the output
+    - when the detail page was last fetched, and in which run it was last seen
+
+    `observe()` decides whether a listing's detail page has to be fetched again:
+    it is new, it was "upped" (jumped up the search results), its card changed,
+    or its last fetch is older than the TTL. Listings it skips are carried
+    forward: `carried_records()` returns their stored records, so an
+    incremental run still writes every listing it saw. Listings that were not
+    seen in a complete run are marked as removed by `mark_removed()`.
+
+Usage:
+    from storage.listing_index import ListingIndex
+    index = ListingIndex("listing_index.sqlite3", ttl_seconds=86400)
+    reason = index.observe(item, page=1, position=0, run_id=run_id)
+    if reason:
+        ...  # fetch details, write the record, then index.record_details(url, record)
+    for record in index.carried_records(run_id):
+        ...  # write the unchanged listings' previous records
+
+Dependencies:
+    - sqlite3 (standard library)
+"""
+
+import json
+import sqlite3
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Approximate number of cards on one search page, used to rank (page, position)
+LISTINGS_PER_PAGE: int = 20
+
+_SCHEMA: str = """
+CREATE TABLE IF NOT EXISTS listings (
+    url           TEXT PRIMARY KEY,
+    page          INTEGER,
+    position      INTEGER,
+    status        TEXT,
+    features      TEXT,
+    record        TEXT,
+    fetched_at    REAL,
+    carried_run   REAL,
+    first_seen_at REAL NOT NULL,
+    last_seen_run REAL NOT NULL,
+    removed_at    REAL
+);
+CREATE INDEX IF NOT EXISTS idx_listings_last_seen ON listings(last_seen_run);
+CREATE INDEX IF NOT EXISTS idx_listings_removed ON listings(removed_at);
+"""
+# Columns added after the first release, with their types: old index files are migrated on open
+_ADDED_COLUMNS: Tuple[Tuple[str, str], ...] = (("record", "TEXT"), ("carried_run", "REAL"))
+
+
+def _rank(page: int, position: int) -> int:
+    return (page - 1) * LISTINGS_PER_PAGE + position
+
+
+class ListingIndex:
+    """
+    SQLite-backed index of listings and their last observed state.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float, upped_threshold: int = LISTINGS_PER_PAGE,
+                 commit_every: int = 500) -> None:
+        """
+        Args:
+            path (str): SQLite database file.
+            ttl_seconds (float): Refetch details older than this even if nothing changed.
+            upped_threshold (int): Minimum jump up the search ranking treated as "upped".
+            commit_every (int): Number of writes between commits.
+        """
+        self.ttl_seconds: float = ttl_seconds
+        self.upped_threshold: int = upped_threshold
+        self.commit_every: int = commit_every
+        self._pending_writes: int = 0
+        self._conn: sqlite3.Connection = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(listings)")}
+        for name, kind in _ADDED_COLUMNS:
+            if name not in columns:
+                self._conn.execute(f"ALTER TABLE listings ADD COLUMN {name} {kind}")
+        self._conn.commit()
+
+    def _written(self) -> None:
+        self._pending_writes += 1
+        if self._pending_writes >= self.commit_every:
+            self.commit()
+
+    def commit(self) -> None:
+        self._conn.commit()
+        self._pending_writes = 0
+
+    def close(self) -> None:
+        self.commit()
+        self._conn.close()
+
+    def observe(self, item: Dict[str, Any], page: int, position: int, run_id: float) -> Optional[str]:
+        """
+        Record a listing seen on a search page and decide whether to refetch it.
+
+        Args:
+            item (Dict[str, Any]): Link info from `extract_links_from_html`.
+            page (int): Search page number the listing was found on.
+            position (int): Index of the card on that page.
+            run_id (float): Identifier (start timestamp) of the current run.
+
+        Returns:
+            Optional[str]: "new", "upped", "changed" or "stale" if the detail page
+            must be fetched, None if the stored record is still current (it is then
+            returned by `carried_records(run_id)`).
+        """
+        url: str = item["link"]
+        features: str = json.dumps(sorted(item.get("features") or []))
+        status: Optional[str] = item.get("status")
+        row = self._conn.execute(
+            "SELECT page, position, status, features, fetched_at, removed_at, record IS NOT NULL "
+            "FROM listings WHERE url = ?",
+            (url,),
+        ).fetchone()
+
+        now: float = time.time()
+        if row is None:
+            self._conn.execute(
+                "INSERT INTO listings(url, page, position, status, features, first_seen_at, last_seen_run) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, page, position, status, features, now, run_id),
+            )
+            self._written()
+            return "new"
+
+        old_page, old_position, old_status, old_features, fetched_at, removed_at, has_record = row
+        reason: Optional[str] = None
+        # Without a stored record the listing cannot be carried forward (indexes of older versions)
+        if removed_at is not None or fetched_at is None or not has_record:
+            reason = "new"
+        elif _rank(old_page, old_position) - _rank(page, position) >= self.upped_threshold:
+            reason = "upped"
+        elif old_status != status or old_features != features:
+            reason = "changed"
+        elif now - fetched_at > self.ttl_seconds:
+            reason = "stale"
+        self._conn.execute(
+            "UPDATE listings SET page = ?, position = ?, status = ?, features = ?, "
+            "last_seen_run = ?, removed_at = NULL, carried_run = ? WHERE url = ?",
+            (page, position, status, features, run_id, None if reason else run_id, url),
+        )
+        self._written()
+        return reason
+
+    def record_details(self, url: str, record: Dict[str, Any]) -> None:
+        """
+        Store the record written for a freshly parsed detail page.
+
+        Args:
+            url (str): Detail page URL.
+            record (Dict[str, Any]): The record as written to the output.
+
+        Returns:
+            None
+        """
+        self._conn.execute(
+            "UPDATE listings SET record = ?, fetched_at = ?, carried_run = NULL WHERE url = ?",
+            (json.dumps(record, ensure_ascii=False), time.time(), url),
+        )
+        self._written()
+
+    def carried_records(self, run_id: float) -> Iterator[Dict[str, Any]]:
+        """
+        Previous records of the listings `observe()` found unchanged during a run.
+
+        Args:
+            run_id (float): Identifier of the run.
+
+        Yields:
+            Dict[str, Any]: Stored records, in search order.
+        """
+        self.commit()
+        rows = self._conn.execute(
+            "SELECT record FROM listings WHERE carried_run = ? AND record IS NOT NULL ORDER BY page, position",
+            (run_id,),
+        )
+        for (record,) in rows:
+            yield json.loads(record)
+
+    def mark_removed(self, run_id: float) -> List[Dict[str, Any]]:
+        """
+        Mark listings not seen during the given (complete) run as removed.
+
+        Args:
+            run_id (float): Identifier of the run that just finished.
+
+        Returns:
+            List[Dict[str, Any]]: A removal marker per newly removed listing:
+            {"link", "removed_at", "first_seen_at", "last_seen_run"}.
+        """
+        now: float = time.time()
+        rows = self._conn.execute(
+            "SELECT url, first_seen_at, last_seen_run FROM listings WHERE last_seen_run != ? AND removed_at IS NULL",
+            (run_id,),
+        ).fetchall()
+        self._conn.execute(
+            "UPDATE listings SET removed_at = ?, carried_run = NULL WHERE last_seen_run != ? AND removed_at IS NULL",
+            (now, run_id),
+        )
+        self.commit()
+        return [{"link": url, "removed_at": now, "first_seen_at": first_seen, "last_seen_run": last_seen}
+                for url, first_seen, last_seen in rows]
@@ -0,0 +1,323 @@
+"""
+src/storage/ndjson.py — Streaming NDJSON (JSON Lines) output for crawl records.
+
+Author: Danil
+Created: 2026-10-17
+Description:
+    Provides:
+    - `NDJsonWriter`: appends one JSON record per line as soon as it is parsed,
+      with optional gzip/zstd compression and periodic fsync, so a crash keeps
+      everything written so far; an `on_sync` callback runs once the records
+      are on disk (the crawl commits its checkpoint there), and appending first
+      cuts off a record left half-written by a crash
+    - `iter_ndjson`: streams records back from a (possibly compressed) NDJSON file
+    - `ndjson_to_json_array`: converts an NDJSON file into the legacy single-array
+      `full_results.json` layout (same as `json.dump(..., indent=2)`) without
+      loading all records into memory
+
+    Compression is chosen explicitly or inferred from the file suffix
+    (`.gz` → gzip, `.zst` → zstd).
+
+Usage:
+    from storage.ndjson import NDJsonWriter, ndjson_to_json_array
+    with NDJsonWriter("full_results.ndjson.gz") as sink:
+        sink.write(record)
+    ndjson_to_json_array("full_results.ndjson.gz", "full_results.json")
+
+Dependencies:
+    - gzip (standard library)
+    - zstandard (optional, for zstd compression)
+"""
+
+import gzip
+import io
+import json
+import os
+from typing import Any, BinaryIO, Callable, Dict, Iterator, Optional
+
+_CHUNK: int = 1 << 16
+
+
+def detect_compression(path: str) -> Optional[str]:
+    """
+    Infer the compression codec from a file name.
+
+    Args:
+        path (str): Output or input file path.
+
+    Returns:
+        Optional[str]: "gzip", "zstd" or None.
+    """
+    if path.endswith(".gz"):
+        return "gzip"
+    if path.endswith(".zst"):
+        return "zstd"
+    return None
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("zstd compression requires the 'zstandard' package")
+    return zstandard
+
+
+def _open_reader(raw: BinaryIO, compression: Optional[str]) -> BinaryIO:
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=raw, mode="rb")
+    if compression == "zstd":
+        return _zstandard().ZstdDecompressor().stream_reader(raw, read_across_frames=True)
+    return raw
+
+
+def trim_partial_line(path: str, compression: Optional[str] = None) -> int:
+    """
+    Cut a record left half-written by a crash off the end of an NDJSON file,
+    so that appending to it does not glue the next record onto it.
+
+    A plain file is truncated after its last newline. A compressed stream
+    cannot be cut at a line, so if it ends mid-line or mid-stream its complete
+    lines are re-compressed into a new file that replaces it.
+
+    Args:
+        path (str): NDJSON file (missing or empty files are left alone).
+        compression (Optional[str]): "gzip", "zstd", "none" or None (infer from suffix).
+
+    Returns:
+        int: Number of uncompressed bytes dropped.
+    """
+    compression = detect_compression(path) if compression is None else compression
+    if compression == "none":
+        compression = None
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return 0
+
+    if compression is None:
+        with open(path, "r+b") as f:
+            end: int = f.seek(0, os.SEEK_END)
+            keep: int = 0
+            position: int = end
+            while position > 0:
+                step: int = min(_CHUNK, position)
+                position -= step
+                f.seek(position)
+                cut: int = f.read(step).rfind(b"\n")
+                if cut >= 0:
+                    keep = position + cut + 1
+                    break
+            if keep < end:
+                f.truncate(keep)
+            return end - keep
+
+    tail: bytes = b""
+    complete: bool = True
+    tmp_path: str = path + ".trim"
+    with open(path, "rb") as raw, NDJsonWriter(tmp_path, compression) as out:
+        binary = _open_reader(raw, compression)
+        while True:
+            try:
+                chunk: bytes = binary.read(_CHUNK)
+            except EOFError:
+                complete = False
+                break
+            if not chunk:
+                break
+            data: bytes = tail + chunk
+            cut = data.rfind(b"\n")
+            if cut >= 0:
+                out.write_raw(data[:cut + 1])
+            tail = data[cut + 1:]
+    if complete and not tail:
+        os.remove(tmp_path)
+        return 0
+    os.replace(tmp_path, path)
+    return len(tail)
+
+
+class NDJsonWriter:
+    """
+    Append-only NDJSON sink with optional compression and periodic fsync.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        compression: Optional[str] = None,
+        fsync_every: int = 0,
+        append: bool = False,
+        on_sync: Optional[Callable[[], None]] = None,
+    ) -> None:
+        """
+        Args:
+            path (str): Output file path.
+            compression (Optional[str]): "gzip", "zstd", "none" or None (infer from suffix).
+            fsync_every (int): Flush and fsync after this many records (0 = only on close).
+            append (bool): Append to an existing file instead of truncating it; a
+                half-written last record is cut off first.
+            on_sync (Optional[Callable[[], None]]): Called after every fsync, i.e.
+                whenever all records written so far are on disk.
+        """
+        self.path: str = path
+        self.compression: Optional[str] = detect_compression(path) if compression is None else compression
+        if self.compression == "none":
+            self.compression = None
+        self.fsync_every: int = fsync_every
+        self.on_sync: Optional[Callable[[], None]] = on_sync
+        self.count: int = 0
+
+        if append:
+            trim_partial_line(path, self.compression or "none")
+
+        mode: str = "ab" if append else "wb"
+        self._raw: BinaryIO = open(path, mode)
+        if self.compression == "gzip":
+            self._stream = gzip.GzipFile(fileobj=self._raw, mode=mode)
+        elif self.compression == "zstd":
+            self._stream = _zstandard().ZstdCompressor().stream_writer(self._raw, closefd=False)
+        elif self.compression is None:
+            self._stream = self._raw
+        else:
+            self._raw.close()
+            raise ValueError(f"Unknown compression: {compression}")
+
+    def write(self, record: Dict[str, Any]) -> None:
+        """
+        Serialise one record as a single JSON line.
+
+        Args:
+            record (Dict[str, Any]): Record to write.
+
+        Returns:
+            None
+        """
+        line: str = json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+        self._stream.write(line.encode("utf-8") + b"\n")
+        self.count += 1
+        if self.fsync_every and self.count % self.fsync_every == 0:
+            self.sync()
+
+    def write_raw(self, data: bytes) -> None:
+        """
+        Write already serialised, newline-terminated lines (not counted as records).
+
+        Args:
+            data (bytes): UTF-8 NDJSON lines.
+
+        Returns:
+            None
+        """
+        self._stream.write(data)
+
+    def sync(self) -> None:
+        """
+        Flush buffered data (including the compressor's) and fsync the file.
+
+        Returns:
+            None
+        """
+        if self.compression == "zstd":
+            self._stream.flush(_zstandard().FLUSH_BLOCK)
+        else:
+            self._stream.flush()
+        self._raw.flush()
+        os.fsync(self._raw.fileno())
+        if self.on_sync is not None:
+            self.on_sync()
+
+    def close(self) -> None:
+        """
+        Finish the compressed stream, fsync and close the file.
+
+        Returns:
+            None
+        """
+        if self._raw.closed:
+            return
+        if self._stream is not self._raw:
+            self._stream.close()
+        self._raw.flush()
+        os.fsync(self._raw.fileno())
+        self._raw.close()
+        if self.on_sync is not None:
+            self.on_sync()
+
+    def __enter__(self) -> "NDJsonWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def iter_ndjson(path: str, compression: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Stream records from an NDJSON file, skipping a truncated trailing line.
+
+    Args:
+        path (str): Input file path.
+        compression (Optional[str]): "gzip", "zstd", "none" or None (infer from suffix).
+
+    Yields:
+        Dict[str, Any]: One record per line.
+    """
+    compression = detect_compression(path) if compression is None else compression
+    raw: BinaryIO = open(path, "rb")
+    binary = _open_reader(raw, compression)
+
+    with raw, io.TextIOWrapper(binary, encoding="utf-8") as text:
+        try:
+            for line in text:
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # Last line may be cut short if the writer crashed mid-record
+                    continue
+        except EOFError:
+            # Compressed stream cut short by a crash; keep what was readable
+            return
+
+
+def ndjson_to_json_array(
+    src: str,
+    dst: str,
+    compression: Optional[str] = None,
+    unique_by: Optional[str] = None,
+) -> int:
+    """
+    Convert an NDJSON file into a single JSON array file, streaming record by record.
+
+    The output is identical to `json.dump(records, f, ensure_ascii=False, indent=2)`.
+    With `unique_by`, only the last record for each value of that key is kept
+    (e.g. a listing re-fetched by a resumed crawl); this costs one extra pass
+    over the input and a set of the key values.
+
+    Args:
+        src (str): NDJSON input path.
+        dst (str): JSON array output path.
+        compression (Optional[str]): Input compression; inferred from suffix if None.
+        unique_by (Optional[str]): Record key used to drop earlier duplicates.
+
+    Returns:
+        int: Number of records written.
+    """
+    keep: Optional[Dict[Any, int]] = None
+    if unique_by:
+        keep = {}
+        for position, record in enumerate(iter_ndjson(src, compression)):
+            keep[record.get(unique_by)] = position
+        keep_positions = set(keep.values())
+
+    count: int = 0
+    with open(dst, "w", encoding="utf-8") as out:
+        out.write("[")
+        for position, record in enumerate(iter_ndjson(src, compression)):
+            if keep is not None and position not in keep_positions:
+                continue
+            body: str = json.dumps(record, ensure_ascii=False, indent=2)
+            out.write(",\n  " if count else "\n  ")
+            out.write(body.replace("\n", "\n  "))
+            count += 1
+        out.write("\n]" if count else "]")
+    return count
@@ -0,0 +1,337 @@
+"""
+src/storage/sqlite_store.py — Persistent SQLite database of listings with price history.
+
+Author: Danil
+Created: 2026-10-17
+Description:
+    Keeps every crawled listing across runs instead of overwriting one JSON
+    file per crawl. Each parsed record is upserted by listing ID:
+    - listings:       latest card data and details (typed columns for brand,
+                      model, year, mileage and prices, full details as JSON),
+                      first/last seen and last content change timestamps
+    - prices:         price observations, one row whenever the price differs
+                      from the previous one (price history over time)
+    - images:         image URLs of each listing, in page order
+    - config_options: configuration options (section, option) per listing
+    - vin_history:    VIN history sources and record counts per listing
+
+    Writes are buffered and committed in batches inside one transaction each.
+    A content hash of the details (ignoring counters such as views, and the
+    prices, which have their own history) tells real changes from
+    re-observations, so `changes_since()` can answer "what is new, changed or
+    re-priced since yesterday" with a query, reporting a price cut only as
+    `price_changed`.
+
+Usage:
+    from storage.sqlite_store import ListingDatabase
+    with ListingDatabase("listings.sqlite3") as db:
+        db.add(listing)                       # models.CarListing
+    for change in ListingDatabase("listings.sqlite3").changes_since(time.time() - 86400):
+        print(change)
+
+Dependencies:
+    - sqlite3, hashlib, json (standard library)
+    - models: typed records
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from models.car import CarDetails, CarListing
+from models.legacy import iter_listings
+
+_SCHEMA: str = """
+CREATE TABLE IF NOT EXISTS listings (
+    listing_id    TEXT PRIMARY KEY,
+    link          TEXT NOT NULL,
+    status        TEXT,
+    features      TEXT NOT NULL,
+    brand         TEXT,
+    model         TEXT,
+    generation    TEXT,
+    year          INTEGER,
+    mileage_km    INTEGER,
+    price_usd     INTEGER,
+    price_kgs     INTEGER,
+    body_type     TEXT,
+    location      TEXT,
+    details       TEXT NOT NULL,
+    content_hash  TEXT NOT NULL,
+    first_seen_at REAL NOT NULL,
+    last_seen_at  REAL NOT NULL,
+    changed_at    REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS prices (
+    listing_id  TEXT NOT NULL,
+    observed_at REAL NOT NULL,
+    price_usd   INTEGER,
+    price_kgs   INTEGER,
+    PRIMARY KEY (listing_id, observed_at)
+);
+CREATE TABLE IF NOT EXISTS images (
+    listing_id TEXT NOT NULL,
+    position   INTEGER NOT NULL,
+    url        TEXT NOT NULL,
+    PRIMARY KEY (listing_id, position)
+);
+CREATE TABLE IF NOT EXISTS config_options (
+    listing_id TEXT NOT NULL,
+    section    TEXT NOT NULL,
+    option     TEXT NOT NULL,
+    PRIMARY KEY (listing_id, section, option)
+);
+CREATE TABLE IF NOT EXISTS vin_history (
+    listing_id   TEXT NOT NULL,
+    source       TEXT NOT NULL,
+    record_count INTEGER NOT NULL,
+    PRIMARY KEY (listing_id, source)
+);
+CREATE INDEX IF NOT EXISTS idx_listings_brand_model_year ON listings(brand, model, year);
+CREATE INDEX IF NOT EXISTS idx_listings_year ON listings(year);
+CREATE INDEX IF NOT EXISTS idx_listings_price ON listings(price_usd);
+CREATE INDEX IF NOT EXISTS idx_listings_first_seen ON listings(first_seen_at);
+CREATE INDEX IF NOT EXISTS idx_listings_changed ON listings(changed_at);
+CREATE INDEX IF NOT EXISTS idx_prices_observed ON prices(observed_at);
+CREATE INDEX IF NOT EXISTS idx_config_option ON config_options(section, option);
+"""
+
+# Details that change on every visit without the listing itself changing
+VOLATILE_FIELDS: Tuple[str, ...] = ("views", "favorites", "updated")
+# Tracked in the `prices` table instead, so a re-pricing is not also a content change
+PRICE_FIELDS: Tuple[str, ...] = ("price_usd", "price_kgs", "price_rub", "price_kzt", "credit_offer")
+
+
+def content_hash(details: CarDetails) -> str:
+    """
+    Hash of the listing's details, ignoring `VOLATILE_FIELDS` and `PRICE_FIELDS`.
+
+    Args:
+        details (CarDetails): Parsed details.
+
+    Returns:
+        str: Hex digest.
+    """
+    data: Dict[str, Any] = details.to_dict()
+    for name in VOLATILE_FIELDS + PRICE_FIELDS:
+        data.pop(name, None)
+    return hashlib.sha1(json.dumps(data, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class ListingDatabase:
+    """
+    SQLite listing database with batched upserts and price history.
+    """
+
+    def __init__(self, path: str, batch_size: int = 500) -> None:
+        """
+        Args:
+            path (str): SQLite database file.
+            batch_size (int): Listings buffered before one write transaction.
+        """
+        self.path: str = path
+        self.batch_size: int = batch_size
+        self._buffer: List[Tuple[CarListing, float]] = []
+        self._conn: sqlite3.Connection = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def add(self, listing: CarListing, observed_at: Optional[float] = None) -> None:
+        """
+        Queue a listing for upsert (listings without details are ignored).
+
+        Args:
+            listing (CarListing): Crawled listing.
+            observed_at (Optional[float]): Observation time; now if None.
+
+        Returns:
+            None
+        """
+        if listing.details is None:
+            return
+        self._buffer.append((listing, observed_at or time.time()))
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def add_many(self, listings: Iterable[CarListing], observed_at: Optional[float] = None) -> None:
+        for listing in listings:
+            self.add(listing, observed_at)
+        self.flush()
+
+    def flush(self) -> None:
+        """
+        Write all buffered listings in one transaction.
+
+        Returns:
+            None
+        """
+        if not self._buffer:
+            return
+        with self._conn:
+            for listing, observed_at in self._buffer:
+                self._upsert(listing, observed_at)
+        self._buffer.clear()
+
+    def _upsert(self, listing: CarListing, observed_at: float) -> None:
+        details: CarDetails = listing.details
+        digest: str = content_hash(details)
+        row = self._conn.execute(
+            "SELECT content_hash, price_usd, price_kgs FROM listings WHERE listing_id = ?",
+            (listing.listing_id,),
+        ).fetchone()
+
+        changed: bool = row is None or row[0] != digest
+        self._conn.execute(
+            """
+            INSERT INTO listings(listing_id, link, status, features, brand, model, generation, year,
+                                 mileage_km, price_usd, price_kgs, body_type, location, details,
+                                 content_hash, first_seen_at, last_seen_at, changed_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(listing_id) DO UPDATE SET
+                link = excluded.link, status = excluded.status, features = excluded.features,
+                brand = excluded.brand, model = excluded.model, generation = excluded.generation,
+                year = excluded.year, mileage_km = excluded.mileage_km, price_usd = excluded.price_usd,
+                price_kgs = excluded.price_kgs, body_type = excluded.body_type, location = excluded.location,
+                details = excluded.details, content_hash = excluded.content_hash,
+                last_seen_at = excluded.last_seen_at,
+                changed_at = CASE WHEN listings.content_hash = excluded.content_hash
+                                  THEN listings.changed_at ELSE excluded.changed_at END
+            """,
+            (
+                listing.listing_id, listing.link, listing.status, json.dumps(list(listing.features)),
+                details.brand, details.model, details.generation, details.year, details.mileage_km,
+                details.price_usd, details.price_kgs, details.body_type, details.location,
+                json.dumps(details.to_dict(), ensure_ascii=False), digest,
+                observed_at, observed_at, observed_at,
+            ),
+        )
+        if row is None or (row[1], row[2]) != (details.price_usd, details.price_kgs):
+            self._conn.execute(
+                "INSERT OR REPLACE INTO prices(listing_id, observed_at, price_usd, price_kgs) VALUES (?, ?, ?, ?)",
+                (listing.listing_id, observed_at, details.price_usd, details.price_kgs),
+            )
+        if not changed:
+            return
+
+        # Child tables are only rewritten when the content actually changed
+        for table in ("images", "config_options", "vin_history"):
+            self._conn.execute(f"DELETE FROM {table} WHERE listing_id = ?", (listing.listing_id,))
+        self._conn.executemany(
+            "INSERT INTO images(listing_id, position, url) VALUES (?, ?, ?)",
+            ((listing.listing_id, position, url) for position, url in enumerate(details.image_links)),
+        )
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO config_options(listing_id, section, option) VALUES (?, ?, ?)",
+            ((listing.listing_id, section, option)
+             for section, options in (details.configuration or {}).items() for option in options),
+        )
+        if details.vin_report is not None:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO vin_history(listing_id, source, record_count) VALUES (?, ?, ?)",
+                ((listing.listing_id, record.source, record.record_count)
+                 for record in details.vin_report.history_records),
+            )
+
+    def import_records(self, path: str, compression: Optional[str] = None,
+                       observed_at: Optional[float] = None) -> int:
+        """
+        Upsert every record of an NDJSON file (legacy or typed layout).
+
+        Args:
+            path (str): NDJSON record file.
+            compression (Optional[str]): Compression; inferred from suffix if None.
+            observed_at (Optional[float]): Observation time for all records; now if None.
+
+        Returns:
+            int: Number of listings with details that were upserted.
+        """
+        observed_at = observed_at or time.time()
+        count: int = 0
+        for listing in iter_listings(path, compression):
+            if listing.details is not None:
+                self.add(listing, observed_at)
+                count += 1
+        self.flush()
+        return count
+
+    def changes_since(self, since: float) -> Iterator[Dict[str, Any]]:
+        """
+        Listings that appeared, changed or were re-priced since a point in time.
+
+        Args:
+            since (float): Unix timestamp.
+
+        Yields:
+            Dict[str, Any]: {"kind": "new" | "changed" | "price_changed", "listing_id", "link",
+            "brand", "model", "year", "price_usd", "old_price_usd", "at"}.
+        """
+        self.flush()
+        for row in self._conn.execute(
+            "SELECT listing_id, link, brand, model, year, price_usd, first_seen_at FROM listings "
+            "WHERE first_seen_at >= ? ORDER BY first_seen_at",
+            (since,),
+        ):
+            yield self._change("new", row, None)
+        for row in self._conn.execute(
+            "SELECT listing_id, link, brand, model, year, price_usd, changed_at FROM listings "
+            "WHERE changed_at >= ? AND first_seen_at < ? ORDER BY changed_at",
+            (since, since),
+        ):
+            yield self._change("changed", row, None)
+        for row in self._conn.execute(
+            """
+            SELECT l.listing_id, l.link, l.brand, l.model, l.year, p.price_usd, p.observed_at,
+                   (SELECT q.price_usd FROM prices q
+                     WHERE q.listing_id = p.listing_id AND q.observed_at < p.observed_at
+                     ORDER BY q.observed_at DESC LIMIT 1) AS old_price
+            FROM prices p JOIN listings l ON l.listing_id = p.listing_id
+            WHERE p.observed_at >= ? AND l.first_seen_at < p.observed_at
+            ORDER BY p.observed_at
+            """,
+            (since,),
+        ):
+            yield self._change("price_changed", row[:7], row[7])
+
+    @staticmethod
+    def _change(kind: str, row: Tuple, old_price: Optional[int]) -> Dict[str, Any]:
+        listing_id, link, brand, model, year, price_usd, at = row
+        return {
+            "kind": kind,
+            "listing_id": listing_id,
+            "link": link,
+            "brand": brand,
+            "model": model,
+            "year": year,
+            "price_usd": price_usd,
+            "old_price_usd": old_price,
+            "at": at,
+        }
+
+    def price_history(self, listing_id: str) -> List[Tuple[float, Optional[int], Optional[int]]]:
+        """
+        Price observations of one listing.
+
+        Args:
+            listing_id (str): Listing ID.
+
+        Returns:
+            List[Tuple[float, Optional[int], Optional[int]]]: (observed_at, price_usd, price_kgs), oldest first.
+        """
+        return self._conn.execute(
+            "SELECT observed_at, price_usd, price_kgs FROM prices WHERE listing_id = ? ORDER BY observed_at",
+            (listing_id,),
+        ).fetchall()
+
+    def close(self) -> None:
+        self.flush()
+        self._conn.close()
+
+    def __enter__(self) -> "ListingDatabase":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
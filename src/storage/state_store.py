@@ -0,0 +1,221 @@
+"""
+src/storage/state_store.py — Persistent crawl checkpoint store (SQLite).
+
+Author: Danil
+Created: 2026-10-17
+Description:
+    Records which search pages and which detail URLs have been fetched/parsed
+    and with what outcome, so an interrupted crawl can be resumed:
+    - pages:   search result page URL → status ('pending' | 'done' | 'failed')
+    - details: detail page URL → listing info from the search page + status
+    - meta:    run identifier shared by the original run and its resumptions
+
+    Writes are committed in batches (`commit_every`) to keep the hot path cheap;
+    at most one batch of status updates is lost on a hard crash, and those
+    items are simply fetched again on the next `--resume`.
+
+Usage:
+    from storage.state_store import CrawlStateStore
+    store = CrawlStateStore("crawl_state.sqlite3")
+    store.add_pages(page_urls)
+    store.mark_page(url, "done")
+    store.close()
+
+Dependencies:
+    - sqlite3 (standard library)
+"""
+
+import json
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, Iterator, List
+
+PENDING: str = "pending"
+DONE: str = "done"
+FAILED: str = "failed"
+
+_SCHEMA: str = """
+CREATE TABLE IF NOT EXISTS pages (
+    url        TEXT PRIMARY KEY,
+    status     TEXT NOT NULL,
+    attempts   INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS details (
+    url        TEXT PRIMARY KEY,
+    listing    TEXT NOT NULL,
+    status     TEXT NOT NULL,
+    attempts   INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_pages_status ON pages(status);
+CREATE INDEX IF NOT EXISTS idx_details_status ON details(status);
+"""
+
+
+class CrawlStateStore:
+    """
+    SQLite-backed record of crawl progress for pages and detail URLs.
+    """
+
+    def __init__(self, path: str, commit_every: int = 200) -> None:
+        """
+        Args:
+            path (str): SQLite database file.
+            commit_every (int): Number of writes between commits.
+        """
+        self.path: str = path
+        self.commit_every: int = commit_every
+        self._pending_writes: int = 0
+        self._conn: sqlite3.Connection = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def _written(self, n: int = 1) -> None:
+        self._pending_writes += n
+        if self._pending_writes >= self.commit_every:
+            self.commit()
+
+    def commit(self) -> None:
+        self._conn.commit()
+        self._pending_writes = 0
+
+    def close(self) -> None:
+        self.commit()
+        self._conn.close()
+
+    def reset(self) -> None:
+        """
+        Forget all recorded progress (used for a fresh, non-resumed crawl).
+
+        Returns:
+            None
+        """
+        self._conn.execute("DELETE FROM pages")
+        self._conn.execute("DELETE FROM details")
+        self._conn.execute("DELETE FROM meta")
+        self.commit()
+
+    def run_id(self) -> float:
+        """
+        Identifier of the current crawl: its start time, kept across `--resume` runs.
+
+        Returns:
+            float: Run start timestamp.
+        """
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'run_id'").fetchone()
+        if row:
+            return float(row[0])
+        run_id: float = time.time()
+        self._conn.execute("INSERT INTO meta(key, value) VALUES ('run_id', ?)", (repr(run_id),))
+        self.commit()
+        return run_id
+
+    def has_pages(self) -> bool:
+        return self._conn.execute("SELECT 1 FROM pages LIMIT 1").fetchone() is not None
+
+    def add_pages(self, urls: Iterable[str]) -> None:
+        """
+        Register search pages as pending (existing entries are kept).
+
+        Args:
+            urls (Iterable[str]): Search page URLs.
+
+        Returns:
+            None
+        """
+        now: float = time.time()
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO pages(url, status, updated_at) VALUES (?, ?, ?)",
+            ((url, PENDING, now) for url in urls),
+        )
+        self.commit()
+
+    def mark_page(self, url: str, status: str) -> None:
+        self._conn.execute(
+            "UPDATE pages SET status = ?, attempts = attempts + 1, updated_at = ? WHERE url = ?",
+            (status, time.time(), url),
+        )
+        self._written()
+
+    def all_pages(self) -> List[str]:
+        """
+        Returns:
+            List[str]: Every registered search page, in insertion order.
+        """
+        return [row[0] for row in self._conn.execute("SELECT url FROM pages ORDER BY rowid")]
+
+    def unfinished_pages(self) -> List[str]:
+        """
+        Returns:
+            List[str]: Search pages that are pending or failed, in insertion order.
+        """
+        rows = self._conn.execute("SELECT url FROM pages WHERE status != ? ORDER BY rowid", (DONE,))
+        return [row[0] for row in rows]
+
+    def add_detail(self, item: Dict[str, Any]) -> bool:
+        """
+        Register a listing found on a search page.
+
+        Args:
+            item (Dict[str, Any]): Link info dictionary with a 'link' key.
+
+        Returns:
+            bool: True if the URL was not known yet and should be queued.
+        """
+        cursor = self._conn.execute(
+            "INSERT OR IGNORE INTO details(url, listing, status, updated_at) VALUES (?, ?, ?, ?)",
+            (item["link"], json.dumps(item, ensure_ascii=False), PENDING, time.time()),
+        )
+        self._written()
+        return cursor.rowcount == 1
+
+    def update_detail(self, item: Dict[str, Any]) -> None:
+        """
+        Replace the stored listing info of a registered URL (its status is kept),
+        e.g. after card data of a repeated occurrence was merged into it.
+
+        Args:
+            item (Dict[str, Any]): Link info dictionary with a 'link' key.
+
+        Returns:
+            None
+        """
+        self._conn.execute(
+            "UPDATE details SET listing = ?, updated_at = ? WHERE url = ?",
+            (json.dumps(item, ensure_ascii=False), time.time(), item["link"]),
+        )
+        self._written()
+
+    def mark_detail(self, url: str, status: str) -> None:
+        self._conn.execute(
+            "UPDATE details SET status = ?, attempts = attempts + 1, updated_at = ? WHERE url = ?",
+            (status, time.time(), url),
+        )
+        self._written()
+
+    def unfinished_details(self) -> Iterator[Dict[str, Any]]:
+        """
+        Yields:
+            Dict[str, Any]: Stored listing info for detail URLs that are pending or failed.
+        """
+        rows = self._conn.execute("SELECT listing FROM details WHERE status != ? ORDER BY rowid", (DONE,)).fetchall()
+        for (listing,) in rows:
+            yield json.loads(listing)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Returns:
+            Dict[str, Dict[str, int]]: Counts per status for pages and details.
+        """
+        result: Dict[str, Dict[str, int]] = {}
+        for table in ("pages", "details"):
+            rows = self._conn.execute(f"SELECT status, COUNT(*) FROM {table} GROUP BY status")
+            result[table] = {status: count for status, count in rows}
+        return result
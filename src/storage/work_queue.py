@@ -0,0 +1,445 @@
+"""
+src/storage/work_queue.py — Shared work queue for sharded crawls (SQLite, optional Redis).
+
+Author: Danil
+Created: 2026-10-17
+Description:
+    Coordinates several crawl workers (processes on one machine, or nodes
+    sharing a file system / Redis server) that split one crawl between them.
+    Every task has a kind ("page" or "detail"), a unique key (its URL), a JSON
+    payload and an optional shard number:
+    - `put_many`: enqueue tasks; keys already in the queue are ignored, so a
+      listing seen on two search pages is only queued once
+    - `claim`: atomically lease up to `limit` pending tasks of a shard (tasks
+      without a shard can be claimed by anyone); a lease expires after
+      `lease_seconds`, and `claim` hands expired tasks (those of a crashed or
+      stuck worker) out again
+    - `release_leases`: hand every leased task back before all workers restart
+    - `ack`: mark leased tasks done, or failed: a failed task goes back to
+      pending until it has been claimed `max_attempts` times, then it stays
+      failed (dead-lettered) until `retry_failed` queues it again
+    - `outstanding`: pending + leased tasks, used to decide when a worker may
+      stop; workers keep claiming while it is non-zero, which is how the
+      expired leases of a dead worker get picked up
+
+    `SqliteWorkQueue` is the local backend: one database file, each process
+    opens its own connection and claims inside `BEGIN IMMEDIATE` transactions.
+    `RedisWorkQueue` offers the same interface on a Redis server (needs the
+    optional `redis` package). `open_work_queue` picks the backend from a URL.
+
+Usage:
+    from storage.work_queue import open_work_queue
+    queue = open_work_queue("sqlite:///crawl_queue.sqlite3")
+    queue.put_many("page", [(url, {}, 0) for url in page_urls])
+    for task in queue.claim("page", "worker-0", shard=0, limit=4):
+        ...
+        queue.ack([task.id])
+
+Dependencies:
+    - sqlite3 (standard library)
+    - redis (optional, for redis:// queues)
+"""
+
+import json
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+PENDING: str = "pending"
+LEASED: str = "leased"
+DONE: str = "done"
+FAILED: str = "failed"
+
+_SCHEMA: str = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id          INTEGER PRIMARY KEY,
+    kind        TEXT NOT NULL,
+    key         TEXT NOT NULL,
+    shard       INTEGER,
+    payload     TEXT NOT NULL,
+    status      TEXT NOT NULL,
+    owner       TEXT,
+    lease_until REAL NOT NULL DEFAULT 0,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (kind, key)
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_claim ON tasks(kind, status, shard);
+"""
+
+# (key, payload, shard) as accepted by `put_many`
+TaskSpec = Tuple[str, Dict[str, Any], Optional[int]]
+
+
+@dataclass
+class Task:
+    """
+    A claimed unit of work.
+
+    Attributes:
+        id (Any): Backend-specific task identifier, passed back to `ack`.
+        kind (str): "page" or "detail".
+        key (str): Unique key within the kind (the URL).
+        payload (Dict[str, Any]): Data needed to process the task.
+    """
+    id: Any
+    kind: str
+    key: str
+    payload: Dict[str, Any]
+
+
+class SqliteWorkQueue:
+    """
+    Work queue stored in one SQLite file shared by all workers.
+    """
+
+    def __init__(self, path: str, lease_seconds: float = 600.0, max_attempts: int = 3) -> None:
+        """
+        Args:
+            path (str): SQLite database file.
+            lease_seconds (float): How long a claimed task stays reserved for its worker.
+            max_attempts (int): Claims after which a failed task is no longer retried.
+        """
+        self.path: str = path
+        self.lease_seconds: float = lease_seconds
+        self.max_attempts: int = max_attempts
+        self._conn: sqlite3.Connection = sqlite3.connect(path, timeout=60.0, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def reset(self) -> None:
+        """
+        Drop all tasks (used before preparing a fresh sharded crawl).
+
+        Returns:
+            None
+        """
+        self._conn.execute("DELETE FROM tasks")
+
+    def release_leases(self) -> int:
+        """
+        Return all leased tasks to the pending state (all workers are restarting).
+
+        Returns:
+            int: Number of released tasks.
+        """
+        return self._conn.execute(
+            "UPDATE tasks SET status = ?, owner = NULL, lease_until = 0 WHERE status = ?", (PENDING, LEASED)
+        ).rowcount
+
+    def retry_failed(self) -> int:
+        """
+        Queue the tasks that ran out of attempts once more (a resumed crawl).
+
+        Returns:
+            int: Number of requeued tasks.
+        """
+        return self._conn.execute(
+            "UPDATE tasks SET status = ?, owner = NULL, attempts = 0 WHERE status = ?", (PENDING, FAILED)
+        ).rowcount
+
+    def put_many(self, kind: str, tasks: Iterable[TaskSpec]) -> int:
+        """
+        Enqueue tasks; keys already present (in any state) are ignored.
+
+        Args:
+            kind (str): Task kind.
+            tasks (Iterable[TaskSpec]): (key, payload, shard) tuples; shard None = any worker.
+
+        Returns:
+            int: Number of tasks actually added.
+        """
+        before: int = self._conn.total_changes
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO tasks(kind, key, shard, payload, status) VALUES (?, ?, ?, ?, ?)",
+                ((kind, key, shard, json.dumps(payload, ensure_ascii=False), PENDING)
+                 for key, payload, shard in tasks),
+            )
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+        return self._conn.total_changes - before
+
+    def claim(self, kind: str, owner: str, shard: Optional[int] = None, limit: int = 1) -> List[Task]:
+        """
+        Lease up to `limit` pending (or expired) tasks of a shard; expired tasks
+        without attempts left are marked failed instead.
+
+        Args:
+            kind (str): Task kind.
+            owner (str): Worker name recorded on the lease.
+            shard (Optional[int]): Only tasks of this shard or without a shard; None = any task.
+            limit (int): Maximum number of tasks to lease.
+
+        Returns:
+            List[Task]: Leased tasks (empty if none are available right now).
+        """
+        now: float = time.time()
+        query: str = ("SELECT id, key, payload FROM tasks WHERE kind = ? "
+                      "AND (status = ? OR (status = ? AND lease_until < ?))")
+        params: List[Any] = [kind, PENDING, LEASED, now]
+        if shard is not None:
+            query += " AND (shard = ? OR shard IS NULL)"
+            params.append(shard)
+        query += " ORDER BY id LIMIT ?"
+        params.append(limit)
+
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            # An expired lease that used up its attempts (the task keeps crashing its worker) is dead
+            self._conn.execute(
+                "UPDATE tasks SET status = ?, owner = NULL WHERE kind = ? AND status = ? AND lease_until < ? "
+                "AND attempts >= ?",
+                (FAILED, kind, LEASED, now, self.max_attempts),
+            )
+            rows = self._conn.execute(query, params).fetchall()
+            self._conn.executemany(
+                "UPDATE tasks SET status = ?, owner = ?, lease_until = ?, attempts = attempts + 1 WHERE id = ?",
+                ((LEASED, owner, now + self.lease_seconds, row[0]) for row in rows),
+            )
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+        return [Task(row[0], kind, row[1], json.loads(row[2])) for row in rows]
+
+    def ack(self, ids: Iterable[Any], ok: bool = True) -> None:
+        """
+        Finish leased tasks.
+
+        Args:
+            ids (Iterable[Any]): Task ids returned by `claim`.
+            ok (bool): Mark them done (True) or failed (False; retried while
+                they have attempts left).
+
+        Returns:
+            None
+        """
+        if ok:
+            self._conn.executemany("UPDATE tasks SET status = ?, lease_until = 0 WHERE id = ?",
+                                   ((DONE, task_id) for task_id in ids))
+            return
+        self._conn.executemany(
+            "UPDATE tasks SET status = CASE WHEN attempts < ? THEN ? ELSE ? END, owner = NULL, lease_until = 0 "
+            "WHERE id = ?",
+            ((self.max_attempts, PENDING, FAILED, task_id) for task_id in ids),
+        )
+
+    def outstanding(self, kind: str, shard: Optional[int] = None) -> int:
+        """
+        Count tasks that are not finished yet (pending or leased).
+
+        Args:
+            kind (str): Task kind.
+            shard (Optional[int]): Only tasks claimable by this shard; None = all.
+
+        Returns:
+            int: Number of unfinished tasks.
+        """
+        query: str = "SELECT COUNT(*) FROM tasks WHERE kind = ? AND status IN (?, ?)"
+        params: List[Any] = [kind, PENDING, LEASED]
+        if shard is not None:
+            query += " AND (shard = ? OR shard IS NULL)"
+            params.append(shard)
+        return self._conn.execute(query, params).fetchone()[0]
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Task counts per kind and status.
+
+        Returns:
+            Dict[str, Dict[str, int]]: e.g. {"page": {"done": 40}, "detail": {"pending": 12}}.
+        """
+        result: Dict[str, Dict[str, int]] = {}
+        for kind, status, count in self._conn.execute(
+                "SELECT kind, status, COUNT(*) FROM tasks GROUP BY kind, status"):
+            result.setdefault(kind, {})[status] = count
+        return result
+
+
+class RedisWorkQueue:
+    """
+    Work queue on a Redis server: one list per (kind, shard), a set of seen keys
+    per kind and a hash of leased tasks per worker (each entry carries its lease
+    expiry and attempt count).
+    """
+
+    def __init__(self, url: str, prefix: str = "mashina", lease_seconds: float = 600.0,
+                 max_attempts: int = 3) -> None:
+        """
+        Args:
+            url (str): Redis URL, e.g. redis://host:6379/0.
+            prefix (str): Key prefix, so several crawls can share a server.
+            lease_seconds (float): How long a claimed task stays reserved for its worker.
+            max_attempts (int): Claims after which a failed task is no longer retried.
+        """
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("redis:// work queues require the 'redis' package")
+        self.prefix: str = prefix
+        self.lease_seconds: float = lease_seconds
+        self.max_attempts: int = max_attempts
+        self._redis = redis.Redis.from_url(url, decode_responses=True)
+
+    def _key(self, *parts: Any) -> str:
+        return ":".join([self.prefix, *map(str, parts)])
+
+    def close(self) -> None:
+        self._redis.close()
+
+    def reset(self) -> None:
+        keys: List[str] = list(self._redis.scan_iter(self._key("*")))
+        if keys:
+            self._redis.delete(*keys)
+
+    def _requeue(self, kind: str, entry: Dict[str, Any], front: bool = False) -> None:
+        shard: Optional[int] = entry.get("shard")
+        queue: str = self._key(kind, "queue", "any" if shard is None else shard)
+        raw: str = json.dumps({key: value for key, value in entry.items() if key != "lease_until"},
+                              ensure_ascii=False)
+        # rpop takes from the right: `front` puts the task first in line
+        if front:
+            self._redis.rpush(queue, raw)
+        else:
+            self._redis.lpush(queue, raw)
+
+    def _unlease(self, leased: str, key: str) -> Optional[Dict[str, Any]]:
+        raw: Optional[str] = self._redis.hget(leased, key)
+        # hdel decides the race between workers reclaiming the same expired lease
+        if raw is None or not self._redis.hdel(leased, key):
+            return None
+        kind: str = leased[len(self.prefix) + 1:].split(":", 1)[0]
+        self._redis.decr(self._key(kind, "leased_count"))
+        return json.loads(raw)
+
+    def _requeue_expired(self, kind: str) -> None:
+        now: float = time.time()
+        for leased in list(self._redis.smembers(self._key(kind, "leased_hashes"))):
+            for key, raw in self._redis.hgetall(leased).items():
+                if json.loads(raw).get("lease_until", 0) < now:
+                    entry: Optional[Dict[str, Any]] = self._unlease(leased, key)
+                    if entry is None:
+                        continue
+                    if entry.get("attempts", 0) < self.max_attempts:
+                        self._requeue(kind, entry, front=True)
+                    else:
+                        self._redis.lpush(self._key(kind, "dead"), json.dumps(entry, ensure_ascii=False))
+                        self._redis.incr(self._key(kind, FAILED))
+
+    def release_leases(self) -> int:
+        released: int = 0
+        for leased in list(self._redis.scan_iter(self._key("*", "leased", "*"))):
+            kind: str = leased[len(self.prefix) + 1:].split(":", 1)[0]
+            for key in self._redis.hkeys(leased):
+                entry: Optional[Dict[str, Any]] = self._unlease(leased, key)
+                if entry is not None:
+                    self._requeue(kind, entry)
+                    released += 1
+        return released
+
+    def retry_failed(self) -> int:
+        retried: int = 0
+        for kind in ("page", "detail"):
+            while True:
+                raw: Optional[str] = self._redis.rpop(self._key(kind, "dead"))
+                if raw is None:
+                    break
+                entry: Dict[str, Any] = json.loads(raw)
+                entry["attempts"] = 0
+                self._requeue(kind, entry)
+                self._redis.decr(self._key(kind, FAILED))
+                retried += 1
+        return retried
+
+    def put_many(self, kind: str, tasks: Iterable[TaskSpec]) -> int:
+        added: int = 0
+        for key, payload, shard in tasks:
+            if not self._redis.sadd(self._key(kind, "seen"), key):
+                continue
+            queue: str = self._key(kind, "queue", "any" if shard is None else shard)
+            self._redis.lpush(queue, json.dumps({"key": key, "payload": payload, "shard": shard},
+                                          ensure_ascii=False))
+            self._redis.sadd(self._key(kind, "queues"), queue)
+            added += 1
+        return added
+
+    def claim(self, kind: str, owner: str, shard: Optional[int] = None, limit: int = 1) -> List[Task]:
+        self._requeue_expired(kind)
+        if shard is None:
+            queues: List[str] = sorted(self._redis.smembers(self._key(kind, "queues")))
+        else:
+            queues = [self._key(kind, "queue", shard), self._key(kind, "queue", "any")]
+        leased: str = self._key(kind, "leased", owner)
+        self._redis.sadd(self._key(kind, "leased_hashes"), leased)
+        tasks: List[Task] = []
+        for queue in queues:
+            while len(tasks) < limit:
+                raw: Optional[str] = self._redis.rpop(queue)
+                if raw is None:
+                    break
+                entry: Dict[str, Any] = json.loads(raw)
+                entry["attempts"] = entry.get("attempts", 0) + 1
+                entry["lease_until"] = time.time() + self.lease_seconds
+                self._redis.hset(leased, entry["key"], json.dumps(entry, ensure_ascii=False))
+                self._redis.incr(self._key(kind, "leased_count"))
+                tasks.append(Task((leased, entry["key"]), kind, entry["key"], entry["payload"]))
+        return tasks
+
+    def ack(self, ids: Iterable[Any], ok: bool = True) -> None:
+        for leased, key in ids:
+            entry: Optional[Dict[str, Any]] = self._unlease(leased, key)
+            if entry is None:
+                continue
+            kind: str = leased[len(self.prefix) + 1:].split(":", 1)[0]
+            if ok:
+                self._redis.incr(self._key(kind, DONE))
+            elif entry.get("attempts", 0) < self.max_attempts:
+                self._requeue(kind, entry)
+            else:
+                self._redis.lpush(self._key(kind, "dead"), json.dumps(entry, ensure_ascii=False))
+                self._redis.incr(self._key(kind, FAILED))
+
+    def outstanding(self, kind: str, shard: Optional[int] = None) -> int:
+        if shard is None:
+            queues: List[str] = list(self._redis.smembers(self._key(kind, "queues")))
+        else:
+            queues = [self._key(kind, "queue", shard), self._key(kind, "queue", "any")]
+        pending: int = sum(self._redis.llen(queue) for queue in queues)
+        return pending + int(self._redis.get(self._key(kind, "leased_count")) or 0)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        result: Dict[str, Dict[str, int]] = {}
+        for kind in ("page", "detail"):
+            result[kind] = {
+                PENDING: self.outstanding(kind) - int(self._redis.get(self._key(kind, "leased_count")) or 0),
+                LEASED: int(self._redis.get(self._key(kind, "leased_count")) or 0),
+                DONE: int(self._redis.get(self._key(kind, DONE)) or 0),
+                FAILED: int(self._redis.get(self._key(kind, FAILED)) or 0),
+            }
+        return result
+
+
+def open_work_queue(url: str):
+    """
+    Open a work queue from a URL.
+
+    Args:
+        url (str): "sqlite:///path/to/queue.sqlite3", "redis://host:port/db",
+            or a plain file path (SQLite).
+
+    Returns:
+        Union[SqliteWorkQueue, RedisWorkQueue]: The queue backend.
+    """
+    if url.startswith(("redis://", "rediss://")):
+        return RedisWorkQueue(url)
+    if url.startswith("sqlite:///"):
+        url = url[len("sqlite:///"):]
+    return SqliteWorkQueue(url)
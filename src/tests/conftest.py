@@ -0,0 +1,116 @@
+"""
+src/tests/conftest.py — Shared pytest fixtures for the crawler test suite.
+
+Author: Danil
+Created: 2026-10-17
+Description:
+    The modules import each other relative to `src/` (`from config import ...`),
+    so `src/` is put on sys.path here. The page fixtures are the saved pages of
+    `data/reference_data/html/`, split like the extractor benchmark splits them;
+    `mock_site` serves the local mock of the site for end-to-end crawls.
+
+Usage:
+    cd src && python -m pytest -q
+"""
+
+import json
+import os
+import sys
+import urllib.request
+from typing import Any, Dict, Iterator, List
+
+import pytest
+
+SRC_DIR: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from benchmarks.bench_e2e import start_mock_server  # noqa: E402
+from benchmarks.bench_extractors import load_corpus  # noqa: E402
+from benchmarks.mock_server import MockSiteConfig  # noqa: E402
+from services.options import CrawlOptions  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def detail_pages() -> List[str]:
+    """
+    Saved detail pages.
+
+    Returns:
+        List[str]: HTML of each page.
+    """
+    details, _ = load_corpus()
+    assert details, "no saved detail pages"
+    return details
+
+
+@pytest.fixture(scope="session")
+def search_pages() -> List[str]:
+    """
+    Saved search result pages.
+
+    Returns:
+        List[str]: HTML of each page.
+    """
+    _, listings = load_corpus()
+    assert listings, "no saved search pages"
+    return listings
+
+
+class MockSiteHandle:
+    """
+    A running mock site: its base URL and request counters.
+    """
+
+    def __init__(self, base_url: str) -> None:
+        self.base_url: str = base_url
+        self.search_url: str = f"{base_url}/search/all/?page=1"
+
+    def crawl_options(self, workdir: str, **overrides: Any) -> CrawlOptions:
+        """
+        Options of an unthrottled crawl of the site with every file under `workdir`.
+
+        Args:
+            workdir (str): Directory for the output, checkpoint and index files.
+            **overrides: Other CrawlOptions fields.
+
+        Returns:
+            CrawlOptions: The options.
+        """
+        return CrawlOptions(
+            search_url=self.search_url,
+            host_rates={},
+            default_rate=1_000_000.0,
+            output_path=os.path.join(workdir, "results.ndjson"),
+            compression=None,
+            legacy_json_path=os.path.join(workdir, "results.json"),
+            state_path=os.path.join(workdir, "state.sqlite3"),
+            dead_letter_path=os.path.join(workdir, "dead_letters.ndjson"),
+            index_path=os.path.join(workdir, "index.sqlite3"),
+            removed_path=os.path.join(workdir, "removed.ndjson"),
+            **overrides,
+        )
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns:
+            Dict[str, int]: Responses answered so far, by page kind and status.
+        """
+        with urllib.request.urlopen(self.base_url + "/__stats", timeout=5) as resp:
+            return json.loads(resp.read())
+
+
+@pytest.fixture
+def mock_site() -> Iterator[MockSiteHandle]:
+    """
+    Mock site with 3 search pages of 5 listings each, served from a child process.
+
+    Yields:
+        MockSiteHandle: The running site.
+    """
+    process, base_url = start_mock_server(MockSiteConfig(pages=3, cards_per_page=5))
+    try:
+        yield MockSiteHandle(base_url)
+    finally:
+        process.terminate()
+        process.join()
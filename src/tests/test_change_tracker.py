@@ -0,0 +1,86 @@
+"""
+src/tests/test_change_tracker.py — Change events across crawls: new, price_changed, upped, removed.
+"""
+
+import pytest
+
+from models.legacy import listing_from_legacy
+from storage.change_tracker import ChangeTracker
+from storage.ndjson import iter_ndjson
+
+DAY: float = 86400.0
+T0: float = 1_700_000_000.0
+# Text an ad last upped 2 hours before T0 shows on each later day
+_SINCE_T0 = ["Обновлено 2 часа назад", "Обновлено 1 день назад", "Обновлено 2 дня назад", "Обновлено 3 дня назад"]
+
+
+def _listing(n, day=0, price="$ 16 300", updated=None, details=True):
+    updated = updated or _SINCE_T0[day]
+    car_details = {"title": "Kia K5, 2020", "price_usd": price, "price_kgs": "1 425 435 сом",
+                   "updated": updated, "views": "100", "favorites": "3"} if details else {}
+    return listing_from_legacy({"link": f"https://m.mashina.kg/details/kia-k5-{n:022x}", "status": None,
+                                "features": [], "car_details": car_details})
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return str(tmp_path / "snapshots.sqlite3"), str(tmp_path / "changes.ndjson")
+
+
+def _crawl(paths, listings, at, detect_removed=True):
+    with ChangeTracker(*paths) as tracker:
+        for listing in listings:
+            tracker.observe(listing, at=at)
+        removed = tracker.finish(detect_removed=detect_removed, at=at)
+        return dict(tracker.counts), removed
+
+
+def test_first_crawl_reports_new(paths):
+    counts, removed = _crawl(paths, [_listing(n) for n in range(3)], T0)
+    assert counts == {"new": 3} and removed == 0
+    assert [event["event"] for event in iter_ndjson(paths[1])] == ["new"] * 3
+
+
+def test_unchanged_crawl_reports_nothing(paths):
+    _crawl(paths, [_listing(n) for n in range(3)], T0)
+    # Same relative text an hour later: its drift is not an upping
+    counts, removed = _crawl(paths, [_listing(n, updated="Обновлено 3 часа назад") for n in range(3)], T0 + 3600)
+    assert counts == {} and removed == 0
+
+
+def test_price_change_and_upping(paths):
+    _crawl(paths, [_listing(n) for n in range(3)], T0)
+    listings = [_listing(0, 1, price="$ 15 900"), _listing(1, 1, updated="Обновлено 5 минут назад"), _listing(2, 1)]
+    counts, _ = _crawl(paths, listings, T0 + DAY)
+    assert counts == {"price_changed": 1, "upped": 1}
+    events = {event["event"]: event for event in iter_ndjson(paths[1]) if event["event"] != "new"}
+    assert events["price_changed"]["price_usd"] == [16300, 15900]
+    assert events["upped"]["listing_id"] == _listing(1).listing_id
+
+
+def test_missing_listing_removed_once_and_new_again(paths):
+    _crawl(paths, [_listing(n) for n in range(3)], T0)
+    counts, removed = _crawl(paths, [_listing(n, 1) for n in range(2)], T0 + DAY)
+    assert counts == {"removed": 1} and removed == 1
+    counts, removed = _crawl(paths, [_listing(n, 2) for n in range(2)], T0 + 2 * DAY)
+    assert counts == {} and removed == 0
+    counts, _ = _crawl(paths, [_listing(n, 3) for n in range(3)], T0 + 3 * DAY)
+    assert counts == {"new": 1}
+
+
+def test_failed_detail_fetch_is_not_removal(paths):
+    _crawl(paths, [_listing(n) for n in range(3)], T0)
+    listings = [_listing(0, 1), _listing(1, 1), _listing(2, 1, details=False)]
+    counts, removed = _crawl(paths, listings, T0 + DAY)
+    assert counts == {} and removed == 0
+    counts, _ = _crawl(paths, [_listing(n, 2) for n in range(3)], T0 + 2 * DAY)
+    assert counts == {}
+
+
+def test_partial_crawl_detects_no_removals(paths):
+    _crawl(paths, [_listing(n) for n in range(3)], T0)
+    counts, removed = _crawl(paths, [_listing(0, 1)], T0 + DAY, detect_removed=False)
+    assert counts == {} and removed == 0
+    # The listings it did not see are still live for the next complete crawl
+    counts, removed = _crawl(paths, [_listing(n, 2) for n in range(3)], T0 + 2 * DAY)
+    assert counts == {} and removed == 0
@@ -0,0 +1,61 @@
+"""
+src/tests/test_cli.py — Command-line parsing of main.py.
+"""
+
+import pytest
+
+from config import HOST_RATE_LIMITS
+from main import parse_args
+
+
+def test_defaults():
+    options, mode = parse_args([])
+    assert mode == "crawl"
+    assert options.host_rates == HOST_RATE_LIMITS
+
+
+def test_rate_overrides_and_adds_hosts():
+    options, _ = parse_args(["--rate", "m.mashina.kg=3", "--rate", "cdn.example=1.5"])
+    assert options.host_rates["m.mashina.kg"] == 3.0
+    assert options.host_rates["cdn.example"] == 1.5
+    assert options.host_rates["im.mashina.kg"] == HOST_RATE_LIMITS["im.mashina.kg"]
+
+
+@pytest.mark.parametrize("item", ["m.mashina.kg", "m.mashina.kg=", "m.mashina.kg=fast"])
+def test_rate_rejects_malformed(item):
+    with pytest.raises(SystemExit):
+        parse_args(["--rate", item])
+
+
+@pytest.mark.parametrize("argv, mode", [
+    (["--reparse-cache"], "reparse"),
+    (["--prepare-queue"], "prepare"),
+    (["--merge-shards"], "merge"),
+    (["--export-only", "--export", "csv"], "export"),
+    (["--sqlite-db", "db.sqlite3", "--changes-since", "24"], "changes"),
+])
+def test_modes(argv, mode):
+    assert parse_args(argv)[1] == mode
+
+
+@pytest.mark.parametrize("argv", [
+    ["--segments", "--lazy-pages"],
+    ["--segment-brands", "toyota"],
+    ["--detail-sample", "1.5"],
+    ["--export-only"],
+    ["--changes-since", "24"],
+    ["--export", "csv", "--partition-by", "brand"],
+    ["--workers", "2", "--worker-index", "2"],
+])
+def test_invalid_combinations(argv):
+    with pytest.raises(SystemExit):
+        parse_args(argv)
+
+
+def test_columnar_export_needs_pyarrow(monkeypatch, capsys):
+    monkeypatch.setattr("main.pyarrow_available", lambda: False)
+    with pytest.raises(SystemExit):
+        parse_args(["--export", "parquet"])
+    assert "requires the 'pyarrow' package" in capsys.readouterr().err
+    options, _ = parse_args(["--export", "csv"])
+    assert options.export_format == "csv"
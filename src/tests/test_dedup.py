@@ -0,0 +1,81 @@
+"""
+src/tests/test_dedup.py — Listing IDs, card merging and admission of repeated listings.
+"""
+
+import pytest
+
+from utils.dedup import BloomFilter, ListingDeduplicator, dedupe_listings, listing_id
+from utils.parse_listings import extract_links_from_html
+
+_URL = "https://m.mashina.kg/details/kia-k5-6855454d2d764519587823"
+
+
+def test_listing_id_ignores_query_and_slug_text():
+    assert listing_id(_URL) == "6855454d2d764519587823"
+    assert listing_id("/details/kia-optima-6855454D2D764519587823/?from=vip#top") == "6855454d2d764519587823"
+    assert listing_id("/details/no-id-here") == "no-id-here"
+
+
+def test_dedupe_listings_merges_cards():
+    items = [
+        {"link": _URL, "features": ["VIP"], "status": None},
+        {"link": _URL + "?from=top", "features": ["VIP", "Срочно"], "status": "Продано"},
+        {"link": "https://m.mashina.kg/details/toyota-camry-aaaaaaaaaaaaaaaa", "features": []},
+    ]
+    unique = dedupe_listings(items)
+    assert [listing_id(item["link"]) for item in unique] == ["6855454d2d764519587823", "aaaaaaaaaaaaaaaa"]
+    assert unique[0]["features"] == ["VIP", "Срочно"]
+    assert unique[0]["status"] == "Продано"
+
+
+@pytest.mark.parametrize("bloom_capacity", [0, 1000])
+def test_cards_repeated_across_pages_admitted_once(search_pages, bloom_capacity):
+    # A promoted listing shows up again on later pages of the same search
+    cards = extract_links_from_html(search_pages[0])
+    repeated = extract_links_from_html(search_pages[0], page_url="https://m.mashina.kg/search/all/?page=2")
+    dedup = ListingDeduplicator(bloom_capacity=bloom_capacity)
+    admitted = [item for item in cards + repeated if dedup.admit(item)]
+    assert len(admitted) == len({listing_id(item["link"]) for item in cards}) == len(dedupe_listings(cards + repeated))
+    assert dedup.duplicates == len(repeated)
+
+
+@pytest.mark.parametrize("bloom_capacity", [0, 1000])
+def test_admission(bloom_capacity):
+    dedup = ListingDeduplicator(bloom_capacity=bloom_capacity)
+    first = {"link": _URL, "features": []}
+    assert dedup.admit(first)
+    # Pending: merged into the queued occurrence
+    assert not dedup.admit({"link": _URL + "?from=vip", "features": ["VIP"]})
+    assert first["features"] == ["VIP"]
+    assert (dedup.duplicates, dedup.merged) == (1, 1)
+    # Written: still known, no longer merged
+    dedup.release(_URL)
+    assert not dedup.admit({"link": _URL, "features": ["Срочно"]})
+    assert first["features"] == ["VIP"]
+    assert (dedup.duplicates, dedup.merged) == (2, 1)
+
+
+def test_merge_reported_to_on_merge():
+    merged = []
+    dedup = ListingDeduplicator(on_merge=merged.append)
+    first = {"link": _URL, "features": [], "status": None}
+    assert dedup.admit(first)
+    assert not dedup.admit({"link": _URL, "features": []})
+    assert merged == []
+    assert not dedup.admit({"link": _URL, "features": ["VIP"], "status": "Продано"})
+    assert merged == [first] and first["status"] == "Продано"
+
+
+def test_bloom_admits_every_distinct_listing():
+    dedup = ListingDeduplicator(bloom_capacity=5000)
+    urls = [f"https://m.mashina.kg/details/car-{n:016x}" for n in range(5000)]
+    assert all(dedup.admit({"link": url}) for url in urls)
+    assert not any(dedup.admit({"link": url}) for url in urls)
+
+
+def test_bloom_filter_sizing():
+    bloom = BloomFilter(10_000, error_rate=1e-6)
+    assert bloom.add("a") and not bloom.add("a")
+    assert "a" in bloom and "b" not in bloom
+    assert bloom.count == 1
+    assert bloom.size >= 28 * 10_000 and bloom.hashes == 20
@@ -0,0 +1,103 @@
+"""
+src/tests/test_extractors.py — Detail extractor output parity across parse paths.
+"""
+
+import json
+import os
+
+import pytest
+
+from benchmarks.bench_extractors import FIXTURES_DIR
+import utils.parse_details
+from utils.parse_details import EXTRACTORS, extract_car_details
+from utils.parse_details.parser import make_soup
+from utils.parse_details.parser import compare_parsers, compare_scoped, history_unwrapped
+
+
+# VIN history of an older layout: no div.vin-report, and a source title after its link
+_UNWRAPPED_HISTORY = """
+<div class="car-name lw">Kia K5, 2020</div>
+<div class="block"><div class="title">ДТП</div><div class="link"><span class="green">Найдено 2 записи</span></div></div>
+<div class="block"><div><div class="link"><span class="green">Найдена 1 запись</span></div></div><div class="title">Пробег</div></div>
+"""
+
+
+def _expected(name):
+    with open(os.path.join(FIXTURES_DIR, f"{name}.expected.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _unwrap_vin_report(html):
+    start = html.index('<div class="vin-report">')
+    end = html.index('<a class="btn-product-modal"', start)
+    return html[:start] + _UNWRAPPED_HISTORY + html[end:]
+
+
+@pytest.mark.parametrize("name", ["detail_full", "detail_minimal"])
+@pytest.mark.parametrize("parser", ["lxml", "html.parser"])
+def test_registry_matches_baseline_lookups(name, parser):
+    # *.expected.json is the output of the extractors before the registry and
+    # precompiled selectors replaced their per-call select_one lookups
+    with open(os.path.join(FIXTURES_DIR, f"{name}.html"), encoding="utf-8") as f:
+        html = f.read()
+    expected = _expected(name)
+    assert extract_car_details(html, parser=parser, scoped=False) == expected
+    soup = make_soup(html, parser)
+    for spec in EXTRACTORS:
+        fields = spec.func(soup)
+        assert set(fields) == set(spec.fields)
+        assert fields == {key: expected[key] for key in spec.fields}
+
+
+def test_lxml_matches_html_parser(detail_pages):
+    for html in detail_pages:
+        assert compare_parsers(html, "html.parser", "lxml") == {}
+
+
+def test_lxml_matches_html_parser_on_broken_markup(detail_pages):
+    # Unclosed tags are repaired differently by the two backends
+    for html in detail_pages:
+        broken = html.replace("</div>", "", 5).replace("</span>", "", 3)
+        assert compare_parsers(broken, "html.parser", "lxml") == {}
+
+
+@pytest.mark.parametrize("parser", ["lxml", "html.parser"])
+def test_scoped_matches_full_parse(detail_pages, parser):
+    for html in detail_pages:
+        assert compare_scoped(html, parser) == {}
+
+
+@pytest.mark.parametrize("parser", ["lxml", "html.parser"])
+def test_scoped_matches_full_parse_without_vin_container(detail_pages, parser):
+    pages = [_unwrap_vin_report(html) for html in detail_pages if 'class="vin-report"' in html]
+    assert pages
+    for html in pages:
+        full = extract_car_details(html, parser=parser, scoped=False)
+        assert [r["source"] for r in full["vin_report"]["history_records"]] == ["ДТП", "Пробег"]
+        assert compare_scoped(html, parser) == {}
+
+
+@pytest.mark.parametrize("parser", ["lxml", "html.parser"])
+def test_history_markers_elsewhere_do_not_force_full_parse(detail_pages, parser, monkeypatch):
+    # Marker strings in scripts and other blocks, not VIN history elements
+    noise = ('<script>var nameClass = "car-name";</script>'
+             '<div class="seller-comments">Найден покупатель? Пишите</div><span class="green">Новый</span>')
+    parses = []
+
+    def counting_make_soup(html, parser=None, parse_only=None):
+        parses.append(parse_only)
+        return make_soup(html, parser, parse_only)
+
+    monkeypatch.setattr(utils.parse_details, "make_soup", counting_make_soup)
+    for html in detail_pages:
+        page = html.replace("</body>", noise + "</body>")
+        assert extract_car_details(page, parser=parser, scoped=True)["title"] is not None
+        assert not history_unwrapped(make_soup(page, parser, utils.parse_details.DETAIL_BLOCKS))
+    assert len(parses) == len(detail_pages)
+
+
+@pytest.mark.parametrize("parser", ["lxml", "html.parser"])
+def test_unwrapped_history_detected_in_scoped_tree(detail_pages, parser):
+    pages = [_unwrap_vin_report(html) for html in detail_pages if 'class="vin-report"' in html]
+    for html in pages:
+        assert history_unwrapped(make_soup(html, parser, utils.parse_details.DETAIL_BLOCKS))
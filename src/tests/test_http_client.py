@@ -0,0 +1,40 @@
+"""
+src/tests/test_http_client.py — Engine selection and connection pool limits.
+"""
+
+import asyncio
+
+import pytest
+
+from utils.http_client import AiohttpClient, create_client
+
+
+def test_unknown_engine_rejected():
+    with pytest.raises(ValueError, match="Unknown HTTP engine"):
+        create_client("curl")
+
+
+def test_aiohttp_pool_limits():
+    async def run():
+        client = create_client("aiohttp", pool_size=50, pool_size_per_host=10)
+        try:
+            assert isinstance(client, AiohttpClient)
+            connector = client._session.connector
+            return connector.limit, connector.limit_per_host
+        finally:
+            await client.close()
+
+    assert asyncio.run(run()) == (50, 10)
+
+
+def test_httpx_keepalive_covers_whole_pool():
+    pytest.importorskip("httpx")
+
+    async def run():
+        client = create_client("httpx", pool_size=50, pool_size_per_host=10)
+        try:
+            return client.limits.max_connections, client.limits.max_keepalive_connections
+        finally:
+            await client.close()
+
+    assert asyncio.run(run()) == (50, 50)
@@ -0,0 +1,57 @@
+"""
+src/tests/test_incremental.py — Incremental crawls against the mock site.
+"""
+
+import asyncio
+import json
+
+from services.crawl_service import main_crawl
+from storage.listing_index import ListingIndex
+from storage.ndjson import iter_ndjson
+
+_GONE = "https://m.mashina.kg/details/kia-k5-000000000000000000000001"
+
+
+def _seed_gone_listing(index_path):
+    index = ListingIndex(index_path, ttl_seconds=3600)
+    index.observe({"link": _GONE, "status": None, "features": []}, page=1, position=0, run_id=0.0)
+    index.record_details(_GONE, {"link": _GONE, "car_details": {"title": "Kia K5, 2020"}})
+    index.close()
+
+
+def test_second_run_carries_unchanged_and_marks_removed(mock_site, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    options = mock_site.crawl_options(str(tmp_path), incremental=True)
+    asyncio.run(main_crawl(options))
+    first = {record["link"]: record for record in iter_ndjson(options.output_path)}
+    assert len(first) == 15
+    assert not (tmp_path / "removed.ndjson").exists()
+
+    _seed_gone_listing(options.index_path)
+    before = mock_site.stats()
+    asyncio.run(main_crawl(options))
+
+    after = mock_site.stats()
+    assert after.get("details_200", 0) - before.get("details_200", 0) == 0
+    second = list(iter_ndjson(options.output_path))
+    assert {record["link"]: record for record in second} == first
+    assert len(second) == 15
+    markers = list(iter_ndjson(options.removed_path))
+    assert [marker["link"] for marker in markers] == [_GONE]
+    assert markers[0]["last_seen_run"] == 0.0
+    with open(options.legacy_json_path, encoding="utf-8") as f:
+        assert len(json.load(f)) == 15
+
+    # A removed listing is reported once, not on every later run
+    asyncio.run(main_crawl(options))
+    assert len(list(iter_ndjson(options.removed_path))) == 1
+
+
+def test_brand_restricted_run_marks_nothing_removed(mock_site, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert asyncio.run(main_crawl(mock_site.crawl_options(str(tmp_path), incremental=True)))
+    options = mock_site.crawl_options(str(tmp_path), incremental=True, segmented=True, segment_brands=("kia",))
+    # Not a complete crawl: the change tracker must not report removals either
+    assert not asyncio.run(main_crawl(options))
+    assert sum(1 for _ in iter_ndjson(options.output_path)) > 0
+    assert not (tmp_path / "removed.ndjson").exists()
@@ -0,0 +1,21 @@
+"""
+src/tests/test_legacy.py — Typed ⇄ legacy record conversion.
+"""
+
+from models.legacy import details_from_legacy, details_to_legacy, listing_from_legacy, listing_to_legacy
+from utils.parse_details import extract_car_details
+
+
+def test_legacy_round_trip(detail_pages):
+    for html in detail_pages:
+        details = extract_car_details(html)
+        assert details_to_legacy(details_from_legacy(details)) == details
+        record = {"link": "https://m.mashina.kg/details/kia-k5-6855454d2d764519587823", "status": "vip",
+                  "features": ["autoup"], "car_details": details}
+        assert listing_to_legacy(listing_from_legacy(record)) == record
+
+
+def test_reference_ids_kept_when_resolved(detail_pages):
+    details = {**extract_car_details(detail_pages[0]), "brand_id": 1, "model_id": None, "region_id": 2,
+               "town_id": None}
+    assert details_to_legacy(details_from_legacy(details)) == details
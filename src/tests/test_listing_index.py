@@ -0,0 +1,99 @@
+"""
+src/tests/test_listing_index.py — Incremental crawl index: refetch decisions, carried records, removals.
+"""
+
+import sqlite3
+
+import pytest
+
+from storage.listing_index import ListingIndex
+
+RUN_1: float = 1.0
+RUN_2: float = 2.0
+
+
+def _item(n, status=None, features=()):
+    return {"link": f"https://m.mashina.kg/details/kia-k5-{n:022d}", "status": status, "features": list(features)}
+
+
+def _record(item):
+    return {**item, "car_details": {"title": f"Kia K5 #{item['link'][-3:]}"}}
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = ListingIndex(str(tmp_path / "index.sqlite3"), ttl_seconds=3600)
+    yield index
+    index.close()
+
+
+def _first_run(index, items):
+    for position, item in enumerate(items):
+        assert index.observe(item, page=1, position=position, run_id=RUN_1) == "new"
+        index.record_details(item["link"], _record(item))
+
+
+def test_unchanged_listings_are_carried_forward(index):
+    items = [_item(n) for n in range(3)]
+    _first_run(index, items)
+    for position, item in enumerate(items):
+        assert index.observe(item, page=1, position=position, run_id=RUN_2) is None
+    assert list(index.carried_records(RUN_2)) == [_record(item) for item in items]
+
+
+def test_refetch_reasons(index):
+    items = [_item(n) for n in range(3)]
+    _first_run(index, items)
+    index.ttl_seconds = 3600
+    assert index.observe(_item(0, status="vip"), page=1, position=0, run_id=RUN_2) == "changed"
+    assert index.observe(items[1], page=1, position=1, run_id=RUN_2) is None
+    index.ttl_seconds = -1
+    assert index.observe(items[2], page=1, position=2, run_id=RUN_2) == "stale"
+    assert index.observe(_item(9), page=1, position=3, run_id=RUN_2) == "new"
+    # Only the listing that was not refetched is carried
+    assert [r["link"] for r in index.carried_records(RUN_2)] == [items[1]["link"]]
+
+
+def test_upped_listing(index):
+    item = _item(1)
+    assert index.observe(item, page=5, position=0, run_id=RUN_1) == "new"
+    index.record_details(item["link"], _record(item))
+    assert index.observe(item, page=1, position=0, run_id=RUN_2) == "upped"
+
+
+def test_refetched_record_replaces_carried_one(index):
+    item = _item(1)
+    _first_run(index, [item])
+    index.observe(item, page=1, position=0, run_id=RUN_2)
+    index.record_details(item["link"], {**_record(item), "car_details": {"title": "new"}})
+    assert list(index.carried_records(RUN_2)) == []
+
+
+def test_removed_markers(index):
+    items = [_item(n) for n in range(3)]
+    _first_run(index, items)
+    index.observe(items[0], page=1, position=0, run_id=RUN_2)
+    markers = index.mark_removed(RUN_2)
+    assert sorted(m["link"] for m in markers) == sorted(item["link"] for item in items[1:])
+    assert all(m["last_seen_run"] == RUN_1 for m in markers)
+    # Already removed listings are not reported twice; a returning one is new again
+    assert index.mark_removed(RUN_2) == []
+    assert index.observe(items[1], page=1, position=1, run_id=3.0) == "new"
+
+
+def test_old_index_without_records_is_migrated(tmp_path):
+    path = str(tmp_path / "old.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE listings (url TEXT PRIMARY KEY, page INTEGER, position INTEGER, status TEXT, "
+                 "features TEXT, updated TEXT, posted TEXT, fetched_at REAL, first_seen_at REAL NOT NULL, "
+                 "last_seen_run REAL NOT NULL, removed_at REAL)")
+    item = _item(1)
+    conn.execute("INSERT INTO listings VALUES (?, 1, 0, NULL, '[]', NULL, NULL, 1e12, 0, ?, NULL)", (item["link"], RUN_1))
+    conn.commit()
+    conn.close()
+    index = ListingIndex(path, ttl_seconds=3600)
+    try:
+        # Fresh, unchanged, but there is no record to carry forward
+        assert index.observe(item, page=1, position=0, run_id=RUN_2) == "new"
+    finally:
+        index.close()
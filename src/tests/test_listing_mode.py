@@ -0,0 +1,64 @@
+"""
+src/tests/test_listing_mode.py — Listing-only records and detail selection.
+"""
+
+import pytest
+
+from models.legacy import details_from_legacy
+from services.listing_mode import DetailSelector, offer_details, parse_detail_filter
+from utils.parse_details import extract_car_details
+from utils.parse_listings import extract_links_from_html
+
+SEARCH_URL = "https://m.mashina.kg/search/all/?page=1"
+
+
+@pytest.fixture(scope="module")
+def offers(search_pages):
+    items = extract_links_from_html(search_pages[0], page_url=SEARCH_URL, with_offers=True)
+    assert all(item.get("offer") for item in items)
+    return items
+
+
+def _detail(detail_pages, title):
+    return next(d for d in map(extract_car_details, detail_pages) if d["title"].startswith(title))
+
+
+def test_offer_details_has_the_detail_layout(offers, detail_pages):
+    full = extract_car_details(detail_pages[0])
+    for item in offers:
+        assert list(offer_details(item["offer"])) == list(full)
+
+
+def test_offer_prices_match_detail_page_formats(offers, detail_pages):
+    # The first card and detail_full.html are the same Kia K5
+    offer = offer_details(offers[0]["offer"])
+    full = _detail(detail_pages, "Kia K5")
+    assert offer["price_usd"] == full["price_usd"] == "$ 16 300"
+    assert details_from_legacy(offer).price_usd == details_from_legacy(full).price_usd == 16300
+
+    som = offer_details({"name": "Kia K5", "price": 1425435, "currency": "KGS"})
+    assert som["price_kgs"] == full["price_kgs"] == "1 425 435 сом"
+    assert som["price_usd"] is None
+
+
+def test_offer_fields_absent_from_search_page(offers):
+    offer = offer_details(offers[0]["offer"])
+    assert offer["year"] is None and offer["mileage"] is None and offer["vin_report"] is None
+    assert offer["title"] == offers[0]["offer"]["name"]
+    assert offer["image_links"] == [offers[0]["offer"]["image"]]
+
+
+def test_detail_filter(offers):
+    predicate = parse_detail_filter("price_usd<20000;title~kia;features=vip")
+    assert predicate(offers[0])
+    assert not parse_detail_filter("price_usd>20000")(offers[0])
+    with pytest.raises(ValueError):
+        parse_detail_filter("mileage<1000")
+
+
+def test_detail_sample_is_stable(offers):
+    selector = DetailSelector(sample_rate=0.5)
+    picked = [selector(item) for item in offers]
+    assert picked == [DetailSelector(sample_rate=0.5)(item) for item in offers]
+    assert not any(DetailSelector(sample_rate=0.0)(item) for item in offers)
+    assert all(DetailSelector(sample_rate=1.0)(item) for item in offers)
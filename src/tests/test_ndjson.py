@@ -0,0 +1,92 @@
+"""
+src/tests/test_ndjson.py — Streaming NDJSON sink and its JSON array conversion.
+"""
+
+import json
+
+import pytest
+
+from storage.ndjson import NDJsonWriter, iter_ndjson, ndjson_to_json_array, trim_partial_line
+
+_RECORDS = [
+    {"link": "https://m.mashina.kg/details/a", "car_details": {"title": "Kia K5, 2020", "price_usd": "$ 16 300"}},
+    {"link": "https://m.mashina.kg/details/b", "car_details": {}},
+]
+
+
+@pytest.mark.parametrize("suffix", [".ndjson", ".ndjson.gz"])
+def test_round_trip(tmp_path, suffix):
+    path = str(tmp_path / f"results{suffix}")
+    with NDJsonWriter(path, fsync_every=1) as sink:
+        for record in _RECORDS:
+            sink.write(record)
+    assert sink.count == 2
+    assert list(iter_ndjson(path)) == _RECORDS
+
+
+@pytest.mark.parametrize("records", [_RECORDS, []])
+def test_json_array_matches_json_dump(tmp_path, records):
+    src, dst = str(tmp_path / "results.ndjson"), str(tmp_path / "results.json")
+    with NDJsonWriter(src) as sink:
+        for record in records:
+            sink.write(record)
+    assert ndjson_to_json_array(src, dst) == len(records)
+    with open(dst, encoding="utf-8") as f:
+        assert f.read() == json.dumps(records, ensure_ascii=False, indent=2)
+
+
+def test_appended_refetch_kept_once(tmp_path):
+    src, dst = str(tmp_path / "results.ndjson"), str(tmp_path / "results.json")
+    with NDJsonWriter(src) as sink:
+        sink.write(_RECORDS[0])
+    # A resumed run appends, re-fetching a listing whose status was not committed
+    refetched = {**_RECORDS[0], "car_details": {"title": "Kia K5, 2020", "price_usd": "$ 15 900"}}
+    with NDJsonWriter(src, append=True) as sink:
+        sink.write(refetched)
+        sink.write(_RECORDS[1])
+    assert ndjson_to_json_array(src, dst, unique_by="link") == 2
+    with open(dst, encoding="utf-8") as f:
+        assert json.load(f) == [refetched, _RECORDS[1]]
+
+
+def test_append_after_crash_mid_line(tmp_path):
+    path = str(tmp_path / "results.ndjson")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"link":"a"}\n{"link":"b","x":')
+    with NDJsonWriter(path, append=True) as sink:
+        sink.write({"link": "c"})
+    assert list(iter_ndjson(path)) == [{"link": "a"}, {"link": "c"}]
+
+
+def test_append_after_crash_mid_gzip_stream(tmp_path):
+    path = str(tmp_path / "results.ndjson.gz")
+    with NDJsonWriter(path) as sink:
+        for n in range(200):
+            sink.write({"link": str(n), "pad": "x" * 50})
+    with open(path, "rb") as f:
+        cut = f.read()[:-100]
+    with open(path, "wb") as f:
+        f.write(cut)
+    with NDJsonWriter(path, append=True) as sink:
+        sink.write({"link": "last"})
+    records = list(iter_ndjson(path))
+    assert records[-1] == {"link": "last"}
+    assert [r["link"] for r in records[:-1]] == [str(n) for n in range(len(records) - 1)]
+
+
+def test_append_keeps_intact_files(tmp_path):
+    path = str(tmp_path / "results.ndjson")
+    with NDJsonWriter(path) as sink:
+        sink.write(_RECORDS[0])
+    assert trim_partial_line(path) == 0
+    assert trim_partial_line(str(tmp_path / "missing.ndjson")) == 0
+    assert list(iter_ndjson(path)) == [_RECORDS[0]]
+
+
+def test_on_sync_runs_once_records_are_on_disk(tmp_path):
+    path = str(tmp_path / "results.ndjson")
+    synced = []
+    with NDJsonWriter(path, fsync_every=2, on_sync=lambda: synced.append(len(list(iter_ndjson(path))))) as sink:
+        for record in _RECORDS + _RECORDS[:1]:
+            sink.write(record)
+    assert synced == [2, 3]
@@ -0,0 +1,64 @@
+"""
+src/tests/test_reference.py — Catalogue ID resolution and its JSON cache.
+"""
+
+import json
+import shutil
+
+import pytest
+
+from config import BRANDS_CATALOGUE_PATH, REGIONS_CATALOGUE_PATH
+from main import parse_args
+from models.reference import fold, load_reference_index
+
+
+@pytest.fixture(scope="module")
+def index():
+    return load_reference_index(cache_path=None)
+
+
+def test_reference_ids_are_opt_in():
+    assert parse_args([])[0].reference_ids is False
+    assert parse_args(["--reference-ids"])[0].reference_ids is True
+
+
+def test_fold():
+    assert fold("Mercedes-Benz") == fold("mercedes benz") == "mercedesbenz"
+    # Cyrillic "Е" matches the Latin one
+    assert fold("Е-Класс") == fold("E-Класс")
+
+
+def test_resolve(index):
+    ids = index.resolve({"brand": "Mercedes-Benz", "model": "E-Класс AMG",
+                         "car_location": "Чуйская область, Бишкек"})
+    assert all(ids[key] is not None for key in ("brand_id", "model_id", "region_id", "town_id"))
+    # Listing-only records have only a title
+    assert index.resolve({"title": "Mercedes-Benz E-Класс AMG, 2020"})["model_id"] == ids["model_id"]
+    assert index.resolve({"brand": "Nonexistent"}) == dict.fromkeys(ids)
+
+
+def test_json_cache_is_reused_and_invalidated(tmp_path, index):
+    brands = tmp_path / "brands.json"
+    regions = tmp_path / "regions.json"
+    shutil.copy(BRANDS_CATALOGUE_PATH, brands)
+    shutil.copy(REGIONS_CATALOGUE_PATH, regions)
+    cache = tmp_path / "index.cache.json"
+    details = {"brand": "Mercedes-Benz", "model": "E-Класс AMG", "car_location": "Чуйская область, Бишкек"}
+
+    built = load_reference_index(str(brands), str(regions), str(cache))
+    assert json.loads(cache.read_text(encoding="utf-8"))["version"]
+    assert load_reference_index(str(brands), str(regions), str(cache)).resolve(details) == index.resolve(details)
+
+    # A catalogue with different content rebuilds the cache
+    data = json.loads(brands.read_text(encoding="utf-8"))
+    data = [brand for brand in data if brand["name"] != "Mercedes-Benz"]
+    brands.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    assert load_reference_index(str(brands), str(regions), str(cache)).resolve(details)["brand_id"] is None
+    assert built.resolve(details)["brand_id"] is not None
+
+
+def test_unreadable_cache_is_rebuilt(tmp_path, index):
+    cache = tmp_path / "index.cache.json"
+    cache.write_text("not json", encoding="utf-8")
+    rebuilt = load_reference_index(cache_path=str(cache))
+    assert rebuilt.resolve({"brand": "Toyota"}) == index.resolve({"brand": "Toyota"})
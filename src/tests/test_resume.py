@@ -0,0 +1,132 @@
+"""
+src/tests/test_resume.py — Resuming an interrupted crawl against the mock site.
+"""
+
+import asyncio
+import json
+import sqlite3
+import subprocess
+import sys
+import textwrap
+import urllib.request
+
+from services import crawl_service
+from services.crawl_service import iter_listing_links, main_crawl
+from services.options import CrawlOptions
+from tests.conftest import SRC_DIR
+from storage.ndjson import iter_ndjson
+from storage.state_store import PENDING, CrawlStateStore
+from utils.dedup import ListingDeduplicator
+from utils.parse_listings import extract_links_from_html
+
+
+def _interrupt(options, last_page_links, lost_links, unsynced_link):
+    """
+    Roll a finished crawl back to where a crash would have left it: the last
+    search page not fetched, some listings fetched but not written, and one
+    record written whose status update was not committed yet.
+    """
+    with sqlite3.connect(options.state_path) as conn:
+        conn.execute("UPDATE pages SET status = ? WHERE url LIKE '%page=3'", (PENDING,))
+        conn.executemany("DELETE FROM details WHERE url = ?", ((link,) for link in last_page_links))
+        conn.executemany("UPDATE details SET status = ? WHERE url = ?",
+                         ((PENDING, link) for link in lost_links + [unsynced_link]))
+    records = [r for r in iter_ndjson(options.output_path)
+               if r["link"] not in last_page_links and r["link"] not in lost_links]
+    with open(options.output_path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def test_resume_fetches_only_unfinished_work(mock_site, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    options = mock_site.crawl_options(str(tmp_path))
+    asyncio.run(main_crawl(options))
+    with open(options.legacy_json_path, encoding="utf-8") as f:
+        complete = {record["link"]: record for record in json.load(f)}
+    assert len(complete) == 15
+
+    page_3 = mock_site.base_url + "/search/all/?page=3"
+    with urllib.request.urlopen(page_3, timeout=5) as resp:
+        last_page_links = [item["link"] for item in extract_links_from_html(resp.read().decode(), page_url=page_3)]
+    others = [link for link in complete if link not in last_page_links]
+    _interrupt(options, last_page_links, lost_links=others[:2], unsynced_link=others[2])
+    store = CrawlStateStore(options.state_path)
+    run_id = store.run_id()
+    store.close()
+    before = mock_site.stats()
+
+    asyncio.run(main_crawl(mock_site.crawl_options(str(tmp_path), resume=True)))
+
+    after = mock_site.stats()
+    assert after["search_200"] - before["search_200"] == 1
+    assert after["details_200"] - before["details_200"] == len(last_page_links) + 3
+    with open(options.legacy_json_path, encoding="utf-8") as f:
+        resumed = json.load(f)
+    # The re-fetched unsynced listing is written twice to the NDJSON but once to the JSON array
+    assert sum(1 for _ in iter_ndjson(options.output_path)) == 16
+    assert sorted(record["link"] for record in resumed) == sorted(complete)
+    store = CrawlStateStore(options.state_path)
+    assert store.run_id() == run_id
+    assert store.stats() == {"pages": {"done": 3}, "details": {"done": 15}}
+    store.close()
+
+
+# Crawl in a child process that dies hard (no flush, no cleanup) while writing
+# its 9th record; the checkpoint store commits after every write meanwhile
+_KILLED_CRAWL = textwrap.dedent("""
+    import asyncio, os, sys
+    from storage.ndjson import NDJsonWriter
+    from storage.state_store import CrawlStateStore
+    from services.crawl_service import main_crawl
+    from tests.conftest import MockSiteHandle
+
+    CrawlStateStore.__init__.__defaults__ = (1,)
+    write = NDJsonWriter.write
+
+    def write_then_die(self, record):
+        if self.count == 8:
+            os._exit(9)
+        write(self, record)
+
+    NDJsonWriter.write = write_then_die
+    site = MockSiteHandle(sys.argv[1])
+    asyncio.run(main_crawl(site.crawl_options(sys.argv[2], fsync_every=3, detail_concurrency=2)))
+""")
+
+
+def test_resume_after_hard_kill_loses_nothing(mock_site, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    killed = subprocess.run([sys.executable, "-c", _KILLED_CRAWL, mock_site.base_url, str(tmp_path)],
+                            cwd=SRC_DIR, capture_output=True, timeout=60)
+    assert killed.returncode == 9, killed.stderr.decode()[-2000:]
+    options = mock_site.crawl_options(str(tmp_path), resume=True)
+    asyncio.run(main_crawl(options))
+
+    with open(options.legacy_json_path, encoding="utf-8") as f:
+        links = [record["link"] for record in json.load(f)]
+    assert len(links) == len(set(links)) == 15
+    assert all(record["car_details"] for record in iter_ndjson(options.output_path))
+
+
+def test_card_merged_from_later_page_is_stored(tmp_path, monkeypatch):
+    link = "https://m.mashina.kg/details/kia-k5-6855454d2d764519587823"
+    cards = {"page=1": [{"link": link, "status": None, "features": []}],
+             "page=2": [{"link": link + "?from=vip", "status": None, "features": ["VIP"]}]}
+
+    async def fetch_listing_page(url, **kwargs):
+        return url, True, cards[url.rsplit("?", 1)[1]]
+
+    async def crawl_listings():
+        return [item async for item in iter_listing_links(pages, CrawlOptions(listing_concurrency=1), store,
+                                                          dedup=dedup)]
+
+    monkeypatch.setattr(crawl_service, "fetch_listing_page", fetch_listing_page)
+    pages = [f"https://m.mashina.kg/search/all/?{page}" for page in cards]
+    store = CrawlStateStore(str(tmp_path / "state.sqlite3"))
+    store.add_pages(pages)
+    dedup = ListingDeduplicator(on_merge=store.update_detail)
+    assert [item["link"] for item in asyncio.run(crawl_listings())] == [link]
+    # What a resumed run would queue again
+    assert list(store.unfinished_details()) == [{"link": link, "status": None, "features": ["VIP"]}]
+    store.close()
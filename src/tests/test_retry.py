@@ -0,0 +1,79 @@
+"""
+src/tests/test_retry.py — Retry back-off ownership and dead-letter re-queueing.
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from utils import fetch
+from utils.http_client import FetchResponse
+from utils.rate_limit import HostRateLimiter
+from utils.retry import DeadLetterQueue, RetryPolicy, release_dead_letters, take_dead_letters
+
+_URL = "https://m.mashina.kg/details/kia-k5-6855454d2d764519587823"
+
+
+class _CountingPolicy(RetryPolicy):
+    delays: int = 0
+
+    def delay(self, attempt, retry_after=None):
+        self.delays += 1
+        return 0.05
+
+
+class _ScriptedClient:
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+
+    async def get(self, url, headers=None):
+        return FetchResponse(url=url, status=self.statuses.pop(0))
+
+
+@pytest.fixture
+def policy():
+    policy = _CountingPolicy(max_attempts=3)
+    fetch.set_retry_policy(policy)
+    yield policy
+    fetch.set_retry_policy(None)
+    fetch.set_rate_limiter(None)
+
+
+def test_rate_limiter_owns_the_back_off(policy):
+    fetch.set_rate_limiter(HostRateLimiter({}, default_rate=1000.0, backoff_base=0.2))
+    start = time.monotonic()
+    response = asyncio.run(fetch._get_with_retries(_ScriptedClient([503, 200]), _URL, None))
+    elapsed = time.monotonic() - start
+    assert response.status == 200
+    assert policy.delays == 0
+    assert 0.2 <= elapsed < 0.4
+
+
+def test_policy_backs_off_without_rate_limiter(policy):
+    response = asyncio.run(fetch._get_with_retries(_ScriptedClient([503, 503, 200]), _URL, None))
+    assert response.status == 200
+    assert policy.delays == 2
+
+
+def _dead_letters(path, urls):
+    with DeadLetterQueue(path, append=True) as queue:
+        for url in urls:
+            queue.add("detail", url, {"link": url}, reason="no details")
+
+
+def test_interrupted_requeue_keeps_its_entries(tmp_path):
+    path = str(tmp_path / "dead_letters.ndjson")
+    _dead_letters(path, ["a", "b", "c"])
+    assert sorted(entry["url"] for entry in take_dead_letters(path)) == ["a", "b", "c"]
+
+    # The re-queue run dead-letters "a" again and crashes before reaching "b" and "c"
+    _dead_letters(path, ["a"])
+    assert sorted(entry["url"] for entry in take_dead_letters(path)) == ["a", "b", "c"]
+
+    # This run finishes; only its new failure is left
+    _dead_letters(path, ["c"])
+    release_dead_letters(path)
+    assert [entry["url"] for entry in take_dead_letters(path)] == ["c"]
+    release_dead_letters(path)
+    assert take_dead_letters(path) == []
@@ -0,0 +1,133 @@
+"""
+src/tests/test_scheduler.py — Bounded-concurrency scheduler: limits, back-pressure and failures.
+"""
+
+import asyncio
+import sqlite3
+
+import pytest
+
+from services import crawl_service
+from services.scheduler import CrawlScheduler
+from storage.ndjson import iter_ndjson
+from storage.state_store import CrawlStateStore
+
+
+def test_results_and_failures():
+    async def handler(n):
+        if n == 3:
+            raise ValueError("boom")
+        await asyncio.sleep(0)
+        return n * 2
+
+    async def run():
+        return [r async for r in CrawlScheduler(4).map(range(10), handler)]
+
+    assert sorted(asyncio.run(run())) == [n * 2 for n in range(10) if n != 3]
+
+
+def test_concurrency_limit():
+    active = peak = 0
+
+    async def handler(n):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.001)
+        active -= 1
+        return n
+
+    async def run():
+        return [r async for r in CrawlScheduler(3).map(range(30), handler)]
+
+    assert len(asyncio.run(run())) == 30
+    assert peak <= 3
+
+
+def test_slow_consumer_bounds_buffered_work():
+    concurrency = 2
+    pulled = 0
+
+    async def items():
+        nonlocal pulled
+        for n in range(1000):
+            pulled += 1
+            yield n
+
+    async def handler(n):
+        return n
+
+    async def run():
+        consumed = 0
+        results = CrawlScheduler(concurrency).map(items(), handler)
+        try:
+            async for _ in results:
+                consumed += 1
+                await asyncio.sleep(0.001)
+                # input queue + result queue + in-flight handlers + the item being fed
+                assert pulled - consumed <= concurrency * 2 * 2 + concurrency + 1
+                if consumed == 50:
+                    break
+        finally:
+            await results.aclose()
+
+    asyncio.run(asyncio.wait_for(run(), timeout=10))
+
+
+def test_input_stream_failure_raised_after_drain():
+    async def items():
+        for n in range(5):
+            yield n
+        raise sqlite3.OperationalError("database is locked")
+
+    async def handler(n):
+        return n
+
+    async def run():
+        results = []
+        with pytest.raises(sqlite3.OperationalError):
+            async for r in CrawlScheduler(2).map(items(), handler):
+                results.append(r)
+        return results
+
+    assert sorted(asyncio.run(run())) == list(range(5))
+
+
+def test_handler_failures_reach_on_error():
+    async def handler(n):
+        if n % 3 == 0:
+            raise ValueError(n)
+        return n
+
+    async def run():
+        return [r async for r in CrawlScheduler(4).map(range(9), handler, on_error=lambda n, e: -n)]
+
+    assert sorted(asyncio.run(run())) == sorted([1, 2, 4, 5, 7, 8, 0, -3, -6])
+
+
+def test_crawl_dead_letters_listing_whose_handler_raises(mock_site, tmp_path, monkeypatch):
+    fetch = crawl_service.fetch_listing_details
+
+    async def flaky(item, **kwargs):
+        if item["link"].endswith("4519587823"):
+            raise RuntimeError("parse pool died")
+        return await fetch(item, **kwargs)
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(crawl_service, "fetch_listing_details", flaky)
+    options = mock_site.crawl_options(str(tmp_path))
+    asyncio.run(crawl_service.main_crawl(options))
+    failed = [r["link"] for r in iter_ndjson(options.output_path) if not r["car_details"]]
+    assert failed and all(link.endswith("4519587823") for link in failed)
+    assert sorted(entry["url"] for entry in iter_ndjson(options.dead_letter_path)) == sorted(failed)
+    assert sum(1 for _ in iter_ndjson(options.output_path)) == 15
+
+
+def test_crawl_fails_when_listing_stage_raises(mock_site, tmp_path, monkeypatch):
+    def broken(self, item):
+        raise sqlite3.OperationalError("disk I/O error")
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(CrawlStateStore, "add_detail", broken)
+    with pytest.raises(sqlite3.OperationalError):
+        asyncio.run(crawl_service.main_crawl(mock_site.crawl_options(str(tmp_path))))
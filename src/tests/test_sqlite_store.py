@@ -0,0 +1,97 @@
+"""
+src/tests/test_sqlite_store.py — Listing database upserts, price history and change queries.
+"""
+
+import json
+import os
+
+import pytest
+
+from models.legacy import listing_from_legacy
+from storage.sqlite_store import ListingDatabase
+
+from tests.conftest import SRC_DIR
+
+DAY: float = 86400.0
+T0: float = 1_700_000_000.0
+_LINK = "https://m.mashina.kg/details/kia-k5-6855454d2d764519587823"
+
+with open(os.path.join(SRC_DIR, "data", "reference_data", "html", "detail_full.expected.json"),
+          encoding="utf-8") as _f:
+    _DETAILS = json.load(_f)
+
+
+def _listing(link=_LINK, **details):
+    return listing_from_legacy({"link": link, "status": None, "features": [],
+                                "car_details": {**_DETAILS, **details}})
+
+
+@pytest.fixture
+def db(tmp_path):
+    with ListingDatabase(str(tmp_path / "listings.sqlite3")) as db:
+        yield db
+
+
+def _row(db, listing_id, columns):
+    return db._conn.execute(f"SELECT {columns} FROM listings WHERE listing_id = ?", (listing_id,)).fetchone()
+
+
+def _children(db, listing_id):
+    return {table: db._conn.execute(f"SELECT * FROM {table} WHERE listing_id = ? ORDER BY 2, 3",
+                                    (listing_id,)).fetchall()
+            for table in ("images", "config_options", "vin_history")}
+
+
+def test_reobservation_updates_in_place(db):
+    listing = _listing()
+    db.add_many([listing], observed_at=T0)
+    db.add_many([_listing(views="250", updated="Обновлено 1 день назад")], observed_at=T0 + DAY)
+
+    assert db._conn.execute("SELECT COUNT(*) FROM listings").fetchone() == (1,)
+    assert _row(db, listing.listing_id, "first_seen_at, last_seen_at, changed_at") == (T0, T0 + DAY, T0)
+    assert json.loads(_row(db, listing.listing_id, "details")[0])["views"] == 250
+    assert list(db.changes_since(T0 + DAY)) == []
+
+
+def test_child_tables_rewritten_only_on_content_change(db):
+    listing = _listing()
+    db.add_many([listing], observed_at=T0)
+    children = _children(db, listing.listing_id)
+    assert len(children["images"]) == len(_DETAILS["image_links"])
+    assert len(children["config_options"]) == 3
+    assert len(children["vin_history"]) == 2
+
+    # A re-priced listing keeps its images, options and VIN history rows
+    db.add_many([_listing(price_usd="$ 15 900")], observed_at=T0 + DAY)
+    assert _children(db, listing.listing_id) == children
+
+    db.add_many([_listing(image_links=["https://cdn.mashina.kg/new.jpg"], configuration={},
+                          vin_report=None)], observed_at=T0 + 2 * DAY)
+    assert _children(db, listing.listing_id) == {
+        "images": [(listing.listing_id, 0, "https://cdn.mashina.kg/new.jpg")], "config_options": [], "vin_history": [],
+    }
+
+
+def test_price_history_records_each_new_price(db):
+    listing = _listing()
+    for day, price in enumerate(["$ 16 300", "$ 16 300", "$ 15 900", "$ 15 900", "$ 16 100"]):
+        db.add_many([_listing(price_usd=price)], observed_at=T0 + day * DAY)
+    assert [(at, usd) for at, usd, _ in db.price_history(listing.listing_id)] == [
+        (T0, 16300), (T0 + 2 * DAY, 15900), (T0 + 4 * DAY, 16100),
+    ]
+
+
+def test_changes_since_reports_each_listing_once(db):
+    priced, edited = _listing(), _listing(_LINK.replace("23", "24"))
+    db.add_many([priced, edited], observed_at=T0)
+    fresh = _listing(_LINK.replace("23", "25"))
+    db.add_many([_listing(price_usd="$ 15 900"), _listing(edited.link, mileage="90 000 км"), fresh],
+                observed_at=T0 + DAY)
+
+    changes = {change["listing_id"]: change for change in db.changes_since(T0 + DAY)}
+    assert len(list(db.changes_since(T0 + DAY))) == 3
+    assert changes[fresh.listing_id]["kind"] == "new"
+    assert changes[edited.listing_id]["kind"] == "changed"
+    assert changes[priced.listing_id]["kind"] == "price_changed"
+    assert (changes[priced.listing_id]["old_price_usd"], changes[priced.listing_id]["price_usd"]) == (16300, 15900)
+    assert list(db.changes_since(T0 + 2 * DAY)) == []
@@ -0,0 +1,105 @@
+"""
+src/tests/test_work_queue.py — Shared work queue: leases, expiry, retries; sharded page claiming.
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from services.sharding import ShardRouter
+from storage.state_store import CrawlStateStore
+from storage.work_queue import DONE, FAILED, LEASED, PENDING, SqliteWorkQueue, open_work_queue
+
+PAGES = [f"https://m.mashina.kg/search/all/?page={n}" for n in range(1, 5)]
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = SqliteWorkQueue(str(tmp_path / "queue.sqlite3"), lease_seconds=60, max_attempts=2)
+    queue.put_many("page", ((url, {}, None) for url in PAGES))
+    yield queue
+    queue.close()
+
+
+def test_put_many_ignores_known_keys(queue):
+    assert queue.put_many("page", [(PAGES[0], {}, None), ("new", {}, None)]) == 1
+    assert queue.outstanding("page") == len(PAGES) + 1
+
+
+def test_claim_and_ack(queue):
+    tasks = queue.claim("page", "worker-0", limit=3)
+    assert [task.key for task in tasks] == PAGES[:3]
+    assert queue.claim("page", "worker-1", limit=3)[0].key == PAGES[3]
+    queue.ack([task.id for task in tasks])
+    assert queue.stats()["page"] == {DONE: 3, LEASED: 1}
+    assert queue.outstanding("page") == 1
+
+
+def test_shard_filter(tmp_path):
+    queue = open_work_queue(f"sqlite:///{tmp_path / 'queue.sqlite3'}")
+    queue.put_many("detail", [("a", {}, 0), ("b", {}, 1), ("c", {}, None)])
+    assert sorted(task.key for task in queue.claim("detail", "worker-1", shard=1, limit=5)) == ["b", "c"]
+    assert queue.outstanding("detail", shard=0) == 2  # "a", and "c" leased by worker-1
+    queue.close()
+
+
+def test_expired_lease_is_claimed_again(queue):
+    queue.lease_seconds = -1
+    stale = queue.claim("page", "worker-0", limit=1)
+    queue.lease_seconds = 60
+    reclaimed = queue.claim("page", "worker-1", limit=1)
+    assert [task.key for task in reclaimed] == [stale[0].key]
+
+
+def test_failed_task_is_retried_then_dead(queue):
+    task = queue.claim("page", "worker-0", limit=1)[0]
+    queue.ack([task.id], ok=False)
+    again = queue.claim("page", "worker-1", limit=1)[0]
+    assert again.key == task.key
+    queue.ack([again.id], ok=False)
+    assert queue.stats()["page"][FAILED] == 1
+    assert task.key not in [t.key for t in queue.claim("page", "worker-1", limit=10)]
+    # A resumed crawl gives it another round
+    assert queue.retry_failed() == 1
+    assert queue.stats()["page"][PENDING] == 1
+
+
+def test_expired_lease_without_attempts_left_is_dead(queue):
+    queue.lease_seconds = -1
+    for _ in range(2):
+        queue.claim("page", "worker-0", limit=1)
+    queue.lease_seconds = 60
+    assert PAGES[0] not in [task.key for task in queue.claim("page", "worker-1", limit=10)]
+    assert queue.stats()["page"][FAILED] == 1
+
+
+def test_release_leases(queue):
+    queue.claim("page", "worker-0", limit=2)
+    assert queue.release_leases() == 2
+    assert queue.stats()["page"] == {PENDING: len(PAGES)}
+
+
+def test_router_takes_over_pages_of_a_dead_worker(queue, tmp_path):
+    # worker-1 leases a page and dies without acknowledging it
+    queue.lease_seconds = 0.2
+    orphan = queue.claim("page", "worker-1", limit=1)[0]
+    queue.lease_seconds = 60
+    router = ShardRouter(queue, 0, 2, "hash", claim_batch=10, poll_interval=0.05)
+    store = CrawlStateStore(str(tmp_path / "state.sqlite3"))
+
+    async def crawl():
+        seen = []
+        async for url in router.pages(store):
+            seen.append(url)
+            router.page_done(url, True)
+        return seen
+
+    try:
+        start = time.monotonic()
+        seen = asyncio.run(asyncio.wait_for(crawl(), timeout=10))
+    finally:
+        store.close()
+    assert sorted(seen) == sorted(PAGES)
+    assert orphan.key in seen and time.monotonic() - start >= 0.1
+    assert queue.outstanding("page") == 0
@@ -6,7 +6,9 @@ Created: 2025-06-23
 
 Description:
     This module re-exports key utility functions from the utils package:
-    - fetch_html:       Fetches raw HTML content from a URL.
+    - fetch_html:       Fetches raw HTML content from a URL (synchronous fallback).
+    - fetch_html_async: Fetches raw HTML content through the shared async client.
+    - close_client:     Closes the shared async HTTP client.
     - get_total_pages:  Retrieves total pagination page count from a URL.
     - build_page_links: Generates a list of paginated URLs based on the base URL.
     - extract_links_from_html: Extracts car listing links from a page's HTML.
@@ -19,12 +21,13 @@ Usage:
 
 Project Structure:
     - fetch.py           : HTTP fetching utilities.
+    - http_client.py     : Pooled async HTTP client engines (aiohttp / httpx / requests).
     - pagination.py      : Pagination link extraction and generation.
     - parse_listings.py  : Parsing car listing overview pages.
     - parse_details/     : Directory containing detailed car page parsers.
 """
 
-from .fetch import fetch_html
+from .fetch import fetch_html, fetch_html_async, close_client
 from .pagination import get_total_pages, build_page_links
 from .parse_listings import extract_links_from_html
 from .parse_details import extract_car_details, fetch_and_parse_car
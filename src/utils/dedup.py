@@ -0,0 +1,218 @@
+"""
+src/utils/dedup.py — Listing identity and deduplication of search results.
+
+Author: Danil
+Created: 2026-10-17
+Description:
+    VIP / premium listings are pinned to many search pages, and the same
+    listing can be linked with slightly different URLs. This module makes sure
+    every listing is fetched once:
+    - `listing_id`: stable listing ID from the detail URL slug
+      (`.../details/kia-k5-6855454d2d764519587823` → `6855454d2d764519587823`)
+    - `merge_listing`: folds another occurrence into a link info dict
+      (union of `features`, first non-empty `status`)
+    - `ListingDeduplicator`: admits the first occurrence of each listing ID;
+      later occurrences are merged into it while its detail page is still
+      queued or being fetched (`on_merge` persists the merged card), and
+      dropped afterwards
+    - `BloomFilter`: fixed-size probabilistic set used instead of an exact set
+      of IDs when memory must stay bounded on very large runs (a false
+      positive skips a listing, with probability `error_rate`)
+
+Usage:
+    from utils.dedup import ListingDeduplicator
+    dedup = ListingDeduplicator(bloom_capacity=5_000_000)
+    for item in extract_links_from_html(html):
+        if dedup.admit(item):
+            queue(item)
+    dedup.release(item["link"])   # once its record is written
+
+Dependencies:
+    - hashlib, math, re (standard library)
+"""
+
+import hashlib
+import math
+import re
+from typing import Any, Callable, Dict, List, Optional, Set, Union
+from urllib.parse import urlsplit
+
+# Trailing hex token of a detail slug: "<brand>-<model>-<id>"
+_ID_RE = re.compile(r"-([0-9a-f]{12,})$", re.IGNORECASE)
+
+
+def listing_id(url: str) -> str:
+    """
+    Listing ID parsed from a detail page URL.
+
+    Args:
+        url (str): Absolute or relative detail URL (query and fragment are ignored).
+
+    Returns:
+        str: The hex ID at the end of the slug, or the whole slug if it has none.
+    """
+    slug: str = urlsplit(url).path.rstrip("/").rsplit("/", 1)[-1]
+    match = _ID_RE.search(slug)
+    return match.group(1).lower() if match else slug
+
+
+def merge_listing(target: Dict[str, Any], other: Dict[str, Any]) -> bool:
+    """
+    Merge the search-card data of another occurrence of the same listing.
+
+    Args:
+        target (Dict[str, Any]): Link info dict that is kept (updated in place).
+        other (Dict[str, Any]): Another occurrence.
+
+    Returns:
+        bool: True if `target` changed.
+    """
+    changed: bool = False
+    features: List[str] = list(target.get("features") or [])
+    for feature in other.get("features") or []:
+        if feature not in features:
+            features.append(feature)
+            changed = True
+    if changed:
+        target["features"] = features
+    if not target.get("status") and other.get("status"):
+        target["status"] = other["status"]
+        changed = True
+    return changed
+
+
+def dedupe_listings(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Collapse repeated listings of one search page, merging their card data.
+
+    Args:
+        items (List[Dict[str, Any]]): Output of `extract_links_from_html`.
+
+    Returns:
+        List[Dict[str, Any]]: One entry per listing ID, in first-seen order.
+    """
+    unique: Dict[str, Dict[str, Any]] = {}
+    for item in items:
+        key: str = listing_id(item["link"])
+        if key in unique:
+            merge_listing(unique[key], item)
+        else:
+            unique[key] = item
+    return list(unique.values())
+
+
+class BloomFilter:
+    """
+    Bloom filter over strings (double hashing of one BLAKE2b digest).
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 1e-6) -> None:
+        """
+        Args:
+            capacity (int): Expected number of distinct keys.
+            error_rate (float): False-positive probability at `capacity` keys.
+        """
+        self.capacity: int = max(1, capacity)
+        self.error_rate: float = error_rate
+        self.size: int = max(8, int(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes: int = max(1, round(self.size / self.capacity * math.log(2)))
+        self._bits: bytearray = bytearray((self.size + 7) // 8)
+        self.count: int = 0
+
+    def _positions(self, key: str):
+        digest: bytes = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1: int = int.from_bytes(digest[:8], "little")
+        h2: int = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+    def add(self, key: str) -> bool:
+        """
+        Insert a key.
+
+        Args:
+            key (str): Key to insert.
+
+        Returns:
+            bool: True if the key was (definitely) not in the filter before.
+        """
+        new: bool = False
+        for p in self._positions(key):
+            mask: int = 1 << (p & 7)
+            if not self._bits[p >> 3] & mask:
+                self._bits[p >> 3] |= mask
+                new = True
+        if new:
+            self.count += 1
+        return new
+
+
+class ListingDeduplicator:
+    """
+    Admits each listing ID once per crawl and merges repeated occurrences into
+    the pending one until its record is written.
+    """
+
+    def __init__(self, bloom_capacity: int = 0, error_rate: float = 1e-6,
+                 on_merge: Optional[Callable[[Dict[str, Any]], None]] = None) -> None:
+        """
+        Args:
+            bloom_capacity (int): Use a Bloom filter sized for this many listings;
+                0 keeps an exact set of IDs.
+            error_rate (float): Bloom filter false-positive probability.
+            on_merge (Optional[Callable[[Dict[str, Any]], None]]): Called with the pending
+                occurrence whenever a repeated one changed it (e.g. to update its stored copy).
+        """
+        self._seen: Union[Set[str], BloomFilter] = (
+            BloomFilter(bloom_capacity, error_rate) if bloom_capacity > 0 else set()
+        )
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._on_merge: Optional[Callable[[Dict[str, Any]], None]] = on_merge
+        self.duplicates: int = 0
+        self.merged: int = 0
+
+    def admit(self, item: Dict[str, Any]) -> bool:
+        """
+        Decide whether a listing found on a search page should be fetched.
+
+        Args:
+            item (Dict[str, Any]): Link info dict with a 'link' key.
+
+        Returns:
+            bool: True for the first occurrence of the listing; False for a
+            duplicate (merged into the pending occurrence when there is one).
+        """
+        key: str = listing_id(item["link"])
+        pending: Optional[Dict[str, Any]] = self._pending.get(key)
+        if pending is not None:
+            self.duplicates += 1
+            if pending is not item and merge_listing(pending, item):
+                self.merged += 1
+                if self._on_merge is not None:
+                    self._on_merge(pending)
+            return False
+        if isinstance(self._seen, BloomFilter):
+            new: bool = self._seen.add(key)
+        else:
+            new = key not in self._seen
+            self._seen.add(key)
+        if not new:
+            self.duplicates += 1
+            return False
+        self._pending[key] = item
+        return True
+
+    def release(self, url: str) -> None:
+        """
+        Forget the pending occurrence once its record has been written
+        (the ID stays known, so later occurrences are still dropped).
+
+        Args:
+            url (str): Detail URL of the written record.
+
+        Returns:
+            None
+        """
+        self._pending.pop(listing_id(url), None)
@@ -1,17 +1,39 @@
 """
-src/utils/fetch.py — Utility function for synchronous HTML fetching.
+src/utils/fetch.py — HTML fetching utilities (async engine + synchronous fallback).
 
-Author: Danil  
-Created: 2025-06-22  
+Author: Danil
+Created: 2025-06-22
 Description:
-    Provides a helper function to fetch raw HTML content from a given URL using
-    the `requests` library. Standard headers and logging are applied globally.
+    Provides helpers to fetch raw HTML content from a given URL:
+    - `fetch_html_async` / `fetch_response`: default async path, sharing one pooled
+      keep-alive client session (see `utils.http_client`) across the whole process
+    - `fetch_html`: synchronous `requests` fallback
+
+    The shared client is created lazily on first use and must be closed with
+    `close_client()` before the event loop shuts down. When a
+    `utils.rate_limit.HostRateLimiter` is installed with `set_rate_limiter()`,
+    every async request waits for its host's token and reports its status back.
+    When a `utils.html_cache.HtmlCache` is installed with `set_html_cache()`,
+    fresh entries are served from disk and older ones are revalidated with
+    conditional requests (304 → cached body).
+    Timeouts, network errors, 5xx and 429 responses are retried according to
+    the installed `utils.retry.RetryPolicy` (back-off with jitter, `Retry-After`),
+    and a `utils.retry.CircuitBreaker` installed with `set_circuit_breaker()`
+    pauses a host after consecutive failures.
+    Every network response is recorded in `utils.metrics` (latency, bytes and
+    status per host, cache hits), and callbacks registered with
+    `add_response_hook()` see it as well, e.g. for benchmarks.
 
 Usage:
+    from utils.fetch import fetch_html_async, close_client
+    html = await fetch_html_async("https://example.com/page")
+    await close_client()
+
     from utils.fetch import fetch_html
     html = fetch_html("https://example.com/page")
 
 Dependencies:
+    - aiohttp (default async engine), httpx (optional)
     - requests
     - config.HEADERS for HTTP headers
     - config.logger for logging
@@ -20,14 +42,304 @@ Returns:
     - str: Raw HTML content if successful, or empty string on failure.
 """
 
+import asyncio
+import time
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
 import requests
 from requests import Response
-from config import HEADERS, logger
+from config import (
+    FETCH_ENGINE,
+    HEADERS,
+    HTTP2_ENABLED,
+    HTTP_POOL_SIZE,
+    HTTP_POOL_SIZE_PER_HOST,
+    REQUEST_TIMEOUT,
+    RETRY_BACKOFF_BASE,
+    RETRY_BACKOFF_MAX,
+    RETRY_MAX_ATTEMPTS,
+    logger,
+)
+from utils.http_client import FetchResponse, create_client
+from utils.metrics import CACHE_HITS, FETCH_BYTES, FETCH_LATENCY, FETCH_PAGE_SIZE, FETCH_RESPONSES, FETCH_RETRIES
+from utils.html_cache import CacheEntry, HtmlCache
+from utils.rate_limit import HostRateLimiter
+from utils.retry import CircuitBreaker, RetryPolicy, header, parse_retry_after
+
+
+_client = None
+_client_lock: Optional[asyncio.Lock] = None
+_rate_limiter: Optional[HostRateLimiter] = None
+_html_cache: Optional[HtmlCache] = None
+_response_hooks: List[Callable[[FetchResponse], None]] = []
+_retry_policy: RetryPolicy = RetryPolicy(RETRY_MAX_ATTEMPTS, RETRY_BACKOFF_BASE, RETRY_BACKOFF_MAX)
+_circuit_breaker: Optional[CircuitBreaker] = None
 
 
 def fetch_html(url: str) -> str:
     """
-    Fetch HTML content from the given URL using synchronous requests.
+    Fetch HTML content from the given URL using synchronous requests,
+    retrying transient failures according to the installed retry policy.
+
+    Args:
+        url (str): The target URL to fetch HTML content from.
+
+    Returns:
+        str: The HTML content of the page, or an empty string if the request fails.
+    """
+    policy: RetryPolicy = _retry_policy
+    attempt: int = 0
+    while True:
+        attempt += 1
+        retry_after: Optional[float] = None
+        try:
+            response: Response = requests.get(url, headers=HEADERS, timeout=REQUEST_TIMEOUT)
+            if response.ok:
+                logger.info(f"Fetched: {url}")
+                return response.text
+            status: int = response.status_code
+            reason: str = f"HTTP {status}"
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        except requests.RequestException as e:
+            status, reason = 0, str(e)
+        if not policy.should_retry(status) or attempt >= policy.max_attempts:
+            logger.error(f"Failed to fetch {url} after {attempt} attempt(s): {reason}")
+            return ""
+        time.sleep(policy.delay(attempt, retry_after))
+
+
+async def open_client(
+    engine: str = FETCH_ENGINE,
+    pool_size: int = HTTP_POOL_SIZE,
+    pool_size_per_host: int = HTTP_POOL_SIZE_PER_HOST,
+    http2: bool = HTTP2_ENABLED,
+) -> None:
+    """
+    Open the process-wide async HTTP client, replacing any existing one.
+
+    Args:
+        engine (str): "aiohttp", "httpx" or "requests".
+        pool_size (int): Maximum number of pooled connections.
+        pool_size_per_host (int): Maximum pooled connections per host (aiohttp only).
+        http2 (bool): Enable HTTP/2 (httpx engine only).
+
+    Returns:
+        None
+    """
+    global _client
+    await close_client()
+    _client = create_client(
+        engine,
+        pool_size=pool_size,
+        pool_size_per_host=pool_size_per_host,
+        timeout=REQUEST_TIMEOUT,
+        http2=http2,
+    )
+    logger.info(f"Opened HTTP client: {type(_client).__name__} (pool={pool_size})")
+
+
+async def close_client() -> None:
+    """
+    Close the process-wide async HTTP client if it is open.
+
+    Returns:
+        None
+    """
+    global _client
+    if _client is not None:
+        client, _client = _client, None
+        await client.close()
+
+
+def set_rate_limiter(limiter: Optional[HostRateLimiter]) -> None:
+    """
+    Install (or remove, with None) the per-host rate limiter used by async fetches.
+
+    Args:
+        limiter (Optional[HostRateLimiter]): Limiter instance or None.
+
+    Returns:
+        None
+    """
+    global _rate_limiter
+    _rate_limiter = limiter
+
+
+def set_html_cache(cache: Optional[HtmlCache]) -> None:
+    """
+    Install (or remove, with None) the on-disk HTML cache used by async fetches.
+
+    Args:
+        cache (Optional[HtmlCache]): Cache instance or None.
+
+    Returns:
+        None
+    """
+    global _html_cache
+    _html_cache = cache
+
+
+def set_retry_policy(policy: Optional[RetryPolicy]) -> None:
+    """
+    Install the retry policy used by all fetches (None restores the config defaults).
+
+    Args:
+        policy (Optional[RetryPolicy]): Policy instance or None.
+
+    Returns:
+        None
+    """
+    global _retry_policy
+    _retry_policy = policy or RetryPolicy(RETRY_MAX_ATTEMPTS, RETRY_BACKOFF_BASE, RETRY_BACKOFF_MAX)
+
+
+def set_circuit_breaker(breaker: Optional[CircuitBreaker]) -> None:
+    """
+    Install (or remove, with None) the per-host circuit breaker used by async fetches.
+
+    Args:
+        breaker (Optional[CircuitBreaker]): Breaker instance or None.
+
+    Returns:
+        None
+    """
+    global _circuit_breaker
+    _circuit_breaker = breaker
+
+
+def add_response_hook(hook: Callable[[FetchResponse], None]) -> None:
+    """
+    Register a callback invoked with every response received from the network
+    (cache hits served without a request are not reported).
+
+    Args:
+        hook (Callable[[FetchResponse], None]): Callback; must not block.
+
+    Returns:
+        None
+    """
+    _response_hooks.append(hook)
+
+
+def remove_response_hook(hook: Callable[[FetchResponse], None]) -> None:
+    if hook in _response_hooks:
+        _response_hooks.remove(hook)
+
+
+def _record_response(response: FetchResponse) -> None:
+    host: str = urlsplit(response.url).hostname or ""
+    FETCH_LATENCY.observe(response.elapsed, host=host)
+    FETCH_RESPONSES.inc(host=host, status=response.status)
+    if response.text:
+        size: int = len(response.text.encode("utf-8"))
+        FETCH_BYTES.inc(size, host=host)
+        FETCH_PAGE_SIZE.observe(size, host=host)
+    for hook in _response_hooks:
+        try:
+            hook(response)
+        except Exception as e:
+            logger.warning(f"Response hook failed for {response.url}: {e}")
+
+
+async def _get_client():
+    global _client_lock
+    if _client is None:
+        if _client_lock is None:
+            _client_lock = asyncio.Lock()
+        async with _client_lock:
+            if _client is None:
+                await open_client()
+    return _client
+
+
+async def _get_with_retries(client, url: str, headers: Optional[Dict[str, str]]) -> FetchResponse:
+    policy: RetryPolicy = _retry_policy
+    breaker: Optional[CircuitBreaker] = _circuit_breaker
+    host: str = urlsplit(url).hostname or ""
+    attempt: int = 0
+    while True:
+        attempt += 1
+        probe: bool = await breaker.wait(host) if breaker is not None else False
+        try:
+            if _rate_limiter is not None:
+                await _rate_limiter.acquire(url)
+            response: FetchResponse = await client.get(url, headers=headers)
+        except asyncio.CancelledError:
+            if probe:
+                breaker.release(host)
+            raise
+
+        retryable: bool = policy.should_retry(response.status)
+        retry_after: Optional[float] = None
+        if response.status in (429, 503):
+            retry_after = parse_retry_after(header(response.headers, "Retry-After"))
+        paused: bool = False
+        if _rate_limiter is not None:
+            paused = _rate_limiter.record(url, response.status, retry_after)
+        if breaker is not None:
+            breaker.record(host, not retryable, probe)
+        _record_response(response)
+
+        if not retryable or attempt >= policy.max_attempts:
+            return response
+        FETCH_RETRIES.inc(host=host)
+        if paused:
+            # The limiter paused the host (for at least Retry-After); acquire() waits that out
+            logger.info(f"Retrying {url} after the host's back-off ({response.error or response.status}, "
+                        f"attempt {attempt + 1}/{policy.max_attempts})")
+            continue
+        delay: float = policy.delay(attempt, retry_after)
+        logger.info(f"Retrying {url} in {delay:.1f}s ({response.error or response.status}, "
+                    f"attempt {attempt + 1}/{policy.max_attempts})")
+        await asyncio.sleep(delay)
+
+
+async def fetch_response(url: str, headers: Optional[Dict[str, str]] = None) -> FetchResponse:
+    """
+    Fetch a URL with the shared async client and return the full response.
+
+    Args:
+        url (str): The target URL.
+        headers (Optional[Dict[str, str]]): Extra request headers.
+
+    Returns:
+        FetchResponse: Status, body, headers and timing of the last attempt.
+        Never raises on HTTP errors.
+    """
+    cache: Optional[HtmlCache] = _html_cache
+    entry: Optional[CacheEntry] = None
+    if cache is not None:
+        entry = await asyncio.to_thread(cache.get, url)
+        if entry is not None:
+            if cache.is_fresh(entry):
+                CACHE_HITS.inc(kind="fresh")
+                return FetchResponse(url=url, status=200, text=entry.body, from_cache=True)
+            headers = {**cache.conditional_headers(entry), **(headers or {})}
+
+    client = await _get_client()
+    response: FetchResponse = await _get_with_retries(client, url, headers)
+
+    if cache is not None:
+        if response.status == 304 and entry is not None:
+            await asyncio.to_thread(cache.touch, url)
+            CACHE_HITS.inc(kind="revalidated")
+            response = FetchResponse(
+                url=url,
+                status=200,
+                text=entry.body,
+                headers=response.headers,
+                elapsed=response.elapsed,
+                from_cache=True,
+            )
+        elif response.ok:
+            await asyncio.to_thread(cache.put, url, response.text, response.headers)
+    return response
+
+
+async def fetch_html_async(url: str) -> str:
+    """
+    Fetch HTML content from the given URL using the shared async client.
 
     Args:
         url (str): The target URL to fetch HTML content from.
@@ -35,11 +347,10 @@ def fetch_html(url: str) -> str:
     Returns:
         str: The HTML content of the page, or an empty string if the request fails.
     """
-    try:
-        response: Response = requests.get(url, headers=HEADERS, timeout=10)
-        response.raise_for_status()
-        logger.info(f"Fetched: {url}")
-        return response.text
-    except Exception as e:
-        logger.error(f"Failed to fetch {url}: {e}")
+    response: FetchResponse = await fetch_response(url)
+    if not response.ok:
+        reason: str = response.error or f"HTTP {response.status}"
+        logger.error(f"Failed to fetch {url}: {reason}")
         return ""
+    logger.info(f"Fetched: {url}" + (" (cache)" if response.from_cache else ""))
+    return response.text
@@ -0,0 +1,253 @@
+"""
+src/utils/html_cache.py — On-disk cache of raw HTML responses with conditional revalidation.
+
+Author: Danil
+Created: 2026-10-17
+Description:
+    Stores every successfully fetched page body gzip-compressed on disk, keyed by
+    the SHA-256 of its URL, next to a small JSON metadata file (ETag,
+    Last-Modified, fetch time, size). `utils.fetch` uses it to:
+    - serve entries younger than `fresh_seconds` without touching the network
+    - send `If-None-Match` / `If-Modified-Since` for older entries and treat
+      `304 Not Modified` as a cache hit
+    Entries older than `max_age_seconds` are evicted, and the least recently
+    fetched entries are dropped once the cache exceeds `max_bytes`.
+
+    `iter_entries()` walks the whole corpus so pages can be re-parsed offline
+    after an extractor changes.
+
+Usage:
+    from utils.html_cache import HtmlCache
+    cache = HtmlCache(".html_cache", fresh_seconds=0, max_age_seconds=7 * 86400)
+    entry = cache.get(url)
+    cache.put(url, html, response_headers)
+
+Dependencies:
+    - gzip, hashlib, json (standard library)
+    - config.logger for logging
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from config import logger
+
+
+@dataclass
+class CacheEntry:
+    """
+    A cached response.
+
+    Attributes:
+        url (str): Requested URL.
+        body (str): Decoded HTML.
+        etag (Optional[str]): ETag response header.
+        last_modified (Optional[str]): Last-Modified response header.
+        fetched_at (float): Time the body was last fetched or revalidated.
+    """
+    url: str
+    body: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+
+
+class HtmlCache:
+    """
+    URL-hash keyed store of gzip-compressed HTML bodies plus revalidation metadata.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        fresh_seconds: float = 0.0,
+        max_age_seconds: float = 7 * 86400,
+        max_bytes: int = 2 * 1024 ** 3,
+    ) -> None:
+        """
+        Args:
+            directory (str): Cache root directory (created if missing).
+            fresh_seconds (float): Serve entries younger than this without revalidating.
+            max_age_seconds (float): Evict entries not refreshed for this long.
+            max_bytes (int): Evict least recently fetched entries above this total size.
+        """
+        self.directory: str = directory
+        self.fresh_seconds: float = fresh_seconds
+        self.max_age_seconds: float = max_age_seconds
+        self.max_bytes: int = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, url: str) -> Tuple[str, str]:
+        key: str = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        folder: str = os.path.join(self.directory, key[:2])
+        return os.path.join(folder, key + ".html.gz"), os.path.join(folder, key + ".json")
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        """
+        Load a cached response.
+
+        Args:
+            url (str): Requested URL.
+
+        Returns:
+            Optional[CacheEntry]: The entry, or None if missing or unreadable.
+        """
+        body_path, meta_path = self._paths(url)
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta: Dict = json.load(f)
+            with gzip.open(body_path, "rt", encoding="utf-8") as f:
+                body: str = f.read()
+        except (OSError, ValueError, EOFError):
+            return None
+        return CacheEntry(url, body, meta.get("etag"), meta.get("last_modified"), meta.get("fetched_at", 0.0))
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        return time.time() - entry.fetched_at < self.fresh_seconds
+
+    @staticmethod
+    def conditional_headers(entry: CacheEntry) -> Dict[str, str]:
+        """
+        Build revalidation headers for a cached entry.
+
+        Args:
+            entry (CacheEntry): Cached response.
+
+        Returns:
+            Dict[str, str]: If-None-Match / If-Modified-Since headers (possibly empty).
+        """
+        headers: Dict[str, str] = {}
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def _write_meta(self, meta_path: str, meta: Dict) -> None:
+        tmp: str = meta_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp, meta_path)
+
+    def put(self, url: str, body: str, headers: Dict[str, str]) -> None:
+        """
+        Store a fresh response body and its validators.
+
+        Args:
+            url (str): Requested URL.
+            body (str): Decoded HTML.
+            headers (Dict[str, str]): Response headers (ETag / Last-Modified are kept).
+
+        Returns:
+            None
+        """
+        body_path, meta_path = self._paths(url)
+        os.makedirs(os.path.dirname(body_path), exist_ok=True)
+        lowered: Dict[str, str] = {k.lower(): v for k, v in headers.items()}
+
+        tmp: str = body_path + ".tmp"
+        with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=6) as f:
+            f.write(body)
+        os.replace(tmp, body_path)
+        self._write_meta(meta_path, {
+            "url": url,
+            "etag": lowered.get("etag"),
+            "last_modified": lowered.get("last-modified"),
+            "fetched_at": time.time(),
+            "size": os.path.getsize(body_path),
+        })
+
+    def touch(self, url: str) -> None:
+        """
+        Mark a cached entry as revalidated now (after a 304 response).
+
+        Args:
+            url (str): Requested URL.
+
+        Returns:
+            None
+        """
+        _, meta_path = self._paths(url)
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta: Dict = json.load(f)
+        except (OSError, ValueError):
+            return
+        meta["fetched_at"] = time.time()
+        self._write_meta(meta_path, meta)
+
+    def _iter_meta(self) -> Iterator[Tuple[str, Dict]]:
+        for folder in sorted(os.listdir(self.directory)):
+            folder_path: str = os.path.join(self.directory, folder)
+            if not os.path.isdir(folder_path):
+                continue
+            for name in os.listdir(folder_path):
+                if not name.endswith(".json"):
+                    continue
+                meta_path: str = os.path.join(folder_path, name)
+                try:
+                    with open(meta_path, encoding="utf-8") as f:
+                        yield meta_path, json.load(f)
+                except (OSError, ValueError):
+                    continue
+
+    def _remove(self, meta_path: str) -> None:
+        for path in (meta_path, meta_path[: -len(".json")] + ".html.gz"):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def evict(self) -> int:
+        """
+        Drop entries older than `max_age_seconds`, then the least recently fetched
+        ones until the cache fits into `max_bytes`.
+
+        Returns:
+            int: Number of evicted entries.
+        """
+        now: float = time.time()
+        kept: List[Tuple[float, int, str]] = []
+        evicted: int = 0
+        for meta_path, meta in self._iter_meta():
+            fetched_at: float = meta.get("fetched_at", 0.0)
+            if now - fetched_at > self.max_age_seconds:
+                self._remove(meta_path)
+                evicted += 1
+            else:
+                kept.append((fetched_at, meta.get("size", 0), meta_path))
+
+        total: int = sum(size for _, size, _ in kept)
+        for fetched_at, size, meta_path in sorted(kept):
+            if total <= self.max_bytes:
+                break
+            self._remove(meta_path)
+            total -= size
+            evicted += 1
+
+        if evicted:
+            logger.info(f"HTML cache: evicted {evicted} entries, {total / 1024 ** 2:.1f} MB kept")
+        return evicted
+
+    def iter_entries(self, url_contains: Optional[str] = None) -> Iterator[CacheEntry]:
+        """
+        Walk every cached page, e.g. to re-parse the corpus offline.
+
+        Args:
+            url_contains (Optional[str]): Only yield URLs containing this substring.
+
+        Yields:
+            CacheEntry: Cached responses.
+        """
+        for _, meta in self._iter_meta():
+            url: Optional[str] = meta.get("url")
+            if not url or (url_contains and url_contains not in url):
+                continue
+            entry: Optional[CacheEntry] = self.get(url)
+            if entry is not None:
+                yield entry
@@ -0,0 +1,239 @@
+"""
+src/utils/http_client.py — Pooled HTTP client engines used by the async fetcher.
+
+Author: Danil
+Created: 2026-10-17
+Description:
+    Wraps the supported HTTP libraries behind one small async interface so that
+    `utils.fetch` can keep a single long-lived session per process:
+    - "aiohttp": default engine, pooled keep-alive connections
+    - "httpx":   optional engine, required for HTTP/2 (needs `h2` installed)
+    - "requests": fallback that runs the synchronous client in worker threads
+
+    Every engine returns a `FetchResponse` and never raises on HTTP errors;
+    network failures are reported with `status == 0` and the `error` field set.
+
+Usage:
+    from utils.http_client import create_client
+    client = create_client("aiohttp", pool_size=200)
+    response = await client.get("https://m.mashina.kg/search/all/")
+    await client.close()
+
+Dependencies:
+    - aiohttp (default engine)
+    - httpx, h2 (optional, HTTP/2)
+    - brotli / brotlicffi (optional, "br" content decoding)
+    - requests (fallback engine)
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+import requests
+
+from config import HEADERS, REQUEST_TIMEOUT, logger
+
+# Engine names accepted by `create_client` (and the --engine flag)
+ENGINES = ("aiohttp", "httpx", "requests")
+
+
+def _accept_encoding() -> str:
+    """
+    Build the Accept-Encoding header, advertising brotli only when a decoder is installed.
+
+    Returns:
+        str: Value for the Accept-Encoding header.
+    """
+    try:
+        import brotli  # noqa: F401
+        return "gzip, deflate, br"
+    except ImportError:
+        pass
+    try:
+        import brotlicffi  # noqa: F401
+        return "gzip, deflate, br"
+    except ImportError:
+        return "gzip, deflate"
+
+
+@dataclass
+class FetchResponse:
+    """
+    Result of a single HTTP request.
+
+    Attributes:
+        url (str): Requested URL.
+        status (int): HTTP status code, or 0 if the request failed before a response.
+        text (str): Decoded response body (empty on failure).
+        headers (Dict[str, str]): Response headers.
+        elapsed (float): Wall time of the request in seconds.
+        error (Optional[str]): Error description for network-level failures.
+        from_cache (bool): Body served from the on-disk HTML cache (fresh hit or 304).
+    """
+    url: str
+    status: int
+    text: str = ""
+    headers: Dict[str, str] = field(default_factory=dict)
+    elapsed: float = 0.0
+    error: Optional[str] = None
+    from_cache: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300
+
+
+class AiohttpClient:
+    """
+    Async client backed by one shared `aiohttp.ClientSession`.
+    """
+
+    def __init__(self, pool_size: int, pool_size_per_host: int, timeout: float) -> None:
+        import aiohttp
+
+        connector = aiohttp.TCPConnector(
+            limit=pool_size,
+            limit_per_host=pool_size_per_host,
+            ttl_dns_cache=300,
+            keepalive_timeout=30,
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            headers={**HEADERS, "Accept-Encoding": _accept_encoding()},
+            timeout=aiohttp.ClientTimeout(total=timeout),
+        )
+
+    async def get(self, url: str, headers: Optional[Dict[str, str]] = None) -> FetchResponse:
+        start: float = time.perf_counter()
+        try:
+            async with self._session.get(url, headers=headers) as resp:
+                text: str = await resp.text(errors="replace")
+                return FetchResponse(
+                    url=url,
+                    status=resp.status,
+                    text=text,
+                    headers=dict(resp.headers),
+                    elapsed=time.perf_counter() - start,
+                )
+        except Exception as e:
+            return FetchResponse(url=url, status=0, elapsed=time.perf_counter() - start, error=repr(e))
+
+    async def close(self) -> None:
+        await self._session.close()
+
+
+class HttpxClient:
+    """
+    Async client backed by one shared `httpx.AsyncClient`, with optional HTTP/2.
+
+    httpx limits connections for the whole pool only, so both the open and the
+    idle keep-alive limits are `pool_size` (`limits`); there is no per-host cap.
+    """
+
+    def __init__(self, pool_size: int, timeout: float, http2: bool) -> None:
+        import httpx
+
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                http2 = False
+
+        self.limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        self._client = httpx.AsyncClient(
+            http2=http2,
+            headers={**HEADERS, "Accept-Encoding": _accept_encoding()},
+            timeout=timeout,
+            limits=self.limits,
+            follow_redirects=True,
+        )
+
+    async def get(self, url: str, headers: Optional[Dict[str, str]] = None) -> FetchResponse:
+        start: float = time.perf_counter()
+        try:
+            resp = await self._client.get(url, headers=headers)
+            return FetchResponse(
+                url=url,
+                status=resp.status_code,
+                text=resp.text,
+                headers=dict(resp.headers),
+                elapsed=time.perf_counter() - start,
+            )
+        except Exception as e:
+            return FetchResponse(url=url, status=0, elapsed=time.perf_counter() - start, error=repr(e))
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+class ThreadedRequestsClient:
+    """
+    Fallback client: a pooled `requests.Session` driven from worker threads.
+    """
+
+    def __init__(self, pool_size: int, timeout: float) -> None:
+        self._session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._session.headers.update(HEADERS)
+        self._timeout = timeout
+
+    def _get(self, url: str, headers: Optional[Dict[str, str]]) -> FetchResponse:
+        start: float = time.perf_counter()
+        try:
+            resp = self._session.get(url, headers=headers, timeout=self._timeout)
+            return FetchResponse(
+                url=url,
+                status=resp.status_code,
+                text=resp.text,
+                headers=dict(resp.headers),
+                elapsed=time.perf_counter() - start,
+            )
+        except Exception as e:
+            return FetchResponse(url=url, status=0, elapsed=time.perf_counter() - start, error=repr(e))
+
+    async def get(self, url: str, headers: Optional[Dict[str, str]] = None) -> FetchResponse:
+        return await asyncio.to_thread(self._get, url, headers)
+
+    async def close(self) -> None:
+        self._session.close()
+
+
+def create_client(
+    engine: str,
+    pool_size: int = 100,
+    pool_size_per_host: int = 100,
+    timeout: float = REQUEST_TIMEOUT,
+    http2: bool = False,
+):
+    """
+    Create an HTTP client for the given engine name, falling back to the
+    threaded `requests` client if the requested library is not installed.
+
+    Args:
+        engine (str): "aiohttp", "httpx" or "requests".
+        pool_size (int): Maximum number of pooled connections.
+        pool_size_per_host (int): Maximum pooled connections per host (aiohttp
+            only; httpx and requests have no per-host limit).
+        timeout (float): Total request timeout in seconds.
+        http2 (bool): Enable HTTP/2 (httpx engine only).
+
+    Returns:
+        An object exposing `async get(url, headers)` and `async close()`.
+
+    Raises:
+        ValueError: If the engine name is not one of `ENGINES`.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown HTTP engine {engine!r}, expected one of {', '.join(ENGINES)}")
+    try:
+        if engine == "aiohttp":
+            return AiohttpClient(pool_size, pool_size_per_host, timeout)
+        if engine == "httpx":
+            return HttpxClient(pool_size, timeout, http2)
+    except ImportError as e:
+        logger.warning(f"HTTP engine '{engine}' unavailable ({e}), falling back to requests")
+    return ThreadedRequestsClient(pool_size, timeout)
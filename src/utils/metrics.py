@@ -0,0 +1,403 @@
+"""
+src/utils/metrics.py — In-process metrics for the crawl pipeline.
+
+Author: Danil
+Created: 2026-10-17
+Description:
+    Minimal Prometheus-style instrumentation without extra dependencies:
+    - `Counter`, `Gauge` and `Histogram` metrics with optional labels
+    - a `MetricsRegistry` that renders them in the Prometheus text format or
+      as a JSON snapshot (histograms include estimated p50 / p90 / p99)
+    - `MetricsServer`: `/metrics` HTTP endpoint for Prometheus to scrape
+    - `SnapshotWriter`: periodically rewrites a JSON snapshot file
+
+    The crawler's own metrics are defined at module level (`FETCH_LATENCY`,
+    `PARSE_SECONDS`, `QUEUE_DEPTH`, ...) and updated by `utils.fetch`,
+    `utils.parse_details`, `services.scheduler` and `services.crawl_service`.
+    Updates are plain dict operations, so they are cheap enough for the hot path;
+    they are not thread-safe and must happen on the event loop thread (or in a
+    worker process, see `Histogram.drain()` / `Histogram.merge()`).
+
+Usage:
+    from utils.metrics import REGISTRY, FETCH_LATENCY
+    FETCH_LATENCY.observe(0.12, host="m.mashina.kg")
+    print(REGISTRY.render_prometheus())
+
+Dependencies:
+    - aiohttp (only for `MetricsServer`)
+    - config.logger for logging
+"""
+
+import asyncio
+import json
+import math
+import os
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from config import logger
+
+LabelValues = Tuple[str, ...]
+
+LATENCY_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PARSE_BUCKETS: Tuple[float, ...] = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+SIZE_BUCKETS: Tuple[float, ...] = (1024, 4096, 16384, 65536, 131072, 262144, 524288, 1048576)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    kind: str = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> None:
+        self.name: str = name
+        self.help: str = help_text
+        self.labelnames: Tuple[str, ...] = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _label_text(self, key: LabelValues, extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs: List[Tuple[str, str]] = list(zip(self.labelnames, key))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """
+    Monotonically increasing value, one per label combination.
+    """
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key: LabelValues = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        lines: List[str] = self._header()
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{self._label_text(key)} {_format_value(value)}")
+        return lines
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        return [{"labels": dict(zip(self.labelnames, key)), "value": value}
+                for key, value in sorted(self._values.items())]
+
+
+class Gauge(Counter):
+    """
+    Value that can go up and down (queue depths, in-flight requests).
+    """
+    kind = "gauge"
+
+    def set(self, value: float, **labels: Any) -> None:
+        self._values[self._key(labels)] = value
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values over fixed buckets, plus their sum and count.
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        super().__init__(name, help_text, labelnames)
+        self.buckets: Tuple[float, ...] = tuple(sorted(buckets)) + (math.inf,)
+        # label values -> [per-bucket counts (non-cumulative)..., sum, count]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def _series(self, key: LabelValues) -> List[float]:
+        series: Optional[List[float]] = self._values.get(key)
+        if series is None:
+            series = self._values[key] = [0.0] * (len(self.buckets) + 2)
+        return series
+
+    def observe(self, value: float, **labels: Any) -> None:
+        series: List[float] = self._series(self._key(labels))
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+                break
+        series[-2] += value
+        series[-1] += 1
+
+    def drain(self) -> Dict[LabelValues, List[float]]:
+        """
+        Return and clear the raw state, e.g. to ship it out of a worker process.
+
+        Returns:
+            Dict[LabelValues, List[float]]: Raw series keyed by label values.
+        """
+        values, self._values = self._values, {}
+        return values
+
+    def merge(self, values: Dict[LabelValues, List[float]]) -> None:
+        """
+        Add raw state produced by `drain()` (same buckets) into this histogram.
+
+        Args:
+            values (Dict[LabelValues, List[float]]): Raw series keyed by label values.
+
+        Returns:
+            None
+        """
+        for key, other in values.items():
+            series: List[float] = self._series(key)
+            for i, v in enumerate(other):
+                series[i] += v
+
+    def quantile(self, q: float, series: List[float]) -> Optional[float]:
+        """
+        Estimate a quantile by linear interpolation inside the matching bucket.
+
+        Args:
+            q (float): Quantile in [0, 1].
+            series (List[float]): Raw series of one label combination.
+
+        Returns:
+            Optional[float]: Estimated value, or None if nothing was observed.
+        """
+        count: float = series[-1]
+        if not count:
+            return None
+        rank: float = q * count
+        seen: float = 0.0
+        lower: float = 0.0
+        for i, bound in enumerate(self.buckets):
+            if seen + series[i] >= rank and series[i]:
+                if bound == math.inf:
+                    return lower
+                return lower + (bound - lower) * (rank - seen) / series[i]
+            seen += series[i]
+            lower = bound if bound != math.inf else lower
+        return lower
+
+    def render(self) -> List[str]:
+        lines: List[str] = self._header()
+        for key, series in sorted(self._values.items()):
+            cumulative: float = 0.0
+            for i, bound in enumerate(self.buckets):
+                cumulative += series[i]
+                label: str = self._label_text(key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{label} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_sum{self._label_text(key)} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{self._label_text(key)} {_format_value(series[-1])}")
+        return lines
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        samples: List[Dict[str, Any]] = []
+        for key, series in sorted(self._values.items()):
+            count: float = series[-1]
+            samples.append({
+                "labels": dict(zip(self.labelnames, key)),
+                "count": count,
+                "sum": series[-2],
+                "mean": series[-2] / count if count else None,
+                "p50": self.quantile(0.50, series),
+                "p90": self.quantile(0.90, series),
+                "p99": self.quantile(0.99, series),
+            })
+        return samples
+
+
+class MetricsRegistry:
+    """
+    Named collection of metrics with Prometheus text and JSON renderers.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self.started_at: float = time.time()
+
+    def _register(self, metric: _Metric) -> Any:
+        existing: Optional[_Metric] = self._metrics.get(metric.name)
+        if existing is not None:
+            if type(existing) is not type(metric):
+                raise ValueError(f"Metric {metric.name} already registered as {existing.kind}")
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def render_prometheus(self) -> str:
+        """
+        Returns:
+            str: All metrics in the Prometheus text exposition format (0.0.4).
+        """
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns:
+            Dict[str, Any]: JSON-serialisable view of all metrics.
+        """
+        now: float = time.time()
+        return {
+            "timestamp": now,
+            "uptime_seconds": now - self.started_at,
+            "metrics": {
+                name: {"type": metric.kind, "help": metric.help, "samples": metric.snapshot()}
+                for name, metric in self._metrics.items()
+            },
+        }
+
+    def write_snapshot(self, path: str) -> None:
+        """
+        Atomically write the JSON snapshot to a file.
+
+        Args:
+            path (str): Destination file.
+
+        Returns:
+            None
+        """
+        _write_json(path, self.snapshot())
+
+
+def _write_json(path: str, data: Dict[str, Any]) -> None:
+    tmp: str = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+REGISTRY: MetricsRegistry = MetricsRegistry()
+
+FETCH_LATENCY: Histogram = REGISTRY.histogram(
+    "crawler_fetch_latency_seconds", "Network request latency", ["host"])
+FETCH_BYTES: Counter = REGISTRY.counter(
+    "crawler_fetch_bytes_total", "Decoded response body bytes downloaded", ["host"])
+FETCH_PAGE_SIZE: Histogram = REGISTRY.histogram(
+    "crawler_fetch_page_bytes", "Decoded response body size", ["host"], buckets=SIZE_BUCKETS)
+FETCH_RESPONSES: Counter = REGISTRY.counter(
+    "crawler_fetch_responses_total", "Network responses by HTTP status (0 = transport error)", ["host", "status"])
+FETCH_RETRIES: Counter = REGISTRY.counter(
+    "crawler_fetch_retries_total", "Requests retried after a failed attempt", ["host"])
+CACHE_HITS: Counter = REGISTRY.counter(
+    "crawler_cache_hits_total", "Pages served from the HTML cache", ["kind"])
+PARSE_SECONDS: Histogram = REGISTRY.histogram(
+    "crawler_parse_seconds", "Time spent per extractor on one detail page", ["extractor"], buckets=PARSE_BUCKETS)
+QUEUE_DEPTH: Gauge = REGISTRY.gauge(
+    "crawler_queue_depth", "Items waiting in a scheduler queue", ["stage"])
+IN_FLIGHT: Gauge = REGISTRY.gauge(
+    "crawler_in_flight", "Handlers currently running in a scheduler", ["stage"])
+PAGES_FETCHED: Counter = REGISTRY.counter(
+    "crawler_search_pages_total", "Search result pages processed", ["outcome"])
+RECORDS_WRITTEN: Counter = REGISTRY.counter(
+    "crawler_records_written_total", "Records written to the output", ["outcome"])
+
+
+class MetricsServer:
+    """
+    Tiny aiohttp server exposing `REGISTRY` on `/metrics` (Prometheus) and `/metrics.json`.
+    """
+
+    def __init__(self, port: int, host: str = "0.0.0.0", registry: MetricsRegistry = REGISTRY) -> None:
+        self.port: int = port
+        self.host: str = host
+        self.registry: MetricsRegistry = registry
+        self._runner = None
+
+    async def start(self) -> None:
+        from aiohttp import web
+
+        async def prometheus(request: "web.Request") -> "web.Response":
+            return web.Response(text=self.registry.render_prometheus(),
+                                content_type="text/plain", charset="utf-8")
+
+        async def snapshot(request: "web.Request") -> "web.Response":
+            return web.json_response(self.registry.snapshot())
+
+        app = web.Application()
+        app.router.add_get("/metrics", prometheus)
+        app.router.add_get("/metrics.json", snapshot)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            runner, self._runner = self._runner, None
+            await runner.cleanup()
+
+
+class SnapshotWriter:
+    """
+    Background task rewriting a JSON snapshot of `REGISTRY` every `interval` seconds.
+    """
+
+    def __init__(self, path: str, interval: float, registry: MetricsRegistry = REGISTRY) -> None:
+        self.path: str = path
+        self.interval: float = interval
+        self.registry: MetricsRegistry = registry
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                # Snapshot on the loop thread (metrics are not thread-safe), write in a thread
+                await asyncio.to_thread(_write_json, self.path, self.registry.snapshot())
+            except OSError as e:
+                logger.warning(f"Could not write metrics snapshot {self.path}: {e}")
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Stop the background task and write a final snapshot.
+
+        Returns:
+            None
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.registry.write_snapshot(self.path)
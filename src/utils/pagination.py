@@ -5,59 +5,102 @@ Author: Danil
 Created: 2025-06-22  
 Description:
     Provides functions to:
-    - Determine the total number of pages in search results
-    - Build full list of paginated search result URLs
+    - Determine the total number of pages in search results (only the
+      pagination block is parsed)
+    - Build full list of paginated search result URLs, either synchronously or
+      on the async fetch path while keeping page 1's HTML for the listing stage
+    - Stream page URLs lazily until a page comes back without listing cards,
+      so pages added or removed during a long crawl are neither missed nor
+      fetched empty
+    - Read / set the page number of a search result URL
 
 Usage:
     from utils.pagination import build_page_links
     links = build_page_links("https://m.mashina.kg/search/all/?page=1")
 
+    links, first_html = await discover_page_links("https://m.mashina.kg/search/all/?page=1")
+
 Dependencies:
-    - requests
     - BeautifulSoup4
+    - utils.fetch for the HTTP requests
     - config.logger for logging
 """
 
-from bs4 import BeautifulSoup, Tag
-import requests
-from typing import List
+import asyncio
+
+from bs4 import BeautifulSoup, SoupStrainer, Tag
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs, urlencode, urlsplit, urlunsplit
+from utils.fetch import fetch_html, fetch_html_async
+from utils.parse_details.parser import make_soup
 from config import logger
 
+_PAGINATION_ONLY: SoupStrainer = SoupStrainer("ul", class_="pagination")
 
-def get_total_pages(url: str) -> int:
+
+def find_total_pages(html: str) -> Optional[int]:
     """
-    Determine the total number of pages in the search result pagination.
+    Read the total number of pages from the pagination of a search result page, if it has one.
 
     Args:
-        url (str): A URL pointing to the first page of search results.
+        html (str): HTML of a search result page.
 
     Returns:
-        int: Total number of pages available.
-
-    Raises:
-        Exception: If the pagination structure is not found or request fails.
+        Optional[int]: Total number of pages, or None if there is no "Последняя" link
+        (e.g. results that fit on one page).
     """
-    try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Failed to fetch URL: {e}")
-        raise Exception(f"Failed to fetch URL: {e}")
-
-    soup: BeautifulSoup = BeautifulSoup(response.text, "html.parser")
+    soup: BeautifulSoup = make_soup(html, parse_only=_PAGINATION_ONLY)
     all_links: List[Tag] = soup.select('ul.pagination a[data-page]')
 
     for link in reversed(all_links):
         if link.text.strip().lower() == "последняя":
             page_number = link.get("data-page")
             if page_number and page_number.isdigit():
-                logger.info(f"Total pages found: {page_number}")
                 return int(page_number)
+    return None
+
+
+def total_pages_from_html(html: str) -> int:
+    """
+    Read the total number of pages from the pagination of a search result page.
+
+    Args:
+        html (str): HTML of a search result page.
+
+    Returns:
+        int: Total number of pages available.
+
+    Raises:
+        Exception: If the pagination structure is not found.
+    """
+    total: Optional[int] = find_total_pages(html)
+    if total is not None:
+        logger.info(f"Total pages found: {total}")
+        return total
 
     logger.error("Pagination element with 'Последняя' not found.")
     raise Exception("Pagination element with 'Последняя' not found.")
 
 
+def get_total_pages(url: str) -> int:
+    """
+    Determine the total number of pages in the search result pagination.
+
+    Args:
+        url (str): A URL pointing to the first page of search results.
+
+    Returns:
+        int: Total number of pages available.
+
+    Raises:
+        Exception: If the pagination structure is not found or request fails.
+    """
+    html: str = fetch_html(url)
+    if not html:
+        raise Exception(f"Failed to fetch URL: {url}")
+    return total_pages_from_html(html)
+
+
 def build_page_links(base_url: str) -> List[str]:
     """
     Build a list of paginated search result URLs based on total pages.
@@ -69,4 +112,159 @@ def build_page_links(base_url: str) -> List[str]:
         List[str]: List of full URLs for each page of the search results.
     """
     total_pages: int = get_total_pages(base_url)
-    return [f"https://m.mashina.kg/search/all/?page={i}" for i in range(1, total_pages + 1)]
+    return [with_page(base_url, i) for i in range(1, total_pages + 1)]
+
+
+async def discover_page_links(base_url: str) -> Tuple[List[str], str]:
+    """
+    Fetch page 1 on the async path and build the paginated URLs from it.
+    The returned HTML lets the listing stage use page 1 without fetching it again.
+
+    Args:
+        base_url (str): A base URL starting from page 1 of the search results.
+
+    Returns:
+        Tuple[List[str], str]: URLs of every page (page 1 first) and the HTML of page 1.
+
+    Raises:
+        Exception: If page 1 cannot be fetched or has no pagination.
+    """
+    first_url: str = with_page(base_url, 1)
+    html: str = await fetch_html_async(first_url)
+    if not html:
+        raise Exception(f"Failed to fetch URL: {first_url}")
+    total_pages: int = total_pages_from_html(html)
+    return [with_page(base_url, i) for i in range(1, total_pages + 1)], html
+
+
+class LazyPageLinks:
+    """
+    Async stream of search page URLs: first the given pages, then page after page
+    from `start` until a page comes back without listing cards (or too many
+    pages past the last non-empty one fail to load).
+
+    Pages up to `expected_last` (the page count read from page 1) are generated
+    freely; beyond it at most `lookahead` generated pages are in flight, which
+    bounds the number of empty pages requested after the real end.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        pages: Iterable[str] = (),
+        start: int = 1,
+        on_new_page: Optional[Callable[[str], None]] = None,
+        max_failures: int = 3,
+        expected_last: int = 0,
+        lookahead: int = 4,
+    ) -> None:
+        """
+        Args:
+            base_url (str): Any search result URL (its `page` parameter is replaced).
+            pages (Iterable[str]): Known page URLs to yield first (e.g. unfinished pages).
+            start (int): First page number to generate after them.
+            on_new_page (Optional[Callable[[str], None]]): Called with each generated URL
+                before it is yielded (e.g. to checkpoint it).
+            max_failures (int): Failed pages past the last non-empty page that end the stream.
+            expected_last (int): Last page according to the pagination, 0 if unknown.
+            lookahead (int): Generated pages in flight past `expected_last`.
+        """
+        self.base_url: str = base_url
+        self.pages: List[str] = list(pages)
+        self.next_page: int = start
+        self.last_page: Optional[int] = None
+        self.on_new_page: Optional[Callable[[str], None]] = on_new_page
+        self.max_failures: int = max_failures
+        self.expected_last: int = expected_last
+        self.lookahead: int = max(1, lookahead)
+        self._start: int = start
+        self._highest_full: int = 0
+        self._failed: List[int] = []
+        self._outstanding: int = 0
+        self._progress: asyncio.Event = asyncio.Event()
+
+    def stop(self, page: int) -> None:
+        """
+        End the stream before the given page; no later page is generated.
+
+        Args:
+            page (int): First page number that should not be crawled.
+
+        Returns:
+            None
+        """
+        if self.last_page is None or page - 1 < self.last_page:
+            self.last_page = page - 1
+            self._progress.set()
+            logger.info(f"Stopping pagination at page {self.last_page}")
+
+    def record(self, page: int, cards: Optional[int]) -> None:
+        """
+        Report the outcome of a page generated by this stream.
+
+        Args:
+            page (int): Page number.
+            cards (Optional[int]): Number of listing cards found, None if the fetch failed.
+
+        Returns:
+            None
+        """
+        if page >= self._start:
+            self._outstanding -= 1
+            self._progress.set()
+        if cards is None:
+            self._failed.append(page)
+            beyond: int = sum(1 for p in self._failed if p > self._highest_full)
+            if beyond >= self.max_failures:
+                self.stop(self._highest_full + 1)
+        elif cards == 0:
+            logger.info(f"Page {page} has no listings")
+            self.stop(page)
+        else:
+            self._highest_full = max(self._highest_full, page)
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        for url in self.pages:
+            yield url
+        while self.last_page is None or self.next_page <= self.last_page:
+            if self.next_page > self.expected_last and self._outstanding >= self.lookahead:
+                self._progress.clear()
+                await self._progress.wait()
+                continue
+            url = with_page(self.base_url, self.next_page)
+            self.next_page += 1
+            self._outstanding += 1
+            if self.on_new_page is not None:
+                self.on_new_page(url)
+            yield url
+
+
+def with_page(url: str, page: int) -> str:
+    """
+    Return the search result URL with its `page` query parameter set.
+
+    Args:
+        url (str): Any search result URL (other query parameters are kept).
+        page (int): Page number.
+
+    Returns:
+        str: URL of the requested page.
+    """
+    parts = urlsplit(url)
+    query: Dict[str, List[str]] = parse_qs(parts.query, keep_blank_values=True)
+    query["page"] = [str(page)]
+    return urlunsplit(parts._replace(query=urlencode(query, doseq=True)))
+
+
+def page_number_from_url(url: str) -> int:
+    """
+    Read the `page` query parameter of a search result URL.
+
+    Args:
+        url (str): Search result page URL.
+
+    Returns:
+        int: Page number, 1 if the parameter is missing or invalid.
+    """
+    values: List[str] = parse_qs(urlsplit(url).query).get("page", [])
+    return int(values[0]) if values and values[0].isdigit() else 1
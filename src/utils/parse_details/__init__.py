@@ -5,27 +5,34 @@ Author: Danil
 Created: 2025-06-22  
 Description:
     This module provides:
-    - `extract_car_details(html: str)`: parses all structured blocks from raw car detail HTML
-    - `fetch_and_parse_car(url: str)`: fetches HTML from a given car detail URL and parses it
+    - `extract_car_details(html: str, parser=None, scoped=None)`: parses all structured blocks from raw
+      car detail HTML, optionally building the tree only for the blocks the extractors read
+    - `fetch_car_html(url: str)`: fetches the raw HTML of a car detail page
+    - `fetch_and_parse_car(url: str, parse_pool=None)`: fetches HTML from a given car detail URL
+      and parses it, in-process or in a `utils.parse_pool.ParsePool` worker
 
     The module aggregates individual extractors (breadcrumbs, specs, pricing, images, etc.)
-    and composes a full dictionary of car information.
+    and composes a full dictionary of car information. Each extractor declares its
+    fields and precompiled selectors in `registry.py`; `EXTRACTORS` fixes their
+    output order. The HTML tree builder (lxml or html.parser) is chosen in
+    `parser.py`. Soup construction and every extractor are reported to the
+    registry's timing hooks (by default `utils.metrics.PARSE_SECONDS`).
 
 Usage:
     from utils.parse_details import fetch_and_parse_car
 
 Dependencies:
-    - asyncio
     - BeautifulSoup4
     - config.logger
-    - utils.fetch.fetch_html
+    - utils.fetch.fetch_html_async
 """
 
-import asyncio
+import time
+
 from bs4 import BeautifulSoup
-from typing import Dict, Optional
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
 
-from utils.fetch import fetch_html
+from utils.fetch import fetch_html_async
 
 from .breadcrumbs import extract_car_breadcrumbs
 from .head_info import extract_head_info
@@ -38,53 +45,97 @@ from .seller_comment import extract_seller_comment
 from .configuration import extract_configuration_options
 from .history import extract_history_records
 from .vin import extract_vin_code
+from .parser import DETAIL_BLOCKS, history_unwrapped, make_soup, scoped_parsing
+from .registry import REGISTRY, ExtractorSpec, report_timing, run_extractors
 
 from config import logger
 
+if TYPE_CHECKING:
+    from utils.parse_pool import ParsePool
+
+
+# Registered extractors in output order; each takes the page soup and returns a dict of fields
+EXTRACTORS: Tuple[ExtractorSpec, ...] = tuple(REGISTRY[name] for name in (
+    "breadcrumbs",
+    "head_info",
+    "credit",
+    "contact",
+    "images",
+    "specs",
+    "average_price",
+    "seller_comment",
+    "configuration",
+    "history",
+    "vin",
+))
+
 
-def extract_car_details(html: str) -> Dict[str, Optional[str]]:
+def extract_car_details(html: str, parser: Optional[str] = None,
+                        scoped: Optional[bool] = None) -> Dict[str, Optional[str]]:
     """
     Extract structured car data from a single detail page's HTML.
 
     Args:
         html (str): Raw HTML content of a car detail page.
+        parser (Optional[str]): HTML parser backend ("lxml" / "html.parser"); process default if None.
+        scoped (Optional[bool]): Parse only `parser.DETAIL_BLOCKS`; process default if None.
+            A scoped page without a header (changed layout) or with VIN history
+            outside its container is parsed again in full.
 
     Returns:
         Dict[str, Optional[str]]: Parsed fields including specs, prices, contacts, VIN, etc.
     """
-    soup: BeautifulSoup = BeautifulSoup(html, "html.parser")
-    details: Dict[str, Optional[str]] = {}
-
-    details.update(extract_car_breadcrumbs(soup))
-    details.update(extract_head_info(soup))
-    details.update(extract_credit_title(soup))
-    details.update(extract_contact_info(soup))
-    details.update(extract_image_links(soup))
-    details.update(extract_main_specs(soup))
-    details.update(extract_average_price(soup))
-    details.update(extract_seller_comment(soup))
-    details.update(extract_configuration_options(soup))
-    details.update(extract_history_records(soup))
-    details.update(extract_vin_code(soup))
+    if scoped_parsing(scoped):
+        start: float = time.perf_counter()
+        soup: BeautifulSoup = make_soup(html, parser, parse_only=DETAIL_BLOCKS)
+        report_timing("soup", time.perf_counter() - start)
+        details: Dict[str, Optional[str]] = run_extractors(soup, EXTRACTORS)
+        if details["title"] is not None and not history_unwrapped(soup):
+            return details
+        logger.debug("Scoped parse missed the header or VIN history blocks; parsing the full page")
+    start = time.perf_counter()
+    soup = make_soup(html, parser)
+    report_timing("soup", time.perf_counter() - start)
+    return run_extractors(soup, EXTRACTORS)
+
+
+async def fetch_car_html(url: str) -> str:
+    """
+    Asynchronously fetch the raw HTML of a car detail page.
 
-    return details
+    Args:
+        url (str): The full URL of a car detail page.
 
+    Returns:
+        str: Raw HTML, or an empty string on failure.
+    """
+    html: str = await fetch_html_async(url)
+    if not html:
+        logger.warning(f"No HTML content fetched for {url}")
+    return html
 
-async def fetch_and_parse_car(url: str) -> Dict[str, Optional[str]]:
+
+async def fetch_and_parse_car(url: str, parse_pool: Optional["ParsePool"] = None) -> Dict[str, Optional[str]]:
     """
     Asynchronously fetch a car detail page and extract all relevant data.
 
+    Fetching always happens on the event loop; parsing runs in-process, or in
+    a worker process when a `ParsePool` is given.
+
     Args:
         url (str): The full URL of a car detail page.
+        parse_pool (Optional[ParsePool]): Process pool for the parse stage.
 
     Returns:
         Dict[str, Optional[str]]: Dictionary of extracted fields or empty dict on failure.
     """
-    html: str = await asyncio.to_thread(fetch_html, url)
+    html: str = await fetch_car_html(url)
     if not html:
-        logger.warning(f"No HTML content fetched for {url}")
         return {}
 
-    details: Dict[str, Optional[str]] = extract_car_details(html)
+    if parse_pool is not None:
+        details: Dict[str, Optional[str]] = await parse_pool.parse_details(html)
+    else:
+        details = extract_car_details(html)
     logger.info(f"Parsed details for {url}")
     return details
@@ -16,7 +16,16 @@ Usage:
 from typing import Dict, Optional
 from bs4 import BeautifulSoup, Tag
 
+from .registry import compile_selectors, extractor
 
+_SELECTORS = compile_selectors({
+    "block": "div.details-stat",
+    "description": "p b",
+    "price": "span.formatted-anal",
+})
+
+
+@extractor("average_price", fields=("average_price_desc", "average_price_usd"), selectors=_SELECTORS)
 def extract_average_price(soup: BeautifulSoup) -> Dict[str, Optional[str]]:
     """
     Extracts the average market price block from the given car detail soup.
@@ -29,14 +38,14 @@ def extract_average_price(soup: BeautifulSoup) -> Dict[str, Optional[str]]:
             - 'average_price_desc': Description of average pricing (if available)
             - 'average_price_usd': Extracted USD price (if available)
     """
-    block: Optional[Tag] = soup.select_one("div.details-stat")
+    block: Optional[Tag] = _SELECTORS["block"].select_one(soup)
     if not block:
         return {"average_price_desc": None, "average_price_usd": None}
 
-    desc_tag: Optional[Tag] = block.select_one("p b")
+    desc_tag: Optional[Tag] = _SELECTORS["description"].select_one(block)
     description: Optional[str] = desc_tag.get_text(" ", strip=True) if desc_tag else None
 
-    price_tag: Optional[Tag] = block.select_one("span.formatted-anal")
+    price_tag: Optional[Tag] = _SELECTORS["price"].select_one(block)
     price_usd: Optional[str] = price_tag.get_text(strip=True) if price_tag else None
 
     return {
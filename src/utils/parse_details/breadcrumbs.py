@@ -14,7 +14,15 @@ Usage:
 from bs4 import BeautifulSoup, Tag
 from typing import Dict, Optional
 
+from .registry import compile_selectors, extractor
 
+_SELECTORS = compile_selectors({
+    "items": 'li[itemtype="https://schema.org/ListItem"]',
+    "name": 'span[itemprop="name"]',
+})
+
+
+@extractor("breadcrumbs", fields=("brand", "model", "generation"), selectors=_SELECTORS)
 def extract_car_breadcrumbs(soup: BeautifulSoup) -> Dict[str, Optional[str]]:
     """
     Extract car brand, model, and generation from breadcrumb navigation.
@@ -26,13 +34,13 @@ def extract_car_breadcrumbs(soup: BeautifulSoup) -> Dict[str, Optional[str]]:
         Dict[str, Optional[str]]: Keys "brand", "model", "generation" with string values or None.
     """
     result: Dict[str, Optional[str]] = {"brand": None, "model": None, "generation": None}
-    breadcrumb_items = soup.find_all("li", itemtype="https://schema.org/ListItem")
+    breadcrumb_items = _SELECTORS["items"].select(soup)
 
     if len(breadcrumb_items) >= 3:
         try:
-            brand_tag: Optional[Tag] = breadcrumb_items[-3].find("span", itemprop="name")
-            model_tag: Optional[Tag] = breadcrumb_items[-2].find("span", itemprop="name")
-            generation_tag: Optional[Tag] = breadcrumb_items[-1].find("span", itemprop="name")
+            brand_tag: Optional[Tag] = _SELECTORS["name"].select_one(breadcrumb_items[-3])
+            model_tag: Optional[Tag] = _SELECTORS["name"].select_one(breadcrumb_items[-2])
+            generation_tag: Optional[Tag] = _SELECTORS["name"].select_one(breadcrumb_items[-1])
 
             result["brand"] = brand_tag.get_text(strip=True) if brand_tag else None
             result["model"] = model_tag.get_text(strip=True) if model_tag else None
@@ -14,7 +14,17 @@ Usage:
 from typing import Dict, List, Optional
 from bs4 import BeautifulSoup, Tag
 
+from .registry import compile_selectors, extractor
 
+_SELECTORS = compile_selectors({
+    "block": "div.configuration",
+    "names": "div.name",
+    "values": "div.value",
+    "options": "p",
+})
+
+
+@extractor("configuration", fields=("configuration",), selectors=_SELECTORS)
 def extract_configuration_options(soup: BeautifulSoup) -> Dict[str, Optional[Dict[str, List[str]]]]:
     """
     Extracts configuration options from the given BeautifulSoup object.
@@ -28,19 +38,19 @@ def extract_configuration_options(soup: BeautifulSoup) -> Dict[str, Optional[Dic
             where keys are section names and values are lists of option strings.
             Returns {'configuration': None} if the configuration block is not found.
     """
-    config_block: Optional[Tag] = soup.select_one("div.configuration")
+    config_block: Optional[Tag] = _SELECTORS["block"].select_one(soup)
     if not config_block:
         return {"configuration": None}
 
     configuration: Dict[str, List[str]] = {}
-    names: Optional[Tag] = config_block.select("div.name")
-    values: Optional[Tag] = config_block.select("div.value")
+    names: Optional[Tag] = _SELECTORS["names"].select(config_block)
+    values: Optional[Tag] = _SELECTORS["values"].select(config_block)
 
     for name_div, value_div in zip(names, values):
         section_name: str = name_div.get_text(strip=True)
         options: List[str] = [
             p.get_text(strip=True) 
-            for p in value_div.select("p") 
+            for p in _SELECTORS["options"].select(value_div) 
             if p.get_text(strip=True)
         ]
         configuration[section_name] = options
@@ -16,7 +16,17 @@ from bs4 import BeautifulSoup, Tag
 
 from config import BASE_URL
 
+from .registry import compile_selectors, extractor
 
+_SELECTORS = compile_selectors({
+    "block": "div.personal-info.details-phone-wrap",
+    "user_name": "span.i-name",
+    "profile": "a[href^='/user/']",
+    "phone": "div.number",
+})
+
+
+@extractor("contact", fields=("user_name", "user_profile_url", "phone_number"), selectors=_SELECTORS)
 def extract_contact_info(soup: BeautifulSoup) -> Dict[str, Optional[str]]:
     """
     Extract user contact information.
@@ -30,7 +40,7 @@ def extract_contact_info(soup: BeautifulSoup) -> Dict[str, Optional[str]]:
             - "user_profile_url": full URL to the user profile or None
             - "phone_number": seller's phone number or None
     """
-    contact_div: Optional[Tag] = soup.select_one("div.personal-info.details-phone-wrap")
+    contact_div: Optional[Tag] = _SELECTORS["block"].select_one(soup)
     if not contact_div:
         return {
             "user_name": None,
@@ -38,13 +48,13 @@ def extract_contact_info(soup: BeautifulSoup) -> Dict[str, Optional[str]]:
             "phone_number": None
         }
 
-    user_name_tag: Optional[Tag] = contact_div.select_one("span.i-name")
+    user_name_tag: Optional[Tag] = _SELECTORS["user_name"].select_one(contact_div)
     user_name: Optional[str] = user_name_tag.get_text(strip=True) if user_name_tag else None
 
-    profile_link_tag: Optional[Tag] = contact_div.select_one("a[href^='/user/']")
+    profile_link_tag: Optional[Tag] = _SELECTORS["profile"].select_one(contact_div)
     profile_url: Optional[str] = urljoin(BASE_URL, profile_link_tag['href']) if profile_link_tag else None
 
-    phone_tag: Optional[Tag] = contact_div.select_one("div.number")
+    phone_tag: Optional[Tag] = _SELECTORS["phone"].select_one(contact_div)
     phone_number: Optional[str] = phone_tag.get_text(strip=True) if phone_tag else None
 
     return {
@@ -13,7 +13,15 @@ Usage:
 from typing import Dict, Optional
 from bs4 import BeautifulSoup, Tag
 
+from .registry import compile_selectors, extractor
 
+_SELECTORS = compile_selectors({
+    "block": "div#details-actions-block",
+    "title": "div.credit-button-top .content .title",
+})
+
+
+@extractor("credit", fields=("credit_offer",), selectors=_SELECTORS)
 def extract_credit_title(soup: BeautifulSoup) -> Dict[str, Optional[str]]:
     """
     Extract credit offer title from the given BeautifulSoup object.
@@ -24,11 +32,11 @@ def extract_credit_title(soup: BeautifulSoup) -> Dict[str, Optional[str]]:
     Returns:
         Dict[str, Optional[str]]: Dictionary with key 'credit_offer' and the offer title or None.
     """
-    block: Optional[Tag] = soup.find("div", id="details-actions-block")
+    block: Optional[Tag] = _SELECTORS["block"].select_one(soup)
     if not block:
         return {"credit_offer": None}
 
-    title_div: Optional[Tag] = block.select_one("div.credit-button-top .content .title")
+    title_div: Optional[Tag] = _SELECTORS["title"].select_one(block)
     if title_div:
         return {"credit_offer": title_div.get_text(strip=True)}
     return {"credit_offer": None}
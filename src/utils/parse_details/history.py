@@ -16,7 +16,16 @@ import re
 from typing import Any, Dict, List, Optional
 from bs4 import BeautifulSoup, Tag
 
+from .registry import compile_selectors, extractor
 
+_RECORD_COUNT_RE = re.compile(r"Найден[ао]?\s+(\d+)\s+запис", re.IGNORECASE)
+_SELECTORS = compile_selectors({
+    "car_name": "div.car-name.lw",
+    "record_counts": "span.green",
+})
+
+
+@extractor("history", fields=("vin_report",), selectors=_SELECTORS)
 def extract_history_records(soup: BeautifulSoup) -> Dict[str, Optional[Dict[str, Any]]]:
     """
     Extract VIN-related history records from the parsed HTML soup.
@@ -32,16 +41,16 @@ def extract_history_records(soup: BeautifulSoup) -> Dict[str, Optional[Dict[str,
     """
     vin_report: Dict[str, Any] = {}
 
-    name_block: Optional[BeautifulSoup] = soup.find("div", class_="car-name lw")
+    name_block: Optional[Tag] = _SELECTORS["car_name"].select_one(soup)
     if name_block:
         vin_report["car_name_and_year_vin"] = name_block.get_text(strip=True)
 
     record_sources: List[Dict[str, Any]] = []
 
-    for span in soup.find_all("span", class_="green"):
+    for span in _SELECTORS["record_counts"].select(soup):
         record_text: str = span.get_text(strip=True)
 
-        match: Optional[re.Match[str]] = re.search(r"Найден[ао]?\s+(\d+)\s+запис", record_text, re.IGNORECASE)
+        match: Optional[re.Match[str]] = _RECORD_COUNT_RE.search(record_text)
         if not match:
             continue
 
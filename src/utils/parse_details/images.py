@@ -18,7 +18,12 @@ Dependencies:
 from typing import Dict, List
 from bs4 import BeautifulSoup, Tag
 
+from .registry import compile_selectors, extractor
 
+_SELECTORS = compile_selectors({"images": "div.fotorama-details a[data-full]"})
+
+
+@extractor("images", fields=("image_links",), selectors=_SELECTORS)
 def extract_image_links(soup: BeautifulSoup) -> Dict[str, List[str]]:
     """
     Extracts image URLs from the car detail page soup.
@@ -29,6 +34,6 @@ def extract_image_links(soup: BeautifulSoup) -> Dict[str, List[str]]:
     Returns:
         Dict[str, List[str]]: Dictionary with key 'image_links' and list of image URLs as value.
     """
-    image_div: List[Tag] = soup.select("div.fotorama-details a[data-full]")
+    image_div: List[Tag] = _SELECTORS["images"].select(soup)
     links: List[str] = [tag["data-full"].strip() for tag in image_div if tag.has_attr("data-full")]
     return {"image_links": links}
@@ -0,0 +1,231 @@
+"""
+src/utils/parse_details/parser.py — Pluggable HTML parser backend for the extractors.
+
+Author: Danil
+Created: 2026-10-17
+Description:
+    All extractors work on a BeautifulSoup tree; this module decides which tree
+    builder produces it:
+    - "lxml":        C-based libxml2 parser, several times faster (default when installed)
+    - "html.parser": pure-Python standard-library parser (always available)
+
+    The extractor code is the same for every backend. `compare_parsers()` runs
+    `extract_car_details` with two backends and reports any field that differs,
+    so a backend switch can be validated on real pages.
+
+    Scoped parsing (`set_scoped_parsing(True)`) builds the tree only for the
+    blocks the extractors read (`DETAIL_BLOCKS`): breadcrumbs, header, credit,
+    contact, photos, specs, average price, seller comment, configuration, VIN
+    history and the VIN button. Scripts, footer and related-ads carousels are
+    skipped by the tree builder, which cuts parse time and memory per page.
+    The VIN history is only kept inside its `div.vin-report` container: its
+    generic "title" / "link" blocks cannot be kept on their own without losing
+    the sibling order the history extractor relies on. Its report name
+    (`div.car-name`) and record counts (`span.green`) are kept wherever they
+    are, so a page whose history is not wrapped is recognised from the scoped
+    tree and parsed in full (`history_unwrapped`). `compare_scoped()` checks
+    scoped parsing against a full parse of the same page.
+
+Usage:
+    from utils.parse_details.parser import make_soup, set_default_parser
+    set_default_parser("lxml")
+    soup = make_soup(html)
+
+Dependencies:
+    - BeautifulSoup4
+    - lxml (optional, fast backend)
+    - config.HTML_PARSER, config.logger
+"""
+
+from typing import Any, Dict, FrozenSet, Optional, Tuple
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from config import HTML_PARSER, SCOPED_PARSING, logger
+
+PARSERS: Tuple[str, ...] = ("lxml", "html.parser")
+
+_default_parser: Optional[str] = None
+_scoped_default: Optional[bool] = None
+
+# Containers read by the extractors, by class; everything inside a kept element is kept
+_BLOCK_CLASSES: FrozenSet[str] = frozenset({
+    "head-wrapper-main",   # head_info
+    "personal-info",       # contact
+    "fotorama-details",    # images
+    "tab-content",         # specs
+    "details-stat",        # average_price
+    "seller-comments",     # seller_comment
+    "configuration",       # configuration
+    "vin-report",          # history (see history_unwrapped for pages without it)
+})
+# VIN history elements also kept outside the container, to spot unwrapped history:
+# report name, record counts ("Найдено N записей")
+_HISTORY_MARKER_CLASSES: Dict[str, str] = {"div": "car-name", "span": "green"}
+_RECORD_COUNT_TEXT: str = "Найден"
+_BLOCK_ITEMTYPES: FrozenSet[str] = frozenset({
+    "https://schema.org/BreadcrumbList",
+    "https://schema.org/ListItem",
+})
+_BLOCK_IDS: FrozenSet[str] = frozenset({"details-actions-block"})
+
+
+def _lxml_available() -> bool:
+    try:
+        import lxml  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def resolve_parser(name: Optional[str] = None) -> str:
+    """
+    Resolve a parser name, falling back to "html.parser" when lxml is missing.
+
+    Args:
+        name (Optional[str]): Requested backend; the configured default if None.
+
+    Returns:
+        str: Tree builder name accepted by BeautifulSoup.
+    """
+    name = name or _default_parser or HTML_PARSER
+    if name not in PARSERS:
+        raise ValueError(f"Unknown HTML parser: {name}")
+    if name == "lxml" and not _lxml_available():
+        logger.warning("lxml is not installed, falling back to html.parser")
+        return "html.parser"
+    return name
+
+
+def set_default_parser(name: Optional[str]) -> None:
+    """
+    Set the process-wide parser backend used when no parser is passed explicitly.
+
+    Args:
+        name (Optional[str]): Backend name, or None to restore the configured default.
+
+    Returns:
+        None
+    """
+    global _default_parser
+    _default_parser = resolve_parser(name) if name else None
+
+
+def _is_detail_block(name: str, attrs: Dict[str, Any]) -> bool:
+    if attrs.get("itemtype") in _BLOCK_ITEMTYPES or attrs.get("id") in _BLOCK_IDS:
+        return True
+    classes: Any = attrs.get("class")
+    if not classes:
+        return False
+    if isinstance(classes, str):
+        classes = classes.split()
+    if name == "a":
+        return "btn-product-modal" in classes
+    if _HISTORY_MARKER_CLASSES.get(name) in classes:
+        return True
+    return name == "div" and not _BLOCK_CLASSES.isdisjoint(classes)
+
+
+DETAIL_BLOCKS: SoupStrainer = SoupStrainer(_is_detail_block)
+
+
+def history_unwrapped(soup: BeautifulSoup) -> bool:
+    """
+    Tell whether a page has VIN history blocks outside a `div.vin-report`, which a
+    scoped parse would miss.
+
+    Args:
+        soup (BeautifulSoup): Scoped parse of the page.
+
+    Returns:
+        bool: True if the page has to be parsed in full.
+    """
+    for name, class_ in _HISTORY_MARKER_CLASSES.items():
+        for marker in soup.find_all(name, class_=class_):
+            if name == "span" and _RECORD_COUNT_TEXT not in marker.get_text():
+                continue
+            if marker.find_parent("div", class_="vin-report") is None:
+                return True
+    return False
+
+
+def set_scoped_parsing(enabled: Optional[bool]) -> None:
+    """
+    Set whether detail pages are parsed scoped to `DETAIL_BLOCKS` by default.
+
+    Args:
+        enabled (Optional[bool]): True / False, or None to restore the configured default.
+
+    Returns:
+        None
+    """
+    global _scoped_default
+    _scoped_default = enabled
+
+
+def scoped_parsing(scoped: Optional[bool] = None) -> bool:
+    """
+    Resolve the scoped-parsing switch.
+
+    Args:
+        scoped (Optional[bool]): Explicit choice; the process default if None.
+
+    Returns:
+        bool: Whether to parse only `DETAIL_BLOCKS`.
+    """
+    if scoped is not None:
+        return scoped
+    return SCOPED_PARSING if _scoped_default is None else _scoped_default
+
+
+def make_soup(html: str, parser: Optional[str] = None, parse_only: Optional[SoupStrainer] = None) -> BeautifulSoup:
+    """
+    Parse HTML with the selected backend.
+
+    Args:
+        html (str): Raw HTML.
+        parser (Optional[str]): Backend name; the process default if None.
+        parse_only (Optional[SoupStrainer]): Only build the tree for matching elements.
+
+    Returns:
+        BeautifulSoup: Parsed document.
+    """
+    return BeautifulSoup(html, resolve_parser(parser), parse_only=parse_only)
+
+
+def compare_parsers(html: str, first: str = "html.parser", second: str = "lxml") -> Dict[str, Tuple[Any, Any]]:
+    """
+    Parse a detail page with two backends and list the fields that differ.
+
+    Args:
+        html (str): Raw HTML of a car detail page.
+        first (str): Reference backend.
+        second (str): Backend under test.
+
+    Returns:
+        Dict[str, Tuple[Any, Any]]: Field name → (first value, second value) for every mismatch.
+    """
+    from . import extract_car_details
+
+    a: Dict[str, Any] = extract_car_details(html, parser=first, scoped=False)
+    b: Dict[str, Any] = extract_car_details(html, parser=second, scoped=False)
+    return {key: (a.get(key), b.get(key)) for key in a.keys() | b.keys() if a.get(key) != b.get(key)}
+
+
+def compare_scoped(html: str, parser: Optional[str] = None) -> Dict[str, Tuple[Any, Any]]:
+    """
+    Parse a detail page in full and scoped to `DETAIL_BLOCKS` and list the fields that differ.
+
+    Args:
+        html (str): Raw HTML of a car detail page.
+        parser (Optional[str]): Backend; the process default if None.
+
+    Returns:
+        Dict[str, Tuple[Any, Any]]: Field name → (full-parse value, scoped value) for every mismatch.
+    """
+    from . import extract_car_details
+
+    full: Dict[str, Any] = extract_car_details(html, parser=parser, scoped=False)
+    scoped: Dict[str, Any] = extract_car_details(html, parser=parser, scoped=True)
+    return {key: (full.get(key), scoped.get(key)) for key in full.keys() | scoped.keys()
+            if full.get(key) != scoped.get(key)}
@@ -0,0 +1,177 @@
+"""
+src/utils/parse_details/registry.py — Declarative extractor registry with precompiled selectors.
+
+Author: Danil
+Created: 2026-10-17
+Description:
+    Every detail-page extractor registers itself here with the fields it
+    produces and the CSS selectors it uses:
+
+        _SELECTORS = compile_selectors({"block": "div.details-stat", "price": "span.formatted-anal"})
+
+        @extractor("average_price", fields=("average_price_desc", "average_price_usd"), selectors=_SELECTORS)
+        def extract_average_price(soup): ...
+
+    - `compile_selectors` compiles the selectors with soupsieve once, at
+      import, instead of BeautifulSoup re-parsing the selector strings on
+      every `select_one` call; extractors call `.select_one(tag)` /
+      `.select(tag)` on the compiled patterns
+    - label maps and regexes live next to them as frozen module constants
+    - `run_extractors` runs a list of extractors over one soup, merges their
+      dicts and reports each extractor's duration to the timing hooks; the
+      default hook feeds `utils.metrics.PARSE_SECONDS`, and `add_timing_hook`
+      plugs in others (profilers, benchmarks)
+
+Usage:
+    from utils.parse_details.registry import REGISTRY, add_timing_hook, run_extractors
+    add_timing_hook(lambda name, seconds: totals.update({name: totals.get(name, 0) + seconds}))
+    details = run_extractors(soup, REGISTRY.values())
+
+Dependencies:
+    - soupsieve (installed with BeautifulSoup4)
+    - utils.metrics for the default timing hook
+"""
+
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Tuple
+
+import soupsieve
+from bs4 import BeautifulSoup
+
+from utils.metrics import PARSE_SECONDS
+
+Extractor = Callable[[BeautifulSoup], Dict[str, Any]]
+TimingHook = Callable[[str, float], None]
+
+
+@dataclass(frozen=True)
+class ExtractorSpec:
+    """
+    A registered extractor.
+
+    Attributes:
+        name (str): Short name used in metrics and benchmarks ("head_info").
+        func (Extractor): Soup → dict of fields.
+        fields (Tuple[str, ...]): Keys of the dict it returns.
+        selectors (Mapping[str, soupsieve.SoupSieve]): Its compiled selectors, by role.
+    """
+    name: str
+    func: Extractor
+    fields: Tuple[str, ...]
+    selectors: Mapping[str, soupsieve.SoupSieve]
+
+
+# Registered extractors by name, in registration (import) order
+REGISTRY: Dict[str, ExtractorSpec] = {}
+_TIMING_HOOKS: List[TimingHook] = []
+
+
+def compile_selectors(selectors: Mapping[str, str]) -> Mapping[str, soupsieve.SoupSieve]:
+    """
+    Compile CSS selectors once.
+
+    Args:
+        selectors (Mapping[str, str]): Role → CSS selector.
+
+    Returns:
+        Mapping[str, soupsieve.SoupSieve]: Read-only role → compiled selector.
+    """
+    return MappingProxyType({role: soupsieve.compile(css) for role, css in selectors.items()})
+
+
+def extractor(
+    name: str,
+    fields: Iterable[str],
+    selectors: Mapping[str, soupsieve.SoupSieve] = MappingProxyType({}),
+) -> Callable[[Extractor], Extractor]:
+    """
+    Register an extractor (decorator); the function itself is returned unchanged.
+
+    Args:
+        name (str): Short name of the extractor.
+        fields (Iterable[str]): Keys of the dict it returns.
+        selectors (Mapping[str, soupsieve.SoupSieve]): Its compiled selectors.
+
+    Returns:
+        Callable[[Extractor], Extractor]: The decorator.
+
+    Raises:
+        ValueError: If the name is already taken by another function.
+    """
+    def register(func: Extractor) -> Extractor:
+        existing = REGISTRY.get(name)
+        if existing is not None and existing.func.__qualname__ != func.__qualname__:
+            raise ValueError(f"Extractor name {name!r} is already registered")
+        REGISTRY[name] = ExtractorSpec(name, func, tuple(fields), selectors)
+        return func
+    return register
+
+
+def add_timing_hook(hook: TimingHook) -> None:
+    """
+    Call `hook(extractor name, seconds)` after every extractor run.
+
+    Args:
+        hook (TimingHook): Callback; it must be cheap, it runs on the parse hot path.
+
+    Returns:
+        None
+    """
+    _TIMING_HOOKS.append(hook)
+
+
+def remove_timing_hook(hook: TimingHook) -> None:
+    """
+    Stop calling a hook added with `add_timing_hook`.
+
+    Args:
+        hook (TimingHook): The callback.
+
+    Returns:
+        None
+    """
+    if hook in _TIMING_HOOKS:
+        _TIMING_HOOKS.remove(hook)
+
+
+def _observe(name: str, seconds: float) -> None:
+    PARSE_SECONDS.observe(seconds, extractor=name)
+
+
+add_timing_hook(_observe)
+
+
+def report_timing(name: str, seconds: float) -> None:
+    """
+    Pass a duration to every timing hook (also used for the soup construction).
+
+    Args:
+        name (str): Stage name.
+        seconds (float): Duration.
+
+    Returns:
+        None
+    """
+    for hook in _TIMING_HOOKS:
+        hook(name, seconds)
+
+
+def run_extractors(soup: BeautifulSoup, specs: Iterable[ExtractorSpec]) -> Dict[str, Any]:
+    """
+    Run extractors over one page and merge their fields, timing each one.
+
+    Args:
+        soup (BeautifulSoup): Parsed detail page.
+        specs (Iterable[ExtractorSpec]): Extractors in output order.
+
+    Returns:
+        Dict[str, Any]: Merged fields.
+    """
+    details: Dict[str, Any] = {}
+    for spec in specs:
+        start: float = time.perf_counter()
+        details.update(spec.func(soup))
+        report_timing(spec.name, time.perf_counter() - start)
+    return details
@@ -10,8 +10,14 @@ Description:
 from typing import Dict, Optional
 from bs4 import BeautifulSoup, Tag
 
+from .registry import compile_selectors, extractor
+
+_SELECTORS = compile_selectors({"comment": "div.seller-comments span.original"})
+
+
+@extractor("seller_comment", fields=("seller_comment",), selectors=_SELECTORS)
 def extract_seller_comment(soup: BeautifulSoup) -> Dict[str, Optional[str]]:
-    block: Optional[Tag] = soup.select_one("div.seller-comments span.original")
+    block: Optional[Tag] = _SELECTORS["comment"].select_one(soup)
     if block:
         return {"seller_comment": block.get_text(strip=True, separator="\n")}
     return {"seller_comment": None}
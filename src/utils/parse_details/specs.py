@@ -5,53 +5,65 @@ Author: Danil
 Created: 2025-06-23
 Description:
     Parses key car specification fields such as year, mileage, color, engine, etc.
-    Maps Russian labels to standardized English keys.
+    Maps Russian labels to standardized English keys (a read-only map built once).
 
 """
 
-from typing import Dict, Optional
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional, Tuple
 from bs4 import BeautifulSoup, Tag
 
+from .registry import compile_selectors, extractor
 
+LABEL_MAP: Mapping[str, str] = MappingProxyType({
+    "год выпуска": "year",
+    "пробег": "mileage",
+    "кузов": "body_type",
+    "цвет": "color",
+    "двигатель": "engine",
+    "коробка": "transmission",
+    "привод": "drive_type",
+    "руль": "steering_wheel",
+    "состояние": "condition",
+    "таможня": "customs_cleared",
+    "обмен": "exchange",
+    "наличие": "availability",
+    "регион, город": "car_location",
+    "учёт": "registration_country",
+    "прочее": "other_info",
+    "vin": "vin",
+})
+SPEC_FIELDS: Tuple[str, ...] = tuple(LABEL_MAP.values())
+
+_SELECTORS = compile_selectors({
+    "rows": "div.tab-content div.field-row.clr",
+    "label": "div.field-label",
+    "value": "div.field-value",
+    "mileage_source": "span.mileage-source",
+})
+
+
+@extractor("specs", fields=SPEC_FIELDS, selectors=_SELECTORS)
 def extract_main_specs(soup: BeautifulSoup) -> Dict[str, Optional[str]]:
-    label_map: Dict[str, str] = {
-        "год выпуска": "year",
-        "пробег": "mileage",
-        "кузов": "body_type",
-        "цвет": "color",
-        "двигатель": "engine",
-        "коробка": "transmission",
-        "привод": "drive_type",
-        "руль": "steering_wheel",
-        "состояние": "condition",
-        "таможня": "customs_cleared",
-        "обмен": "exchange",
-        "наличие": "availability",
-        "регион, город": "car_location",
-        "учёт": "registration_country",
-        "прочее": "other_info",
-        "vin": "vin",
-    }
-
-    specs: Dict[str, Optional[str]] = {v: None for v in label_map.values()}
-
-    rows: list[Tag] = soup.select("div.tab-content div.field-row.clr")
+    specs: Dict[str, Optional[str]] = dict.fromkeys(SPEC_FIELDS)
+
+    rows: list[Tag] = _SELECTORS["rows"].select(soup)
 
     for row in rows:
-        label_tag: Optional[Tag] = row.select_one("div.field-label")
-        value_tag: Optional[Tag] = row.select_one("div.field-value")
+        label_tag: Optional[Tag] = _SELECTORS["label"].select_one(row)
+        value_tag: Optional[Tag] = _SELECTORS["value"].select_one(row)
 
         if not label_tag or not value_tag:
             continue
 
         raw_label: str = label_tag.get_text(strip=True).lower()
-        key: Optional[str] = label_map.get(raw_label)
+        key: Optional[str] = LABEL_MAP.get(raw_label)
 
         if not key:
             continue  
 
         if raw_label == "пробег":
-            hidden_span: Optional[Tag] = value_tag.select_one("span.mileage-source")
+            hidden_span: Optional[Tag] = _SELECTORS["mileage_source"].select_one(value_tag)
             value: str = (hidden_span.get_text(strip=True) + " км") if hidden_span else value_tag.get_text(strip=True)
         else:
             value: str = value_tag.get_text(strip=True)
@@ -12,8 +12,13 @@ Description:
 from typing import Dict, Optional
 from bs4 import BeautifulSoup, Tag
 
+from .registry import compile_selectors, extractor
 
+_SELECTORS = compile_selectors({"vin_link": "a.btn-product-modal[data-vincode]"})
+
+
+@extractor("vin", fields=("vin_code",), selectors=_SELECTORS)
 def extract_vin_code(soup: BeautifulSoup) -> Dict[str, Optional[str]]:
-    vin_link: Optional[Tag] = soup.find("a", class_="btn-product-modal", attrs={"data-vincode": True})
+    vin_link: Optional[Tag] = _SELECTORS["vin_link"].select_one(soup)
     vin_code: Optional[str] = vin_link.get("data-vincode", "").strip() if vin_link else None
     return {"vin_code": vin_code or None}
@@ -8,39 +8,104 @@ Description:
     - URLs of individual car listings
     - 'Срочно' status if available
     - Feature tags (e.g., VIP, Premium, Colored, AutoUp)
+    - Optionally, each car's schema.org `Offer` from the page's JSON-LD
+      `AggregateOffer` (price, currency, name, image, seller), for crawls
+      that do not fetch detail pages
 
 Usage:
     from utils.parse_listings import extract_links_from_html
     links = extract_links_from_html(html_content)
+    links = extract_links_from_html(html_content, with_offers=True)   # + item["offer"]
 
 Dependencies:
     - BeautifulSoup4
     - config.BASE_URL for absolute URL joining
 """
 
+import json
 from bs4 import BeautifulSoup
 from bs4.element import Tag
-from typing import List, Dict, Optional, Set
+from typing import Any, List, Dict, Optional, Set
 from urllib.parse import urljoin
-from config import BASE_URL
+from utils.parse_details.parser import make_soup
+from utils.dedup import listing_id
+from config import BASE_URL, logger
 
 
-def extract_links_from_html(html: str) -> List[Dict[str, str]]:
+def extract_offers(soup: BeautifulSoup, page_url: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Extracts the per-car offers of the JSON-LD `AggregateOffer` embedded in a search page.
+
+    Args:
+        soup (BeautifulSoup): Parsed search result page.
+        page_url (Optional[str]): URL the page was fetched from, used to resolve
+            relative links (defaults to `config.BASE_URL`).
+
+    Returns:
+        Dict[str, Dict[str, Any]]: Offers by listing ID (page order), each with:
+            - 'link': Full URL to the car listing
+            - 'name': Car name as shown on the card
+            - 'price' (Optional[int]) and 'currency' (e.g. "USD")
+            - 'image': Thumbnail URL
+            - 'seller': Seller name
+            - 'price_valid_until': Date string (YYYY-MM-DD)
+    """
+    offers: Dict[str, Dict[str, Any]] = {}
+    for script in soup.select('script[type="application/ld+json"]'):
+        try:
+            data: Any = json.loads(script.string or "")
+        except ValueError as e:
+            logger.warning(f"Invalid JSON-LD on {page_url}: {e}")
+            continue
+        for product in data if isinstance(data, list) else [data]:
+            aggregate: Any = product.get("offers") if isinstance(product, dict) else None
+            if not isinstance(aggregate, dict) or aggregate.get("@type") != "AggregateOffer":
+                continue
+            for offer in aggregate.get("offers") or []:
+                if not offer.get("url"):
+                    continue
+                image: Dict[str, Any] = offer.get("image") or {}
+                price: str = str(offer.get("price") or "")
+                link: str = urljoin(page_url or BASE_URL, offer["url"])
+                offers[listing_id(link)] = {
+                    "link": link,
+                    "name": image.get("name"),
+                    "price": int(float(price)) if price.replace(".", "", 1).isdigit() else None,
+                    "currency": offer.get("priceCurrency"),
+                    "image": image.get("contentUrl"),
+                    "seller": (image.get("creator") or {}).get("name"),
+                    "price_valid_until": offer.get("priceValidUntil"),
+                }
+    return offers
+
+
+def extract_links_from_html(
+    html: str,
+    parser: Optional[str] = None,
+    page_url: Optional[str] = None,
+    with_offers: bool = False,
+) -> List[Dict[str, Any]]:
     """
     Extracts car listing links and metadata from the HTML of a search result page.
 
     Args:
         html (str): Raw HTML content of a search results page.
+        parser (Optional[str]): HTML parser backend; process default if None.
+        page_url (Optional[str]): URL the page was fetched from, used to resolve
+            relative links (defaults to `config.BASE_URL`).
+        with_offers (bool): Also attach each car's JSON-LD offer (see `extract_offers`)
+            as 'offer'; offers without a card are returned as cards without status/features.
 
     Returns:
-        List[Dict[str, str]]: A list of dictionaries containing:
+        List[Dict[str, Any]]: A list of dictionaries containing:
             - 'link': Full URL to the car listing
             - 'status': 'Срочно' label if present
             - 'features': List of paid features (vip, premium, etc.)
+            - 'offer': JSON-LD offer or None (only with `with_offers`)
     """
-    soup: BeautifulSoup = BeautifulSoup(html, "html.parser")
+    soup: BeautifulSoup = make_soup(html, parser)
     items: List[Tag] = soup.select('div.list-item.list-label')
-    results: List[Dict[str, str]] = []
+    results: List[Dict[str, Any]] = []
 
     for item in items:
         link_tag = item.find('a', href=True)
@@ -48,7 +113,7 @@ def extract_links_from_html(html: str) -> List[Dict[str, str]]:
             continue
 
         # Build full link to car detail page
-        link: str = urljoin(BASE_URL, link_tag['href'])
+        link: str = urljoin(page_url or BASE_URL, link_tag['href'])
 
         # Check if listing is marked as 'Срочно'
         urgent_tag: Optional[Tag] = item.select_one('.urgent-label')
@@ -73,4 +138,11 @@ def extract_links_from_html(html: str) -> List[Dict[str, str]]:
             "features": list(features)
         })
 
+    if with_offers:
+        offers: Dict[str, Dict[str, Any]] = extract_offers(soup, page_url)
+        for result in results:
+            result["offer"] = offers.pop(listing_id(result["link"]), None)
+        for offer in offers.values():
+            results.append({"link": offer["link"], "status": None, "features": [], "offer": offer})
+
     return results
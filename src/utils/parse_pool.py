@@ -0,0 +1,171 @@
+"""
+src/utils/parse_pool.py — Process-pool parse stage for detail and listing HTML.
+
+Author: Danil
+Created: 2026-10-17
+Description:
+    HTML parsing is CPU-bound and holds the GIL, so running it on the event loop
+    (or in `asyncio.to_thread`) keeps one core busy while the rest idle.
+    `ParsePool` ships raw HTML to a `ProcessPoolExecutor` instead:
+    - requests are collected into batches (`batch_size` pages, or whatever has
+      arrived after `max_delay` seconds) to amortise pickling/IPC overhead
+    - each worker process runs the regular extractors and returns plain dicts
+    - callers simply `await pool.parse_details(html)`; fetching stays async
+    - per-extractor timings recorded in the workers are shipped back with each
+      batch and merged into the parent's `utils.metrics.PARSE_SECONDS`
+
+Usage:
+    from utils.parse_pool import ParsePool
+    pool = ParsePool(workers=4, batch_size=8)
+    details = await pool.parse_details(html)
+    pool.close()
+
+Dependencies:
+    - concurrent.futures.ProcessPoolExecutor
+    - utils.parse_details.extract_car_details
+    - utils.parse_listings.extract_links_from_html
+"""
+
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import logger
+from utils.metrics import PARSE_SECONDS
+
+DETAILS: str = "details"
+LISTING: str = "listing"
+OFFERS: str = "offers"
+
+
+def _init_worker(parser: Optional[str], scoped: Optional[bool] = None) -> None:
+    from utils.parse_details.parser import set_default_parser, set_scoped_parsing
+    set_default_parser(parser)
+    set_scoped_parsing(scoped)
+
+
+def _parse_batch(batch: List[Tuple[str, str, Optional[str]]]) -> Tuple[List[Tuple[bool, Any]], Dict]:
+    """
+    Parse a batch of pages inside a worker process.
+
+    Args:
+        batch (List[Tuple[str, str, Optional[str]]]): (kind, html, page url) triples;
+            kind is "details", "listing" or "offers" (listing with JSON-LD offers).
+
+    Returns:
+        Tuple[List[Tuple[bool, Any]], Dict]: (ok, parsed result or error message) for
+        each page, and the parse timings recorded for the batch.
+    """
+    from utils.parse_details import extract_car_details
+    from utils.parse_listings import extract_links_from_html
+
+    results: List[Tuple[bool, Any]] = []
+    for kind, html, url in batch:
+        try:
+            if kind == DETAILS:
+                results.append((True, extract_car_details(html)))
+            else:
+                results.append((True, extract_links_from_html(html, page_url=url, with_offers=kind == OFFERS)))
+        except Exception as e:
+            results.append((False, f"{type(e).__name__}: {e}"))
+    return results, PARSE_SECONDS.drain()
+
+
+class ParsePool:
+    """
+    Batched, awaitable front-end for a pool of parser processes.
+    """
+
+    def __init__(self, workers: int, batch_size: int = 8, max_delay: float = 0.005,
+                 parser: Optional[str] = None, scoped: Optional[bool] = None) -> None:
+        """
+        Args:
+            workers (int): Number of parser processes.
+            batch_size (int): Pages sent to a worker in one call.
+            max_delay (float): Longest time (seconds) a partial batch waits before being sent.
+            parser (Optional[str]): HTML parser backend used inside the workers.
+            scoped (Optional[bool]): Parse detail pages scoped to the extracted blocks
+                (see `utils.parse_details.parser`); the configured default if None.
+        """
+        self.batch_size: int = max(1, batch_size)
+        self.max_delay: float = max_delay
+        self._executor: ProcessPoolExecutor = ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(parser, scoped)
+        )
+        self._batch: List[Tuple[str, str, Optional[str], asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        logger.info(f"Started parse pool: {workers} workers, batch size {self.batch_size}")
+
+    async def parse_details(self, html: str) -> Dict[str, Any]:
+        """
+        Parse a car detail page in a worker process.
+
+        Args:
+            html (str): Raw HTML of a car detail page.
+
+        Returns:
+            Dict[str, Any]: Output of `extract_car_details`.
+        """
+        return await self._submit(DETAILS, html)
+
+    async def parse_listing(self, html: str, page_url: Optional[str] = None,
+                            with_offers: bool = False) -> List[Dict[str, Any]]:
+        """
+        Parse a search result page in a worker process.
+
+        Args:
+            html (str): Raw HTML of a search result page.
+            page_url (Optional[str]): URL of the page, for resolving relative links.
+            with_offers (bool): Also attach the JSON-LD offers (listing-only crawls).
+
+        Returns:
+            List[Dict[str, Any]]: Output of `extract_links_from_html`.
+        """
+        return await self._submit(OFFERS if with_offers else LISTING, html, page_url)
+
+    async def _submit(self, kind: str, html: str, url: Optional[str] = None) -> Any:
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future = loop.create_future()
+        self._batch.append((kind, html, url, future))
+        if len(self._batch) >= self.batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_delay, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._batch = self._batch, []
+        if not batch:
+            return
+        done = asyncio.wrap_future(self._executor.submit(_parse_batch, [(kind, html, url) for kind, html, url, _ in batch]))
+        done.add_done_callback(lambda f: self._deliver(batch, f))
+
+    @staticmethod
+    def _deliver(batch: List[Tuple[str, str, Optional[str], asyncio.Future]], done: asyncio.Future) -> None:
+        if done.cancelled() or done.exception() is not None:
+            error: BaseException = asyncio.CancelledError() if done.cancelled() else done.exception()
+            for *_, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        results, timings = done.result()
+        PARSE_SECONDS.merge(timings)
+        for (*_, future), (ok, value) in zip(batch, results):
+            if future.done():
+                continue
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(Exception(value))
+
+    def close(self) -> None:
+        """
+        Shut the worker processes down.
+
+        Returns:
+            None
+        """
+        self._executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,180 @@
+"""
+src/utils/rate_limit.py — Per-host token-bucket rate limiting with adaptive back-off.
+
+Author: Danil
+Created: 2026-10-17
+Description:
+    Keeps the crawler polite towards each host it talks to (m.mashina.kg for
+    pages, im.mashina.kg for images):
+    - `TokenBucket`: classic token bucket, `rate` requests/second with a burst `capacity`
+    - `HostRateLimiter`: one bucket per host; on 429/5xx responses it pauses the host
+      with exponential back-off and halves its rate, then slowly restores the rate
+      after consecutive successful responses
+
+    `utils.fetch` calls `acquire(url)` before and `record(url, status, retry_after)`
+    after every request when a limiter is installed via `set_rate_limiter()`.
+
+Usage:
+    from utils.rate_limit import HostRateLimiter
+    limiter = HostRateLimiter({"m.mashina.kg": 10.0}, default_rate=5.0)
+    await limiter.acquire(url)
+    limiter.record(url, 200)
+
+Dependencies:
+    - asyncio
+    - config.logger for logging
+"""
+
+import asyncio
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+from config import logger
+
+
+class TokenBucket:
+    """
+    Async token bucket: refills `rate` tokens per second up to `capacity`.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None) -> None:
+        self.rate: float = rate
+        self.capacity: float = capacity if capacity is not None else max(1.0, rate)
+        self._tokens: float = self.capacity
+        self._updated: float = time.monotonic()
+        self._lock: asyncio.Lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now: float = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        """
+        Wait until one token is available and consume it.
+
+        Returns:
+            None
+        """
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class HostRateLimiter:
+    """
+    Per-host token buckets with adaptive back-off on throttling and server errors.
+    """
+
+    def __init__(
+        self,
+        host_rates: Dict[str, float],
+        default_rate: float,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+        min_rate: float = 0.5,
+        recovery_after: int = 20,
+    ) -> None:
+        """
+        Args:
+            host_rates (Dict[str, float]): Requests/second per host name.
+            default_rate (float): Requests/second for hosts not listed in `host_rates`.
+            backoff_base (float): First pause (seconds) after a 429/5xx response.
+            backoff_max (float): Upper bound for the pause.
+            min_rate (float): Lowest rate the adaptive throttle may reduce a host to.
+            recovery_after (int): Consecutive successes needed to raise the rate again.
+        """
+        self.host_rates: Dict[str, float] = dict(host_rates)
+        self.default_rate: float = default_rate
+        self.backoff_base: float = backoff_base
+        self.backoff_max: float = backoff_max
+        self.min_rate: float = min_rate
+        self.recovery_after: int = recovery_after
+
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._paused_until: Dict[str, float] = {}
+        self._backoff: Dict[str, float] = {}
+        self._successes: Dict[str, int] = {}
+
+    def _bucket(self, host: str) -> TokenBucket:
+        bucket: Optional[TokenBucket] = self._buckets.get(host)
+        if bucket is None:
+            bucket = TokenBucket(self.host_rates.get(host, self.default_rate))
+            self._buckets[host] = bucket
+        return bucket
+
+    def pause(self, host: str, seconds: float) -> None:
+        """
+        Stop issuing requests to a host for the given number of seconds.
+
+        Args:
+            host (str): Host name.
+            seconds (float): Pause duration.
+
+        Returns:
+            None
+        """
+        until: float = time.monotonic() + seconds
+        if until > self._paused_until.get(host, 0.0):
+            self._paused_until[host] = until
+
+    async def acquire(self, url: str) -> None:
+        """
+        Wait for a pending back-off to expire and for a token of the URL's host.
+
+        Args:
+            url (str): URL about to be requested.
+
+        Returns:
+            None
+        """
+        host: str = urlsplit(url).hostname or ""
+        delay: float = self._paused_until.get(host, 0.0) - time.monotonic()
+        while delay > 0:
+            await asyncio.sleep(delay)
+            delay = self._paused_until.get(host, 0.0) - time.monotonic()
+        await self._bucket(host).acquire()
+
+    def record(self, url: str, status: int, retry_after: Optional[float] = None) -> bool:
+        """
+        Feed a response status back into the limiter.
+
+        429 and 5xx responses (and network failures, status 0) pause the host with
+        exponential back-off (at least `retry_after`, if the server sent one) and
+        halve its rate; successes gradually restore it.
+
+        Args:
+            url (str): Requested URL.
+            status (int): HTTP status code, 0 for network errors.
+            retry_after (Optional[float]): Parsed `Retry-After` header, in seconds.
+
+        Returns:
+            bool: True if the host was paused; the next `acquire()` for it waits
+            the pause out, so a retry needs no back-off of its own.
+        """
+        host: str = urlsplit(url).hostname or ""
+        bucket: TokenBucket = self._bucket(host)
+
+        if status == 429 or status >= 500 or status == 0:
+            backoff: float = min(self.backoff_max, self._backoff.get(host, self.backoff_base / 2) * 2)
+            self._backoff[host] = backoff
+            if retry_after is not None:
+                backoff = max(backoff, retry_after)
+            self._successes[host] = 0
+            self.pause(host, backoff)
+            bucket.rate = max(self.min_rate, bucket.rate / 2)
+            logger.warning(f"Throttling {host}: status {status}, pause {backoff:.1f}s, rate {bucket.rate:.2f}/s")
+            return True
+
+        self._backoff.pop(host, None)
+        self._successes[host] = self._successes.get(host, 0) + 1
+        target: float = self.host_rates.get(host, self.default_rate)
+        if bucket.rate < target and self._successes[host] >= self.recovery_after:
+            bucket.rate = min(target, bucket.rate * 1.25)
+            self._successes[host] = 0
+        return False
@@ -0,0 +1,324 @@
+"""
+src/utils/retry.py — Retry policy, per-host circuit breaker and dead-letter file.
+
+Author: Danil
+Created: 2026-10-17
+Description:
+    Transient failures (timeouts, connection resets, 5xx, 429) should not cost
+    a record. This module provides the pieces `utils.fetch` uses to retry them:
+    - `RetryPolicy`: which responses are retried, how many attempts, and the
+      delay between them (exponential back-off with full jitter; a
+      `Retry-After` header takes precedence)
+    - `CircuitBreaker`: after `failure_threshold` consecutive failures a host is
+      "opened" and all requests to it wait for `reset_timeout` seconds; then a
+      single probe request decides whether it closes again or stays open for
+      twice as long
+    - `DeadLetterQueue`: NDJSON file of pages / listings that still failed after
+      all retries, so they can be re-queued later without a full resume
+
+Usage:
+    from utils.retry import CircuitBreaker, DeadLetterQueue, RetryPolicy
+    policy = RetryPolicy(max_attempts=4)
+    if policy.should_retry(response.status) and attempt < policy.max_attempts:
+        await asyncio.sleep(policy.delay(attempt, parse_retry_after(...)))
+
+Dependencies:
+    - asyncio, random, email.utils (standard library)
+    - config.logger for logging
+"""
+
+import asyncio
+import json
+import os
+import random
+import time
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, FrozenSet, Iterator, List, Optional
+
+from config import logger
+
+RETRY_STATUSES: FrozenSet[int] = frozenset({0, 408, 425, 429, 500, 502, 503, 504})
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a `Retry-After` header value.
+
+    Args:
+        value (Optional[str]): Either delta-seconds or an HTTP date.
+
+    Returns:
+        Optional[float]: Seconds to wait (>= 0), or None if missing or invalid.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+
+
+def header(headers: Dict[str, str], name: str) -> Optional[str]:
+    """
+    Case-insensitive header lookup on a plain dict.
+
+    Args:
+        headers (Dict[str, str]): Response headers.
+        name (str): Header name.
+
+    Returns:
+        Optional[str]: Header value, or None if absent.
+    """
+    lowered: str = name.lower()
+    for key, value in headers.items():
+        if key.lower() == lowered:
+            return value
+    return None
+
+
+@dataclass
+class RetryPolicy:
+    """
+    When and how often to retry a request.
+
+    Attributes:
+        max_attempts (int): Total attempts per request, including the first (1 = no retries).
+        backoff_base (float): Upper bound of the first delay, in seconds.
+        backoff_max (float): Upper bound of any computed delay, in seconds.
+        retry_after_max (float): Longest `Retry-After` the policy is willing to honour.
+        retry_statuses (FrozenSet[int]): Statuses that are retried (0 = network error / timeout).
+    """
+    max_attempts: int = 4
+    backoff_base: float = 0.5
+    backoff_max: float = 30.0
+    retry_after_max: float = 120.0
+    retry_statuses: FrozenSet[int] = field(default_factory=lambda: RETRY_STATUSES)
+
+    def should_retry(self, status: int) -> bool:
+        return status in self.retry_statuses
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        Delay before the next attempt.
+
+        Args:
+            attempt (int): Number of attempts made so far (1 after the first failure).
+            retry_after (Optional[float]): Server-requested delay, if any.
+
+        Returns:
+            float: Seconds to wait.
+        """
+        if retry_after is not None:
+            return min(retry_after, self.retry_after_max)
+        # "Full jitter": uniform in [0, min(cap, base * 2^(attempt-1))]
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+
+
+class CircuitBreaker:
+    """
+    Per-host circuit breaker: closed → open after consecutive failures →
+    half-open (one probe) → closed or open again.
+    """
+
+    def __init__(self, failure_threshold: int = 10, reset_timeout: float = 30.0,
+                 max_reset_timeout: float = 600.0) -> None:
+        """
+        Args:
+            failure_threshold (int): Consecutive failures that open the circuit.
+            reset_timeout (float): Seconds a freshly opened circuit stays open.
+            max_reset_timeout (float): Upper bound when a failed probe doubles the timeout.
+        """
+        self.failure_threshold: int = failure_threshold
+        self.reset_timeout: float = reset_timeout
+        self.max_reset_timeout: float = max_reset_timeout
+        self._failures: Dict[str, int] = {}
+        self._open_until: Dict[str, float] = {}
+        self._timeout: Dict[str, float] = {}
+        self._probing: Dict[str, asyncio.Event] = {}
+
+    def is_open(self, host: str) -> bool:
+        return host in self._open_until
+
+    def release(self, host: str) -> None:
+        """
+        Give up a probe slot without an outcome (the probe request was cancelled).
+
+        Args:
+            host (str): Host name.
+
+        Returns:
+            None
+        """
+        probe: Optional[asyncio.Event] = self._probing.pop(host, None)
+        if probe is not None:
+            probe.set()
+
+    async def wait(self, host: str) -> bool:
+        """
+        Block while the host's circuit is open. After the timeout, the first
+        caller goes through as a probe and the others wait for its outcome.
+
+        Args:
+            host (str): Host name.
+
+        Returns:
+            bool: True if the caller is the probe and must report its outcome
+            with `record(..., probe=True)` (or `release()` if it is cancelled).
+        """
+        while host in self._open_until:
+            probe: Optional[asyncio.Event] = self._probing.get(host)
+            if probe is not None:
+                await probe.wait()
+                continue
+            delay: float = self._open_until[host] - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            if host in self._open_until and host not in self._probing:
+                self._probing[host] = asyncio.Event()
+                return True
+        return False
+
+    def record(self, host: str, success: bool, probe: bool = False) -> None:
+        """
+        Feed the outcome of a request into the breaker.
+
+        Args:
+            host (str): Host name.
+            success (bool): False for retryable failures (timeouts, 5xx, 429).
+            probe (bool): The request was the half-open probe returned by `wait()`.
+
+        Returns:
+            None
+        """
+        if success:
+            self._failures[host] = 0
+            if self._open_until.pop(host, None) is not None:
+                self._timeout.pop(host, None)
+                logger.info(f"Circuit closed for {host}")
+        else:
+            self._failures[host] = self._failures.get(host, 0) + 1
+            if probe or (host not in self._open_until and self._failures[host] >= self.failure_threshold):
+                timeout: float = min(self.max_reset_timeout, self._timeout.get(host, self.reset_timeout / 2) * 2)
+                self._timeout[host] = timeout
+                self._open_until[host] = time.monotonic() + timeout
+                logger.warning(f"Circuit open for {host} after {self._failures[host]} failures, "
+                               f"pausing {timeout:.0f}s")
+        if probe:
+            self.release(host)
+
+
+class DeadLetterQueue:
+    """
+    Append-only NDJSON file of work items that failed after all retries.
+    """
+
+    def __init__(self, path: str, append: bool = True) -> None:
+        """
+        Args:
+            path (str): NDJSON file (created on first write).
+            append (bool): Keep entries of previous runs; otherwise drop the old file.
+        """
+        self.path: str = path
+        if not append and os.path.exists(path):
+            os.remove(path)
+        self.count: int = 0
+        self._file = None
+
+    def add(self, kind: str, url: str, item: Optional[Dict[str, Any]] = None, reason: str = "") -> None:
+        """
+        Record a failed page or listing.
+
+        Args:
+            kind (str): "page" (search result page) or "detail" (listing detail page).
+            url (str): Failed URL.
+            item (Optional[Dict[str, Any]]): Listing info needed to re-queue a detail.
+            reason (str): Short description of the failure.
+
+        Returns:
+            None
+        """
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        entry: Dict[str, Any] = {"kind": kind, "url": url, "reason": reason, "failed_at": time.time()}
+        if item is not None:
+            entry["item"] = item
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self.count += 1
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> "DeadLetterQueue":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def take_dead_letters(path: str) -> List[Dict[str, Any]]:
+    """
+    Read a dead-letter file so its entries can be re-queued (entries that fail
+    again are appended to a fresh file).
+
+    The entries are kept in `<path>.taken` until `release_dead_letters` confirms
+    that the re-queue run finished; if it crashed, the next call picks them up
+    again together with whatever that run appended.
+
+    Args:
+        path (str): Dead-letter NDJSON file.
+
+    Returns:
+        List[Dict[str, Any]]: Entries, deduplicated by (kind, url), last one wins.
+    """
+    taken: str = path + ".taken"
+    entries: Dict[tuple, Dict[str, Any]] = {}
+    for source in (taken, path):
+        if os.path.exists(source):
+            for entry in _iter_lines(source):
+                entries[(entry.get("kind"), entry.get("url"))] = entry
+    if not entries:
+        return []
+    with open(taken + ".tmp", "w", encoding="utf-8") as f:
+        for entry in entries.values():
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(taken + ".tmp", taken)
+    if os.path.exists(path):
+        os.remove(path)
+    return list(entries.values())
+
+
+def release_dead_letters(path: str) -> None:
+    """
+    Drop the entries taken by `take_dead_letters` once their re-queue run has
+    finished (the ones that failed again are in `path` by then).
+
+    Args:
+        path (str): Dead-letter NDJSON file.
+
+    Returns:
+        None
+    """
+    if os.path.exists(path + ".taken"):
+        os.remove(path + ".taken")
+
+
+def _iter_lines(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue